@@ -3,6 +3,9 @@ DROP TABLE IF EXISTS student_prompt CASCADE;
 DROP TABLE IF EXISTS playground_result CASCADE;
 DROP TABLE IF EXISTS game_simulation_params CASCADE;
 DROP TABLE IF EXISTS user_api_key CASCADE;
+DROP TABLE IF EXISTS simulation_job CASCADE;
+DROP TABLE IF EXISTS chat_work_unit CASCADE;
+DROP TABLE IF EXISTS negotiation_checkpoint CASCADE;
 DROP TABLE IF EXISTS negotiation_chat CASCADE;
 DROP TABLE IF EXISTS instructor CASCADE;
 DROP TABLE IF EXISTS plays CASCADE;
@@ -115,12 +118,82 @@ CREATE TABLE negotiation_chat (
     transcript TEXT NOT NULL,
     summary TEXT,
     deal_value FLOAT,
+    prompt_tokens INT,
+    completion_tokens INT,
+    cached_tokens INT,
+    cost_usd DOUBLE PRECISION,
+    llm_route TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (game_id, round_number, group1_class, group1_id, group2_class, group2_id),
     FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
 );
 
+-- negotiation_checkpoint table - messages of unfinished chats, so retries resume mid-conversation
+CREATE TABLE negotiation_checkpoint (
+    game_id INT NOT NULL,
+    round_number SMALLINT NOT NULL,
+    group1_class VARCHAR(20) NOT NULL,
+    group1_id SMALLINT NOT NULL,
+    group2_class VARCHAR(20) NOT NULL,
+    group2_id SMALLINT NOT NULL,
+    history TEXT NOT NULL,                             -- JSON list of {"name", "content"} messages
+    message_count INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, round_number, group1_class, group1_id, group2_class, group2_id),
+    FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+);
+
+-- simulation_job table - simulations queued from the Control Panel and run by a background worker
+CREATE TABLE simulation_job (
+    job_id SERIAL PRIMARY KEY,
+    game_id INT NOT NULL,
+    status VARCHAR(20) NOT NULL,                       -- queued, running, success, partial, aborted, failed, interrupted
+    created_by VARCHAR(50),
+    worker VARCHAR(100),                               -- host:pid of the process running the job
+    params TEXT,                                       -- JSON run settings (never API keys)
+    total_matches INT NOT NULL DEFAULT 0,
+    processed_matches INT NOT NULL DEFAULT 0,
+    completed_matches INT NOT NULL DEFAULT 0,
+    progress TEXT,                                     -- latest progress line
+    result TEXT,                                       -- JSON outcome of create_chats
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+);
+
+-- chat_work_unit table - one row per chat of a tournament, claimed by worker processes
+CREATE TABLE chat_work_unit (
+    unit_id SERIAL PRIMARY KEY,
+    game_id INT NOT NULL,
+    round_number INT NOT NULL,
+    group1_class VARCHAR(20) NOT NULL,                 -- round row key
+    group1_id INT NOT NULL,
+    group2_class VARCHAR(20) NOT NULL,
+    group2_id INT NOT NULL,
+    group1_initiates BOOLEAN NOT NULL,                 -- which side of the row plays role 1
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',     -- pending, leased, done, failed
+    attempts INT NOT NULL DEFAULT 0,
+    leased_by VARCHAR(100),                            -- host:pid of the worker holding the lease
+    lease_expires_at TIMESTAMP,                        -- expired leases are claimed again
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    UNIQUE (game_id, round_number, group1_class, group1_id, group2_class, group2_id, group1_initiates),
+    FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+);
+
+-- chat_work_run table - run settings of a game's work queue, applied by every worker that joins it
+CREATE TABLE chat_work_run (
+    game_id INT PRIMARY KEY,
+    settings TEXT NOT NULL,                            -- JSON run settings (never API keys)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+);
+
 
 -- Create a table for game modes
 CREATE TABLE game_modes (
@@ -178,6 +251,9 @@ CREATE TABLE game_simulation_params (
     negotiation_termination_message TEXT NOT NULL,
     summary_prompt TEXT NOT NULL,
     summary_termination_message TEXT NOT NULL,
+    context_mode TEXT NOT NULL DEFAULT 'full',        -- full | last_k | summary (see conversation_context.py)
+    context_window INT,                                -- messages sent verbatim when context_mode is bounded
+    context_summary_model TEXT,                        -- model writing the rolling summary (NULL = game model)
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (game_id),
     FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
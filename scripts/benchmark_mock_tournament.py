@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tournament Throughput Benchmark (offline)
+
+Runs a full round-robin tournament through create_chats against the offline
+mock LLM backend (modules/llm_mock.py), so scheduling, conversation turns,
+summaries, retries and scoring can be load tested without an API key.
+
+The database write path is exercised when a database is configured
+(DATABASE_URL or .streamlit/secrets.toml) and --game-id points at an existing
+game; otherwise the DB helpers find no connection and skip their writes.
+
+Usage:
+    python scripts/benchmark_mock_tournament.py --teams 100 --rounds 5 --concurrency 32 --latency 0.5
+    python scripts/benchmark_mock_tournament.py --teams 20 --rate-limit 0.05 --latency-dist lognormal
+    python scripts/benchmark_mock_tournament.py --cache-mode record    # then: --cache-mode replay
+    python scripts/benchmark_mock_tournament.py --teams 20 --rpm 600 --tpm 200000
+    python scripts/benchmark_mock_tournament.py --teams 40 --concurrency 64 --adaptive --rate-limit 0.02
+    python scripts/benchmark_mock_tournament.py --teams 20 --prefix-cache-min 64    # short prompts still cache
+    python scripts/benchmark_mock_tournament.py --turns 40 --agree-after 80 --context-mode last_k --context-window 8
+    python scripts/benchmark_mock_tournament.py --teams 20 --summary-workers 4 --summary-batch 4
+    python scripts/benchmark_mock_tournament.py --teams 20 --no-deal 0.5 --structured-summaries
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+# Add the streamlit directory to the path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from modules.conversation_context import CONTEXT_MODES, DEFAULT_CONTEXT_WINDOW, ContextPolicy  # noqa: E402
+from modules.llm_cache import CACHE_MODES, open_llm_cache  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.negotiations import create_chats  # noqa: E402
+from modules.negotiations_agents import build_team_agents  # noqa: E402
+
+NAME_ROLES = ["Buyer", "Seller"]
+NEGOTIATION_TERMINATION_MESSAGE = "Pleasure doing business with you"
+SUMMARY_TERMINATION_MESSAGE = "Agreed value:"
+SUMMARY_PROMPT = "Summarize the negotiation and state the agreed value."
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark create_chats against the offline mock LLM backend.")
+    parser.add_argument("--teams", type=int, default=100, help="Number of teams (default: 100)")
+    parser.add_argument("--rounds", type=int, default=3, help="Tournament rounds (default: 3)")
+    parser.add_argument("--turns", type=int, default=10, help="Max exchanges per chat (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Chats played in parallel (default: 16)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean seconds per LLM call (default: 0.2)")
+    parser.add_argument(
+        "--latency-dist",
+        default="lognormal",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        help="Latency distribution (default: lognormal)",
+    )
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Probability of a 429 per call")
+    parser.add_argument("--error", type=float, default=0.0, help="Probability of a 500 per call")
+    parser.add_argument("--agree-after", type=int, default=6, help="Messages before agents accept an offer")
+    parser.add_argument("--no-deal", type=float, default=0.1, help="Fraction of chats that never agree")
+    parser.add_argument(
+        "--prefix-cache-min", type=int, default=1024, help="Prompt tokens before the mock reports cached prefixes"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency, faults and team values")
+    parser.add_argument(
+        "--adaptive", action="store_true", help="Let AIMD adjust concurrency (--concurrency is the upper bound)"
+    )
+    parser.add_argument("--rpm", type=int, default=None, help="Client-side requests-per-minute limit")
+    parser.add_argument("--tpm", type=int, default=None, help="Client-side tokens-per-minute limit")
+    parser.add_argument("--context-mode", default="full", choices=CONTEXT_MODES, help="Conversation context policy")
+    parser.add_argument(
+        "--context-window", type=int, default=DEFAULT_CONTEXT_WINDOW, help="Messages kept verbatim when bounded"
+    )
+    parser.add_argument(
+        "--summary-workers", type=int, default=0, help="Evaluate summaries on N background threads (0 = inline)"
+    )
+    parser.add_argument("--summary-batch", type=int, default=1, help="Transcripts per background summary request")
+    parser.add_argument(
+        "--structured-summaries", action="store_true", help="Ask the summary agent for a JSON schema answer"
+    )
+    parser.add_argument("--game-id", type=int, default=None, help="Existing game to store results under")
+    parser.add_argument("--cache-mode", default="off", choices=CACHE_MODES, help="LLM response cache mode")
+    parser.add_argument("--cache-path", default=None, help="LLM response cache file (default: LLM_CACHE_PATH)")
+    return parser.parse_args()
+
+
+def build_teams(num_teams, seed):
+    rng = random.Random(seed)
+    teams = [["T", group_id] for group_id in range(1, num_teams + 1)]
+    team_info = []
+    for team in teams:
+        prompts = [
+            f"You are the buyer for group {team[1]}. Keep the price as low as possible.",
+            f"You are the seller for group {team[1]}. Keep the price as high as possible.",
+        ]
+        team_info.append(
+            build_team_agents(
+                team,
+                prompts,
+                rng.randint(40, 90),
+                rng.randint(20, 70),
+                NAME_ROLES,
+                NEGOTIATION_TERMINATION_MESSAGE,
+            )
+        )
+    return teams, team_info
+
+
+def main():
+    args = parse_args()
+    query = urlencode(
+        {
+            "latency": args.latency,
+            "latency_dist": args.latency_dist,
+            "rate_limit": args.rate_limit,
+            "error": args.error,
+            "agree_after": args.agree_after,
+            "no_deal": args.no_deal,
+            "seed": args.seed,
+            "prefix_cache_min_tokens": args.prefix_cache_min,
+        }
+    )
+    llm_config = LLMConfig(
+        model="mock",
+        api_key="mock",
+        base_url=f"mock://?{query}",
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+    teams, team_info = build_teams(args.teams, args.seed)
+    # The schedule is shuffled with the global RNG; seed it so reruns (and cache replays) pair the same teams.
+    random.seed(args.seed)
+
+    print(f"Running {args.teams} teams x {args.rounds} rounds with concurrency {args.concurrency} ...")
+    start = time.perf_counter()
+    with open_llm_cache(args.cache_mode, args.cache_path) as llm_cache:
+        result = create_chats(
+            args.game_id,
+            llm_config,
+            NAME_ROLES,
+            "same",
+            teams,
+            [],
+            args.rounds,
+            args.turns,
+            NEGOTIATION_TERMINATION_MESSAGE,
+            SUMMARY_PROMPT,
+            SUMMARY_TERMINATION_MESSAGE,
+            max_concurrency=args.concurrency,
+            adaptive_concurrency=args.adaptive,
+            team_info=team_info,
+            llm_cache=llm_cache,
+            context_policy=ContextPolicy(args.context_mode, args.context_window),
+            summary_workers=args.summary_workers,
+            summary_batch_size=args.summary_batch,
+            structured_summaries=args.structured_summaries,
+        )
+    elapsed = time.perf_counter() - start
+
+    chats = result["processed_matches"]
+    print(f"\nStatus: {result['status']} ({result['completed_matches']}/{result['total_matches']} chats completed)")
+    print(f"Wall time: {elapsed:.2f}s, throughput: {chats / elapsed if elapsed else 0:.2f} chats/s")
+    print("\nTiming:")
+    print(json.dumps(result["timing"], indent=2))
+    print("\nDiagnostics:")
+    print(json.dumps(result["diagnostics"], indent=2))
+    print("\nToken usage:")
+    print(json.dumps(result["usage"]["total"], indent=2))
+    return 0 if result["status"] == "success" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
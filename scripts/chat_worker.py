@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Chat Worker
+
+Joins a tournament that the Control Panel started with "Share with Worker
+Processes" and plays chats from the game's work queue (chat_work_unit table)
+until it is drained.  Start as many workers as the API key's rate limit
+allows, on this machine or any other that can reach the database; each one
+claims chats with its own lease, and chats of a worker that dies are picked
+up by the others once the lease expires.
+
+The game's simulation settings (model, turns, termination messages, context
+policy) and the run settings stored with the queue (summary workers and
+batching, local deal reading, structured summaries, requests and tokens per
+minute, failover) are read from the database, so a chat is played, judged
+and throttled the same way whichever process runs it.  API keys are never
+stored there, so pass one with --api-key or the OPENAI_API_KEY environment
+variable; a run that fails over uses this machine's LLM_FALLBACK_* endpoint.
+
+Usage:
+    python scripts/chat_worker.py --game-id 42
+    python scripts/chat_worker.py --game-id 42 --concurrency 8 --lease-seconds 600
+    python scripts/chat_worker.py --game-id 42 --base-url https://openrouter.ai/api/v1 --model openai/gpt-4o
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add the streamlit directory to the path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from modules.conversation_context import context_policy_from_params  # noqa: E402
+from modules.database_handler import (  # noqa: E402
+    get_all_group_values,
+    get_game_by_id,
+    get_game_simulation_params,
+    get_game_team_inputs,
+    get_group_ids_from_game_id,
+)
+from modules.llm_routing import fallbacks_from_env  # noqa: E402
+from modules.negotiations import _db_write_lock, build_llm_config, create_chats  # noqa: E402
+from modules.negotiations_work_queue import (  # noqa: E402
+    DEFAULT_LEASE_SECONDS,
+    ChatWorkQueue,
+    DatabaseWorkQueueStore,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play chats from a game's work queue.")
+    parser.add_argument("--game-id", type=int, required=True, help="Game whose queued chats to play")
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY"), help="API key (default: $OPENAI_API_KEY)")
+    parser.add_argument("--model", help="Model id (default: the model stored for the game)")
+    parser.add_argument("--base-url", default=os.getenv("LLM_BASE_URL"), help="OpenAI-compatible API base URL")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chats played in parallel (default: 4)")
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help=f"Seconds a claimed chat stays with this worker without a renewal (default: {DEFAULT_LEASE_SECONDS:g})",
+    )
+    parser.add_argument("--worker-id", help="Name recorded on leases (default: host:pid)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.api_key:
+        sys.exit("An API key is required (--api-key or OPENAI_API_KEY).")
+
+    game = get_game_by_id(args.game_id)
+    params = get_game_simulation_params(args.game_id)
+    if not game or not params:
+        sys.exit(f"Game {args.game_id} has no stored simulation settings; start the run from the Control Panel.")
+    values = get_all_group_values(args.game_id)
+    if not values:
+        sys.exit("Failed to retrieve group values from database.")
+    team_inputs = get_game_team_inputs(args.game_id)
+    if team_inputs is None:
+        sys.exit("Failed to retrieve team submissions from database.")
+    teams = [
+        team
+        for team in get_group_ids_from_game_id(args.game_id) or []
+        if (team_inputs.get((team[0], int(team[1]))) or {}).get("prompt")
+    ]
+
+    work_queue = ChatWorkQueue(
+        args.game_id,
+        DatabaseWorkQueueStore(lock=_db_write_lock),
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+    )
+    settings = work_queue.settings()
+    if settings is None:
+        sys.exit(f"Game {args.game_id} has no queued run; start it from the Control Panel with worker sharing on.")
+    print(f"Worker {work_queue.worker_id} joining game {args.game_id}: {work_queue.open_units()} chats open")
+
+    result = create_chats(
+        args.game_id,
+        build_llm_config(
+            args.model or params["model"],
+            args.api_key,
+            base_url=args.base_url,
+            requests_per_minute=settings.get("requests_per_minute"),
+            tokens_per_minute=settings.get("tokens_per_minute"),
+            fallbacks=fallbacks_from_env() if settings.get("fail_over") else None,
+        ),
+        game["name_roles"].split("#_;:)"),
+        params["conversation_order"],
+        teams,
+        values,
+        0,
+        params["num_turns"],
+        params["negotiation_termination_message"],
+        params["summary_prompt"],
+        params["summary_termination_message"],
+        max_concurrency=args.concurrency,
+        context_policy=context_policy_from_params(params),
+        work_queue=work_queue,
+        join_queue=True,
+        summary_workers=settings.get("summary_workers", 0),
+        summary_batch_size=settings.get("summary_batch_size", 1),
+        read_deals_locally=settings.get("read_deals_locally", False),
+        structured_summaries=settings.get("structured_summaries", False),
+    )
+    print(
+        json.dumps(
+            {
+                "status": result["status"],
+                "completed_matches": result["completed_matches"],
+                "processed_matches": result["processed_matches"],
+                "work_queue": result["diagnostics"].get("work_queue"),
+                "message": result.get("message"),
+            },
+            indent=2,
+            default=str,
+        )
+    )
+    return 0 if result["status"] == "success" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
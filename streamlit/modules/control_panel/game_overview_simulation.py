@@ -1,3 +1,4 @@
+import os
 import time
 
 import streamlit as st
@@ -5,28 +6,53 @@ import streamlit as st
 from ..control_panel_ui_helpers import (
     calculate_planned_chats,
     format_progress_caption,
-    format_progress_status_line,
+    format_rate_limit_caption,
+)
+from ..conversation_context import (
+    CONTEXT_FULL,
+    CONTEXT_MODE_LABELS,
+    CONTEXT_MODES,
+    DEFAULT_CONTEXT_WINDOW,
+    ContextPolicy,
+    context_policy_from_params,
 )
 from ..database_handler import (
     delete_from_round,
     delete_negotiation_chats,
+    delete_negotiation_checkpoints,
     get_all_group_values,
     get_error_matchups,
     get_game_simulation_params,
+    get_game_team_inputs,
     get_group_ids_from_game_id,
-    get_student_prompt,
     get_user_api_key,
     list_user_api_keys,
     update_num_rounds_game,
     upsert_game_simulation_params,
 )
+from ..llm_cache import CACHE_MODES, CACHE_OFF, open_llm_cache
 from ..llm_models import MODEL_EXPLANATIONS, MODEL_OPTIONS
+from ..llm_rate_limit import rate_limit_utilization
+from ..llm_routing import fallbacks_from_env
 from ..negotiations import (
+    _db_write_lock,
     build_llm_config,
     create_all_error_chats,
     create_chats,
     is_invalid_api_key_error,
 )
+from ..negotiations_work_queue import ChatWorkQueue, DatabaseWorkQueueStore
+from ..simulation_jobs import ACTIVE_JOB_STATES, JOB_FAILED, JOB_INTERRUPTED, JOB_QUEUED, get_job_runner
+
+DEFAULT_PARALLEL_CHATS = 4
+JOB_REFRESH_SECONDS = 2
+MAX_PARALLEL_CHATS = 32
+CACHE_MODE_LABELS = {
+    "off": "Off",
+    "read_write": "Reuse identical responses",
+    "record": "Record (always call the API)",
+    "replay": "Replay only (no API calls)",
+}
 
 
 def render_simulation_tab(selected_game: dict) -> None:
@@ -46,11 +72,14 @@ def render_simulation_tab(selected_game: dict) -> None:
         if teams is False:
             st.error("An error occurred while retrieving group information.")
             teams = []
+        team_inputs = get_game_team_inputs(game_id)
+        if team_inputs is None:
+            st.error("An error occurred while retrieving the submissions.")
+            team_inputs = {}
         missing_submissions = []
         to_remove = []
         for i in teams:
-            prompts = get_student_prompt(game_id, i[0], i[1])
-            if not prompts:
+            if not (team_inputs.get((i[0], int(i[1]))) or {}).get("prompt"):
                 to_remove.append(i)
                 missing_submissions.append(f"Class {i[0]} - Group {i[1]}")
 
@@ -76,6 +105,9 @@ def render_simulation_tab(selected_game: dict) -> None:
         default_summary_termination = (
             simulation_params["summary_termination_message"] if simulation_params else "Agreed value:"
         )
+        default_context_mode = (simulation_params or {}).get("context_mode") or CONTEXT_FULL
+        default_context_window = (simulation_params or {}).get("context_window") or DEFAULT_CONTEXT_WINDOW
+        default_summary_model = (simulation_params or {}).get("context_summary_model") or "gpt-5-nano"
         default_conversation_starter = simulation_params["conversation_order"] if simulation_params else name_roles_1
         conversation_options = [f"{name_roles_1} ➡ {name_roles_2}", f"{name_roles_2} ➡ {name_roles_1}"]
         if default_conversation_starter == "same":
@@ -89,7 +121,7 @@ def render_simulation_tab(selected_game: dict) -> None:
         if len(teams) >= 2:
             st.warning(
                 "Attention: Running a new simulation will erase all previous data related to the game. "
-                "This includes all group chats and all group scores."
+                "This includes all group chats and all group scores, unless you resume the previous run."
             )
             with st.form(key="cc_simulation_form"):
                 selected_key_id = None
@@ -100,6 +132,15 @@ def render_simulation_tab(selected_game: dict) -> None:
                         key="cc_api_key_select_sim",
                     )
                     selected_key_id = key_options[selected_label]
+                extra_key_labels = []
+                if len(key_options) > 1:
+                    extra_key_labels = st.multiselect(
+                        "Additional API Keys",
+                        options=list(key_options.keys()),
+                        key="cc_api_key_pool_sim",
+                        help="Spread chats across these keys as well. Throttled keys are rested and rejected keys "
+                        "are taken out of rotation, so each extra key adds its own rate limit.",
+                    )
                 model = st.selectbox(
                     "OpenAI Model",
                     model_options,
@@ -135,6 +176,107 @@ def render_simulation_tab(selected_game: dict) -> None:
                     value=int(default_num_turns),
                     key="cc_num_turns",
                 )
+                context_mode = st.selectbox(
+                    "Conversation Memory",
+                    CONTEXT_MODES,
+                    index=CONTEXT_MODES.index(default_context_mode) if default_context_mode in CONTEXT_MODES else 0,
+                    format_func=lambda mode: CONTEXT_MODE_LABELS[mode],
+                    key="cc_context_mode",
+                    help="How much of the conversation agents see on each turn. Bounding it keeps prompt size and "
+                    "latency flat in long games; the summary option condenses older messages with the model below.",
+                )
+                context_window = st.number_input(
+                    "Recent Messages Kept",
+                    step=1,
+                    min_value=2,
+                    value=int(default_context_window),
+                    key="cc_context_window",
+                    help="Messages always sent word for word when conversation memory is bounded.",
+                )
+                context_summary_model = st.selectbox(
+                    "Summary Model",
+                    model_options,
+                    index=model_options.index(default_summary_model) if default_summary_model in model_options else 0,
+                    key="cc_context_summary_model",
+                    help="Model that condenses older messages (only used with the summary option).",
+                )
+                parallel_chats = st.number_input(
+                    "Parallel Chats",
+                    step=1,
+                    min_value=1,
+                    max_value=MAX_PARALLEL_CHATS,
+                    value=DEFAULT_PARALLEL_CHATS,
+                    key="cc_parallel_chats",
+                    help="How many chats run at the same time. Lower it if your API key hits rate limits.",
+                )
+                adaptive_concurrency = st.checkbox(
+                    "Adapt Parallel Chats to Rate Limits",
+                    value=False,
+                    key="cc_adaptive_concurrency",
+                    help="Start below the parallel chats setting, add chats while calls succeed and back off "
+                    "when the provider throttles. The limit learned for a key and model carries over to later runs.",
+                )
+                summary_workers = st.number_input(
+                    "Background Summary Workers",
+                    step=1,
+                    min_value=0,
+                    max_value=MAX_PARALLEL_CHATS,
+                    value=0,
+                    key="cc_summary_workers",
+                    help="Evaluate deal summaries on this many background threads instead of at the end of "
+                    "each chat, so the next negotiation starts right away (0 = summarize inside each chat).",
+                )
+                read_deals_locally = st.checkbox(
+                    "Read Clear Deals Without the Summary Agent",
+                    value=False,
+                    key="cc_read_deals_locally",
+                    help="When both sides' closing messages confirm the same single value, store it directly "
+                    "and skip the summary call. Unclear endings are still judged by the summary agent.",
+                )
+                structured_summaries = st.checkbox(
+                    "Structured Summary Answers (JSON)",
+                    value=False,
+                    key="cc_structured_summaries",
+                    help="Ask the summary agent for a JSON object (agreed, value, summary) enforced by the "
+                    "provider instead of a free-text line. Providers without JSON schema support fall back "
+                    "to the same answer in plain text.",
+                )
+                requests_per_minute = st.number_input(
+                    "Requests per Minute Limit",
+                    step=50,
+                    min_value=0,
+                    value=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0") or 0),
+                    key="cc_requests_per_minute",
+                    help="Your API key's request limit for this model (0 = no limit). Shared with every "
+                    "simulation and Playground chat using the same key and model.",
+                )
+                tokens_per_minute = st.number_input(
+                    "Tokens per Minute Limit",
+                    step=10000,
+                    min_value=0,
+                    value=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0") or 0),
+                    key="cc_tokens_per_minute",
+                    help="Your API key's token limit for this model (0 = no limit).",
+                )
+                default_cache_mode = os.getenv("LLM_CACHE_MODE", CACHE_OFF)
+                cache_mode = st.selectbox(
+                    "Response Cache",
+                    CACHE_MODES,
+                    index=CACHE_MODES.index(default_cache_mode) if default_cache_mode in CACHE_MODES else 0,
+                    format_func=lambda mode: CACHE_MODE_LABELS[mode],
+                    key="cc_llm_cache_mode",
+                    help="Reuse completions of byte-identical requests from earlier runs, "
+                    "e.g. to re-score a tournament without paying for it again.",
+                )
+                env_fallbacks = fallbacks_from_env()
+                fail_over = st.checkbox(
+                    "Fail Over to Fallback Endpoint",
+                    value=False,
+                    key="cc_fail_over",
+                    disabled=env_fallbacks is None,
+                    help="Send calls to the endpoint set in LLM_FALLBACK_BASE_URL / LLM_FALLBACK_MODEL while "
+                    "the selected provider keeps failing.",
+                )
                 negotiation_termination_message = st.text_input(
                     "Negotiation Termination Message",
                     value=default_negotiation_termination,
@@ -148,6 +290,20 @@ def render_simulation_tab(selected_game: dict) -> None:
                     value=default_summary_termination,
                     key="cc_summary_termination_message",
                 )
+                resume_run = st.checkbox(
+                    "Resume Previous Run",
+                    value=False,
+                    key="cc_resume_simulation",
+                    help="Keep every chat that already has a result and only play the missing ones, following "
+                    "the stored schedule. Use the same settings as the interrupted run.",
+                )
+                share_with_workers = st.checkbox(
+                    "Share with Worker Processes",
+                    value=False,
+                    key="cc_share_with_workers",
+                    help="Queue the chats in the database so worker processes started with "
+                    "scripts/chat_worker.py, on this or other machines, play them alongside this app.",
+                )
 
                 submit_button = st.form_submit_button(label="Run", disabled=not has_keys)
 
@@ -168,146 +324,130 @@ def render_simulation_tab(selected_game: dict) -> None:
                     and summary_prompt
                     and summary_termination_message
                 ):
-                    status_placeholder = st.empty()
-                    delete_from_round(game_id)
-                    delete_negotiation_chats(game_id)
-
                     initiator_role = conversation_starter.split(" ➡ ")[0].strip()
-                    upsert_game_simulation_params(
-                        game_id=game_id,
-                        model=model,
-                        conversation_order=initiator_role,
-                        starting_message="",
-                        num_turns=num_turns,
-                        negotiation_termination_message=negotiation_termination_message,
-                        summary_prompt=summary_prompt,
-                        summary_termination_message=summary_termination_message,
+                    context_policy = (
+                        None
+                        if context_mode == CONTEXT_FULL
+                        else ContextPolicy(context_mode, int(context_window), context_summary_model)
                     )
 
-                    update_num_rounds_game(rounds_to_run, game_id)
-
-                    config_list = build_llm_config(model, resolved_api_key)
+                    config_list = build_llm_config(
+                        model,
+                        resolved_api_key,
+                        requests_per_minute=int(requests_per_minute) or None,
+                        tokens_per_minute=int(tokens_per_minute) or None,
+                        fallbacks=env_fallbacks if fail_over else None,
+                    )
+                    llm_configs = [config_list]
+                    key_labels = [selected_label]
+                    for label in extra_key_labels:
+                        extra_key = get_user_api_key(st.session_state.get("user_id"), key_options[label])
+                        if label != selected_label and extra_key:
+                            llm_configs.append(
+                                build_llm_config(
+                                    model,
+                                    extra_key,
+                                    requests_per_minute=int(requests_per_minute) or None,
+                                    tokens_per_minute=int(tokens_per_minute) or None,
+                                    fallbacks=env_fallbacks if fail_over else None,
+                                )
+                            )
+                            key_labels.append(label)
                     values = get_all_group_values(game_id)
                     if not values:
                         st.error("Failed to retrieve group values from database.")
                         st.stop()
 
-                    progress_header = st.empty()
-                    progress_placeholder = st.empty()
-                    progress_bar = st.empty()
-                    progress_caption = st.empty()
                     total_matches = calculate_planned_chats(len(teams), rounds_to_run)
+                    run_teams = list(teams)
 
-                    progress_header.markdown("### Simulation Progress")
-                    progress_bar = st.progress(0)
-                    progress_caption.caption(
-                        f"Planned chats: {total_matches} | Rounds: {rounds_to_run} | Teams: {len(teams)}"
-                    )
-
-                    def update_progress(
-                        round_num,
-                        team1,
-                        team2,
-                        role1_name,
-                        role2_name,
-                        completed_matches,
-                        total_matches,
-                        phase,
-                        attempt=None,
-                        elapsed_seconds=None,
-                    ):
-                        visual_completed = completed_matches
-                        if phase in {"running", "retrying"} and total_matches:
-                            # Show partial progress while a blocking chat call is in flight.
-                            visual_completed = min(completed_matches + 0.5, total_matches)
-
-                        if total_matches:
-                            progress_bar.progress(min(visual_completed / total_matches, 1.0))
-
-                        progress_placeholder.info(
-                            format_progress_status_line(
-                                round_num,
-                                team1["Name"],
-                                team2["Name"],
-                                role1_name,
-                                role2_name,
-                                phase,
-                                attempt=attempt,
-                                elapsed_seconds=elapsed_seconds,
-                            )
+                    def run_simulation(progress_callback):
+                        # Runs on the job worker: the previous results are only
+                        # erased once this job's turn comes.
+                        if not resume_run:
+                            delete_from_round(game_id)
+                            delete_negotiation_chats(game_id)
+                            delete_negotiation_checkpoints(game_id)
+                        upsert_game_simulation_params(
+                            game_id=game_id,
+                            model=model,
+                            conversation_order=initiator_role,
+                            starting_message="",
+                            num_turns=num_turns,
+                            negotiation_termination_message=negotiation_termination_message,
+                            summary_prompt=summary_prompt,
+                            summary_termination_message=summary_termination_message,
+                            context_mode=context_mode,
+                            context_window=int(context_window),
+                            context_summary_model=context_summary_model,
                         )
-                        progress_caption.caption(format_progress_caption(completed_matches, total_matches, phase))
-
-                    with st.spinner("Running negotiations..."):
-                        try:
-                            outcome_simulation = create_chats(
+                        if not resume_run:
+                            update_num_rounds_game(rounds_to_run, game_id)
+                        with open_llm_cache(cache_mode) as llm_cache:
+                            return create_chats(
                                 game_id,
-                                config_list,
+                                llm_configs,
                                 name_roles,
                                 initiator_role,
-                                teams,
+                                run_teams,
                                 values,
                                 rounds_to_run,
                                 num_turns,
                                 negotiation_termination_message,
                                 summary_prompt,
                                 summary_termination_message,
-                                progress_callback=update_progress,
+                                progress_callback=progress_callback,
+                                max_concurrency=int(parallel_chats),
+                                adaptive_concurrency=adaptive_concurrency,
+                                llm_cache=llm_cache,
+                                context_policy=context_policy,
+                                key_labels=key_labels,
+                                resume=resume_run,
+                                summary_workers=int(summary_workers),
+                                read_deals_locally=read_deals_locally,
+                                structured_summaries=structured_summaries,
+                                work_queue=(
+                                    ChatWorkQueue(game_id, DatabaseWorkQueueStore(lock=_db_write_lock))
+                                    if share_with_workers
+                                    else None
+                                ),
                             )
-                        except Exception as e:
-                            progress_placeholder.empty()
-                            progress_bar.empty()
-                            progress_caption.empty()
-                            progress_header.empty()
-                            status_placeholder.empty()
-                            if is_invalid_api_key_error(e):
-                                st.error(
-                                    "Your API key appears invalid or unauthorized. Update it in Profile and try again."
-                                )
-                            else:
-                                st.error(f"Simulation failed: {str(e)}")
-                            st.stop()
-                    progress_placeholder.empty()
-                    progress_bar.empty()
-                    progress_caption.empty()
-                    progress_header.empty()
-                    status_placeholder.empty()
-                    if isinstance(outcome_simulation, dict) and outcome_simulation.get("status") == "success":
-                        completed = outcome_simulation.get("completed_matches", 0)
-                        processed = outcome_simulation.get("processed_matches", completed)
-                        total = outcome_simulation.get("total_matches", 0)
-                        st.success(
-                            f"All negotiations were completed successfully! "
-                            f"Successful: {completed} | Processed: {processed} of {total} chats."
-                        )
-                    elif isinstance(outcome_simulation, dict):
-                        completed = outcome_simulation.get("completed_matches", 0)
-                        processed = outcome_simulation.get("processed_matches", 0)
-                        total = outcome_simulation.get("total_matches", 0)
-                        st.warning(
-                            f"Simulation completed with errors. Successful: {completed} | "
-                            f"Processed: {processed} of {total} chats."
+
+                    try:
+                        get_job_runner().submit(
+                            game_id,
+                            run_simulation,
+                            total_matches=total_matches,
+                            created_by=st.session_state.get("user_id"),
+                            params={
+                                "model": model,
+                                "rounds": rounds_to_run,
+                                "teams": len(teams),
+                                "num_turns": int(num_turns),
+                                "parallel_chats": int(parallel_chats),
+                                "summary_workers": int(summary_workers),
+                                "structured_summaries": structured_summaries,
+                                "context_mode": context_mode,
+                                "keys": key_labels,
+                                "resume": resume_run,
+                                "shared_with_workers": share_with_workers,
+                            },
+                            caption_fn=lambda: format_rate_limit_caption(rate_limit_utilization(config_list)),
                         )
-                        st.warning(outcome_simulation.get("message", "Some negotiations were unsuccessful."))
+                    except RuntimeError as e:
+                        st.error(f"Simulation could not be queued: {e}")
+                        st.stop()
+                    if resume_run:
+                        st.success("Simulation queued: resuming the chats that have no result yet.")
                     else:
-                        st.warning(str(outcome_simulation))
-
-                    if isinstance(outcome_simulation, dict):
-                        timing = outcome_simulation.get("timing", {})
-                        st.caption(
-                            "Timing diagnostics (seconds per chat avg): "
-                            f"Negotiation={timing.get('chat_seconds_avg', 0):.2f}, "
-                            f"Summary={timing.get('summary_seconds_avg', 0):.2f}, "
-                            f"DB={timing.get('db_seconds_avg', 0):.2f}"
+                        st.success(
+                            f"Simulation queued: {total_matches} chats over {rounds_to_run} rounds. "
+                            "It keeps running if you leave this page."
                         )
-                        diagnostics = outcome_simulation.get("diagnostics", {})
+                    if share_with_workers:
                         st.caption(
-                            "Run diagnostics: "
-                            f"attempts={diagnostics.get('attempts_total', 0)}, "
-                            f"retries={diagnostics.get('retries_used', 0)}, "
-                            f"failed_attempts={diagnostics.get('attempts_failed', 0)}, "
-                            f"summary_calls={diagnostics.get('summary_calls', 0)}, "
-                            f"avg_turns/successful_chat={diagnostics.get('avg_turns_per_successful_chat', 0):.2f}"
+                            f"Add workers with `python scripts/chat_worker.py --game-id {game_id}` "
+                            "(API key from OPENAI_API_KEY or --api-key)."
                         )
                 else:
                     warning = st.warning("Please fill out all fields before submitting.")
@@ -316,6 +456,8 @@ def render_simulation_tab(selected_game: dict) -> None:
         else:
             st.write("There must be at least two submissions in order to run a simulation.")
 
+        _render_simulation_jobs(game_id)
+
     with sim_tabs[1]:
         saved_keys = list_user_api_keys(st.session_state.get("user_id"))
         key_options = {key["key_name"]: key["key_id"] for key in saved_keys}
@@ -373,17 +515,20 @@ def render_simulation_tab(selected_game: dict) -> None:
 
                     with st.spinner("Re-running error chats..."):
                         try:
-                            outcome_errors_simulation = create_all_error_chats(
-                                game_id,
-                                config_list,
-                                name_roles,
-                                simulation_params["conversation_order"],
-                                values,
-                                simulation_params["num_turns"],
-                                simulation_params["negotiation_termination_message"],
-                                simulation_params["summary_prompt"],
-                                simulation_params["summary_termination_message"],
-                            )
+                            with open_llm_cache() as llm_cache:
+                                outcome_errors_simulation = create_all_error_chats(
+                                    game_id,
+                                    config_list,
+                                    name_roles,
+                                    simulation_params["conversation_order"],
+                                    values,
+                                    simulation_params["num_turns"],
+                                    simulation_params["negotiation_termination_message"],
+                                    simulation_params["summary_prompt"],
+                                    simulation_params["summary_termination_message"],
+                                    llm_cache=llm_cache,
+                                    context_policy=context_policy_from_params(simulation_params),
+                                )
                         except Exception as e:
                             if is_invalid_api_key_error(e):
                                 st.error(
@@ -404,3 +549,160 @@ def render_simulation_tab(selected_game: dict) -> None:
                     warning.empty()
         else:
             st.write("No error chats found.")
+
+
+def _render_simulation_outcome(outcome_simulation):
+    if isinstance(outcome_simulation, dict) and outcome_simulation.get("status") == "success":
+        completed = outcome_simulation.get("completed_matches", 0)
+        processed = outcome_simulation.get("processed_matches", completed)
+        total = outcome_simulation.get("total_matches", 0)
+        st.success(
+            f"All negotiations were completed successfully! "
+            f"Successful: {completed} | Processed: {processed} of {total} chats."
+        )
+    elif isinstance(outcome_simulation, dict) and outcome_simulation.get("status") == "aborted":
+        st.error(
+            f"Simulation aborted after {outcome_simulation.get('processed_matches', 0)} of "
+            f"{outcome_simulation.get('total_matches', 0)} chats."
+        )
+        st.error(outcome_simulation.get("message", "The simulation was aborted."))
+    elif isinstance(outcome_simulation, dict):
+        completed = outcome_simulation.get("completed_matches", 0)
+        processed = outcome_simulation.get("processed_matches", 0)
+        total = outcome_simulation.get("total_matches", 0)
+        st.warning(
+            f"Simulation completed with errors. Successful: {completed} | Processed: {processed} of {total} chats."
+        )
+        st.warning(outcome_simulation.get("message", "Some negotiations were unsuccessful."))
+    else:
+        st.warning(str(outcome_simulation))
+
+    if isinstance(outcome_simulation, dict):
+        if outcome_simulation.get("resumed_matches"):
+            st.caption(f"Resumed run: kept {outcome_simulation['resumed_matches']} chats finished earlier.")
+        timing = outcome_simulation.get("timing", {})
+        st.caption(
+            "Timing diagnostics (seconds per chat avg): "
+            f"Negotiation={timing.get('chat_seconds_avg', 0):.2f}, "
+            f"Summary={timing.get('summary_seconds_avg', 0):.2f}, "
+            f"DB={timing.get('db_seconds_avg', 0):.2f} | "
+            f"Wall time={timing.get('run_wall_seconds', 0):.1f}s"
+        )
+        diagnostics = outcome_simulation.get("diagnostics", {})
+        st.caption(
+            "Run diagnostics: "
+            f"attempts={diagnostics.get('attempts_total', 0)}, "
+            f"retries={diagnostics.get('retries_used', 0)}, "
+            f"failed_attempts={diagnostics.get('attempts_failed', 0)}, "
+            f"llm_calls={diagnostics.get('llm_calls', 0)}, "
+            f"llm_retries={diagnostics.get('llm_retries', 0)}, "
+            f"cache_hits={diagnostics.get('llm_cache_hits', 0)}, "
+            f"throttle_waits={diagnostics.get('llm_throttle_waits', 0)}, "
+            f"parallel_chats={diagnostics.get('concurrency_final', diagnostics.get('max_concurrency', 1))}, "
+            f"resumed_chats={diagnostics.get('resumed_chats', 0)}, "
+            f"context_summaries={diagnostics.get('llm_context_summaries', 0)}, "
+            f"summary_calls={diagnostics.get('summary_calls', 0)}, "
+            f"deals_read_locally={diagnostics.get('summary_local_rate', 0.0):.0%}, "
+            f"avg_turns/successful_chat={diagnostics.get('avg_turns_per_successful_chat', 0):.2f}"
+        )
+        key_health = diagnostics.get("keys")
+        if key_health:
+            st.caption(
+                "API keys: "
+                + " | ".join(
+                    f"{key['label']}: {key['chats']} chats, {key['throttled_chats']} throttled"
+                    + (", removed" if key["disabled"] else "")
+                    for key in key_health
+                )
+            )
+        routes = diagnostics.get("routes")
+        if routes:
+            st.caption(
+                "LLM routes: "
+                + ", ".join(f"{label} ({calls} calls)" for label, calls in routes.items())
+                + f" | failovers={diagnostics.get('llm_failovers', 0)}"
+            )
+        work_queue = diagnostics.get("work_queue")
+        if work_queue:
+            st.caption(
+                f"Work queue: this app played {work_queue['claimed']} chats "
+                f"({work_queue['reclaimed']} reclaimed from stopped workers) | "
+                + ", ".join(f"{status}={count}" for status, count in sorted(work_queue["units"].items()))
+            )
+        usage_total = outcome_simulation.get("usage", {}).get("total", {})
+        cost_usd = usage_total.get("cost_usd")
+        st.caption(
+            "Token usage: "
+            f"prompt={usage_total.get('prompt_tokens', 0):,}, "
+            f"completion={usage_total.get('completion_tokens', 0):,}, "
+            f"cached={usage_total.get('cached_tokens', 0):,} "
+            f"({diagnostics.get('cached_prompt_ratio', 0.0):.0%} of prompt) | "
+            f"Estimated cost={'n/a' if cost_usd is None else f'${cost_usd:.4f}'}"
+        )
+
+
+def _render_simulation_job(job):
+    status = job["status"]
+    total = job.get("total_matches") or 0
+    processed = job.get("processed_matches") or 0
+    if status in ACTIVE_JOB_STATES:
+        st.progress(min(processed / total, 1.0) if total else 0.0)
+        if status == JOB_QUEUED:
+            st.info("Queued: waiting for earlier simulations to finish.")
+        else:
+            st.info(job.get("progress") or "Starting...")
+        st.caption(f"{format_progress_caption(processed, total, 'completed')} | Job #{job['job_id']}")
+    elif status == JOB_FAILED:
+        if is_invalid_api_key_error(job.get("error") or ""):
+            st.error("Your API key appears invalid or unauthorized. Update it in Profile and try again.")
+        else:
+            st.error(f"Simulation failed: {job.get('error')}")
+    elif status == JOB_INTERRUPTED:
+        st.warning(
+            f"The app stopped while this simulation was running ({processed} of {total} chats processed). "
+            "Run it again with Resume Previous Run to play only the missing chats."
+        )
+    else:
+        _render_simulation_outcome(job.get("result"))
+
+
+def _render_simulation_job_list(game_id):
+    jobs = get_job_runner().jobs(game_id)
+    if not jobs:
+        return False
+    active = [job for job in jobs if job["status"] in ACTIVE_JOB_STATES]
+    st.markdown("### Simulation Progress")
+    for job in active or jobs[:1]:
+        _render_simulation_job(job)
+    if len(jobs) > len(active or jobs[:1]):
+        with st.expander("Earlier simulation runs"):
+            for job in jobs:
+                if job in (active or jobs[:1]):
+                    continue
+                st.caption(
+                    f"Job #{job['job_id']}: {job['status']} | "
+                    f"{job.get('processed_matches') or 0} of {job.get('total_matches') or 0} chats | "
+                    f"finished {job.get('finished_at') or '-'}"
+                )
+    return bool(active)
+
+
+def _render_simulation_jobs(game_id):
+    """Show the game's simulation jobs; refreshes itself while one is queued or running."""
+    if not any(job["status"] in ACTIVE_JOB_STATES for job in get_job_runner().jobs(game_id)):
+        _render_simulation_job_list(game_id)
+        return
+
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        _render_simulation_job_list(game_id)
+        st.button("Refresh progress", key="cc_refresh_simulation_jobs")
+        return
+
+    @fragment(run_every=JOB_REFRESH_SECONDS)
+    def live_jobs():
+        if not _render_simulation_job_list(game_id):
+            # The run just finished: redraw the whole page (results, error chats).
+            st.rerun()
+
+    live_jobs()
@@ -2,7 +2,7 @@ import pandas as pd
 
 import streamlit as st
 
-from ..database_handler import get_group_ids_from_game_id, get_student_prompt_with_timestamp
+from ..database_handler import get_game_team_inputs, get_group_ids_from_game_id
 
 
 def render_submissions_tab(selected_game: dict) -> None:
@@ -18,12 +18,17 @@ def render_submissions_tab(selected_game: dict) -> None:
         st.write("No teams found for this game.")
         return
 
+    team_inputs = get_game_team_inputs(game_id)
+    if team_inputs is None:
+        st.error("An error occurred while retrieving the submissions.")
+        return
+
     submissions = []
     missing_groups = []
     for class_, group_id in teams:
-        prompt_data = get_student_prompt_with_timestamp(game_id, class_, group_id)
-        prompts = prompt_data["prompt"] if prompt_data else None
-        updated_at = prompt_data["updated_at"] if prompt_data else None
+        prompt_data = team_inputs.get((class_, int(group_id))) or {}
+        prompts = prompt_data.get("prompt")
+        updated_at = prompt_data.get("updated_at")
         has_prompt = bool(prompts)
         if not has_prompt:
             missing_groups.append(f"Class {class_} - Group {group_id}")
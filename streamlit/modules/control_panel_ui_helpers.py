@@ -52,3 +52,17 @@ def format_progress_caption(completed_matches, total_matches, phase):
         current_chat = min(completed_matches + 1, total_matches)
         return f"Processing chat {current_chat} of {total_matches} (completed {completed_matches})"
     return f"Processed {completed_matches} of {total_matches} chats"
+
+
+def format_rate_limit_caption(utilization):
+    """Describe shared rate-limiter load, e.g. for the simulation progress caption."""
+    if not utilization:
+        return ""
+    parts = []
+    if utilization["requests_per_minute"]:
+        parts.append(f"{utilization['requests_last_minute']}/{utilization['requests_per_minute']} requests/min")
+    if utilization["tokens_per_minute"]:
+        parts.append(f"{utilization['tokens_last_minute']:,}/{utilization['tokens_per_minute']:,} tokens/min")
+    if utilization["waits"]:
+        parts.append(f"throttled {utilization['waits']}x ({utilization['wait_seconds']:.1f}s)")
+    return "Rate limit: " + ", ".join(parts)
@@ -0,0 +1,93 @@
+"""Context policies that bound how much history each LLM call resends.
+
+By default every turn sends the whole conversation, so prompt size grows
+with each turn and a chat's total prompt tokens grow quadratically with
+its length.  A :class:`ContextPolicy` bounds it instead:
+
+* ``full`` – send everything (the default).
+* ``last_k`` – send only the last ``window`` messages.
+* ``summary`` – send the last ``window`` to ``2 * window - 1`` messages
+  verbatim, preceded by a rolling summary of everything older.  The
+  summary is refreshed by a (cheaper) ``summary_model`` each time another
+  ``window`` messages fall out of the verbatim tail.
+
+The system message is always sent.  Bounding the context trades away part
+of the provider's prompt cache: ``last_k`` moves the window every turn, so
+only the system message stays a cacheable prefix, while ``summary`` keeps
+the prefix stable between summary refreshes.  Policies are stored per game in
+``game_simulation_params`` (``context_mode``, ``context_window``,
+``context_summary_model``).
+"""
+
+from dataclasses import dataclass
+
+CONTEXT_FULL = "full"
+CONTEXT_LAST_K = "last_k"
+CONTEXT_SUMMARY = "summary"
+CONTEXT_MODES = (CONTEXT_FULL, CONTEXT_LAST_K, CONTEXT_SUMMARY)
+CONTEXT_MODE_LABELS = {
+    CONTEXT_FULL: "Full history",
+    CONTEXT_LAST_K: "Last messages only",
+    CONTEXT_SUMMARY: "Last messages + summary of older ones",
+}
+
+DEFAULT_CONTEXT_WINDOW = 8
+DEFAULT_SUMMARY_WORDS = 120
+
+CONTEXT_SUMMARIZER_NAME = "ContextSummarizer"
+SUMMARIZER_SYSTEM_MESSAGE = (
+    "You keep a running summary of a negotiation between the named participants. Update the summary with the new"
+    " messages. Keep every offer, counter-offer, price, concession and commitment with who made it, and the current"
+    " state of the negotiation. Write in the third person, at most {words} words, and reply with the summary only."
+)
+SUMMARY_MESSAGE_PREFIX = "Summary of the earlier conversation: "
+
+
+@dataclass(frozen=True)
+class ContextPolicy:
+    """How much conversation history each call resends.
+
+    Args:
+        mode: One of :data:`CONTEXT_MODES`.
+        window: Messages always sent verbatim.
+        summary_model: Model that writes the rolling summary (``None`` = the
+            engine's model).
+        summary_words: Word budget for the summary.
+    """
+
+    mode: str = CONTEXT_FULL
+    window: int = DEFAULT_CONTEXT_WINDOW
+    summary_model: str = None
+    summary_words: int = DEFAULT_SUMMARY_WORDS
+
+    def __post_init__(self):
+        if self.mode not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode: {self.mode}")
+        if self.window < 1:
+            raise ValueError("Context window must be at least 1 message")
+
+    @property
+    def bounded(self):
+        return self.mode != CONTEXT_FULL
+
+
+def context_policy_from_params(simulation_params):
+    """Build the :class:`ContextPolicy` stored in a ``game_simulation_params`` row (``None`` = full history)."""
+    if not simulation_params:
+        return None
+    mode = simulation_params.get("context_mode") or CONTEXT_FULL
+    if mode == CONTEXT_FULL:
+        return None
+    return ContextPolicy(
+        mode=mode,
+        window=int(simulation_params.get("context_window") or DEFAULT_CONTEXT_WINDOW),
+        summary_model=simulation_params.get("context_summary_model") or None,
+    )
+
+
+def summary_request(previous_summary, entries):
+    """User message asking the summarizer to fold *entries* into *previous_summary*."""
+    transcript = "\n".join(f"{entry['name']}: {entry['content']}" for entry in entries)
+    if previous_summary:
+        return f"Summary so far:\n{previous_summary}\n\nNew messages:\n{transcript}"
+    return f"Messages:\n{transcript}"
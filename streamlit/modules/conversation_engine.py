@@ -2,12 +2,70 @@
 
 Replaces Microsoft AutoGen with direct OpenAI-compatible API calls.
 Supports any provider that exposes an OpenAI-compatible chat completions endpoint
-(OpenAI, OpenRouter, Azure, local LLMs via llama.cpp / vLLM / etc.).
+(OpenAI, OpenRouter, Azure, local LLMs via llama.cpp / vLLM / etc.), plus the
+offline ``mock://`` backend from :mod:`llm_mock` for load tests.
+
+Two engines share the same conversation logic:
+
+* :class:`ConversationEngine` blocks on every LLM call (``OpenAI`` client).
+* :class:`AsyncConversationEngine` awaits every LLM call (``AsyncOpenAI``
+  client), so many conversations can run concurrently on one event loop.
+
+The turn-taking rules live in generator "step" functions that yield the next
+``(agent, messages)`` request and receive the reply; each engine only decides
+how that request is executed.
 """
 
+import asyncio
+import hashlib
+import re
+import time
 from dataclasses import dataclass
-
-from openai import OpenAI
+from functools import lru_cache
+from itertools import islice
+from urllib.parse import urlsplit
+
+from openai import AsyncOpenAI, OpenAI
+
+from .conversation_context import (
+    CONTEXT_LAST_K,
+    CONTEXT_SUMMARIZER_NAME,
+    CONTEXT_SUMMARY,
+    SUMMARIZER_SYSTEM_MESSAGE,
+    SUMMARY_MESSAGE_PREFIX,
+    summary_request,
+)
+from .llm_mock import AsyncMockOpenAI, MockOpenAI, get_mock_backend, is_mock_base_url
+from .llm_models import REASONING_TOKEN_HEADROOM, is_reasoning_model, model_usage_key
+from .llm_rate_limit import estimate_prompt_tokens, get_rate_limiter
+from .llm_retry import (
+    ERROR_RETRYABLE,
+    RetryPolicy,
+    classify_llm_error,
+    is_rate_limit_error,
+    is_timeout_error,
+    retry_after_seconds,
+)
+from .llm_routing import ROUTE_STATS_PREFIX, get_circuit_breaker, route_label
+
+
+@dataclass(frozen=True)
+class GenerationLimits:
+    """Output limits applied to every completion generated for one agent.
+
+    Args:
+        max_output_tokens: Cap on the visible reply.  Reasoning models get
+            ``REASONING_TOKEN_HEADROOM`` on top, since their cap also covers
+            hidden reasoning tokens.
+        stop: Stop sequences (at most 4).  Sent to the provider when the
+            model supports them, otherwise applied to the reply afterwards.
+        stop_after: Phrase that ends the agent's part (e.g. the termination
+            message); anything after the sentence containing it is dropped.
+    """
+
+    max_output_tokens: int = None
+    stop: tuple = ()
+    stop_after: str = None
 
 
 @dataclass
@@ -16,6 +74,9 @@ class GameAgent:
 
     name: str
     system_message: str
+    limits: GenerationLimits = None
+    model: str = None  # overrides the engine's model for this agent
+    response_format: dict = None  # structured output (e.g. a JSON schema) for single decisions
 
 
 class ChatResult:
@@ -25,37 +86,393 @@ class ChatResult:
         self.chat_history = chat_history
 
 
-class ConversationEngine:
-    """Runs turn-based conversations between 2+ agents via any OpenAI-compatible API."""
+def _client_kwargs(llm_config):
+    # The engine owns retries (see RetryPolicy), so the SDK's own retry loop is disabled.
+    kwargs = {"api_key": llm_config.api_key, "max_retries": 0}
+    if llm_config.base_url:
+        kwargs["base_url"] = llm_config.base_url
+    return kwargs
+
+
+# Hosts that accept ``prompt_cache_key``; other OpenAI-compatible providers may reject unknown fields.
+_PROMPT_CACHE_KEY_HOSTS = ("api.openai.com",)
+
+
+def _sends_prompt_cache_key(llm_config):
+    if not llm_config.base_url or is_mock_base_url(llm_config.base_url):
+        return True
+    return urlsplit(llm_config.base_url).hostname in _PROMPT_CACHE_KEY_HOSTS
+
+
+@lru_cache(maxsize=4096)
+def _prompt_cache_key(system_message):
+    """Stable routing key for every request that starts with *system_message*."""
+    return hashlib.sha256(system_message.encode("utf-8")).hexdigest()[:32]
+
+
+def _make_client(llm_config, async_client=False):
+    """Return the chat client for *llm_config*; ``mock://`` URLs get the offline backend."""
+    if is_mock_base_url(llm_config.base_url):
+        backend = get_mock_backend(llm_config.base_url)
+        return AsyncMockOpenAI(backend) if async_client else MockOpenAI(backend)
+    client_cls = AsyncOpenAI if async_client else OpenAI
+    return client_cls(**_client_kwargs(llm_config))
+
+
+class _PerspectiveViews:
+    """Append-only API message lists, one per agent, for a single conversation.
+
+    Each agent's list starts with its system message and is only extended
+    with the history entries it has not seen yet, so preparing a request
+    costs O(new messages) instead of rebuilding the whole conversation.
+    The lists are handed to the client as-is and must not be modified.
+
+    With a bounded :class:`~modules.conversation_context.ContextPolicy` the
+    views hold only the recent messages (plus the rolling summary) and are
+    rebuilt for every request; their size no longer grows with the chat.
+    """
+
+    def __init__(self, history, context_policy=None):
+        self.history = history
+        self.policy = context_policy if context_policy is not None and context_policy.bounded else None
+        self._views = {}
+        self.summary = None
+        self.summarized = 0  # history entries folded into the summary
+
+    def compaction(self):
+        """Step that refreshes the rolling summary once enough messages left the verbatim window."""
+        policy = self.policy
+        if policy is None or policy.mode != CONTEXT_SUMMARY:
+            return
+        older = len(self.history) - policy.window
+        if older - self.summarized < policy.window:
+            return
+        summarizer = GameAgent(
+            name=CONTEXT_SUMMARIZER_NAME,
+            system_message=SUMMARIZER_SYSTEM_MESSAGE.format(words=policy.summary_words),
+            limits=GenerationLimits(max_output_tokens=policy.summary_words * 2),
+            model=policy.summary_model,
+        )
+        request = summary_request(self.summary, list(islice(self.history, self.summarized, older)))
+        self.summary = yield summarizer, [
+            {"role": "system", "content": summarizer.system_message},
+            {"role": "user", "content": request},
+        ]
+        self.summarized = older
+
+    def view(self, agent):
+        if self.policy is not None:
+            return self._bounded_view(agent)
+        state = self._views.get(agent.name)
+        if state is None:
+            state = self._views[agent.name] = [[{"role": "system", "content": agent.system_message}], 0]
+        messages, seen = state
+        for entry in islice(self.history, seen, None):
+            role = "assistant" if entry["name"] == agent.name else "user"
+            messages.append({"role": role, "content": entry["content"]})
+        state[1] = len(self.history)
+        return messages
+
+    def _bounded_view(self, agent):
+        messages = [{"role": "system", "content": agent.system_message}]
+        if self.policy.mode == CONTEXT_LAST_K:
+            start = max(len(self.history) - self.policy.window, 0)
+        else:
+            start = self.summarized
+            if self.summary:
+                messages.append({"role": "user", "content": SUMMARY_MESSAGE_PREFIX + self.summary})
+        for entry in islice(self.history, start, None):
+            role = "assistant" if entry["name"] == agent.name else "user"
+            messages.append({"role": role, "content": entry["content"]})
+        return messages
 
-    def __init__(self, llm_config):
-        kwargs = {"api_key": llm_config.api_key}
-        if llm_config.base_url:
-            kwargs["base_url"] = llm_config.base_url
-        self.client = OpenAI(**kwargs)
+    def turn(self, agent):
+        """Step that asks *agent* for its next message (after any due summary refresh)."""
+        yield from self.compaction()
+        return (yield agent, self.view(agent))
+
+
+# Extra request arguments for streamed calls; the final chunk then carries the usage.
+_STREAM_KWARGS = {"stream": True, "stream_options": {"include_usage": True}}
+
+
+class _StreamedReply:
+    """Accumulates a streamed completion: text so far, time to first token and usage."""
+
+    def __init__(self, on_delta, start):
+        self.on_delta = on_delta
+        self.start = start
+        self.text = ""
+        self.first_token_seconds = None
+        self.finish_reason = None
+        self.usage = None
+
+    def add(self, chunk):
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return
+        self.finish_reason = chunk.choices[0].finish_reason or self.finish_reason
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - self.start
+            self.text += delta
+            self.on_delta(self.text)
+
+
+def _apply_limits(content, limits):
+    """Cut *content* at client-side stop sequences and after the ``stop_after`` sentence."""
+    cut = len(content)
+    for stop in limits.stop:
+        index = content.find(stop)
+        if index != -1:
+            cut = min(cut, index)
+    if limits.stop_after:
+        match = re.search(re.escape(limits.stop_after) + r"[^.!?\n]*[.!?]*", content)
+        if match:
+            cut = min(cut, match.end())
+    return content[:cut].rstrip() if cut < len(content) else content
+
+
+def _agent_delta(on_delta, agent):
+    """Bind *agent*'s name to a ``fn(agent_name, text)`` delta callback."""
+    # Context summaries are internal requests, not conversation turns.
+    if on_delta is None or agent.name == CONTEXT_SUMMARIZER_NAME:
+        return None
+    return lambda text: on_delta(agent.name, text)
+
+
+def _record(stats, key, amount=1):
+    """Add *amount* to ``stats[key]`` when the caller asked for call statistics."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+
+class _Route:
+    """An endpoint the engine can call: client, model, rate limiter and circuit breaker."""
+
+    def __init__(self, label, client, rate_limiter, breaker, model=None, prompt_cache_keys=True):
+        self.label = label
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.model = model  # None: the engine's (or the agent's) model
+        self.prompt_cache_keys = prompt_cache_keys
+
+
+class _EngineBase:
+    """Request building and turn-taking rules shared by the sync and async engines."""
+
+    def __init__(self, llm_config, retry_policy=None, cache=None, context_policy=None):
         self.model = llm_config.model
         self.temperature = llm_config.temperature
         self.top_p = llm_config.top_p
-
-    def _call_llm(self, system_message, messages):
-        """Make a single chat-completion call and return the assistant's text."""
-        api_messages = [{"role": "system", "content": system_message}]
-        api_messages.extend(messages)
-
-        kwargs = {"model": self.model, "messages": api_messages}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.context_policy = context_policy
+        self.prompt_cache_keys = _sends_prompt_cache_key(llm_config)
+        # Shared with every other engine using the same account and model.
+        self.rate_limiter = get_rate_limiter(llm_config)
+        self.route_label = route_label(llm_config)
+        # Fallback endpoints (see llm_routing); the primary only gets a breaker when it has somewhere to fail over to.
+        self.fallbacks = list(llm_config.fallbacks or [])
+        self.breaker = get_circuit_breaker(llm_config) if self.fallbacks else None
+        self._fallback_routes = []
+
+    def _build_fallback_routes(self, async_client=False):
+        return [
+            _Route(
+                route_label(config),
+                _make_client(config, async_client),
+                get_rate_limiter(config),
+                get_circuit_breaker(config),
+                model=config.model,
+                prompt_cache_keys=_sends_prompt_cache_key(config),
+            )
+            for config in self.fallbacks
+        ]
+
+    def _routes(self):
+        """The primary endpoint (read from the engine, so tests can swap its client) and the fallbacks."""
+        primary = _Route(self.route_label, self.client, self.rate_limiter, self.breaker)
+        return [primary, *self._fallback_routes]
+
+    @staticmethod
+    def _pick_route(routes):
+        """First route whose breaker lets a call through; the primary when every breaker is open."""
+        for route in routes:
+            if route.breaker is None or route.breaker.allow():
+                return route
+        return routes[0]
+
+    def _route_request(self, route, kwargs, api_messages, limits):
+        """*kwargs* adapted to *route*'s model and provider."""
+        if route.model is None:
+            return kwargs
+        request = self._request_kwargs(api_messages, limits, route.model, kwargs.get("response_format"))
+        if not route.prompt_cache_keys:
+            request.pop("prompt_cache_key", None)
+        return request
+
+    def _fail_over(self, routes, route, error, stats):
+        """Record *error* on *route*'s breaker; return the route to switch to, or ``None`` to stay."""
+        if route.breaker is None:
+            return None
+        if classify_llm_error(error) != ERROR_RETRYABLE or is_rate_limit_error(error):
+            # The endpoint answered: the request was rejected or throttled, which the rate limiter handles.
+            route.breaker.record_success()
+            return None
+        route.breaker.record_failure()
+        next_route = self._pick_route(routes)
+        if next_route is route:
+            return None
+        _record(stats, "llm_failovers")
+        return next_route
+
+    def _request_kwargs(self, api_messages, limits=None, model=None, response_format=None):
+        """Build the chat-completion arguments for *api_messages*.
+
+        Every request of an agent starts with the same system message, then
+        its history in order, so consecutive turns (and the agent's chats
+        against other opponents) share a byte-identical prefix that providers
+        with automatic prompt caching bill as ``cached_tokens``.  On OpenAI
+        the ``prompt_cache_key`` derived from the system message keeps those
+        requests on the same cache.  *response_format* is passed through as is.
+        """
+        model = model or self.model
+        kwargs = {"model": model, "messages": api_messages}
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        if self.prompt_cache_keys and api_messages and api_messages[0]["role"] == "system":
+            kwargs["prompt_cache_key"] = _prompt_cache_key(api_messages[0]["content"])
         if self.temperature is not None:
             kwargs["temperature"] = self.temperature
         if self.top_p is not None:
             kwargs["top_p"] = self.top_p
-
-        response = self.client.chat.completions.create(**kwargs)
-        return response.choices[0].message.content
+        if limits is not None:
+            reasoning = is_reasoning_model(model)
+            if limits.max_output_tokens:
+                if reasoning:
+                    kwargs["max_completion_tokens"] = limits.max_output_tokens + REASONING_TOKEN_HEADROOM
+                else:
+                    kwargs["max_tokens"] = limits.max_output_tokens
+            if limits.stop and not reasoning:
+                kwargs["stop"] = list(limits.stop[:4])
+        return kwargs
+
+    def _limit_reply(self, content, finish_reason, limits, stats):
+        """Apply *limits* to a generated reply and record what they changed."""
+        if finish_reason == "length":
+            _record(stats, "llm_length_stops")
+        if limits is None or content is None:
+            return content
+        if limits.max_output_tokens:
+            _record(stats, "llm_capped_calls")
+        limited = _apply_limits(content, limits)
+        if len(limited) < len(content):
+            _record(stats, "llm_truncated_replies")
+            # Same four-characters-per-token estimate as the rate limiter.
+            _record(stats, "llm_truncated_tokens", (len(content) - len(limited)) // 4)
+        return limited
+
+    @staticmethod
+    def _cap_retry(request, content, finish_reason, stats):
+        """Return *request* without its output cap when the cap left the reply empty, else ``None``."""
+        if content or finish_reason != "length":
+            return None
+        if "max_completion_tokens" not in request and "max_tokens" not in request:
+            return None
+        _record(stats, "llm_cap_retries")
+        return {key: value for key, value in request.items() if key not in ("max_completion_tokens", "max_tokens")}
+
+    def _cached_reply(self, request, stats):
+        """Return the cached reply for *request*, or ``None`` when it must be generated."""
+        if self.cache is None:
+            return None
+        content = self.cache.lookup(request)
+        if content is not None:
+            _record(stats, "llm_cache_hits")
+        return content
+
+    def _record_usage(self, response, stats, model):
+        """Add the token counts reported in ``response.usage`` to *stats*, in total and for *model*."""
+        usage = getattr(response, "usage", None)
+        if stats is None or usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        counts = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "cached_tokens": getattr(details, "cached_tokens", None),
+        }
+        for key, value in counts.items():
+            # Providers may omit any of these fields.
+            if isinstance(value, int):
+                _record(stats, key, value)
+                _record(stats, model_usage_key(model, key), value)
+
+    def _reserve_rate(self, request, stats, rate_limiter):
+        """Reserve *rate_limiter* budget for *request*; return ``(estimated_tokens, wait_seconds)``."""
+        if rate_limiter is None:
+            return 0, 0.0
+        tokens = estimate_prompt_tokens(request["messages"])
+        delay = rate_limiter.reserve(tokens)
+        if delay:
+            _record(stats, "llm_throttle_waits")
+            _record(stats, "llm_throttle_seconds", delay)
+        return tokens, delay
+
+    def _settle_rate(self, estimated_tokens, response, rate_limiter):
+        if rate_limiter is None:
+            return
+        total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(total_tokens, int):
+            rate_limiter.settle(estimated_tokens, total_tokens)
+
+    def _finish_call(self, request, response, content, estimated_tokens, stats, route):
+        """Book-keeping after a successful call on *route*; returns *content*."""
+        _record(stats, "llm_calls")
+        self._record_usage(response, stats, route.model or request["model"])
+        self._settle_rate(estimated_tokens, response, route.rate_limiter)
+        if route.breaker is not None:
+            route.breaker.record_success()
+            _record(stats, ROUTE_STATS_PREFIX + route.label)
+        if isinstance(response, _StreamedReply):
+            _record(stats, "llm_streamed_calls")
+            _record(stats, "llm_stream_seconds", time.perf_counter() - response.start)
+            if response.first_token_seconds is not None:
+                _record(stats, "llm_ttft_seconds", response.first_token_seconds)
+        if route.model is None:
+            # Only the primary answers *request* as keyed; a fallback's reply came from another model.
+            self._remember_reply(request, content)
+        return content
+
+    def _remember_reply(self, request, content):
+        if self.cache is not None and content is not None:
+            self.cache.store(request, content)
+
+    def _retry_delay(self, error, attempt, stats):
+        """Return the wait before retrying a failed call, or ``None`` to re-raise."""
+        if classify_llm_error(error) != ERROR_RETRYABLE:
+            return None
+        # Throttling is counted even on the last attempt: it drives adaptive concurrency.
+        if is_rate_limit_error(error):
+            _record(stats, "llm_rate_limited")
+        elif is_timeout_error(error):
+            _record(stats, "llm_timeouts")
+        if attempt >= self.retry_policy.max_attempts:
+            return None
+        _record(stats, "llm_retries")
+        return self.retry_policy.delay_seconds(attempt, retry_after_seconds(error))
 
     def _build_perspective(self, history, agent_name):
         """Build the OpenAI messages list from one agent's point of view.
 
         The agent's own prior messages become ``assistant`` and every other
-        participant's messages become ``user``.
+        participant's messages become ``user``.  Conversation loops use
+        :class:`_PerspectiveViews` instead, which produces the same messages
+        incrementally.
         """
         messages = []
         for entry in history:
@@ -63,15 +480,182 @@ class ConversationEngine:
             messages.append({"role": role, "content": entry["content"]})
         return messages
 
-    def _generate_reply(self, agent, history):
-        perspective = self._build_perspective(history, agent.name)
-        return self._call_llm(agent.system_message, perspective)
+    # ------------------------------------------------------------------
+    # Turn-taking steps (yield ``(agent, api_messages)``, receive the reply)
+    # ------------------------------------------------------------------
+
+    def _bilateral_steps(self, agent1, agent2, max_turns, termination_fn, history=None, on_message=None):
+        history = list(history or [])
+        views = _PerspectiveViews(history, self.context_policy)
+
+        def append(agent, content):
+            history.append({"name": agent.name, "content": content})
+            if on_message is not None:
+                on_message(history)
+            return termination_fn is not None and termination_fn({"content": content}, history)
+
+        if not history:
+            # Agent 1 generates its own opening message
+            opening = yield from views.turn(agent1)
+            if append(agent1, opening):
+                return ChatResult(history)
+        elif termination_fn and termination_fn({"content": history[-1]["content"]}, history):
+            # Resumed a conversation that had already ended.
+            return ChatResult(history)
+
+        # After the opener, each exchange adds one agent 2 and one agent 1 message.
+        completed_turns, agent2_already_replied = divmod(len(history) - 1, 2)
+        for _ in range(completed_turns, max_turns):
+            if not agent2_already_replied:
+                # Agent 2 responds
+                reply = yield from views.turn(agent2)
+                if append(agent2, reply):
+                    break
+            agent2_already_replied = False
+
+            # Agent 1 responds
+            reply = yield from views.turn(agent1)
+            if append(agent1, reply):
+                break
+
+        return ChatResult(history)
+
+    def _multilateral_steps(self, agents, opening_agent, max_turns, speaker_order_fn, termination_fn):
+        history = []
+        views = _PerspectiveViews(history, self.context_policy)
+        opening = yield from views.turn(opening_agent)
+        history.append({"name": opening_agent.name, "content": opening})
+        if termination_fn and termination_fn({"content": opening}, history):
+            return ChatResult(history)
+
+        if speaker_order_fn is not None:
+            speaker_iter = speaker_order_fn(agents, history)
+        else:
+            start_idx = 0
+            for i, a in enumerate(agents):
+                if a.name == opening_agent.name:
+                    start_idx = (i + 1) % len(agents)
+                    break
+
+            def _round_robin():
+                idx = start_idx
+                while True:
+                    yield agents[idx % len(agents)]
+                    idx += 1
+
+            speaker_iter = _round_robin()
+
+        for _ in range(max_turns):
+            agent = next(speaker_iter)
+            reply = yield from views.turn(agent)
+            history.append({"name": agent.name, "content": reply})
+            if termination_fn and termination_fn({"content": reply}, history):
+                break
+
+        return ChatResult(history)
+
+
+class ConversationEngine(_EngineBase):
+    """Runs turn-based conversations between 2+ agents via any OpenAI-compatible API.
+
+    *context_policy* (:class:`~modules.conversation_context.ContextPolicy`)
+    bounds the history resent on every turn; by default it is sent in full.
+    """
+
+    def __init__(self, llm_config, retry_policy=None, cache=None, context_policy=None):
+        super().__init__(llm_config, retry_policy, cache, context_policy)
+        self.client = _make_client(llm_config)
+        self._fallback_routes = self._build_fallback_routes()
+
+    def _call_llm(self, api_messages, stats=None, on_delta=None, limits=None, model=None, response_format=None):
+        """Make a single chat-completion call and return the assistant's text.
+
+        *api_messages* already starts with the system message.  Identical
+        requests are answered from ``cache`` when one is configured.  Each
+        attempt first waits for the shared ``rate_limiter`` budget, if any.
+        Retryable failures repeat only this call, following ``retry_policy``.
+
+        With *on_delta*, the completion is streamed and ``on_delta(text)`` is
+        called with the text received so far after every chunk (a retried
+        call starts again from an empty text).
+
+        *limits* (:class:`GenerationLimits`) cap and cut the reply.  A capped
+        call that ran out of tokens before producing any text is repeated
+        once without the cap.  *model* overrides the engine's model and
+        *response_format* asks for structured output.
+        """
+        kwargs = self._request_kwargs(api_messages, limits, model, response_format)
+        cached = self._cached_reply(kwargs, stats)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+        routes = self._routes()
+        route = self._pick_route(routes)
+        request = self._route_request(route, kwargs, api_messages, limits)
+        attempt = 1
+        failovers = 0
+        while True:
+            estimated_tokens, wait = self._reserve_rate(request, stats, route.rate_limiter)
+            if wait:
+                time.sleep(wait)
+            try:
+                if on_delta is None:
+                    response = route.client.chat.completions.create(**request)
+                    content = response.choices[0].message.content
+                    finish_reason = response.choices[0].finish_reason
+                else:
+                    response = _StreamedReply(on_delta, time.perf_counter())
+                    for chunk in route.client.chat.completions.create(**request, **_STREAM_KWARGS):
+                        response.add(chunk)
+                    content = response.text
+                    finish_reason = response.finish_reason
+            except Exception as error:
+                delay = self._retry_delay(error, attempt, stats)
+                fallback = self._fail_over(routes, route, error, stats) if failovers < len(routes) else None
+                if fallback is not None:
+                    # The breaker opened: switch endpoints at once instead of waiting on this one.
+                    route, failovers, attempt = fallback, failovers + 1, 1
+                    request = self._route_request(route, kwargs, api_messages, limits)
+                    continue
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            uncapped = self._cap_retry(request, content, finish_reason, stats)
+            if uncapped is not None:
+                request = uncapped
+                continue
+            content = self._limit_reply(content, finish_reason, limits, stats)
+            return self._finish_call(kwargs, response, content, estimated_tokens, stats, route)
+
+    def _run_steps(self, steps, stats=None, on_delta=None):
+        try:
+            agent, messages = next(steps)
+            while True:
+                if agent.name == CONTEXT_SUMMARIZER_NAME:
+                    _record(stats, "llm_context_summaries")
+                reply = self._call_llm(messages, stats, _agent_delta(on_delta, agent), agent.limits, agent.model)
+                agent, messages = steps.send(reply)
+        except StopIteration as done:
+            return done.value
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def run_bilateral(self, agent1, agent2, max_turns, termination_fn=None):
+    def run_bilateral(
+        self,
+        agent1,
+        agent2,
+        max_turns,
+        termination_fn=None,
+        stats=None,
+        history=None,
+        on_message=None,
+        on_delta=None,
+    ):
         """Two-agent back-and-forth (e.g. zero-sum negotiation).
 
         *agent1* opens the conversation by generating its first message via
@@ -84,33 +668,40 @@ class ConversationEngine:
             max_turns: Maximum number of full exchanges.
             termination_fn: ``fn(msg_dict, history) -> bool``.  Called
                 after every generated message.  Return *True* to stop.
+            stats: Optional dict; call counters (``llm_calls``,
+                ``llm_retries``, ``llm_rate_limited``) and token usage
+                (``prompt_tokens``, ``completion_tokens``,
+                ``cached_tokens``) are added to it.
+            history: Optional transcript of an interrupted run of the same
+                conversation (starting with *agent1*'s opener).  The
+                conversation resumes after its last message instead of
+                regenerating it.
+            on_message: ``fn(history)`` called with the live transcript
+                after every generated message, e.g. to checkpoint it.
+                Copy the list to keep it beyond the call.
+            on_delta: ``fn(agent_name, text_so_far)``.  Streams every
+                completion and reports each turn as it is generated;
+                streamed calls add ``llm_streamed_calls``,
+                ``llm_ttft_seconds`` and ``llm_stream_seconds`` to *stats*.
 
         Returns:
             A :class:`ChatResult` whose ``chat_history`` is a list of
             ``{"name": str, "content": str}`` dicts.
         """
-        # Agent 1 generates its own opening message
-        opening = self._call_llm(agent1.system_message, [])
-        history = [{"name": agent1.name, "content": opening}]
-        if termination_fn and termination_fn({"content": opening}, history):
-            return ChatResult(history)
-
-        for _ in range(max_turns):
-            # Agent 2 responds
-            reply = self._generate_reply(agent2, history)
-            history.append({"name": agent2.name, "content": reply})
-            if termination_fn and termination_fn({"content": reply}, history):
-                break
-
-            # Agent 1 responds
-            reply = self._generate_reply(agent1, history)
-            history.append({"name": agent1.name, "content": reply})
-            if termination_fn and termination_fn({"content": reply}, history):
-                break
-
-        return ChatResult(history)
-
-    def run_multilateral(self, agents, opening_agent, max_turns, speaker_order_fn=None, termination_fn=None):
+        return self._run_steps(
+            self._bilateral_steps(agent1, agent2, max_turns, termination_fn, history, on_message), stats, on_delta
+        )
+
+    def run_multilateral(
+        self,
+        agents,
+        opening_agent,
+        max_turns,
+        speaker_order_fn=None,
+        termination_fn=None,
+        stats=None,
+        on_delta=None,
+    ):
         """N-agent conversation (e.g. multi-party negotiation).
 
         *opening_agent* generates the first message via an LLM call, then
@@ -124,46 +715,168 @@ class ConversationEngine:
             speaker_order_fn: ``fn(agents, history) -> iterator of GameAgent``.
                 Defaults to round-robin.
             termination_fn: ``fn(msg_dict, history) -> bool``.
+            stats: Optional dict of call counters (see :meth:`run_bilateral`).
+            on_delta: Optional streaming callback (see :meth:`run_bilateral`).
 
         Returns:
             A :class:`ChatResult`.
         """
-        opening = self._call_llm(opening_agent.system_message, [])
-        history = [{"name": opening_agent.name, "content": opening}]
-        if termination_fn and termination_fn({"content": opening}, history):
-            return ChatResult(history)
+        return self._run_steps(
+            self._multilateral_steps(agents, opening_agent, max_turns, speaker_order_fn, termination_fn),
+            stats,
+            on_delta,
+        )
 
-        if speaker_order_fn is not None:
-            speaker_iter = speaker_order_fn(agents, history)
-        else:
-            start_idx = 0
-            for i, a in enumerate(agents):
-                if a.name == opening_agent.name:
-                    start_idx = (i + 1) % len(agents)
-                    break
-
-            def _round_robin():
-                idx = start_idx
-                while True:
-                    yield agents[idx % len(agents)]
-                    idx += 1
-
-            speaker_iter = _round_robin()
-
-        for _ in range(max_turns):
-            agent = next(speaker_iter)
-            reply = self._generate_reply(agent, history)
-            history.append({"name": agent.name, "content": reply})
-            if termination_fn and termination_fn({"content": reply}, history):
-                break
-
-        return ChatResult(history)
-
-    def single_decision(self, agent, user_message):
+    def single_decision(self, agent, user_message, stats=None, on_delta=None, response_format=None):
         """One-shot LLM call (e.g. cooperate/defect in Prisoner's Dilemma, or summary evaluation).
 
+        *on_delta* streams the answer as in :meth:`run_bilateral`.
+        *response_format* (defaults to ``agent.response_format``) is sent as
+        the request's ``response_format``, e.g. a JSON schema.
+
         Returns:
-            The assistant's response text.
+            The assistant's response text (the JSON document in structured mode).
         """
-        messages = [{"role": "user", "content": user_message}]
-        return self._call_llm(agent.system_message, messages)
+        messages = [{"role": "system", "content": agent.system_message}, {"role": "user", "content": user_message}]
+        return self._call_llm(
+            messages,
+            stats,
+            _agent_delta(on_delta, agent),
+            agent.limits,
+            agent.model,
+            response_format or agent.response_format,
+        )
+
+
+class AsyncConversationEngine(_EngineBase):
+    """Asyncio counterpart of :class:`ConversationEngine` built on ``AsyncOpenAI``.
+
+    Every public method is a coroutine with the same arguments and the same
+    :class:`ChatResult` contract as the synchronous engine, so independent
+    conversations can be awaited together (e.g. with ``asyncio.gather``)
+    while each one waits on the network.
+    """
+
+    def __init__(self, llm_config, retry_policy=None, cache=None, context_policy=None):
+        super().__init__(llm_config, retry_policy, cache, context_policy)
+        self.client = _make_client(llm_config, async_client=True)
+        self._fallback_routes = self._build_fallback_routes(async_client=True)
+
+    async def _call_llm(self, api_messages, stats=None, on_delta=None, limits=None, model=None, response_format=None):
+        """Make a single chat-completion call and return the assistant's text."""
+        kwargs = self._request_kwargs(api_messages, limits, model, response_format)
+        cached = self._cached_reply(kwargs, stats)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+        routes = self._routes()
+        route = self._pick_route(routes)
+        request = self._route_request(route, kwargs, api_messages, limits)
+        attempt = 1
+        failovers = 0
+        while True:
+            estimated_tokens, wait = self._reserve_rate(request, stats, route.rate_limiter)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                if on_delta is None:
+                    response = await route.client.chat.completions.create(**request)
+                    content = response.choices[0].message.content
+                    finish_reason = response.choices[0].finish_reason
+                else:
+                    response = _StreamedReply(on_delta, time.perf_counter())
+                    async for chunk in await route.client.chat.completions.create(**request, **_STREAM_KWARGS):
+                        response.add(chunk)
+                    content = response.text
+                    finish_reason = response.finish_reason
+            except Exception as error:
+                delay = self._retry_delay(error, attempt, stats)
+                fallback = self._fail_over(routes, route, error, stats) if failovers < len(routes) else None
+                if fallback is not None:
+                    # The breaker opened: switch endpoints at once instead of waiting on this one.
+                    route, failovers, attempt = fallback, failovers + 1, 1
+                    request = self._route_request(route, kwargs, api_messages, limits)
+                    continue
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            uncapped = self._cap_retry(request, content, finish_reason, stats)
+            if uncapped is not None:
+                request = uncapped
+                continue
+            content = self._limit_reply(content, finish_reason, limits, stats)
+            return self._finish_call(kwargs, response, content, estimated_tokens, stats, route)
+
+    async def _run_steps(self, steps, stats=None, on_delta=None):
+        try:
+            agent, messages = next(steps)
+            while True:
+                if agent.name == CONTEXT_SUMMARIZER_NAME:
+                    _record(stats, "llm_context_summaries")
+                reply = await self._call_llm(messages, stats, _agent_delta(on_delta, agent), agent.limits, agent.model)
+                agent, messages = steps.send(reply)
+        except StopIteration as done:
+            return done.value
+
+    async def aclose(self):
+        """Close the HTTP clients of the primary endpoint and every fallback route."""
+        for route in self._routes():
+            await route.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def run_bilateral(
+        self,
+        agent1,
+        agent2,
+        max_turns,
+        termination_fn=None,
+        stats=None,
+        history=None,
+        on_message=None,
+        on_delta=None,
+    ):
+        """Async version of :meth:`ConversationEngine.run_bilateral`."""
+        return await self._run_steps(
+            self._bilateral_steps(agent1, agent2, max_turns, termination_fn, history, on_message), stats, on_delta
+        )
+
+    async def run_multilateral(
+        self,
+        agents,
+        opening_agent,
+        max_turns,
+        speaker_order_fn=None,
+        termination_fn=None,
+        stats=None,
+        on_delta=None,
+    ):
+        """Async version of :meth:`ConversationEngine.run_multilateral`."""
+        return await self._run_steps(
+            self._multilateral_steps(agents, opening_agent, max_turns, speaker_order_fn, termination_fn),
+            stats,
+            on_delta,
+        )
+
+    async def single_decision(self, agent, user_message, stats=None, on_delta=None, response_format=None):
+        """Async version of :meth:`ConversationEngine.single_decision`."""
+        messages = [{"role": "system", "content": agent.system_message}, {"role": "user", "content": user_message}]
+        return await self._call_llm(
+            messages,
+            stats,
+            _agent_delta(on_delta, agent),
+            agent.limits,
+            agent.model,
+            response_format or agent.response_format,
+        )
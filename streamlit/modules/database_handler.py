@@ -1,10 +1,14 @@
+import contextvars
+import json
 import logging
 import os
+from contextlib import contextmanager
 
 import pandas as pd
 import psycopg2
 from cryptography.fernet import Fernet, InvalidToken
 from flask import Flask
+from psycopg2.extras import execute_values
 
 import streamlit as st
 
@@ -79,6 +83,84 @@ def _normalize_game_class_value(game_class):
     return class_text
 
 
+NEGOTIATION_CHAT_USAGE_COLUMNS = {
+    "prompt_tokens": "INT",
+    "completion_tokens": "INT",
+    "cached_tokens": "INT",
+    "cost_usd": "DOUBLE PRECISION",
+}
+
+
+# Tables added after Tables_AI_Negotiator.sql was first deployed; created by the startup migration.
+_RUN_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS negotiation_checkpoint (
+        game_id INT NOT NULL,
+        round_number SMALLINT NOT NULL,
+        group1_class VARCHAR(20) NOT NULL,
+        group1_id SMALLINT NOT NULL,
+        group2_class VARCHAR(20) NOT NULL,
+        group2_id SMALLINT NOT NULL,
+        history TEXT NOT NULL,
+        message_count INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (game_id, round_number, group1_class, group1_id, group2_class, group2_id),
+        FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS simulation_job (
+        job_id SERIAL PRIMARY KEY,
+        game_id INT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        created_by VARCHAR(50),
+        worker VARCHAR(100),
+        params TEXT,
+        total_matches INT NOT NULL DEFAULT 0,
+        processed_matches INT NOT NULL DEFAULT 0,
+        completed_matches INT NOT NULL DEFAULT 0,
+        progress TEXT,
+        result TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_work_unit (
+        unit_id SERIAL PRIMARY KEY,
+        game_id INT NOT NULL,
+        round_number INT NOT NULL,
+        group1_class VARCHAR(20) NOT NULL,
+        group1_id INT NOT NULL,
+        group2_class VARCHAR(20) NOT NULL,
+        group2_id INT NOT NULL,
+        group1_initiates BOOLEAN NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        attempts INT NOT NULL DEFAULT 0,
+        leased_by VARCHAR(100),
+        lease_expires_at TIMESTAMP,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        UNIQUE (game_id, round_number, group1_class, group1_id, group2_class, group2_id, group1_initiates),
+        FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_work_run (
+        game_id INT PRIMARY KEY,
+        settings TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (game_id) REFERENCES game(game_id) ON DELETE CASCADE
+    );
+    """,
+)
+
+
 def _normalize_cohort_schema(conn):
     """Run idempotent schema normalization for academic year/class semantics."""
     global _COHORT_SCHEMA_NORMALIZED
@@ -90,9 +172,10 @@ def _normalize_cohort_schema(conn):
             SELECT to_regclass('public.user_') IS NOT NULL,
                    to_regclass('public.game') IS NOT NULL,
                    to_regclass('public.round') IS NOT NULL,
-                   to_regclass('public.negotiation_chat') IS NOT NULL;
+                   to_regclass('public.negotiation_chat') IS NOT NULL,
+                   to_regclass('public.game_simulation_params') IS NOT NULL;
         """)
-        user_exists, game_exists, round_exists, chat_exists = cur.fetchone()
+        user_exists, game_exists, round_exists, chat_exists, params_exists = cur.fetchone()
 
         if user_exists:
             cur.execute("""
@@ -126,6 +209,8 @@ def _normalize_cohort_schema(conn):
                 SET game_class = NULL
                 WHERE game_class IS NOT NULL AND TRIM(game_class) = '';
             """)
+            for table in _RUN_TABLES:
+                cur.execute(table)
 
         if round_exists:
             cur.execute("""
@@ -150,6 +235,17 @@ def _normalize_cohort_schema(conn):
                 ALTER COLUMN group2_class TYPE VARCHAR(20)
                 USING group2_class::text;
             """)
+            # Usage and route columns of databases created before they were added.
+            for column, column_type in {**NEGOTIATION_CHAT_USAGE_COLUMNS, "llm_route": "TEXT"}.items():
+                cur.execute(f"ALTER TABLE negotiation_chat ADD COLUMN IF NOT EXISTS {column} {column_type};")
+
+        if params_exists:
+            # Context policy columns of databases created before they were added.
+            cur.execute("""
+                ALTER TABLE game_simulation_params ADD COLUMN IF NOT EXISTS context_mode TEXT NOT NULL DEFAULT 'full';
+                ALTER TABLE game_simulation_params ADD COLUMN IF NOT EXISTS context_window INT;
+                ALTER TABLE game_simulation_params ADD COLUMN IF NOT EXISTS context_summary_model TEXT;
+            """)
 
     conn.commit()
     _COHORT_SCHEMA_NORMALIZED = True
@@ -162,7 +258,7 @@ def get_db_connection_string():
         return env_url
     try:
         return st.secrets["database"]["url"]
-    except (KeyError, AttributeError) as e:
+    except (KeyError, AttributeError, FileNotFoundError) as e:
         print(f"Error accessing database connection string: {str(e)}")
         return None
 
@@ -197,13 +293,47 @@ def _get_cached_connection():
     return psycopg2.connect(url)
 
 
+# Connection of the current dedicated_connection() block, if any.
+_dedicated_connection = contextvars.ContextVar("dedicated_connection", default=None)
+
+
+@contextmanager
+def dedicated_connection():
+    """
+    Route get_connection() calls made in this block to a connection of their own.
+
+    Background jobs use this so they do not share the cached connection with
+    the Streamlit script.  Threads started inside the block only see the
+    connection when they run in a copy of the block's context.  The
+    connection is closed on exit.
+    """
+    url = get_db_connection_string()
+    conn = psycopg2.connect(url) if url else None
+    if conn is None:
+        yield None
+        return
+    token = _dedicated_connection.set(conn)
+    try:
+        yield conn
+    finally:
+        _dedicated_connection.reset(token)
+        try:
+            conn.rollback()
+        finally:
+            conn.close()
+
+
 def get_connection():
     """
     Get a database connection.
 
-    Uses cached connection in Streamlit context, fresh connection otherwise.
+    Uses the connection of an enclosing dedicated_connection() block, else the
+    cached connection in Streamlit context, fresh connection otherwise.
     This function is the single point to mock in tests.
     """
+    conn = _dedicated_connection.get()
+    if conn is not None and not conn.closed:
+        return conn
     try:
 
         def _try_normalize_schema(connection):
@@ -1134,6 +1264,7 @@ def get_round_data(game_id):
 
 
 # Function to store a negotiation chat transcript
+# Token usage stored with each chat transcript (see insert_negotiation_chat).
 def insert_negotiation_chat(
     game_id,
     round_number,
@@ -1144,7 +1275,16 @@ def insert_negotiation_chat(
     transcript,
     summary=None,
     deal_value=None,
+    usage=None,
+    llm_route=None,
 ):
+    """Store (or overwrite) a chat transcript.
+
+    *usage* is an optional dict with ``prompt_tokens``, ``completion_tokens``,
+    ``cached_tokens`` and ``cost_usd``; *llm_route* names the endpoint(s) that
+    produced the chat.  Their columns are added to older databases by the
+    startup schema migration.
+    """
     conn = get_connection()
     if not conn:
         return False
@@ -1185,6 +1325,15 @@ def insert_negotiation_chat(
                 insert_cols.append("deal_value")
                 values["deal_value"] = deal_value
                 update_cols.append("deal_value = EXCLUDED.deal_value")
+            if usage is not None and set(NEGOTIATION_CHAT_USAGE_COLUMNS) <= columns:
+                for column in NEGOTIATION_CHAT_USAGE_COLUMNS:
+                    insert_cols.append(column)
+                    values[column] = usage.get(column)
+                    update_cols.append(f"{column} = EXCLUDED.{column}")
+            if llm_route is not None and "llm_route" in columns:
+                insert_cols.append("llm_route")
+                values["llm_route"] = llm_route
+                update_cols.append("llm_route = EXCLUDED.llm_route")
 
             cols_sql = ", ".join(insert_cols)
             params_sql = ", ".join(f"%({col})s" for col in insert_cols)
@@ -1207,6 +1356,61 @@ def insert_negotiation_chat(
         return False
 
 
+def update_negotiation_chat_summary(
+    game_id,
+    round_number,
+    group1_class,
+    group1_id,
+    group2_class,
+    group2_id,
+    summary,
+    deal_value,
+    usage=None,
+):
+    """Back-fill the summary and deal value of a stored chat.
+
+    *usage* (same keys as in :func:`insert_negotiation_chat`) holds the
+    summary request's tokens and cost, which are added to the chat's totals.
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            assignments = ["summary = %(summary)s", "deal_value = %(deal_value)s"]
+            values = {
+                "game_id": game_id,
+                "round_number": round_number,
+                "group1_class": group1_class,
+                "group1_id": group1_id,
+                "group2_class": group2_class,
+                "group2_id": group2_id,
+                "summary": summary,
+                "deal_value": deal_value,
+            }
+            if usage is not None:
+                for column in NEGOTIATION_CHAT_USAGE_COLUMNS:
+                    assignments.append(f"{column} = COALESCE({column}, 0) + %({column})s")
+                    values[column] = usage.get(column) or 0
+            cur.execute(
+                f"""
+                UPDATE negotiation_chat
+                SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP
+                WHERE game_id = %(game_id)s AND round_number = %(round_number)s
+                AND group1_class = %(group1_class)s AND group1_id = %(group1_id)s
+                AND group2_class = %(group2_class)s AND group2_id = %(group2_id)s;
+                """,
+                values,
+            )
+            updated = cur.rowcount == 1
+            conn.commit()
+            return updated
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in update_negotiation_chat_summary: {e}")
+        return False
+
+
 # Function to retrieve a negotiation chat transcript
 def get_negotiation_chat(game_id, round_number, group1_class, group1_id, group2_class, group2_id):
     conn = get_connection()
@@ -1298,8 +1502,16 @@ def upsert_game_simulation_params(
     negotiation_termination_message,
     summary_prompt,
     summary_termination_message,
+    context_mode="full",
+    context_window=None,
+    context_summary_model=None,
 ):
-    """Insert or update simulation parameters for a game."""
+    """Insert or update simulation parameters for a game.
+
+    ``context_*`` store the game's conversation context policy (see
+    :mod:`modules.conversation_context`); their columns are added to older
+    tables by the startup schema migration.
+    """
     conn = get_connection()
     if not conn:
         return False
@@ -1329,6 +1541,9 @@ def upsert_game_simulation_params(
                     negotiation_termination_message,
                     summary_prompt,
                     summary_termination_message,
+                    context_mode,
+                    context_window,
+                    context_summary_model,
                     updated_at
                 )
                 VALUES (
@@ -1340,6 +1555,9 @@ def upsert_game_simulation_params(
                     %(negotiation_termination_message)s,
                     %(summary_prompt)s,
                     %(summary_termination_message)s,
+                    %(context_mode)s,
+                    %(context_window)s,
+                    %(context_summary_model)s,
                     CURRENT_TIMESTAMP
                 )
                 ON CONFLICT (game_id)
@@ -1351,6 +1569,9 @@ def upsert_game_simulation_params(
                     negotiation_termination_message = EXCLUDED.negotiation_termination_message,
                     summary_prompt = EXCLUDED.summary_prompt,
                     summary_termination_message = EXCLUDED.summary_termination_message,
+                    context_mode = EXCLUDED.context_mode,
+                    context_window = EXCLUDED.context_window,
+                    context_summary_model = EXCLUDED.context_summary_model,
                     updated_at = CURRENT_TIMESTAMP;
             """
             cur.execute(
@@ -1364,6 +1585,9 @@ def upsert_game_simulation_params(
                     "negotiation_termination_message": negotiation_termination_message,
                     "summary_prompt": summary_prompt,
                     "summary_termination_message": summary_termination_message,
+                    "context_mode": context_mode,
+                    "context_window": context_window,
+                    "context_summary_model": context_summary_model,
                 },
             )
             conn.commit()
@@ -1397,7 +1621,8 @@ def get_game_simulation_params(game_id):
                 """)
             query = """
                 SELECT model, conversation_order, starting_message, num_turns,
-                       negotiation_termination_message, summary_prompt, summary_termination_message
+                       negotiation_termination_message, summary_prompt, summary_termination_message,
+                       context_mode, context_window, context_summary_model
                 FROM game_simulation_params
                 WHERE game_id = %(game_id)s;
             """
@@ -1413,6 +1638,9 @@ def get_game_simulation_params(game_id):
                 "negotiation_termination_message": row[4],
                 "summary_prompt": row[5],
                 "summary_termination_message": row[6],
+                "context_mode": row[7] or "full",
+                "context_window": row[8],
+                "context_summary_model": row[9],
             }
     except Exception as e:
         print(f"Error in get_game_simulation_params: {e}")
@@ -1439,6 +1667,535 @@ def delete_negotiation_chats(game_id):
         return False
 
 
+def upsert_negotiation_checkpoint(game_id, round_number, group1_class, group1_id, group2_class, group2_id, history):
+    """Store the messages generated so far for an unfinished negotiation chat."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO negotiation_checkpoint (
+                    game_id, round_number, group1_class, group1_id, group2_class, group2_id,
+                    history, message_count, updated_at
+                )
+                VALUES (
+                    %(game_id)s, %(round_number)s, %(group1_class)s, %(group1_id)s, %(group2_class)s, %(group2_id)s,
+                    %(history)s, %(message_count)s, CURRENT_TIMESTAMP
+                )
+                ON CONFLICT (game_id, round_number, group1_class, group1_id, group2_class, group2_id)
+                DO UPDATE SET history = EXCLUDED.history,
+                              message_count = EXCLUDED.message_count,
+                              updated_at = CURRENT_TIMESTAMP;
+                """,
+                {
+                    "game_id": game_id,
+                    "round_number": round_number,
+                    "group1_class": group1_class,
+                    "group1_id": group1_id,
+                    "group2_class": group2_class,
+                    "group2_id": group2_id,
+                    "history": json.dumps(history),
+                    "message_count": len(history),
+                },
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in upsert_negotiation_checkpoint: {e}")
+        return False
+
+
+def get_negotiation_checkpoint(game_id, round_number, group1_class, group1_id, group2_class, group2_id):
+    """Return the checkpointed message list of an unfinished chat, or ``None``."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT history
+                FROM negotiation_checkpoint
+                WHERE game_id = %(game_id)s AND round_number = %(round_number)s
+                AND group1_class = %(group1_class)s AND group1_id = %(group1_id)s
+                AND group2_class = %(group2_class)s AND group2_id = %(group2_id)s;
+                """,
+                {
+                    "game_id": game_id,
+                    "round_number": round_number,
+                    "group1_class": group1_class,
+                    "group1_id": group1_id,
+                    "group2_class": group2_class,
+                    "group2_id": group2_id,
+                },
+            )
+            row = cur.fetchone()
+            return json.loads(row[0]) if row else None
+    except Exception as e:
+        print(f"Error in get_negotiation_checkpoint: {e}")
+        return None
+
+
+def delete_negotiation_checkpoint(game_id, round_number, group1_class, group1_id, group2_class, group2_id):
+    """Delete the checkpoint of one chat once its result has been stored."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM negotiation_checkpoint
+                WHERE game_id = %(game_id)s AND round_number = %(round_number)s
+                AND group1_class = %(group1_class)s AND group1_id = %(group1_id)s
+                AND group2_class = %(group2_class)s AND group2_id = %(group2_id)s;
+                """,
+                {
+                    "game_id": game_id,
+                    "round_number": round_number,
+                    "group1_class": group1_class,
+                    "group1_id": group1_id,
+                    "group2_class": group2_class,
+                    "group2_id": group2_id,
+                },
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in delete_negotiation_checkpoint: {e}")
+        return False
+
+
+def delete_negotiation_checkpoints(game_id):
+    """Delete every chat checkpoint of a game (e.g. before a fresh simulation)."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM negotiation_checkpoint WHERE game_id = %(game_id)s;", {"game_id": game_id})
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in delete_negotiation_checkpoints: {e}")
+        return False
+
+
+# Columns of simulation_job that update_simulation_job may set; "params" and
+# "result" hold JSON.
+SIMULATION_JOB_FIELDS = (
+    "status",
+    "worker",
+    "total_matches",
+    "processed_matches",
+    "completed_matches",
+    "progress",
+    "result",
+    "error",
+)
+_SIMULATION_JOB_COLUMNS = (
+    "job_id",
+    "game_id",
+    "status",
+    "created_by",
+    "worker",
+    "params",
+    "total_matches",
+    "processed_matches",
+    "completed_matches",
+    "progress",
+    "result",
+    "error",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "heartbeat_at",
+)
+
+
+def _simulation_job_from_row(row):
+    job = dict(zip(_SIMULATION_JOB_COLUMNS, row))
+    for column in ("params", "result"):
+        job[column] = json.loads(job[column]) if job[column] else None
+    return job
+
+
+def insert_simulation_job(game_id, status, created_by=None, params=None, total_matches=0):
+    """Create a simulation job row; returns its ``job_id`` (``None`` on failure)."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO simulation_job (game_id, status, created_by, params, total_matches)
+                VALUES (%(game_id)s, %(status)s, %(created_by)s, %(params)s, %(total_matches)s)
+                RETURNING job_id;
+                """,
+                {
+                    "game_id": game_id,
+                    "status": status,
+                    "created_by": created_by,
+                    "params": json.dumps(params) if params is not None else None,
+                    "total_matches": total_matches,
+                },
+            )
+            job_id = cur.fetchone()[0]
+            conn.commit()
+            return job_id
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in insert_simulation_job: {e}")
+        return None
+
+
+def update_simulation_job(job_id, started=False, finished=False, **fields):
+    """Update a job's state and progress (see :data:`SIMULATION_JOB_FIELDS`) and its heartbeat.
+
+    *started* / *finished* stamp ``started_at`` / ``finished_at``.
+    """
+    unknown = set(fields) - set(SIMULATION_JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown simulation job fields: {sorted(unknown)}")
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            values = dict(fields)
+            if "result" in values:
+                values["result"] = json.dumps(values["result"], default=str)
+            assignments = [f"{column} = %({column})s" for column in values]
+            assignments.append("heartbeat_at = CURRENT_TIMESTAMP")
+            if started:
+                assignments.append("started_at = CURRENT_TIMESTAMP")
+            if finished:
+                assignments.append("finished_at = CURRENT_TIMESTAMP")
+            values["job_id"] = job_id
+            cur.execute(f"UPDATE simulation_job SET {', '.join(assignments)} WHERE job_id = %(job_id)s;", values)
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in update_simulation_job: {e}")
+        return False
+
+
+def get_simulation_job(job_id):
+    """Return one simulation job as a dict, or ``None``."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {', '.join(_SIMULATION_JOB_COLUMNS)} FROM simulation_job WHERE job_id = %(job_id)s;",
+                {"job_id": job_id},
+            )
+            row = cur.fetchone()
+            return _simulation_job_from_row(row) if row else None
+    except Exception as e:
+        print(f"Error in get_simulation_job: {e}")
+        return None
+
+
+def list_simulation_jobs(game_id, limit=5):
+    """Return the latest simulation jobs of a game, newest first."""
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT {', '.join(_SIMULATION_JOB_COLUMNS)}
+                FROM simulation_job
+                WHERE game_id = %(game_id)s
+                ORDER BY job_id DESC
+                LIMIT %(limit)s;
+                """,
+                {"game_id": game_id, "limit": limit},
+            )
+            return [_simulation_job_from_row(row) for row in cur.fetchall()]
+    except Exception as e:
+        print(f"Error in list_simulation_jobs: {e}")
+        return []
+
+
+def mark_stale_simulation_jobs(stale_seconds):
+    """Mark queued or running jobs whose heartbeat is older than *stale_seconds* as ``interrupted``.
+
+    Workers refresh the heartbeat of their jobs while they are alive, so a
+    stale job belonged to a process that stopped.  Returns the number of jobs
+    marked.
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE simulation_job
+                SET status = 'interrupted', finished_at = CURRENT_TIMESTAMP
+                WHERE status IN ('queued', 'running')
+                AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %(stale_seconds)s);
+                """,
+                {"stale_seconds": stale_seconds},
+            )
+            marked = cur.rowcount
+            conn.commit()
+            return marked
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in mark_stale_simulation_jobs: {e}")
+        return 0
+
+
+_CHAT_WORK_UNIT_COLUMNS = (
+    "unit_id",
+    "game_id",
+    "round_number",
+    "group1_class",
+    "group1_id",
+    "group2_class",
+    "group2_id",
+    "group1_initiates",
+    "status",
+    "attempts",
+    "leased_by",
+)
+
+
+def enqueue_chat_work_units(game_id, units):
+    """Add chat units of a game to the work queue; returns the number added.
+
+    Each unit is a dict with ``round_number``, ``group1_class``, ``group1_id``,
+    ``group2_class``, ``group2_id`` and ``group1_initiates``.  Units already
+    queued are left as they are.  All units go in one multi-row INSERT, in
+    one transaction.
+    """
+    rows = [
+        (
+            game_id,
+            unit["round_number"],
+            unit["group1_class"],
+            unit["group1_id"],
+            unit["group2_class"],
+            unit["group2_id"],
+            unit["group1_initiates"],
+        )
+        for unit in units
+    ]
+    if not rows:
+        return 0
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cur:
+            added = execute_values(
+                cur,
+                """
+                INSERT INTO chat_work_unit (game_id, round_number, group1_class, group1_id,
+                                            group2_class, group2_id, group1_initiates)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING unit_id;
+                """,
+                rows,
+                page_size=len(rows),
+                fetch=True,
+            )
+            conn.commit()
+            return len(added)
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in enqueue_chat_work_units: {e}")
+        return 0
+
+
+def claim_chat_work_unit(game_id, worker, lease_seconds):
+    """Lease the next open chat unit of a game to *worker*; returns it as a dict, or ``None``.
+
+    Open units are the pending ones and those whose lease expired (their
+    worker stopped).  ``FOR UPDATE SKIP LOCKED`` lets any number of workers
+    claim at the same time without blocking on, or double-claiming, a row.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                UPDATE chat_work_unit
+                SET status = 'leased', leased_by = %(worker)s, attempts = attempts + 1,
+                    lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %(lease_seconds)s)
+                WHERE unit_id = (
+                    SELECT unit_id FROM chat_work_unit
+                    WHERE game_id = %(game_id)s
+                    AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP))
+                    ORDER BY round_number, unit_id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {', '.join(_CHAT_WORK_UNIT_COLUMNS)};
+                """,
+                {"game_id": game_id, "worker": worker, "lease_seconds": lease_seconds},
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return dict(zip(_CHAT_WORK_UNIT_COLUMNS, row)) if row else None
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in claim_chat_work_unit: {e}")
+        return None
+
+
+def renew_chat_work_leases(unit_ids, worker, lease_seconds):
+    """Extend *worker*'s leases on *unit_ids*; returns the number renewed."""
+    if not unit_ids:
+        return 0
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chat_work_unit
+                SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %(lease_seconds)s)
+                WHERE unit_id = ANY(%(unit_ids)s) AND status = 'leased' AND leased_by = %(worker)s;
+                """,
+                {"unit_ids": list(unit_ids), "worker": worker, "lease_seconds": lease_seconds},
+            )
+            renewed = cur.rowcount
+            conn.commit()
+            return renewed
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in renew_chat_work_leases: {e}")
+        return 0
+
+
+def finish_chat_work_unit(unit_id, worker, status, error=None):
+    """Record the outcome of a leased unit: ``done``, ``failed``, or ``pending`` to hand it back.
+
+    Only the worker holding the lease can finish a unit, so a worker whose
+    lease expired and was reclaimed does not overwrite the new holder's state.
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chat_work_unit
+                SET status = %(status)s, error = %(error)s, lease_expires_at = NULL,
+                    leased_by = CASE WHEN %(status)s = 'pending' THEN NULL ELSE leased_by END,
+                    finished_at = CASE WHEN %(status)s = 'pending' THEN NULL ELSE CURRENT_TIMESTAMP END
+                WHERE unit_id = %(unit_id)s AND status = 'leased' AND leased_by = %(worker)s;
+                """,
+                {"unit_id": unit_id, "worker": worker, "status": status, "error": error},
+            )
+            finished = cur.rowcount == 1
+            conn.commit()
+            return finished
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in finish_chat_work_unit: {e}")
+        return False
+
+
+def count_chat_work_units(game_id):
+    """Return ``{status: units}`` for a game's work queue."""
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT status, COUNT(*) FROM chat_work_unit
+                WHERE game_id = %(game_id)s
+                GROUP BY status;
+                """,
+                {"game_id": game_id},
+            )
+            counts = dict(cur.fetchall())
+        # End the read's transaction so the shared connection is not left idle in one.
+        conn.commit()
+        return counts
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in count_chat_work_units: {e}")
+        return {}
+
+
+def delete_chat_work_units(game_id):
+    """Empty a game's work queue."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM chat_work_unit WHERE game_id = %(game_id)s;", {"game_id": game_id})
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in delete_chat_work_units: {e}")
+        return False
+
+
+def save_chat_work_settings(game_id, settings):
+    """Store (or replace) the run settings of a game's work queue; *settings* must hold no API keys."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO chat_work_run (game_id, settings)
+                VALUES (%(game_id)s, %(settings)s)
+                ON CONFLICT (game_id) DO UPDATE SET settings = EXCLUDED.settings, created_at = CURRENT_TIMESTAMP;
+                """,
+                {"game_id": game_id, "settings": json.dumps(settings)},
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in save_chat_work_settings: {e}")
+        return False
+
+
+def get_chat_work_settings(game_id):
+    """Return the run settings stored with a game's work queue, or ``None``."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT settings FROM chat_work_run WHERE game_id = %(game_id)s;", {"game_id": game_id})
+            row = cur.fetchone()
+        conn.commit()
+        return json.loads(row[0]) if row else None
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in get_chat_work_settings: {e}")
+        return None
+
+
 def insert_playground_result(
     user_id,
     class_,
@@ -3036,3 +3793,51 @@ def get_student_prompt_with_timestamp(game_id, class_, group_id):
             return None
     except Exception:
         return None
+
+
+# Function to retrieve every team's prompt, submission time and values in one query
+def get_game_team_inputs(game_id):
+    """Retrieve the prompts, last update timestamps and group values of a game's teams.
+
+    One query replaces a get_student_prompt / get_group_values call per team.
+
+    Args:
+        game_id: The game ID
+
+    Returns:
+        ``{(class, group_id): {"prompt", "updated_at", "minimizer_value",
+        "maximizer_value"}}`` for every team with a prompt or values (missing
+        fields are None), or None on failure
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            query = """
+                SELECT COALESCE(sp.class, gv.class), COALESCE(sp.group_id, gv.group_id),
+                       sp.prompt, sp.updated_at, gv.minimizer_value, gv.maximizer_value
+                FROM (
+                    SELECT class, group_id, prompt, updated_at
+                    FROM student_prompt
+                    WHERE game_id = %(game_id)s
+                ) sp
+                FULL OUTER JOIN (
+                    SELECT class, group_id, minimizer_value, maximizer_value
+                    FROM group_values
+                    WHERE game_id = %(game_id)s AND class != 'params'
+                ) gv ON sp.class = gv.class AND sp.group_id = gv.group_id;
+            """
+            cur.execute(query, {"game_id": game_id})
+            return {
+                (row[0], int(row[1])): {
+                    "prompt": row[2],
+                    "updated_at": row[3],
+                    "minimizer_value": row[4],
+                    "maximizer_value": row[5],
+                }
+                for row in cur.fetchall()
+            }
+    except Exception as e:
+        print(f"Error in get_game_team_inputs: {e}")
+        return None
@@ -0,0 +1,184 @@
+"""Content-addressed cache for chat-completion responses.
+
+Entries are keyed by a SHA-256 hash of the complete request (model, sampling
+parameters, system message and conversation), so a completion is reused only
+when the request is byte-identical.  Responses live in a SQLite file and the
+least recently used entries are evicted once the configured entry or size
+limit is exceeded.
+
+Modes:
+
+* ``off`` – no caching.
+* ``read_write`` – serve hits from the cache, call the provider on a miss
+  and store the answer.
+* ``record`` – always call the provider and store (overwrite) the answer.
+* ``replay`` – serve every call from the cache; a miss raises
+  :class:`LLMCacheMiss` instead of reaching the provider.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CACHE_OFF = "off"
+CACHE_READ_WRITE = "read_write"
+CACHE_RECORD = "record"
+CACHE_REPLAY = "replay"
+CACHE_MODES = (CACHE_OFF, CACHE_READ_WRITE, CACHE_RECORD, CACHE_REPLAY)
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite3")
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def cache_key(request):
+    """Hash a chat-completion request (the kwargs sent to the client)."""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with LRU eviction.
+
+    Args:
+        path: Database file (``":memory:"`` keeps the cache in process).
+        mode: One of :data:`CACHE_MODES`.
+        max_entries: Keep at most this many responses (``None`` = unlimited).
+        max_bytes: Keep at most this many bytes of response text.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, mode=CACHE_READ_WRITE, max_entries=None, max_bytes=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_response_last_used ON llm_response (last_used_at)")
+        self._conn.commit()
+
+    def lookup(self, request):
+        """Return the cached response text for *request*, or ``None`` on a miss."""
+        if self.mode in (CACHE_OFF, CACHE_RECORD):
+            return None
+        key = cache_key(request)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_response WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE llm_response SET last_used_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if row is None:
+            if self.mode == CACHE_REPLAY:
+                raise LLMCacheMiss(f"No recorded response for request {key[:12]}")
+            return None
+        return json.loads(row[0])["content"]
+
+    def store(self, request, content):
+        """Remember *content* as the response to *request* (no-op in off/replay mode)."""
+        if self.mode not in (CACHE_READ_WRITE, CACHE_RECORD):
+            return
+        response = json.dumps({"content": content}, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO llm_response (key, response, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET response = excluded.response,
+                                                size = excluded.size,
+                                                last_used_at = excluded.last_used_at
+                """,
+                (cache_key(request), response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.max_entries is not None:
+            self._conn.execute(
+                """
+                DELETE FROM llm_response WHERE key IN (
+                    SELECT key FROM llm_response ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_response").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute("SELECT key, size FROM llm_response ORDER BY last_used_at").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM llm_response WHERE key = ?", stale)
+
+    def stats(self):
+        """Return ``{"entries": int, "bytes": int}`` for the stored responses."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_response").fetchone()
+        return {"entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_response")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def build_llm_cache(mode=None, path=None):
+    """Return an :class:`LLMResponseCache`, or ``None`` when caching is off.
+
+    Unset arguments fall back to the ``LLM_CACHE_MODE``, ``LLM_CACHE_PATH``
+    and ``LLM_CACHE_MAX_MB`` environment variables.
+    """
+    mode = mode or os.getenv("LLM_CACHE_MODE", CACHE_OFF)
+    if mode == CACHE_OFF:
+        return None
+    max_mb = os.getenv("LLM_CACHE_MAX_MB")
+    return LLMResponseCache(
+        path or os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        mode=mode,
+        max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+    )
+
+
+@contextmanager
+def open_llm_cache(mode=None, path=None):
+    """:func:`build_llm_cache` for the duration of a ``with`` block; the cache is closed on exit."""
+    cache = build_llm_cache(mode, path)
+    try:
+        yield cache
+    finally:
+        if cache is not None:
+            cache.close()
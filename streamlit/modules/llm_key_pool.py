@@ -0,0 +1,161 @@
+"""Spread a simulation's chats across several API keys or providers.
+
+A :class:`KeyPool` holds one engine per :class:`~modules.llm_provider.LLMConfig`
+(a saved API key, or another OpenAI-compatible ``base_url``).  Every chat
+attempt leases the healthy key with the fewest chats in flight and reports
+back how it went:
+
+* a chat that hit 429s puts its key in a cooldown that doubles with every
+  throttled chat in a row, so traffic shifts to keys with headroom;
+* ``max_consecutive_failures`` failed chats in a row cool the key down the
+  same way;
+* an authentication failure or exhausted quota takes the key out of
+  rotation for the rest of the run.
+
+When every remaining key is cooling down, the one that recovers first is
+used anyway; a run only fails once every key has been taken out of
+rotation.  Each key keeps its own rate limiter (see ``llm_rate_limit``), so
+N keys give the run N times the provider limit.
+"""
+
+import threading
+import time
+
+from .llm_retry import ERROR_AUTH, ERROR_FATAL, classify_llm_error, is_rate_limit_error
+
+DEFAULT_COOLDOWN_SECONDS = 30.0
+MAX_COOLDOWN_SECONDS = 300.0
+
+
+class NoHealthyKeyError(RuntimeError):
+    """Every key of the pool was taken out of rotation."""
+
+
+def _removes_key(error):
+    """A rejected key or an exhausted quota will not recover during the run."""
+    category = classify_llm_error(error)
+    return category == ERROR_AUTH or (category == ERROR_FATAL and is_rate_limit_error(error))
+
+
+def mask_api_key(api_key):
+    """Short, non-secret label for an API key (``sk-...wxyz``)."""
+    if not api_key:
+        return "(none)"
+    return f"{api_key[:3]}...{api_key[-4:]}" if len(api_key) > 8 else "***"
+
+
+class PooledKey:
+    """One key of a :class:`KeyPool` with its engine and health counters."""
+
+    def __init__(self, label, config, engine):
+        self.label = label
+        self.config = config
+        self.engine = engine
+        self.in_flight = 0
+        self.chats = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.throttled_chats = 0
+        self.consecutive_throttled = 0
+        self.cooldown_until = 0.0
+        self.disabled_reason = None
+
+    def as_dict(self, now):
+        return {
+            "label": self.label,
+            "base_url": self.config.base_url,
+            "chats": self.chats,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "throttled_chats": self.throttled_chats,
+            "cooldown_seconds": round(max(self.cooldown_until - now, 0.0), 1),
+            "disabled": self.disabled_reason,
+        }
+
+
+class KeyPool:
+    """Health-aware rotation over several LLM configs.
+
+    Args:
+        configs: The :class:`LLMConfig` of every key.
+        engine_factory: ``fn(config)`` returning the engine for one key.
+        labels: Display names (defaults to masked keys).
+        cooldown_seconds: Base cooldown after throttling or repeated failures.
+        max_consecutive_failures: Failed chats in a row before a cooldown.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        configs,
+        engine_factory,
+        labels=None,
+        cooldown_seconds=DEFAULT_COOLDOWN_SECONDS,
+        max_consecutive_failures=3,
+        clock=time.monotonic,
+    ):
+        if not configs:
+            raise ValueError("A key pool needs at least one LLM config")
+        labels = labels or [mask_api_key(config.api_key) for config in configs]
+        self.keys = [PooledKey(label, config, engine_factory(config)) for label, config in zip(labels, configs)]
+        self.cooldown_seconds = cooldown_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Lease the best key for the next chat attempt; raises :class:`NoHealthyKeyError`."""
+        with self._lock:
+            now = self._clock()
+            active = [key for key in self.keys if key.disabled_reason is None]
+            if not active:
+                raise NoHealthyKeyError("Every API key was taken out of rotation: " + self._disabled_reasons())
+            ready = [key for key in active if key.cooldown_until <= now]
+            if ready:
+                key = min(ready, key=lambda k: (k.in_flight, k.chats))
+            else:
+                key = min(active, key=lambda k: k.cooldown_until)
+            key.in_flight += 1
+            return key
+
+    def release(self, key, rate_limited=0, error=None):
+        """Return *key* after a chat attempt that saw *rate_limited* 429s and ended with *error*."""
+        with self._lock:
+            now = self._clock()
+            key.in_flight -= 1
+            key.chats += 1
+            if rate_limited or (error is not None and is_rate_limit_error(error)):
+                key.throttled_chats += 1
+                key.consecutive_throttled += 1
+                self._cool_down(key, now, key.consecutive_throttled)
+            else:
+                key.consecutive_throttled = 0
+            if error is None:
+                key.consecutive_failures = 0
+                return
+            key.failures += 1
+            key.consecutive_failures += 1
+            if _removes_key(error):
+                key.disabled_reason = f"{type(error).__name__}: {error}"[:200]
+            elif key.consecutive_failures >= self.max_consecutive_failures:
+                self._cool_down(key, now, key.consecutive_failures - self.max_consecutive_failures + 1)
+
+    def _cool_down(self, key, now, strikes):
+        delay = min(self.cooldown_seconds * 2 ** (strikes - 1), MAX_COOLDOWN_SECONDS)
+        key.cooldown_until = max(key.cooldown_until, now + delay)
+
+    def _disabled_reasons(self):
+        return "; ".join(f"{key.label} ({key.disabled_reason})" for key in self.keys)
+
+    def can_fail_over(self, error):
+        """True when *error* takes a key out of rotation and another key is still available."""
+        if not _removes_key(error):
+            return False
+        with self._lock:
+            return any(key.disabled_reason is None for key in self.keys)
+
+    def summary(self):
+        """Per-key health for run diagnostics."""
+        with self._lock:
+            now = self._clock()
+            return [key.as_dict(now) for key in self.keys]
@@ -0,0 +1,395 @@
+"""Offline, OpenAI-compatible stand-in for load testing the negotiation pipeline.
+
+Point an :class:`~modules.llm_provider.LLMConfig` at a ``mock://`` base URL
+and the conversation engines use :class:`MockOpenAI` /
+:class:`AsyncMockOpenAI` instead of a real provider::
+
+    LLMConfig(model="mock", api_key="mock", base_url="mock://?latency=0.2&rate_limit=0.05&seed=7")
+
+Query parameters (all optional):
+
+* ``latency`` – mean seconds per call.  ``latency_dist`` picks the
+  distribution: ``fixed`` (default), ``uniform`` (0 to 2x mean),
+  ``exponential`` or ``lognormal`` (spread set by ``latency_sigma``).
+* ``rate_limit`` / ``error`` – probability that a call fails with a 429
+  (advertising ``retry_after`` seconds) or with a 500.
+* ``agree_after`` – messages exchanged before an agent accepts the last
+  offer.  ``no_deal`` – probability that a conversation never agrees.
+* ``termination`` – fallback negotiation termination phrase, used when it
+  cannot be read from the agents' system messages.
+* ``seed`` – seeds latency and fault injection.
+* ``prefix_cache_min_tokens`` – like automatic prompt caching, requests
+  whose leading messages were already sent report those tokens as
+  ``cached_tokens`` once the shared prefix reaches this size (default 1024,
+  counted in 128-token blocks; 0 disables the simulation).
+
+``stop`` sequences and ``max_tokens`` / ``max_completion_tokens`` caps are
+honoured: a reply cut by the cap ends with ``finish_reason="length"``.
+
+Requests with ``stream=True`` get word-sized chunks after the drawn latency
+(plus a usage chunk when ``stream_options.include_usage`` is set).
+
+Replies are scripted: the agents trade converging price offers and the
+accepting agent ends with the negotiation termination phrase; the summary
+agent answers with the summary termination phrase and the agreed price (or,
+when the request carries a ``json_schema`` ``response_format``, with the
+``{"agreed", "value", "summary"}`` object), so deal parsing, scoring and
+storage run exactly as with a real model.  Reply
+text depends only on the request, so the same tournament produces the same
+transcripts on every run.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+import openai
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+MOCK_URL_SCHEME = "mock"
+
+_AGENT_TERMINATION_RE = re.compile(r"When the negotiation is finished, say (.+?)\.(?:\s|$)")
+_SUMMARY_TERMINATION_RE = re.compile(r"'(.+?) \[agreed_value\]'")
+_SUMMARY_NEGOTIATION_TERMINATION_RE = re.compile(r"must end naturally with (.+)")
+_PRICE_RE = re.compile(r"\$(-?\d+(?:\.\d+)?)")
+_WORD_RE = re.compile(r"\S+\s*|\s+")
+
+
+@dataclass
+class MockLLMSettings:
+    latency: float = 0.0
+    latency_dist: str = "fixed"
+    latency_sigma: float = 0.5
+    rate_limit: float = 0.0
+    error: float = 0.0
+    retry_after: float = 0.0
+    agree_after: int = 6
+    no_deal: float = 0.0
+    termination: str = "Pleasure doing business with you"
+    seed: int = 0
+    prefix_cache_min_tokens: int = 1024
+
+
+def is_mock_base_url(base_url):
+    return bool(base_url) and urlsplit(base_url).scheme == MOCK_URL_SCHEME
+
+
+def parse_mock_base_url(base_url):
+    """Build :class:`MockLLMSettings` from the query string of a ``mock://`` URL."""
+    settings = MockLLMSettings()
+    types = {field.name: field.type for field in fields(MockLLMSettings)}
+    for key, value in parse_qsl(urlsplit(base_url).query):
+        if key not in types:
+            raise ValueError(f"Unknown mock LLM parameter: {key}")
+        setattr(settings, key, types[key](value))
+    return settings
+
+
+def _digest(*parts):
+    return int(hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:12], 16)
+
+
+def _estimate_tokens(text):
+    return max(len(text or "") // 4, 1)
+
+
+PREFIX_CACHE_BLOCK_TOKENS = 128
+# Prefix hashes remembered by the simulated prompt cache before it starts over.
+PREFIX_CACHE_MAX_ENTRIES = 200_000
+
+
+def _apply_request_limits(request, text):
+    """Cut *text* at the request's ``stop`` sequences and token cap; return ``(text, finish_reason)``."""
+    stops = request.get("stop") or []
+    for stop in [stops] if isinstance(stops, str) else stops:
+        text = text.split(stop, 1)[0]
+    cap = request.get("max_completion_tokens") or request.get("max_tokens")
+    if cap and _estimate_tokens(text) > cap:
+        return text[: cap * 4], "length"
+    return text, "stop"
+
+
+class _MockHTTPResponse:
+    """Just enough of an HTTP response for ``openai.APIStatusError``."""
+
+    request = None
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class MockLLMBackend:
+    """Decides latency, injected failures and scripted replies for mock calls.
+
+    Shared by the sync and async clients; safe to use from several threads.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or MockLLMSettings()
+        self._rng = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self.calls = 0
+
+    def _draw(self):
+        settings = self.settings
+        with self._lock:
+            self.calls += 1
+            fault = self._rng.random()
+            mean = settings.latency
+            if mean <= 0 or settings.latency_dist == "fixed":
+                delay = max(mean, 0.0)
+            elif settings.latency_dist == "uniform":
+                delay = self._rng.uniform(0.0, 2 * mean)
+            elif settings.latency_dist == "exponential":
+                delay = self._rng.expovariate(1.0 / mean)
+            elif settings.latency_dist == "lognormal":
+                # Parameterized so the distribution keeps the requested mean.
+                sigma = settings.latency_sigma
+                delay = mean * self._rng.lognormvariate(-(sigma**2) / 2, sigma)
+            else:
+                raise ValueError(f"Unknown latency distribution: {settings.latency_dist}")
+        return delay, fault
+
+    def _fault(self, fault):
+        settings = self.settings
+        if fault < settings.rate_limit:
+            headers = {"retry-after": str(settings.retry_after)} if settings.retry_after else {}
+            return openai.RateLimitError(
+                "Rate limit reached (mock)",
+                response=_MockHTTPResponse(429, headers),
+                body={"error": {"code": "rate_limit_exceeded"}},
+            )
+        if fault < settings.rate_limit + settings.error:
+            return openai.InternalServerError(
+                "Internal server error (mock)", response=_MockHTTPResponse(500), body=None
+            )
+        return None
+
+    def plan(self, request):
+        """Return ``(delay_seconds, error_or_None, completion)`` for one request."""
+        delay, fault = self._draw()
+        error = self._fault(fault)
+        if error is not None:
+            return delay, error, None
+        text, finish_reason = _apply_request_limits(
+            request, self.reply(request.get("messages") or [], request.get("response_format"))
+        )
+        return delay, None, self._completion(request, text, finish_reason)
+
+    # ------------------------------------------------------------------
+    # Scripted behaviour
+    # ------------------------------------------------------------------
+
+    def reply(self, messages, response_format=None):
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        conversation = [message for message in messages if message["role"] != "system"]
+        if (response_format or {}).get("type") == "json_schema":
+            return self._structured_summary_reply(system, conversation)
+        summary_match = _SUMMARY_TERMINATION_RE.search(system)
+        if summary_match:
+            return self._summary_reply(system, summary_match.group(1), conversation)
+        return self._negotiation_reply(system, conversation)
+
+    def _negotiation_reply(self, system, conversation):
+        settings = self.settings
+        match = _AGENT_TERMINATION_RE.search(system)
+        termination = match.group(1) if match else settings.termination
+
+        # Both agents see the same opener, so it identifies the conversation.
+        chat_id = _digest(settings.seed, conversation[0]["content"] if conversation else system)
+        anchor = 40 + chat_id % 40
+        spread = 10 + chat_id % 15
+        turn = len(conversation)
+
+        never_agrees = (chat_id % 10_000) < settings.no_deal * 10_000
+        if turn >= settings.agree_after and not never_agrees:
+            offers = _PRICE_RE.findall(conversation[-1]["content"])
+            price = offers[-1] if offers else str(anchor)
+            return f"That works for me. {termination} at ${price}"
+
+        # Opposite sides of the anchor, converging as the conversation goes on.
+        direction = -1 if turn % 2 == 0 else 1
+        offer = round(anchor + direction * spread / (turn + 1))
+        if turn == 0:
+            return f"Hello! Proposal {chat_id % 10_000}: I can offer ${offer}."
+        return f"I can offer ${offer}. Let's find a price that works for both of us."
+
+    def _agreed_price(self, system, conversation):
+        match = _SUMMARY_NEGOTIATION_TERMINATION_RE.search(system)
+        termination = match.group(1).strip() if match else self.settings.termination
+        context = conversation[-1]["content"] if conversation else ""
+        _, found, tail = context.rpartition(termination)
+        prices = _PRICE_RE.findall(tail) if found else []
+        return prices[0] if prices else None
+
+    def _summary_reply(self, system, summary_termination, conversation):
+        price = self._agreed_price(system, conversation)
+        if price is not None:
+            return f"Both parties confirmed the deal at ${price}.\n{summary_termination} {price}"
+        return f"The parties did not reach an agreement.\n{summary_termination} None"
+
+    def _structured_summary_reply(self, system, conversation):
+        price = self._agreed_price(system, conversation)
+        if price is not None:
+            reply = {"agreed": True, "value": float(price), "summary": f"Both parties confirmed the deal at ${price}."}
+        else:
+            reply = {"agreed": False, "value": None, "summary": "The parties did not reach an agreement."}
+        return json.dumps(reply)
+
+    def _cached_prefix_tokens(self, messages):
+        """Tokens of the longest message prefix of *messages* seen in an earlier request."""
+        digest = hashlib.sha256()
+        tokens = cached = 0
+        keys = []
+        with self._lock:
+            for message in messages:
+                digest.update(f"{message.get('role')}\x1f{message.get('content') or ''}\x1e".encode())
+                tokens += _estimate_tokens(message.get("content")) + 4
+                key = digest.hexdigest()
+                if key in self._prefixes:
+                    cached = tokens
+                keys.append(key)
+            if len(self._prefixes) > PREFIX_CACHE_MAX_ENTRIES:
+                self._prefixes.clear()
+            self._prefixes.update(keys)
+        minimum = self.settings.prefix_cache_min_tokens
+        if not minimum or cached < minimum:
+            return 0
+        return cached - cached % PREFIX_CACHE_BLOCK_TOKENS
+
+    def _completion(self, request, text, finish_reason="stop"):
+        messages = request.get("messages") or []
+        prompt_tokens = sum(_estimate_tokens(message.get("content")) + 4 for message in messages)
+        completion_tokens = _estimate_tokens(text)
+        return ChatCompletion(
+            id=f"mock-{self.calls}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=request.get("model") or "mock",
+            choices=[{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": text}}],
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": self._cached_prefix_tokens(messages)},
+            },
+        )
+
+    def chunks(self, completion, include_usage=False):
+        """Split *completion* into word-sized ``ChatCompletionChunk`` objects, as ``stream=True`` returns."""
+        text = completion.choices[0].message.content
+        base = {
+            "id": completion.id,
+            "object": "chat.completion.chunk",
+            "created": completion.created,
+            "model": completion.model,
+        }
+        chunks = [
+            ChatCompletionChunk(**base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            for piece in _WORD_RE.findall(text)
+        ]
+        finish_reason = completion.choices[0].finish_reason
+        chunks.append(ChatCompletionChunk(**base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+        if include_usage:
+            chunks.append(ChatCompletionChunk(**base, choices=[], usage=completion.usage))
+        return chunks
+
+
+def _include_usage(kwargs):
+    return bool((kwargs.get("stream_options") or {}).get("include_usage"))
+
+
+def _stream(delay, chunks):
+    # The latency is spent before the first chunk, like a real time to first token.
+    if delay:
+        time.sleep(delay)
+    yield from chunks
+
+
+async def _astream(delay, chunks):
+    if delay:
+        await asyncio.sleep(delay)
+    for chunk in chunks:
+        yield chunk
+
+
+class _Completions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, **kwargs):
+        delay, error, completion = self._backend.plan(kwargs)
+        if error is not None:
+            if delay:
+                time.sleep(delay)
+            raise error
+        if kwargs.get("stream"):
+            return _stream(delay, self._backend.chunks(completion, _include_usage(kwargs)))
+        if delay:
+            time.sleep(delay)
+        return completion
+
+
+class _AsyncCompletions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    async def create(self, **kwargs):
+        delay, error, completion = self._backend.plan(kwargs)
+        if error is not None:
+            if delay:
+                await asyncio.sleep(delay)
+            raise error
+        if kwargs.get("stream"):
+            return _astream(delay, self._backend.chunks(completion, _include_usage(kwargs)))
+        if delay:
+            await asyncio.sleep(delay)
+        return completion
+
+
+class MockOpenAI:
+    """Synchronous client exposing ``chat.completions.create`` like ``OpenAI``."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MockLLMBackend()
+        self.chat = SimpleNamespace(completions=_Completions(self.backend))
+
+    def close(self):
+        pass
+
+
+class AsyncMockOpenAI:
+    """Asyncio client exposing ``chat.completions.create`` like ``AsyncOpenAI``."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MockLLMBackend()
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(self.backend))
+
+    async def close(self):
+        pass
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_mock_backend(base_url):
+    """Return the shared backend for *base_url*.
+
+    Engines built from the same ``mock://`` URL share one backend, so fault
+    injection and call counts cover the whole run.
+    """
+    with _backends_lock:
+        backend = _backends.get(base_url)
+        if backend is None:
+            backend = _backends[base_url] = MockLLMBackend(parse_mock_base_url(base_url))
+        return backend
@@ -7,3 +7,60 @@ MODEL_EXPLANATIONS = {
     "gpt-5-mini": "Recommended default for negotiation quality, consistency, and speed.",
     "gpt-5-nano": "Lowest-cost option for quick experimentation and batch tests.",
 }
+
+# USD per 1M tokens (input, cached input, output); used for run cost estimates.
+MODEL_PRICING = {
+    "gpt-5.2": {"input": 1.75, "cached_input": 0.175, "output": 14.00},
+    "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.00},
+    "gpt-5-nano": {"input": 0.05, "cached_input": 0.005, "output": 0.40},
+}
+
+
+# Prefix of the token counters the engines keep per model next to the totals,
+# e.g. ``model_usage:gpt-5-mini:prompt_tokens``, so each model is priced at its own rate.
+MODEL_USAGE_PREFIX = "model_usage:"
+
+
+def model_usage_key(model, field):
+    return f"{MODEL_USAGE_PREFIX}{model}:{field}"
+
+
+def usage_by_model(counters):
+    """``{model: {field: tokens}}`` from the per-model counters in *counters*."""
+    by_model = {}
+    for key, value in counters.items():
+        if key.startswith(MODEL_USAGE_PREFIX):
+            # Model ids may contain ":" (e.g. "llama3:8b"); field names do not.
+            model, field = key[len(MODEL_USAGE_PREFIX) :].rsplit(":", 1)
+            by_model.setdefault(model, {})[field] = value
+    return by_model
+
+
+def estimate_cost_usd(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """Estimate the USD cost of a usage total, or ``None`` for models without a price.
+
+    Cached tokens are part of ``prompt_tokens`` and billed at the cached-input rate.
+    """
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    cached_tokens = min(cached_tokens, prompt_tokens)
+    cost = (
+        (prompt_tokens - cached_tokens) * pricing["input"]
+        + cached_tokens * pricing["cached_input"]
+        + completion_tokens * pricing["output"]
+    ) / 1_000_000
+    return round(cost, 6)
+
+
+# Reasoning models spend part of max_completion_tokens on hidden reasoning before
+# the visible reply, so output caps for them get this much extra room.
+REASONING_TOKEN_HEADROOM = 2048
+
+_REASONING_MODEL_PREFIXES = ("gpt-5", "o1", "o3", "o4")
+
+
+def is_reasoning_model(model):
+    """True for reasoning models, which take ``max_completion_tokens`` and reject ``stop``."""
+    # Provider-prefixed ids such as "openai/gpt-5-mini" (OpenRouter) count too.
+    return (model or "").rsplit("/", 1)[-1].startswith(_REASONING_MODEL_PREFIXES)
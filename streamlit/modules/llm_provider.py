@@ -17,8 +17,14 @@ class LLMConfig:
         base_url: Base URL for the API. None uses the OpenAI default.
                   For OpenRouter: "https://openrouter.ai/api/v1"
                   For Azure: "https://<resource>.openai.azure.com/openai/deployments/<deployment>"
+                  For the offline load-test backend: "mock://?latency=0.2" (see llm_mock)
         temperature: Sampling temperature. None omits the parameter (use provider default).
         top_p: Nucleus sampling parameter. None omits the parameter.
+        requests_per_minute: Request limit shared by every engine using this
+                  account and model (see llm_rate_limit). None = no limit.
+        tokens_per_minute: Token limit, enforced the same way. None = no limit.
+        fallbacks: Further LLMConfigs (own base_url, key and model) that take
+                  over while this endpoint's circuit breaker is open (see llm_routing).
     """
 
     model: str
@@ -26,3 +32,6 @@ class LLMConfig:
     base_url: str = None
     temperature: float = None
     top_p: float = None
+    requests_per_minute: int = None
+    tokens_per_minute: int = None
+    fallbacks: list = None
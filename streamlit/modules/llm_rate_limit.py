@@ -0,0 +1,205 @@
+"""Process-wide request and token rate limiting for LLM calls.
+
+Every engine in the process that talks to the same provider account and
+model shares one :class:`RateLimiter`, looked up by
+``(base_url, api_key, model)``, so parallel simulations and Playground
+chats draw from a single budget instead of discovering the provider limit
+through 429 responses.
+
+Limits come from the ``requests_per_minute`` / ``tokens_per_minute`` fields
+of :class:`~modules.llm_provider.LLMConfig`, falling back to the
+``LLM_REQUESTS_PER_MINUTE`` / ``LLM_TOKENS_PER_MINUTE`` environment
+variables.  An engine built without limits still joins a limiter that
+another engine registered for the same account and model.
+
+Before dispatch a call reserves one request and its estimated prompt
+tokens; the estimate is corrected with the reported usage afterwards.  A
+reservation that overdraws a bucket returns how long the caller has to wait,
+so sync engines sleep and async engines await without holding the lock.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+# Seconds of budget a bucket may accumulate while idle.  Providers enforce
+# per-minute limits over shorter windows, so a full minute's burst would
+# still be rejected.
+DEFAULT_BURST_SECONDS = 10.0
+WINDOW_SECONDS = 60.0
+
+
+def estimate_prompt_tokens(messages):
+    """Rough prompt size of a chat request (about four characters per token)."""
+    return sum(len(message.get("content") or "") // 4 + 4 for message in messages)
+
+
+class TokenBucket:
+    """Continuously refilled budget of ``per_minute`` units.
+
+    The level may go negative: callers reserve first and then wait for the
+    debt to be repaid, which keeps waiting callers in arrival order.
+    """
+
+    def __init__(self, per_minute, now, burst_seconds=DEFAULT_BURST_SECONDS):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take *amount* from the bucket and return the seconds until it is covered."""
+        self._refill(now)
+        self.level -= amount
+        return max(-self.level / self.rate, 0.0)
+
+    def adjust(self, amount, now):
+        """Charge (positive) or refund (negative) *amount* without waiting."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by several engines.
+
+    Args:
+        requests_per_minute: Request limit (``None`` = unlimited).
+        tokens_per_minute: Token limit (``None`` = unlimited).
+        burst_seconds: Budget that may build up while idle.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        burst_seconds=DEFAULT_BURST_SECONDS,
+        clock=time.monotonic,
+    ):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.burst_seconds = burst_seconds
+        self._requests = None
+        self._tokens = None
+        self._recent = deque()  # (timestamp, requests, tokens) within WINDOW_SECONDS
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None):
+        """Set new limits; ``None`` keeps the current one."""
+        with self._lock:
+            now = self._clock()
+            if requests_per_minute and requests_per_minute != getattr(self._requests, "per_minute", None):
+                self._requests = TokenBucket(requests_per_minute, now, self.burst_seconds)
+            if tokens_per_minute and tokens_per_minute != getattr(self._tokens, "per_minute", None):
+                self._tokens = TokenBucket(tokens_per_minute, now, self.burst_seconds)
+
+    def reserve(self, tokens):
+        """Reserve one request of *tokens* and return the seconds to wait before sending it."""
+        with self._lock:
+            now = self._clock()
+            delay = 0.0
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            self._record(now, 1, tokens)
+            if delay:
+                self.waits += 1
+                self.wait_seconds += delay
+            return delay
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct a reservation once the provider reported the real token count."""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            now = self._clock()
+            if self._tokens is not None:
+                self._tokens.adjust(actual_tokens - estimated_tokens, now)
+            self._record(now, 0, actual_tokens - estimated_tokens)
+
+    def _prune(self, now):
+        while self._recent and self._recent[0][0] < now - WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def _record(self, now, requests, tokens):
+        # Pruned on every write, so a run that never reads utilization() keeps one window of entries.
+        self._prune(now)
+        self._recent.append((now, requests, tokens))
+
+    def utilization(self):
+        """Return the limits, last-minute traffic and time spent waiting."""
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            requests = sum(entry[1] for entry in self._recent)
+            tokens = max(sum(entry[2] for entry in self._recent), 0)
+            requests_limit = self._requests.per_minute if self._requests else None
+            tokens_limit = self._tokens.per_minute if self._tokens else None
+            return {
+                "requests_per_minute": requests_limit,
+                "tokens_per_minute": tokens_limit,
+                "requests_last_minute": requests,
+                "tokens_last_minute": tokens,
+                "request_utilization": round(requests / requests_limit, 3) if requests_limit else None,
+                "token_utilization": round(tokens / tokens_limit, 3) if tokens_limit else None,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_key(base_url, api_key, model):
+    """Registry key for an account and model; the API key is stored hashed."""
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return (base_url or "", key_hash, model)
+
+
+def _env_limit(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def get_rate_limiter(llm_config):
+    """Return the shared limiter for *llm_config*, or ``None`` when it has no limits.
+
+    Limits on the config (or in the environment) create the limiter or update
+    an existing one; a config without limits only joins an existing limiter.
+    """
+    requests_per_minute = getattr(llm_config, "requests_per_minute", None) or _env_limit("LLM_REQUESTS_PER_MINUTE")
+    tokens_per_minute = getattr(llm_config, "tokens_per_minute", None) or _env_limit("LLM_TOKENS_PER_MINUTE")
+    key = limiter_key(llm_config.base_url, llm_config.api_key, llm_config.model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            if not (requests_per_minute or tokens_per_minute):
+                return None
+            limiter = _limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+            return limiter
+    limiter.configure(requests_per_minute, tokens_per_minute)
+    return limiter
+
+
+def rate_limit_utilization(llm_config):
+    """Current :meth:`RateLimiter.utilization` for *llm_config*, or ``None`` if unlimited."""
+    with _limiters_lock:
+        limiter = _limiters.get(limiter_key(llm_config.base_url, llm_config.api_key, llm_config.model))
+    return limiter.utilization() if limiter is not None else None
+
+
+def reset_rate_limiters():
+    """Forget every registered limiter (tests)."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,142 @@
+"""Retry policy and error classification for LLM calls.
+
+Errors raised by an OpenAI-compatible client fall into three classes:
+
+* ``retryable`` – throttling, timeouts, dropped connections and 5xx
+  responses.  Repeating the same request later is expected to succeed.
+* ``auth`` – the key is missing, invalid or not allowed to use the model.
+* ``fatal`` – anything else (bad request, unknown model, exhausted quota,
+  programming errors).  Repeating the request cannot help.
+
+Some of those failures cannot be fixed by any other chat of a run either: a
+rejected key, an exhausted quota or an unknown model.  :func:`run_abort_reason`
+names them so a simulation stops at the first one instead of replaying every
+remaining chat against the same wall.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import openai
+
+ERROR_RETRYABLE = "retryable"
+ERROR_AUTH = "auth"
+ERROR_FATAL = "fatal"
+
+_RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+ABORT_AUTH = "auth"
+ABORT_QUOTA = "quota"
+ABORT_MODEL_NOT_FOUND = "model_not_found"
+
+
+def _error_code(error):
+    code = getattr(error, "code", None)
+    if code:
+        return str(code)
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        nested = body.get("error") if isinstance(body.get("error"), dict) else body
+        return str(nested.get("code") or "") or None
+    return None
+
+
+def classify_llm_error(error):
+    """Return ``"retryable"``, ``"auth"`` or ``"fatal"`` for an LLM client error."""
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return ERROR_AUTH
+    if isinstance(error, openai.RateLimitError):
+        # A 429 with insufficient_quota means the account is out of credit.
+        return ERROR_FATAL if _error_code(error) == "insufficient_quota" else ERROR_RETRYABLE
+    if isinstance(error, openai.APIConnectionError):
+        return ERROR_RETRYABLE
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        if status in (401, 403):
+            return ERROR_AUTH
+        if status in _RETRYABLE_STATUS_CODES or status >= 500:
+            return ERROR_RETRYABLE
+        return ERROR_FATAL
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return ERROR_RETRYABLE
+    return ERROR_FATAL
+
+
+def run_abort_reason(error):
+    """``"auth"``, ``"quota"`` or ``"model_not_found"`` when *error* dooms every call of a run, else ``None``."""
+    category = classify_llm_error(error)
+    if category == ERROR_AUTH:
+        return ABORT_AUTH
+    if category != ERROR_FATAL:
+        return None
+    code = _error_code(error)
+    if code == "insufficient_quota":
+        return ABORT_QUOTA
+    if code == "model_not_found" or isinstance(error, openai.NotFoundError):
+        return ABORT_MODEL_NOT_FOUND
+    return None
+
+
+def is_rate_limit_error(error):
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def is_timeout_error(error):
+    return isinstance(error, (openai.APITimeoutError, TimeoutError)) or getattr(error, "status_code", None) == 408
+
+
+def retry_after_seconds(error):
+    """Read the provider's ``Retry-After`` hint from an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter for a single LLM call.
+
+    Args:
+        max_attempts: Total attempts per call, including the first one.
+        base_delay: Delay before the first retry, in seconds.
+        max_delay: Upper bound for computed backoff delays.
+        jitter: Fraction of each delay that is randomized (0 disables jitter).
+        max_retry_after: Upper bound for provider ``Retry-After`` hints.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    jitter: float = 0.5
+    max_retry_after: float = 60.0
+
+    def delay_seconds(self, attempt, retry_after=None):
+        """Seconds to wait after failed attempt number *attempt* (1-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1)
+        return delay
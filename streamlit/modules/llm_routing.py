@@ -0,0 +1,155 @@
+"""Failover between OpenAI-compatible endpoints with circuit breakers.
+
+An :class:`~modules.llm_provider.LLMConfig` may list ``fallbacks``: further
+configs (e.g. OpenRouter or a local vLLM server), each with its own
+``base_url``, key and model id.  The engines send every call to the first
+route whose :class:`CircuitBreaker` lets it through:
+
+* ``closed`` – the endpoint is healthy; requests flow.
+* ``open`` – ``failure_threshold`` retryable failures in a row (5xx,
+  timeouts, dropped connections) opened the breaker, so calls go to the
+  next route straight away instead of retrying a provider that is down.
+  A 429 is not a failure: the endpoint is up, and the rate limiter and
+  retry backoff deal with it.
+* ``half_open`` – after ``reset_seconds`` one trial call is let through;
+  success closes the breaker (traffic returns to the primary), failure
+  opens it again.
+
+Breakers are process-wide per endpoint, key and model, like the rate
+limiters, so every parallel chat fails over as soon as one of them has seen
+the outage.  Calls are counted per route in the call statistics under
+``llm_route:<label>`` keys, which is how each stored chat records the
+route(s) that produced it.
+
+Fallbacks are opt-in per run: :func:`fallbacks_from_env` reads one from the
+``LLM_FALLBACK_BASE_URL``, ``LLM_FALLBACK_API_KEY`` and ``LLM_FALLBACK_MODEL``
+environment variables when a run asks to fail over.
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .llm_provider import LLMConfig
+from .llm_rate_limit import limiter_key
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_SECONDS = 30.0
+
+ROUTE_STATS_PREFIX = "llm_route:"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one endpoint.
+
+    Args:
+        failure_threshold: Retryable failures in a row that open the circuit.
+        reset_seconds: Time an open circuit waits before a trial call.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS, clock=time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_started = None
+
+    def allow(self):
+        """True when a call may be sent to this endpoint now."""
+        with self._lock:
+            now = self._clock()
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+                self._trial_started = None
+            if self.state == CIRCUIT_HALF_OPEN:
+                # One trial call at a time; a trial that never reported back expires.
+                if self._trial_started is None or now - self._trial_started >= self.reset_seconds:
+                    self._trial_started = now
+                    return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CIRCUIT_OPEN:
+                    self.times_opened += 1
+                self.state = CIRCUIT_OPEN
+                self.opened_at = self._clock()
+                self._trial_started = None
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(llm_config):
+    """Return the process-wide breaker for *llm_config*'s endpoint, key and model."""
+    key = limiter_key(llm_config.base_url, llm_config.api_key, llm_config.model)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+        return breaker
+
+
+def reset_circuit_breakers():
+    """Forget every breaker (tests)."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def route_label(llm_config):
+    """Readable, secret-free name of a route: ``host:model``."""
+    host = urlsplit(llm_config.base_url).hostname if llm_config.base_url else "api.openai.com"
+    if llm_config.base_url and not host:
+        host = urlsplit(llm_config.base_url).scheme
+    return f"{host}:{llm_config.model}"
+
+
+def route_calls(stats):
+    """``{route label: calls}`` counted in *stats*."""
+    return {
+        key[len(ROUTE_STATS_PREFIX) :]: value
+        for key, value in (stats or {}).items()
+        if key.startswith(ROUTE_STATS_PREFIX)
+    }
+
+
+def format_route(stats):
+    """Describe the route(s) behind a chat, e.g. ``api.openai.com:gpt-5-mini`` or ``a:m (10), b:m (2)``."""
+    calls = route_calls(stats)
+    if not calls:
+        return None
+    if len(calls) == 1:
+        return next(iter(calls))
+    return ", ".join(f"{label} ({count})" for label, count in sorted(calls.items(), key=lambda item: -item[1]))
+
+
+def fallbacks_from_env():
+    """Fallback config from ``LLM_FALLBACK_*`` environment variables, as a list (``None`` when unset)."""
+    base_url = os.getenv("LLM_FALLBACK_BASE_URL")
+    model = os.getenv("LLM_FALLBACK_MODEL")
+    if not (base_url and model):
+        return None
+    return [LLMConfig(model=model, api_key=os.getenv("LLM_FALLBACK_API_KEY", ""), base_url=base_url)]
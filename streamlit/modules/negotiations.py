@@ -1,14 +1,23 @@
+import threading
 import time
+from dataclasses import replace
 
 from .conversation_engine import ConversationEngine
 from .database_handler import (
     get_error_matchups,
     get_game_by_id,
+    get_round_data,
     insert_negotiation_chat,
     insert_round_data,
+    update_negotiation_chat_summary,
     update_round_data,
 )
+from .llm_key_pool import KeyPool
+from .llm_rate_limit import limiter_key, rate_limit_utilization
+from .llm_retry import ERROR_RETRYABLE, classify_llm_error, run_abort_reason
+from .llm_routing import format_route, route_calls
 from .negotiations_agents import create_agents
+from .negotiations_checkpoints import DatabaseCheckpointStore, is_resumable_history
 from .negotiations_common import (
     build_llm_config,
     clean_agent_message,
@@ -22,19 +31,32 @@ from .negotiations_common import (
     parse_team_name,
     resolve_initiator_role_index,
 )
+from .negotiations_executor import UNIT_NOT_READY, AIMDConcurrencyController, build_match_executor
+from .negotiations_plan import compile_simulation_plan
 from .negotiations_run_helpers import (
     build_diagnostics_summary,
     build_timing_summary,
+    build_usage_summary,
+    extract_usage,
+    format_run_abort,
     format_unsuccessful_matchups,
+    merge_counters,
+    new_run_diagnostics,
+    new_timing_totals,
+    with_cost,
 )
 from .negotiations_summary import (
     _build_summary_context,
     _extract_summary_text,
     build_summary_agent,
     evaluate_deal_summary,
+    extract_deal_locally,
     extract_summary_from_transcript,
+    format_local_summary,
     parse_deal_value,
 )
+from .negotiations_summary_stage import SummaryStage
+from .negotiations_work_queue import UNIT_DONE, UNIT_FAILED, UNIT_PENDING
 from .schedule import berger_schedule
 
 __all__ = [
@@ -49,6 +71,7 @@ __all__ = [
     "create_chat",
     "create_chats",
     "evaluate_deal_summary",
+    "extract_deal_locally",
     "extract_summary_from_transcript",
     "get_maximizer_reservation",
     "get_minimizer_maximizer",
@@ -61,6 +84,14 @@ __all__ = [
     "resolve_initiator_role_index",
 ]
 
+# The DB layer shares one connection per process; chats that finish on worker
+# threads serialize their writes through this lock.
+_db_write_lock = threading.Lock()
+
+# Final adaptive concurrency of the last run per (base_url, api key, model),
+# used as the starting point of the next run on the same account and model.
+_learned_concurrency = {}
+
 
 def _make_termination_fn(negotiation_termination_message):
     """Return a termination predicate that fires when the phrase appears."""
@@ -71,6 +102,32 @@ def _make_termination_fn(negotiation_termination_message):
     return fn
 
 
+def _chat_abort(error, round_num, team1, team2):
+    """The run abort record for a chat that failed with *error*, or ``None`` if other chats can still succeed."""
+    reason = run_abort_reason(error)
+    if reason is None:
+        return None
+    return {
+        "reason": reason,
+        "error": f"{type(error).__name__}: {error}"[:300],
+        "round": round_num,
+        "team1": team1["Name"],
+        "team2": team2["Name"],
+    }
+
+
+def build_game_context(game_id, game_type="zero-sum"):
+    """Game description prepended to every negotiation agent's system message.
+
+    It opens the prompt of every agent in the game, so it is built once per
+    run and reused verbatim: any per-chat variation would break the shared
+    prefix that provider-side prompt caching relies on.
+    """
+    game_details = get_game_by_id(game_id) if game_id is not None else None
+    game_explanation = game_details.get("explanation", "") if game_details else ""
+    return f"Game Type: {game_type}\nGame Explanation: {game_explanation}\n\n"
+
+
 def create_chat(
     game_id,
     minimizer_team,
@@ -87,64 +144,147 @@ def create_chat(
     game_type="zero-sum",
     timing_totals=None,
     run_diagnostics=None,
+    checkpoint_store=None,
+    game_context=None,
+    summary_stage=None,
+    summary_tag=None,
+    read_deals_locally=False,
+    agents=None,
 ):
-    game_details = get_game_by_id(game_id)
-    game_explanation = game_details.get("explanation", "") if game_details else ""
-    game_context = f"Game Type: {game_type}\nGame Explanation: {game_explanation}\n\n"
-
-    responder_role_index = 2 if initiator_role_index == 1 else 1
-    initiator_team, responder_team = (
-        (minimizer_team, maximizer_team) if initiator_role_index == 1 else (maximizer_team, minimizer_team)
-    )
-
-    agent1 = get_role_agent(initiator_team, initiator_role_index)
-    agent2 = get_role_agent(responder_team, responder_role_index)
+    """Play one negotiation chat, summarize it and store the result.
+
+    With a *checkpoint_store*, the transcript is checkpointed after every
+    message and a previous unfinished attempt of the same chat is resumed
+    instead of regenerated.  The chat's token usage (and estimated cost) is
+    stored with the transcript and added to *run_diagnostics*.  Returns the
+    parsed deal value.
+
+    *game_context* is the run's :func:`build_game_context`; it is looked up
+    when not given.  *agents* are the chat's ``(initiator, responder)``
+    agents with the game context already in place
+    (:meth:`~modules.negotiations_plan.SimulationPlan.chat_agents`); they
+    replace both.
+
+    With a *summary_stage* (:class:`~modules.negotiations_summary_stage.SummaryStage`)
+    the transcript is stored without a summary and handed to the stage,
+    tagged with ``{"chat_key": ..., **summary_tag}``; the function then
+    returns ``None`` and the caller stores the summary from the stage's result
+    (``summary_deferred`` is counted in *run_diagnostics*).
+
+    With *read_deals_locally*, a deal that :func:`extract_deal_locally`
+    reads from the closing messages is stored without asking the summary
+    agent; ``summary_local`` and ``summary_llm``
+    in *run_diagnostics* count both kinds of decision.
+    """
+    if agents is not None:
+        agent1, agent2 = agents
+    else:
+        if game_context is None:
+            game_context = build_game_context(game_id, game_type)
+
+        responder_role_index = 2 if initiator_role_index == 1 else 1
+        initiator_team, responder_team = (
+            (minimizer_team, maximizer_team) if initiator_role_index == 1 else (maximizer_team, minimizer_team)
+        )
+        agent1 = get_role_agent(initiator_team, initiator_role_index)
+        agent2 = get_role_agent(responder_team, responder_role_index)
+
+        # Team agents are shared by every chat of the run (possibly on other
+        # threads), so prepend the game context to per-chat copies.
+        if agent1.system_message:
+            agent1 = replace(agent1, system_message=game_context + agent1.system_message)
+        if agent2.system_message:
+            agent2 = replace(agent2, system_message=game_context + agent2.system_message)
     name1 = agent1.name
     name2 = agent2.name
 
-    if agent1.system_message:
-        agent1.system_message = game_context + agent1.system_message
-    if agent2.system_message:
-        agent2.system_message = game_context + agent2.system_message
-
     termination_fn = _make_termination_fn(negotiation_termination_message)
 
-    chat_start = time.perf_counter()
-    chat = engine.run_bilateral(agent1, agent2, num_turns, termination_fn)
-    chat_elapsed = time.perf_counter() - chat_start
-
-    negotiation = ""
-    turn_count = len(chat.chat_history) if getattr(chat, "chat_history", None) else 0
-
-    for entry in chat.chat_history:
-        clean_msg = clean_agent_message(name1, name2, entry["content"])
-        negotiation += f"{entry['name']}: {clean_msg}\n\n\n"
-
-    summary_text = ""
-    deal_value = None
-    summary_elapsed = 0.0
-    if summary_agent:
-        summary_start = time.perf_counter()
-        summary_text, deal_value = evaluate_deal_summary(
-            engine,
-            chat.chat_history,
-            summary_prompt,
-            summary_termination_message,
-            summary_agent,
-            role1_name=name1,
-            role2_name=name2,
-            history_size=4,
-        )
-        summary_elapsed = time.perf_counter() - summary_start
-
-    db_elapsed = 0.0
-    if store_in_db and minimizer_team and maximizer_team and game_id and round_num is not None:
+    chat_key = None
+    if minimizer_team and maximizer_team and game_id and round_num is not None:
         class1, group1 = parse_team_name(minimizer_team["Name"])
         class2, group2 = parse_team_name(maximizer_team["Name"])
         if class1 and group1 is not None and class2 and group2 is not None:
-            try:
-                db_start = time.perf_counter()
-                insert_negotiation_chat(
+            chat_key = (game_id, round_num, class1, group1, class2, group2)
+
+    resume_history = None
+    save_checkpoint = None
+    if checkpoint_store is not None and chat_key is not None:
+        resume_history = checkpoint_store.load(chat_key)
+        if resume_history and not is_resumable_history(resume_history, name1, name2):
+            resume_history = None
+        if resume_history and run_diagnostics is not None:
+            run_diagnostics["resumed_chats"] = run_diagnostics.get("resumed_chats", 0) + 1
+            run_diagnostics["resumed_messages"] = run_diagnostics.get("resumed_messages", 0) + len(resume_history)
+
+        def save_checkpoint(history):
+            checkpoint_store.save(chat_key, history)
+
+    # LLM counters are collected per chat so its token usage can be stored
+    # with the transcript; they are merged into the run diagnostics even when
+    # the chat fails, since failed calls still count against the budget.
+    chat_stats = {}
+    try:
+        chat_start = time.perf_counter()
+        chat = engine.run_bilateral(
+            agent1,
+            agent2,
+            num_turns,
+            termination_fn,
+            stats=chat_stats,
+            history=resume_history,
+            on_message=save_checkpoint,
+        )
+        chat_elapsed = time.perf_counter() - chat_start
+
+        negotiation = ""
+        turn_count = len(chat.chat_history) if getattr(chat, "chat_history", None) else 0
+
+        for entry in chat.chat_history:
+            clean_msg = clean_agent_message(name1, name2, entry["content"])
+            negotiation += f"{entry['name']}: {clean_msg}\n\n\n"
+
+        summary_text = ""
+        deal_value = None
+        summary_elapsed = 0.0
+        local_deal = False
+        if summary_agent and read_deals_locally:
+            local_value = extract_deal_locally(
+                chat.chat_history, negotiation_termination_message, role1_name=name1, role2_name=name2
+            )
+            if local_value is not None:
+                local_deal = True
+                deal_value = local_value
+                summary_text = format_local_summary(local_value, summary_termination_message)
+        if summary_agent and not local_deal and summary_stage is None:
+            summary_start = time.perf_counter()
+            summary_text, deal_value = evaluate_deal_summary(
+                engine,
+                chat.chat_history,
+                summary_prompt,
+                summary_termination_message,
+                summary_agent,
+                role1_name=name1,
+                role2_name=name2,
+                history_size=4,
+                stats=chat_stats,
+            )
+            summary_elapsed = time.perf_counter() - summary_start
+    finally:
+        if run_diagnostics is not None:
+            merge_counters(run_diagnostics, chat_stats)
+    usage = with_cost(extract_usage(chat_stats), getattr(engine, "model", None))
+    # Per-route call counts only exist when fallbacks are configured; otherwise every call went to the primary.
+    llm_route = format_route(chat_stats) or getattr(engine, "route_label", None)
+
+    db_elapsed = 0.0
+    stored = False
+    if store_in_db and chat_key is not None:
+        _, _, class1, group1, class2, group2 = chat_key
+        try:
+            db_start = time.perf_counter()
+            with _db_write_lock:
+                stored = insert_negotiation_chat(
                     game_id=game_id,
                     round_number=round_num,
                     group1_class=class1,
@@ -154,10 +294,21 @@ def create_chat(
                     transcript=negotiation,
                     summary=summary_text,
                     deal_value=deal_value,
+                    usage=usage,
+                    llm_route=llm_route,
                 )
-                db_elapsed = time.perf_counter() - db_start
-            except Exception as e:
-                print(f"Warning: Failed to store negotiation chat: {e}")
+            db_elapsed = time.perf_counter() - db_start
+        except Exception as e:
+            print(f"Warning: Failed to store negotiation chat: {e}")
+
+    # Keep the checkpoint when the result could not be stored, so a rerun
+    # still resumes the finished transcript instead of replaying it.
+    if save_checkpoint is not None and (stored or not store_in_db):
+        checkpoint_store.clear(chat_key)
+
+    defer_summary = summary_agent and not local_deal and summary_stage is not None
+    if defer_summary:
+        summary_stage.submit(chat.chat_history, name1, name2, tag={"chat_key": chat_key, **(summary_tag or {})})
 
     if timing_totals is not None:
         timing_totals["chat_seconds"] += chat_elapsed
@@ -167,12 +318,69 @@ def create_chat(
 
     if run_diagnostics is not None:
         run_diagnostics["total_turns"] += turn_count
-        run_diagnostics["summary_calls"] += 1 if summary_agent else 0
+        run_diagnostics["summary_calls"] += 1 if summary_agent and not local_deal and summary_stage is None else 0
+        if summary_agent:
+            decision = "summary_local" if local_deal else "summary_llm"
+            run_diagnostics[decision] = run_diagnostics.get(decision, 0) + 1
+        if defer_summary:
+            run_diagnostics["summary_deferred"] = run_diagnostics.get("summary_deferred", 0) + 1
         run_diagnostics["successful_chats"] += 1
 
     return deal_value
 
 
+def schedule_from_round_rows(round_rows):
+    """Rebuild a tournament schedule from stored ``round`` rows.
+
+    Returns ``[[(team1, team2, role1_done, role2_done), ...], ...]`` per round,
+    with team names in :func:`create_agents` form.  ``role1_done`` is true
+    when the chat where team 1 played role 1 has a stored score.
+    """
+    rounds = {}
+    for row in round_rows:
+        round_number, class1, group1, class2, group2 = row[:5]
+        score_team1_role1, score_team1_role2 = row[5], row[7]
+        rounds.setdefault(round_number, []).append(
+            (
+                f"Class{class1}_Group{group1}",
+                f"Class{class2}_Group{group2}",
+                score_team1_role1 is not None,
+                score_team1_role2 is not None,
+            )
+        )
+    return [sorted(rounds.get(round_number, [])) for round_number in range(1, max(rounds) + 1)]
+
+
+def _claimed_units(work_queue, plan):
+    """Turn the units *work_queue* hands this process into :func:`create_chats` units."""
+    rows = {}
+    index = 0
+    for claimed in work_queue.claimed_units():
+        if claimed is UNIT_NOT_READY:
+            yield claimed
+            continue
+        class1, group1 = claimed["group1_class"], str(claimed["group1_id"])
+        class2, group2 = claimed["group2_class"], str(claimed["group2_id"])
+        team1 = plan.team(class1, group1)
+        team2 = plan.team(class2, group2)
+        if team1 is None or team2 is None:
+            print(f"Warning: Could not find the teams of queued chat {claimed['unit_id']}")
+            work_queue.finish(claimed["unit_id"], UNIT_FAILED, "Team not found on this worker")
+            continue
+        key = (class1, group1, class2, group2)
+        row = rows.setdefault((claimed["round_number"], key), {"team1": team1, "key": key})
+        initiator, responder = (team1, team2) if claimed["group1_initiates"] else (team2, team1)
+        yield {
+            "index": index,
+            "round": claimed["round_number"],
+            "team1": initiator,
+            "team2": responder,
+            "row": row,
+            "unit_id": claimed["unit_id"],
+        }
+        index += 1
+
+
 def create_chats(
     game_id,
     llm_config,
@@ -186,11 +394,122 @@ def create_chats(
     summary_prompt,
     summary_termination_message,
     progress_callback=None,
+    max_concurrency=1,
+    executor=None,
+    team_info=None,
+    llm_cache=None,
+    adaptive_concurrency=False,
+    context_policy=None,
+    key_labels=None,
+    resume=False,
+    work_queue=None,
+    join_queue=False,
+    summary_workers=0,
+    summary_batch_size=1,
+    read_deals_locally=False,
+    structured_summaries=False,
 ):
-    schedule = berger_schedule([f"Class{i[0]}_Group{i[1]}" for i in teams], num_rounds)
-
-    engine = ConversationEngine(llm_config)
-    team_info = create_agents(game_id, teams, values, name_roles, negotiation_termination_message)
+    """Play every scheduled chat of a round-robin tournament and store the results.
+
+    Each scheduled match produces two independent chats (one per role
+    assignment).  Chats are handed to *executor* (defaults to
+    :func:`build_match_executor` with *max_concurrency*), so wall time scales
+    with ``chats / max_concurrency``.  Progress callbacks, score updates and
+    counter aggregation always run on the calling thread.
+
+    *team_info* takes prebuilt team dicts (as returned by
+    :func:`create_agents`); by default they are built from the teams'
+    stored submissions.  With ``game_id=None`` nothing is written to the
+    database (used by offline benchmarks).  *llm_cache* is an optional
+    :class:`~modules.llm_cache.LLMResponseCache` shared by every chat.
+
+    With *adaptive_concurrency*, *max_concurrency* becomes an upper bound:
+    an :class:`~modules.negotiations_executor.AIMDConcurrencyController`
+    adds a parallel chat after every unthrottled chat and halves the limit
+    when a chat hit 429s or timeouts.  The run starts from the limit the
+    previous run on the same key and model ended with.
+
+    *context_policy* (:class:`~modules.conversation_context.ContextPolicy`)
+    bounds the history each negotiation turn resends, for long games.
+
+    *llm_config* may also be a list of configs (several API keys or
+    providers; the first one names the model for cost estimates).  Chats are
+    then spread over a :class:`~modules.llm_key_pool.KeyPool`, which rests
+    throttled keys and drops rejected ones; a chat whose key was dropped is
+    retried on another key.  *key_labels* name the keys in ``diagnostics["keys"]``.
+
+    Besides ``timing`` and ``diagnostics``, the result reports ``usage``:
+    prompt, completion and cached tokens with an estimated cost for the whole
+    run, per team and per round.
+
+    A rejected key, an exhausted quota or an unknown model (see
+    :func:`~modules.llm_retry.run_abort_reason`) would fail every remaining
+    chat the same way, so the first one aborts the run: chats not yet started
+    are skipped, and the result has status ``"aborted"`` with the cause under
+    ``abort``.  Unplayed chats keep their unscored round rows, so they can be
+    re-run later like any failed chat.
+
+    With *resume*, the schedule is the one already stored in the game's
+    ``round`` rows, and only chats without a stored score (deal or no deal)
+    are played; ``total_matches`` then counts those, and ``resumed_matches``
+    the finished chats that were kept.  Without stored rows it is a fresh run;
+    when the rows cannot be read, ``RuntimeError`` is raised instead, so a
+    database hiccup never replaces the stored schedule and its results.
+
+    With a *work_queue* (:class:`~modules.negotiations_work_queue.ChatWorkQueue`)
+    the chats left to play are written to the game's work queue (replacing
+    the units of a previous run) and this process plays the ones it claims,
+    alongside any workers that joined the game; the call returns once the
+    queue is drained.  With *join_queue* nothing is scheduled: the process
+    only claims chats another process queued (*teams* must still cover the
+    queued teams).  Counts in the result are this process's chats, and
+    ``diagnostics["work_queue"]`` reports the queue.  A unit is marked done
+    only once its score is stored.  The summary, deal-reading and rate-limit
+    settings are stored with the queue for joining workers (see
+    ``scripts/chat_worker.py``).
+
+    With *summary_workers*, deal summaries are evaluated by a
+    :class:`~modules.negotiations_summary_stage.SummaryStage` with that many
+    threads (on the first key), packing up to *summary_batch_size*
+    transcripts into one request, so a chat's executor slot is free as soon
+    as its negotiation ends.  Summaries, deal values and scores are
+    back-filled on the calling thread as evaluations come in, and the call
+    returns once every summary is stored.  ``completed_matches`` counts
+    chats with a stored score.
+
+    With *read_deals_locally*, deals that
+    :func:`~modules.negotiations_summary.extract_deal_locally` reads from the
+    closing messages skip the summary agent; by default it is always asked.
+    ``diagnostics["summary_local_rate"]`` is the share decided locally.
+
+    With *structured_summaries*, the summary agent answers with a JSON
+    schema ``response_format`` (``{"agreed", "value", "summary"}``) instead
+    of a free-text line; providers that reject the format are asked again
+    without it (``diagnostics["summary_structured_fallbacks"]``).
+    """
+    stored_rows = get_round_data(game_id) if resume and game_id is not None and not join_queue else None
+    if stored_rows is False:
+        raise RuntimeError(f"Could not read the stored schedule of game {game_id}; the run was not resumed.")
+    if work_queue is not None and join_queue:
+        schedule = []
+    elif stored_rows:
+        schedule = schedule_from_round_rows(stored_rows)
+    else:
+        schedule = berger_schedule([f"Class{i[0]}_Group{i[1]}" for i in teams], num_rounds)
+
+    llm_configs = list(llm_config) if isinstance(llm_config, (list, tuple)) else [llm_config]
+    llm_config = llm_configs[0]
+    engine = key_pool = None
+    if len(llm_configs) > 1:
+        key_pool = KeyPool(
+            llm_configs,
+            lambda config: ConversationEngine(config, cache=llm_cache, context_policy=context_policy),
+            labels=key_labels,
+        )
+    else:
+        engine = ConversationEngine(llm_config, cache=llm_cache, context_policy=context_policy)
+    if team_info is None:
+        team_info = create_agents(game_id, teams, values, name_roles, negotiation_termination_message)
     initiator_role_index = resolve_initiator_role_index(name_roles, conversation_order)
     initiator_role_name = name_roles[initiator_role_index - 1]
     responder_role_name = name_roles[1 if initiator_role_index == 1 else 0]
@@ -199,25 +518,45 @@ def create_chats(
         summary_termination_message,
         negotiation_termination_message,
         include_summary=True,
+        structured=structured_summaries,
     )
+    plan = compile_simulation_plan(
+        schedule, team_info, initiator_role_index, build_game_context(game_id), resume=bool(stored_rows)
+    )
+    summary_stage = None
+    if summary_workers:
+        # Summaries go through the chats' engine or key pool, so they share
+        # their keys, rate limits and failover routes.
+        summary_stage = SummaryStage(
+            engine,
+            summary_prompt,
+            summary_termination_message,
+            summary_agent,
+            workers=summary_workers,
+            batch_size=summary_batch_size,
+            key_pool=key_pool,
+        )
 
-    max_retries = 10
-    total_matches = sum(len(round_matches) * 2 for round_matches in schedule)
+    controller = None
+    if adaptive_concurrency and executor is None and max_concurrency and int(max_concurrency) > 1:
+        controller_key = limiter_key(llm_config.base_url, llm_config.api_key, llm_config.model)
+        initial = _learned_concurrency.get(controller_key, max(int(max_concurrency) // 4, 1))
+        controller = AIMDConcurrencyController(initial, int(max_concurrency))
+    if executor is None:
+        executor = build_match_executor(max_concurrency, controller)
+    checkpoint_store = DatabaseCheckpointStore(lock=_db_write_lock)
+
+    # LLM calls retry transient failures themselves, so a chat is only
+    # restarted when a call exhausted its retries.
+    max_retries = 3
     completed_matches = 0
     processed_matches = 0
-    timing_totals = {
-        "chat_seconds": 0.0,
-        "summary_seconds": 0.0,
-        "db_seconds": 0.0,
-        "chats_measured": 0,
-    }
-    run_diagnostics = {
-        "attempts_total": 0,
-        "attempts_failed": 0,
-        "summary_calls": 0,
-        "total_turns": 0,
-        "successful_chats": 0,
-    }
+    timing_totals = new_timing_totals()
+    run_diagnostics = new_run_diagnostics()
+    usage_by_team = {}
+    usage_by_round = {}
+    abort = {}
+    abort_lock = threading.Lock()
 
     def emit_progress(round_num, team1, team2, role1_name, role2_name, phase, attempt=None, elapsed_seconds=None):
         if progress_callback:
@@ -234,189 +573,282 @@ def create_chats(
                 elapsed_seconds=elapsed_seconds,
             )
 
-    errors_matchups = []
-
-    for round_, round_matches in enumerate(schedule, 1):
-        for match in round_matches:
-            team1 = next((team for team in team_info if team["Name"] == match[0]), None)
-            team2 = next((team for team in team_info if team["Name"] == match[1]), None)
-
-            class_group_1 = team1["Name"].split("_")
-            class1 = class_group_1[0][5:]
-            group1 = class_group_1[1][5:]
-
-            class_group_2 = team2["Name"].split("_")
-            class2 = class_group_2[0][5:]
-            group2 = class_group_2[1][5:]
-
-            insert_round_data(game_id, round_, class1, group1, class2, group2, None, None, None, None)
-
-            first_chat_success = False
-            for attempt in range(max_retries):
-                attempt_start = time.perf_counter()
-                try:
-                    run_diagnostics["attempts_total"] += 1
-                    emit_progress(
-                        round_, team1, team2, initiator_role_name, responder_role_name, "running", attempt + 1
-                    )
-
-                    minimizer_team, maximizer_team = get_minimizer_maximizer(team1, team2, initiator_role_index)
-                    deal = create_chat(
-                        game_id,
-                        minimizer_team,
-                        maximizer_team,
-                        initiator_role_index,
-                        num_turns,
-                        summary_prompt,
-                        round_,
-                        engine,
-                        summary_agent,
-                        summary_termination_message,
-                        negotiation_termination_message,
-                        timing_totals=timing_totals,
-                        run_diagnostics=run_diagnostics,
-                    )
-                    score_maximizer, score_minimizer = compute_deal_scores(
-                        deal,
-                        get_maximizer_reservation(maximizer_team),
-                        get_minimizer_reservation(minimizer_team),
-                    )
-
-                    if minimizer_team is team1:
-                        score_team1, score_team2 = score_minimizer, score_maximizer
-                        team1_role_index, team2_role_index = 1, 2
-                    else:
-                        score_team1, score_team2 = score_maximizer, score_minimizer
-                        team1_role_index, team2_role_index = 2, 1
-
-                    update_round_data(
-                        game_id,
-                        round_,
-                        class1,
-                        group1,
-                        class2,
-                        group2,
-                        score_team1,
-                        score_team2,
-                        team1_role_index,
-                        team2_role_index,
-                    )
-                    completed_matches += 1
-                    first_chat_success = True
-                    break
-
-                except Exception:
-                    run_diagnostics["attempts_failed"] += 1
-                    elapsed = round(time.perf_counter() - attempt_start, 2)
-                    emit_progress(
-                        round_,
-                        team1,
-                        team2,
-                        initiator_role_name,
-                        responder_role_name,
-                        "retrying",
-                        attempt + 1,
-                        elapsed_seconds=elapsed,
-                    )
-                    if attempt == max_retries - 1:
-                        errors_matchups.append((round_, team1["Name"], team2["Name"]))
-
-            elapsed = round(time.perf_counter() - attempt_start, 2)
-            processed_matches += 1
-            emit_progress(
-                round_,
-                team1,
-                team2,
-                initiator_role_name,
-                responder_role_name,
-                "completed" if first_chat_success else "failed",
-                elapsed_seconds=elapsed,
+    # Every round row is stored before the first chat starts, so an
+    # interrupted run still leaves the full plan behind (unscored rows).
+    if game_id is not None and not stored_rows:
+        for row in plan.rows:
+            insert_round_data(game_id, *row, None, None, None, None)
+    units = plan.units
+    total_matches = plan.total_matches
+    resumed_matches = plan.resumed_matches
+
+    if work_queue is not None:
+        if not join_queue:
+            work_queue.clear()
+            # Joining workers apply these, so every chat of the game is played, judged and throttled alike.
+            work_queue.enqueue(
+                plan.queue_units(),
+                settings={
+                    "summary_workers": summary_workers,
+                    "summary_batch_size": summary_batch_size,
+                    "read_deals_locally": read_deals_locally,
+                    "structured_summaries": structured_summaries,
+                    "requests_per_minute": llm_config.requests_per_minute,
+                    "tokens_per_minute": llm_config.tokens_per_minute,
+                    "fail_over": bool(llm_config.fallbacks),
+                },
             )
-
-            second_chat_success = False
-            for attempt in range(max_retries):
-                attempt_start = time.perf_counter()
-                try:
-                    run_diagnostics["attempts_total"] += 1
-                    emit_progress(
-                        round_, team2, team1, initiator_role_name, responder_role_name, "running", attempt + 1
-                    )
-
-                    minimizer_team, maximizer_team = get_minimizer_maximizer(team2, team1, initiator_role_index)
-                    deal = create_chat(
-                        game_id,
-                        minimizer_team,
-                        maximizer_team,
-                        initiator_role_index,
-                        num_turns,
-                        summary_prompt,
-                        round_,
-                        engine,
-                        summary_agent,
-                        summary_termination_message,
-                        negotiation_termination_message,
-                        timing_totals=timing_totals,
-                        run_diagnostics=run_diagnostics,
-                    )
-                    score_maximizer, score_minimizer = compute_deal_scores(
+        total_matches = work_queue.open_units()
+        units = _claimed_units(work_queue, plan)
+
+    def play_unit(unit, emit):
+        # Runs on a worker thread: only touches unit-local counters.
+        unit_timing = new_timing_totals()
+        unit_diagnostics = new_run_diagnostics()
+        initiator, responder = unit["team1"], unit["team2"]
+        outcome = {"success": False, "timing": unit_timing, "diagnostics": unit_diagnostics, "elapsed": 0.0}
+        for attempt in range(max_retries):
+            if abort:
+                outcome["skipped"] = True
+                return outcome
+            attempt_start = time.perf_counter()
+            key = None
+            throttled_before = unit_diagnostics.get("llm_rate_limited", 0)
+            try:
+                unit_diagnostics["attempts_total"] += 1
+                emit({"unit": unit, "phase": "running", "attempt": attempt + 1})
+
+                minimizer_team, maximizer_team = get_minimizer_maximizer(initiator, responder, initiator_role_index)
+                if key_pool is not None:
+                    key = key_pool.acquire()
+                deal = create_chat(
+                    game_id,
+                    minimizer_team,
+                    maximizer_team,
+                    initiator_role_index,
+                    num_turns,
+                    summary_prompt,
+                    unit["round"],
+                    engine if key is None else key.engine,
+                    summary_agent,
+                    summary_termination_message,
+                    negotiation_termination_message,
+                    timing_totals=unit_timing,
+                    run_diagnostics=unit_diagnostics,
+                    checkpoint_store=checkpoint_store,
+                    game_context=plan.game_context,
+                    summary_stage=summary_stage,
+                    summary_tag={"unit": unit, "minimizer_team": minimizer_team, "maximizer_team": maximizer_team},
+                    read_deals_locally=read_deals_locally,
+                    agents=plan.chat_agents(minimizer_team, maximizer_team),
+                )
+                if key is not None:
+                    key_pool.release(key, unit_diagnostics.get("llm_rate_limited", 0) - throttled_before)
+                    key = None
+                if not unit_diagnostics.get("summary_deferred"):
+                    outcome["scores"] = compute_deal_scores(
                         deal,
                         get_maximizer_reservation(maximizer_team),
                         get_minimizer_reservation(minimizer_team),
                     )
+                outcome["minimizer_team"] = minimizer_team
+                outcome["success"] = True
+                outcome["elapsed"] = round(time.perf_counter() - attempt_start, 2)
+                return outcome
+
+            except Exception as error:
+                unit_diagnostics["attempts_failed"] += 1
+                elapsed = round(time.perf_counter() - attempt_start, 2)
+                outcome["elapsed"] = elapsed
+                if key is not None:
+                    key_pool.release(key, unit_diagnostics.get("llm_rate_limited", 0) - throttled_before, error)
+                if classify_llm_error(error) != ERROR_RETRYABLE:
+                    if key_pool is not None and key_pool.can_fail_over(error):
+                        # The key was taken out of rotation; replay the chat on another one.
+                        unit_diagnostics["key_failovers"] = unit_diagnostics.get("key_failovers", 0) + 1
+                        emit({"unit": unit, "phase": "retrying", "attempt": attempt + 1, "elapsed": elapsed})
+                        continue
+                    # Replaying the chat cannot fix a bad request or a rejected key.
+                    unit_diagnostics["llm_fatal_errors"] = unit_diagnostics.get("llm_fatal_errors", 0) + 1
+                    chat_abort = _chat_abort(error, unit["round"], initiator, responder)
+                    if chat_abort is not None:
+                        with abort_lock:
+                            if not abort:
+                                abort.update(chat_abort)
+                    return outcome
+                emit({"unit": unit, "phase": "retrying", "attempt": attempt + 1, "elapsed": elapsed})
+        return outcome
+
+    def on_event(event):
+        unit = event["unit"]
+        emit_progress(
+            unit["round"],
+            unit["team1"],
+            unit["team2"],
+            initiator_role_name,
+            responder_role_name,
+            event["phase"],
+            event["attempt"],
+            elapsed_seconds=event.get("elapsed"),
+        )
 
-                    if minimizer_team is team1:
-                        score_team1, score_team2 = score_minimizer, score_maximizer
-                        team1_role_index, team2_role_index = 1, 2
-                    else:
-                        score_team1, score_team2 = score_maximizer, score_minimizer
-                        team1_role_index, team2_role_index = 2, 1
-
-                    update_round_data(
-                        game_id,
-                        round_,
-                        class1,
-                        group1,
-                        class2,
-                        group2,
-                        score_team1,
-                        score_team2,
-                        team1_role_index,
-                        team2_role_index,
-                    )
-                    completed_matches += 1
-                    second_chat_success = True
-                    break
-
-                except Exception:
-                    run_diagnostics["attempts_failed"] += 1
-                    elapsed = round(time.perf_counter() - attempt_start, 2)
-                    emit_progress(
-                        round_,
-                        team2,
-                        team1,
-                        initiator_role_name,
-                        responder_role_name,
-                        "retrying",
-                        attempt + 1,
-                        elapsed_seconds=elapsed,
+    errors_by_index = {}
+
+    def record_scores(unit, minimizer_team, scores):
+        nonlocal completed_matches
+        score_maximizer, score_minimizer = scores
+        if minimizer_team is unit["row"]["team1"]:
+            score_team1, score_team2 = score_minimizer, score_maximizer
+            team1_role_index, team2_role_index = 1, 2
+        else:
+            score_team1, score_team2 = score_maximizer, score_minimizer
+            team1_role_index, team2_role_index = 2, 1
+
+        class1, group1, class2, group2 = unit["row"]["key"]
+        if game_id is not None:
+            with _db_write_lock:
+                update_round_data(
+                    game_id,
+                    unit["round"],
+                    class1,
+                    group1,
+                    class2,
+                    group2,
+                    score_team1,
+                    score_team2,
+                    team1_role_index,
+                    team2_role_index,
+                )
+        completed_matches += 1
+
+    def record_summaries(results):
+        for result in results:
+            tag = result["tag"]
+            unit = tag["unit"]
+            merge_counters(run_diagnostics, result["stats"])
+            summary_usage = extract_usage(result["stats"])
+            for team in (unit["team1"], unit["team2"]):
+                merge_counters(usage_by_team.setdefault(team["Name"], {}), summary_usage)
+            merge_counters(usage_by_round.setdefault(unit["round"], {}), summary_usage)
+            timing_totals["summary_seconds"] += result["seconds"]
+            if result["error"] is not None:
+                run_diagnostics["summary_failures"] = run_diagnostics.get("summary_failures", 0) + 1
+                errors_by_index[unit["index"]] = (unit["round"], unit["team1"]["Name"], unit["team2"]["Name"])
+                finish_unit(unit, UNIT_FAILED)
+                continue
+            run_diagnostics["summary_calls"] += 1
+            if tag["chat_key"] is not None:
+                with _db_write_lock:
+                    update_negotiation_chat_summary(
+                        *tag["chat_key"],
+                        result["summary"],
+                        result["deal_value"],
+                        usage=with_cost(summary_usage, llm_config.model),
                     )
-                    if attempt == max_retries - 1:
-                        errors_matchups.append((round_, team2["Name"], team1["Name"]))
-
-            elapsed = round(time.perf_counter() - attempt_start, 2)
-            processed_matches += 1
-            emit_progress(
-                round_,
-                team2,
-                team1,
-                initiator_role_name,
-                responder_role_name,
-                "completed" if second_chat_success else "failed",
-                elapsed_seconds=elapsed,
+            scores = compute_deal_scores(
+                result["deal_value"],
+                get_maximizer_reservation(tag["maximizer_team"]),
+                get_minimizer_reservation(tag["minimizer_team"]),
             )
-
+            record_scores(unit, tag["minimizer_team"], scores)
+            finish_unit(unit, UNIT_DONE)
+
+    def finish_unit(unit, status):
+        if "unit_id" in unit:
+            work_queue.finish(unit["unit_id"], status)
+
+    def on_result(unit, outcome):
+        nonlocal completed_matches, processed_matches
+        if outcome.get("skipped"):
+            finish_unit(unit, UNIT_PENDING)
+            return
+        merge_counters(timing_totals, outcome["timing"])
+        merge_counters(run_diagnostics, outcome["diagnostics"])
+        # A chat's tokens (including failed attempts) count towards both teams
+        # that played it and towards its round.
+        unit_usage = extract_usage(outcome["diagnostics"])
+        for team in (unit["team1"], unit["team2"]):
+            merge_counters(usage_by_team.setdefault(team["Name"], {}), unit_usage)
+        merge_counters(usage_by_round.setdefault(unit["round"], {}), unit_usage)
+        if controller is not None:
+            unit_diagnostics = outcome["diagnostics"]
+            controller.record(bool(unit_diagnostics.get("llm_rate_limited") or unit_diagnostics.get("llm_timeouts")))
+
+        if outcome["success"]:
+            # A deferred summary scores the chat, and finishes its queued unit, once it is stored; until
+            # then the unit stays leased, so a crash hands it to another worker.
+            if "scores" in outcome:
+                record_scores(unit, outcome["minimizer_team"], outcome["scores"])
+                finish_unit(unit, UNIT_DONE)
+        else:
+            errors_by_index[unit["index"]] = (unit["round"], unit["team1"]["Name"], unit["team2"]["Name"])
+            finish_unit(unit, UNIT_FAILED)
+
+        processed_matches += 1
+        emit_progress(
+            unit["round"],
+            unit["team1"],
+            unit["team2"],
+            initiator_role_name,
+            responder_role_name,
+            "completed" if outcome["success"] else "failed",
+            elapsed_seconds=outcome["elapsed"],
+        )
+        if summary_stage is not None:
+            record_summaries(summary_stage.results())
+
+    run_start = time.perf_counter()
+    try:
+        executor.run(units, play_unit, on_event, on_result)
+        if summary_stage is not None:
+            record_summaries(summary_stage.join())
+    finally:
+        if work_queue is not None:
+            work_queue.close()
+        if summary_stage is not None:
+            summary_stage.close()
+    run_wall_seconds = time.perf_counter() - run_start
+
+    errors_matchups = [errors_by_index[index] for index in sorted(errors_by_index)]
     timing_summary = build_timing_summary(timing_totals)
+    timing_summary["run_wall_seconds"] = round(run_wall_seconds, 3)
     diag_summary = build_diagnostics_summary(run_diagnostics, processed_matches)
+    diag_summary["max_concurrency"] = executor.max_concurrency
+    if controller is not None:
+        _learned_concurrency[controller_key] = controller.limit
+        diag_summary.update(controller.summary())
+    rate_limit = rate_limit_utilization(llm_config)
+    if rate_limit is not None:
+        diag_summary["rate_limit"] = rate_limit
+    if key_pool is not None:
+        diag_summary["keys"] = key_pool.summary()
+        diag_summary["key_failovers"] = run_diagnostics.get("key_failovers", 0)
+    routes = route_calls(run_diagnostics)
+    if routes:
+        diag_summary["routes"] = routes
+        diag_summary["llm_failovers"] = run_diagnostics.get("llm_failovers", 0)
+    if work_queue is not None:
+        diag_summary["work_queue"] = work_queue.summary()
+    if summary_stage is not None:
+        diag_summary.update(summary_stage.summary())
+        diag_summary["summary_failures"] = run_diagnostics.get("summary_failures", 0)
+    usage_summary = build_usage_summary(extract_usage(run_diagnostics), usage_by_team, usage_by_round, llm_config.model)
+
+    if abort:
+        abort["unplayed_matches"] = total_matches - processed_matches
+        return {
+            "status": "aborted",
+            "completed_matches": completed_matches,
+            "processed_matches": processed_matches,
+            "total_matches": total_matches,
+            "resumed_matches": resumed_matches,
+            "errors": errors_matchups,
+            "abort": abort,
+            "message": format_run_abort(abort),
+            "timing": timing_summary,
+            "diagnostics": diag_summary,
+            "usage": usage_summary,
+        }
 
     if not errors_matchups:
         return {
@@ -424,8 +856,10 @@ def create_chats(
             "completed_matches": completed_matches,
             "processed_matches": processed_matches,
             "total_matches": total_matches,
+            "resumed_matches": resumed_matches,
             "timing": timing_summary,
             "diagnostics": diag_summary,
+            "usage": usage_summary,
         }
 
     return {
@@ -433,10 +867,12 @@ def create_chats(
         "completed_matches": completed_matches,
         "processed_matches": processed_matches,
         "total_matches": total_matches,
+        "resumed_matches": resumed_matches,
         "errors": errors_matchups,
         "message": format_unsuccessful_matchups(errors_matchups, name_roles),
         "timing": timing_summary,
         "diagnostics": diag_summary,
+        "usage": usage_summary,
     }
 
 
@@ -450,6 +886,8 @@ def create_all_error_chats(
     negotiation_termination_message,
     summary_prompt,
     summary_termination_message,
+    llm_cache=None,
+    context_policy=None,
 ):
     matches = get_error_matchups(game_id)
 
@@ -459,7 +897,7 @@ def create_all_error_chats(
     unique_teams = {tuple(item) for item in (teams1 + teams2)}
     teams = [list(team) for team in unique_teams]
 
-    engine = ConversationEngine(llm_config)
+    engine = ConversationEngine(llm_config, cache=llm_cache, context_policy=context_policy)
     team_info = create_agents(game_id, teams, values, name_roles, negotiation_termination_message)
     initiator_role_index = resolve_initiator_role_index(name_roles, conversation_order)
     summary_agent = build_summary_agent(
@@ -467,106 +905,71 @@ def create_all_error_chats(
         negotiation_termination_message,
         include_summary=True,
     )
+    plan = compile_simulation_plan([], team_info, initiator_role_index, build_game_context(game_id))
+    checkpoint_store = DatabaseCheckpointStore(lock=_db_write_lock)
 
-    max_retries = 10
+    # Same budget as create_chats: each LLM call already retries transient errors.
+    max_retries = 3
     errors_matchups = []
 
+    # match[3] / match[4] flag the failed chat where team 1 / team 2 was the minimizer;
+    # round rows store team 1's score and role first.
+    chats = []
     for match in matches:
-        team1 = next((team for team in team_info if team["Name"] == f"Class{match[1][0]}_Group{match[1][1]}"), None)
-        team2 = next((team for team in team_info if team["Name"] == f"Class{match[2][0]}_Group{match[2][1]}"), None)
-
+        team1 = plan.team(*match[1])
+        team2 = plan.team(*match[2])
         if team1 is None or team2 is None:
             print(f"Warning: Could not find team1 or team2 for match {match}")
             continue
-
         if match[3] == 1:
-            minimizer_team = team1
-            maximizer_team = team2
-
-            for attempt in range(max_retries):
-                try:
-                    deal = create_chat(
-                        game_id,
-                        minimizer_team,
-                        maximizer_team,
-                        initiator_role_index,
-                        num_turns,
-                        summary_prompt,
-                        match[0],
-                        engine,
-                        summary_agent,
-                        summary_termination_message,
-                        negotiation_termination_message,
-                    )
-                    score_maximizer, score_minimizer = compute_deal_scores(
-                        deal,
-                        get_maximizer_reservation(maximizer_team),
-                        get_minimizer_reservation(minimizer_team),
-                    )
-
-                    update_round_data(
-                        game_id,
-                        match[0],
-                        match[1][0],
-                        match[1][1],
-                        match[2][0],
-                        match[2][1],
-                        score_minimizer,
-                        score_maximizer,
-                        1,
-                        2,
-                    )
-
-                    break
-
-                except Exception:
-                    if attempt == max_retries - 1:
-                        errors_matchups.append((match[0], minimizer_team["Name"], maximizer_team["Name"]))
-
+            chats.append((match, team1, team2, False))
         if match[4] == 1:
-            minimizer_team = team2
-            maximizer_team = team1
-
-            for attempt in range(max_retries):
-                try:
-                    deal = create_chat(
-                        game_id,
-                        minimizer_team,
-                        maximizer_team,
-                        initiator_role_index,
-                        num_turns,
-                        summary_prompt,
-                        match[0],
-                        engine,
-                        summary_agent,
-                        summary_termination_message,
-                        negotiation_termination_message,
-                    )
-                    score_maximizer, score_minimizer = compute_deal_scores(
-                        deal,
-                        get_maximizer_reservation(maximizer_team),
-                        get_minimizer_reservation(minimizer_team),
-                    )
-
-                    update_round_data(
-                        game_id,
-                        match[0],
-                        match[1][0],
-                        match[1][1],
-                        match[2][0],
-                        match[2][1],
-                        score_maximizer,
-                        score_minimizer,
-                        2,
-                        1,
-                    )
+            chats.append((match, team2, team1, True))
 
+    for position, (match, minimizer_team, maximizer_team, team1_maximizes) in enumerate(chats):
+        for attempt in range(max_retries):
+            try:
+                deal = create_chat(
+                    game_id,
+                    minimizer_team,
+                    maximizer_team,
+                    initiator_role_index,
+                    num_turns,
+                    summary_prompt,
+                    match[0],
+                    engine,
+                    summary_agent,
+                    summary_termination_message,
+                    negotiation_termination_message,
+                    checkpoint_store=checkpoint_store,
+                    game_context=plan.game_context,
+                    agents=plan.chat_agents(minimizer_team, maximizer_team),
+                )
+                score_maximizer, score_minimizer = compute_deal_scores(
+                    deal,
+                    get_maximizer_reservation(maximizer_team),
+                    get_minimizer_reservation(minimizer_team),
+                )
+                if team1_maximizes:
+                    scores = (score_maximizer, score_minimizer, 2, 1)
+                else:
+                    scores = (score_minimizer, score_maximizer, 1, 2)
+                update_round_data(game_id, match[0], *match[1], *match[2], *scores)
+                break
+
+            except Exception as error:
+                # Same handling as create_chats: a run-wide failure stops the
+                # rerun, a fatal one fails this chat, a retryable one restarts it.
+                chat_abort = _chat_abort(error, match[0], minimizer_team, maximizer_team)
+                if chat_abort is not None:
+                    chat_abort["unplayed_matches"] = len(chats) - position - 1
+                    return format_run_abort(chat_abort)
+                # LLM calls retry transient failures themselves: restarting the
+                # chat only helps when they ran out, never for a fatal error.
+                if classify_llm_error(error) != ERROR_RETRYABLE or attempt == max_retries - 1:
+                    errors_matchups.append((match[0], minimizer_team["Name"], maximizer_team["Name"]))
                     break
 
-                except Exception:
-                    if attempt == max_retries - 1:
-                        errors_matchups.append((match[0], minimizer_team["Name"], maximizer_team["Name"]))
-
     if not errors_matchups:
         return "All negotiations were completed successfully!"
 
@@ -1,22 +1,83 @@
-from .conversation_engine import GameAgent
-from .database_handler import get_student_prompt
+import math
 
+from .conversation_engine import GameAgent, GenerationLimits
+from .database_handler import get_game_team_inputs
+
+# English prose averages about 1.35 tokens per word; the cap allows twice the
+# word budget so agents that run a little long are not cut mid-sentence.
+TOKENS_PER_WORD = 1.35
+WORD_BUDGET_SLACK = 2.0
+
+
+def output_token_cap(words, negotiation_termination_message=""):
+    """Output token cap for a reply of about *words* words that may end with the termination message."""
+    termination_tokens = math.ceil(len(negotiation_termination_message.split()) * TOKENS_PER_WORD)
+    return math.ceil(words * TOKENS_PER_WORD * WORD_BUDGET_SLACK) + termination_tokens
+
+
+def negotiation_limits(name_roles, negotiation_termination_message, words=50):
+    """Generation limits for a negotiation agent.
+
+    Replies are capped from the word budget, stop before the agent starts
+    writing the next line of the dialogue for either role, and end with the
+    sentence that contains the termination message.
+    """
+    return GenerationLimits(
+        max_output_tokens=output_token_cap(words, negotiation_termination_message),
+        stop=tuple(f"\n{role}:" for role in name_roles),
+        stop_after=negotiation_termination_message or None,
+    )
 
-def create_agents(game_id, teams, values, name_roles, negotiation_termination_message):
-    team_info = []
 
+def build_team_agents(team, prompts, value1, value2, name_roles, negotiation_termination_message, words=50):
+    """Build the team dict for ``team = (class, group_id)`` from its two role prompts."""
     role_1, role_2 = name_roles[0].replace(" ", ""), name_roles[1].replace(" ", "")
-    words = 50
+    instructions = (
+        f" When the negotiation is finished, say {negotiation_termination_message}. This is a short conversation,"
+        f" you will have about 10 opportunities to intervene. Try to keep your answers concise, try not to go over"
+        f" {words} words."
+    )
+    limits = negotiation_limits(name_roles, negotiation_termination_message, words)
+    return {
+        "Name": f"Class{team[0]}_Group{team[1]}",
+        "Value 1": value1,
+        "Value 2": value2,
+        "Agent 1": GameAgent(
+            name=f"Class{team[0]}_Group{team[1]}_{role_1}", system_message=prompts[0] + instructions, limits=limits
+        ),
+        "Agent 2": GameAgent(
+            name=f"Class{team[0]}_Group{team[1]}_{role_2}", system_message=prompts[1] + instructions, limits=limits
+        ),
+    }
+
+
+def create_agents(game_id, teams, values, name_roles, negotiation_termination_message, team_inputs=None):
+    """Build the team dicts of *teams* (``(class, group_id)`` pairs) from their stored submissions.
+
+    Prompts come from *team_inputs* (as returned by
+    :func:`~modules.database_handler.get_game_team_inputs`), fetched in one
+    query when not given.  Values come from *values* (rows of
+    :func:`~modules.database_handler.get_all_group_values`), falling back to
+    the values in *team_inputs*.
+    """
+    if team_inputs is None:
+        team_inputs = get_game_team_inputs(game_id)
+        if team_inputs is None:
+            raise Exception(f"Could not retrieve the submissions of game {game_id}")
+    values_by_team = {(value["class"], int(value["group_id"])): value for value in values or []}
+    team_info = []
 
     for team in teams:
         try:
-            submission = get_student_prompt(game_id, team[0], team[1])
+            key = (team[0], int(team[1]))
+            inputs = team_inputs.get(key) or {}
+            submission = inputs.get("prompt")
             if not submission:
                 raise Exception(f"No submission found for team {team}")
 
-            value_dict = next(
-                (value for value in values if value["class"] == team[0] and int(value["group_id"]) == team[1]), None
-            )
+            value_dict = values_by_team.get(key)
+            if value_dict is None and inputs.get("minimizer_value") is not None:
+                value_dict = inputs
             if value_dict is None:
                 raise Exception(f"No value found for team {team}")
             value1 = int(value_dict["minimizer_value"])
@@ -24,23 +85,9 @@ def create_agents(game_id, teams, values, name_roles, negotiation_termination_me
 
             prompts = [part.strip() for part in submission.split("#_;:)")]
 
-            new_team = {
-                "Name": f"Class{team[0]}_Group{team[1]}",
-                "Value 1": value1,
-                "Value 2": value2,
-                "Agent 1": GameAgent(
-                    name=f"Class{team[0]}_Group{team[1]}_{role_1}",
-                    system_message=prompts[0]
-                    + f" When the negotiation is finished, say {negotiation_termination_message}. This is a short conversation, you will have about 10 opportunities to intervene. Try to keep your answers concise, try not to go over {words} words.",
-                ),
-                "Agent 2": GameAgent(
-                    name=f"Class{team[0]}_Group{team[1]}_{role_2}",
-                    system_message=prompts[1]
-                    + f" When the negotiation is finished, say {negotiation_termination_message}. This is a short conversation, you will have about 10 opportunities to intervene. Try to keep your answers concise, try not to go over {words} words.",
-                ),
-            }
-
-            team_info.append(new_team)
+            team_info.append(
+                build_team_agents(team, prompts, value1, value2, name_roles, negotiation_termination_message)
+            )
         except Exception as e:
             print(f"Error creating agents for team {team}: {str(e)}")
             raise
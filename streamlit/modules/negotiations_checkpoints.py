@@ -0,0 +1,74 @@
+"""Checkpoint stores for resuming interrupted negotiation chats.
+
+A chat is identified by the same key as its ``negotiation_chat`` row:
+``(game_id, round_number, group1_class, group1_id, group2_class, group2_id)``,
+where group 1 is the minimizer team.  While a chat runs, the growing message
+list is saved after every turn; a retry of the same chat loads it and only
+generates the missing turns.  The checkpoint is cleared once the chat result
+has been stored.
+"""
+
+import threading
+
+from .database_handler import (
+    delete_negotiation_checkpoint,
+    get_negotiation_checkpoint,
+    upsert_negotiation_checkpoint,
+)
+
+
+class MemoryCheckpointStore:
+    """Keeps checkpoints in process memory (tests and runs without a database)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histories = {}
+
+    def load(self, key):
+        with self._lock:
+            history = self._histories.get(key)
+            return list(history) if history else None
+
+    def save(self, key, history):
+        with self._lock:
+            self._histories[key] = list(history)
+
+    def clear(self, key):
+        with self._lock:
+            self._histories.pop(key, None)
+
+
+class DatabaseCheckpointStore:
+    """Keeps checkpoints in the ``negotiation_checkpoint`` table.
+
+    Checkpoints survive a crashed or restarted app, so a later
+    ``create_all_error_chats`` run picks up where the failed chat stopped.
+    *lock* serializes access to the shared DB connection when chats run on
+    worker threads.
+    """
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            return get_negotiation_checkpoint(*key)
+
+    def save(self, key, history):
+        with self._lock:
+            upsert_negotiation_checkpoint(*key, history)
+
+    def clear(self, key):
+        with self._lock:
+            delete_negotiation_checkpoint(*key)
+
+
+def is_resumable_history(history, opener_name, responder_name):
+    """Check that a stored transcript was produced by this pair, opener first."""
+    if not history or history[0].get("name") != opener_name:
+        return False
+    for index, entry in enumerate(history):
+        expected = opener_name if index % 2 == 0 else responder_name
+        if entry.get("name") != expected or not isinstance(entry.get("content"), str):
+            return False
+    return True
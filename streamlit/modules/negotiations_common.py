@@ -88,6 +88,24 @@ def get_minimizer_maximizer(initiator_team, responder_team, initiator_role_index
     return responder_team, initiator_team
 
 
+AGREEMENT_INDICATORS = (
+    "agree",
+    "accepted",
+    "deal",
+    "settled",
+    "confirmed",
+    "final",
+    "conclude",
+    "complete",
+    "done",
+)
+
+
+def has_agreement_indicator(content):
+    lowered = (content or "").lower()
+    return any(indicator in lowered for indicator in AGREEMENT_INDICATORS)
+
+
 def is_valid_termination(msg, history, negotiation_termination_message):
     if negotiation_termination_message not in msg["content"]:
         return False
@@ -97,21 +115,7 @@ def is_valid_termination(msg, history, negotiation_termination_message):
 
     last_messages = history[-4:] if len(history) >= 4 else history
 
-    agreement_indicators = [
-        "agree",
-        "accepted",
-        "deal",
-        "settled",
-        "confirmed",
-        "final",
-        "conclude",
-        "complete",
-        "done",
-    ]
-
-    agreement_count = sum(
-        1 for m in last_messages if any(indicator in m["content"].lower() for indicator in agreement_indicators)
-    )
+    agreement_count = sum(1 for m in last_messages if has_agreement_indicator(m["content"]))
 
     if agreement_count < 2:
         return False
@@ -131,7 +135,16 @@ def is_valid_termination(msg, history, negotiation_termination_message):
     return True
 
 
-def build_llm_config(model, api_key, temperature=0.3, top_p=0.5, base_url=None):
+def build_llm_config(
+    model,
+    api_key,
+    temperature=0.3,
+    top_p=0.5,
+    base_url=None,
+    requests_per_minute=None,
+    tokens_per_minute=None,
+    fallbacks=None,
+):
     """Build an LLMConfig for any OpenAI-compatible provider.
 
     Args:
@@ -141,10 +154,18 @@ def build_llm_config(model, api_key, temperature=0.3, top_p=0.5, base_url=None):
         top_p: Nucleus sampling (omitted for gpt-5 family).
         base_url: API base URL.  ``None`` uses the OpenAI default.
                   For OpenRouter pass ``"https://openrouter.ai/api/v1"``.
+        requests_per_minute: Optional request limit for this account and model.
+        tokens_per_minute: Optional token limit for this account and model.
+        fallbacks: Optional LLMConfigs to fail over to (see ``llm_routing``).
     """
+    limits = {
+        "requests_per_minute": requests_per_minute,
+        "tokens_per_minute": tokens_per_minute,
+        "fallbacks": fallbacks,
+    }
     if model.startswith("gpt-5"):
-        return LLMConfig(model=model, api_key=api_key, base_url=base_url)
-    return LLMConfig(model=model, api_key=api_key, base_url=base_url, temperature=temperature, top_p=top_p)
+        return LLMConfig(model=model, api_key=api_key, base_url=base_url, **limits)
+    return LLMConfig(model=model, api_key=api_key, base_url=base_url, temperature=temperature, top_p=top_p, **limits)
 
 
 def is_invalid_api_key_error(error):
@@ -0,0 +1,187 @@
+"""Execution backends for running independent negotiation chats.
+
+A backend receives an iterable of chat *units* and a ``work_fn(unit, emit)``
+that plays one unit.  Work functions report intermediate progress through
+``emit(event_dict)`` and return a result object.  Every backend guarantees
+that ``on_event`` and ``on_result`` run on the calling thread, so callers can
+update Streamlit widgets and shared counters without extra locking.
+
+A unit iterator that has nothing to hand out yet, but is not exhausted
+(e.g. a shared work queue whose other workers still hold units), yields
+:data:`UNIT_NOT_READY` instead of blocking; backends then record finished
+units and ask again a little later.
+"""
+
+import contextvars
+import math
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+UNIT_NOT_READY = object()
+
+
+class SerialMatchExecutor:
+    """Runs units one after another on the calling thread."""
+
+    max_concurrency = 1
+    poll_interval = 0.1
+
+    def run(self, units, work_fn, on_event, on_result):
+        for unit in units:
+            if unit is UNIT_NOT_READY:
+                time.sleep(self.poll_interval)
+                continue
+            on_result(unit, work_fn(unit, on_event))
+
+
+class AIMDConcurrencyController:
+    """Additive-increase / multiplicative-decrease limit on in-flight chats.
+
+    Every chat that finishes without provider throttling raises the limit by
+    ``increase`` (a chat spans many LLM calls, so this is already a slow
+    ramp); a throttled chat (429s or timeouts) multiplies it by ``decrease``.
+    After a decrease, results of chats that were already in flight are not
+    allowed to shrink the limit again, so one burst of 429s counts once.
+
+    The controller only tracks the limit; the caller reports each finished
+    chat with :meth:`record` and the executor reads :attr:`limit`.
+    """
+
+    def __init__(self, initial, maximum, minimum=1, increase=1.0, decrease=0.5):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Concurrency bounds must satisfy 1 <= minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._grace = 0
+        self.initial = self.limit
+        self.peak = self.limit
+        self.throttle_events = 0
+        self.decreases = 0
+        self.results = 0
+        self._limit_total = 0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def record(self, throttled):
+        """Adjust the limit after one finished chat; return the new limit."""
+        self.results += 1
+        self._limit_total += self.limit
+        if throttled:
+            self.throttle_events += 1
+        if self._grace:
+            # Started before the last decrease: its outcome reflects the old limit.
+            self._grace -= 1
+            return self.limit
+        if throttled:
+            previous = self.limit
+            self._limit = float(max(math.floor(self._limit * self.decrease), self.minimum))
+            self.decreases += 1
+            self._grace = max(previous - 1, 0)
+        else:
+            self._limit = min(self._limit + self.increase, float(self.maximum))
+            self.peak = max(self.peak, self.limit)
+        return self.limit
+
+    def summary(self):
+        """Concurrency diagnostics for the run result."""
+        return {
+            "concurrency_initial": self.initial,
+            "concurrency_final": self.limit,
+            "concurrency_peak": self.peak,
+            "concurrency_avg": round(self._limit_total / self.results, 2) if self.results else float(self.limit),
+            "throttle_events": self.throttle_events,
+            "concurrency_decreases": self.decreases,
+        }
+
+
+class ThreadPoolMatchExecutor:
+    """Runs up to ``max_concurrency`` units at a time on worker threads.
+
+    Units are submitted lazily, so at most ``max_concurrency`` are in flight.
+    With a *controller* (see :class:`AIMDConcurrencyController`) the number
+    of in-flight units follows ``controller.limit`` instead, re-read every
+    time a slot frees up.  If a work function raises, no further units are
+    submitted, units already in flight finish and their results are still
+    recorded, and then the first exception is re-raised.
+    """
+
+    def __init__(self, max_concurrency, poll_interval=0.1, controller=None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.controller = controller
+
+    def _limit(self):
+        if self.controller is None:
+            return self.max_concurrency
+        return min(self.controller.limit, self.max_concurrency)
+
+    def run(self, units, work_fn, on_event, on_result):
+        events = queue.Queue()
+
+        def drain_events():
+            while True:
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    return
+                on_event(event)
+
+        pending = iter(units)
+        exhausted = False
+        in_flight = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="negotiation") as pool:
+            while True:
+                not_ready = False
+                while error is None and not exhausted and len(in_flight) < self._limit():
+                    try:
+                        unit = next(pending)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if unit is UNIT_NOT_READY:
+                        not_ready = True
+                        break
+                    # Each unit runs in a copy of the caller's context, so context
+                    # variables such as a job's dedicated DB connection still apply.
+                    in_flight[pool.submit(contextvars.copy_context().run, work_fn, unit, events.put)] = unit
+
+                if not in_flight:
+                    if not not_ready:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                drain_events()
+                for future in done:
+                    unit = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        error = error or exc
+                        continue
+                    on_result(unit, result)
+
+            drain_events()
+        if error is not None:
+            raise error
+
+
+def build_match_executor(max_concurrency=1, controller=None):
+    """Return the execution backend for the requested concurrency limit.
+
+    With an adaptive *controller*, ``max_concurrency`` is the upper bound the
+    controller may grow to.
+    """
+    if max_concurrency is None or int(max_concurrency) <= 1:
+        return SerialMatchExecutor()
+    return ThreadPoolMatchExecutor(int(max_concurrency), controller=controller)
@@ -0,0 +1,147 @@
+"""Compiled tournament plan: everything a run needs before its first LLM call.
+
+:func:`compile_simulation_plan` resolves a schedule against the run's teams
+once, so playing a chat needs no database reads, name parsing or scans of
+the team list:
+
+* ``teams`` indexes the team dicts by name, and ``team_keys`` holds each
+  team's ``(class, group)`` as stored in the ``round`` rows;
+* ``agents`` holds every team's role agents with the game context already
+  at the start of their system messages (the shared prefix that provider
+  prompt caching relies on);
+* ``rows`` lists the ``round`` rows of the schedule in order, and ``units``
+  the chats left to play, in the form :func:`~modules.negotiations.create_chats`
+  hands to its executor.
+
+A :class:`SimulationPlan` and its units are read-only; a run that needs a
+different schedule compiles a new plan.
+"""
+
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+from .negotiations_common import get_minimizer_maximizer, get_role_agent, parse_team_name
+
+
+def team_name(class_, group):
+    """Team name in :func:`~modules.negotiations_agents.create_agents` form."""
+    return f"Class{class_}_Group{group}"
+
+
+@dataclass(frozen=True)
+class SimulationPlan:
+    """Read-only result of :func:`compile_simulation_plan`."""
+
+    game_context: str
+    initiator_role_index: int
+    teams: MappingProxyType
+    team_keys: MappingProxyType
+    agents: MappingProxyType
+    rows: tuple
+    units: tuple
+    resumed_matches: int = 0
+
+    @property
+    def total_matches(self):
+        return len(self.units)
+
+    @property
+    def responder_role_index(self):
+        return 2 if self.initiator_role_index == 1 else 1
+
+    def team(self, class_, group):
+        """The team dict of ``Class{class_}_Group{group}``, or ``None``."""
+        return self.teams.get(team_name(class_, group))
+
+    def chat_agents(self, minimizer_team, maximizer_team):
+        """``(initiator agent, responder agent)`` of a chat, as :func:`~modules.negotiations.create_chat` picks them."""
+        initiator_team, responder_team = (
+            (minimizer_team, maximizer_team) if self.initiator_role_index == 1 else (maximizer_team, minimizer_team)
+        )
+        return (
+            self.agents[(initiator_team["Name"], self.initiator_role_index)],
+            self.agents[(responder_team["Name"], self.responder_role_index)],
+        )
+
+    def queue_units(self):
+        """The units as rows for :meth:`~modules.negotiations_work_queue.ChatWorkQueue.enqueue`."""
+        return [
+            {
+                "round_number": unit["round"],
+                "group1_class": unit["row"]["key"][0],
+                "group1_id": int(unit["row"]["key"][1]),
+                "group2_class": unit["row"]["key"][2],
+                "group2_id": int(unit["row"]["key"][3]),
+                "group1_initiates": unit["team1"] is unit["row"]["team1"],
+            }
+            for unit in self.units
+        ]
+
+
+def _team_key(name):
+    class_, group = parse_team_name(name)
+    return class_, None if group is None else str(group)
+
+
+def _context_agent(agent, game_context):
+    # Team agents are shared with the caller, so the plan holds copies.
+    if game_context and agent.system_message:
+        return replace(agent, system_message=game_context + agent.system_message)
+    return agent
+
+
+def compile_simulation_plan(schedule, team_info, initiator_role_index, game_context="", resume=False):
+    """Resolve *schedule* against *team_info* into a :class:`SimulationPlan`.
+
+    *schedule* lists each round's matches as ``(team1, team2)`` names, or,
+    with *resume*, as the ``(team1, team2, role1_done, role2_done)`` tuples
+    of :func:`~modules.negotiations.schedule_from_round_rows`; finished chats
+    are then left out of ``units`` and counted in ``resumed_matches``.
+    Matches naming a team missing from *team_info* are skipped with a
+    warning.
+    """
+    teams = {team["Name"]: team for team in team_info}
+    team_keys = {name: _team_key(name) for name in teams}
+    agents = {
+        (name, role_index): _context_agent(get_role_agent(team, role_index), game_context)
+        for name, team in teams.items()
+        for role_index in (1, 2)
+    }
+
+    rows = []
+    units = []
+    resumed_matches = 0
+    for round_, round_matches in enumerate(schedule, 1):
+        for match in round_matches:
+            team1, team2 = teams.get(match[0]), teams.get(match[1])
+            if team1 is None or team2 is None:
+                print(f"Warning: Could not find team1 or team2 for scheduled match {match}")
+                continue
+            key = team_keys[team1["Name"]] + team_keys[team2["Name"]]
+            rows.append((round_, *key))
+
+            # Both role assignments of a match update the same round row,
+            # whose "team1" is always the first scheduled team.
+            row = MappingProxyType({"team1": team1, "key": key})
+            for initiator, responder in ((team1, team2), (team2, team1)):
+                if resume:
+                    minimizer_team, _ = get_minimizer_maximizer(initiator, responder, initiator_role_index)
+                    if match[2 if minimizer_team is team1 else 3]:
+                        resumed_matches += 1
+                        continue
+                units.append(
+                    MappingProxyType(
+                        {"index": len(units), "round": round_, "team1": initiator, "team2": responder, "row": row}
+                    )
+                )
+
+    return SimulationPlan(
+        game_context=game_context,
+        initiator_role_index=initiator_role_index,
+        teams=MappingProxyType(teams),
+        team_keys=MappingProxyType(team_keys),
+        agents=MappingProxyType(agents),
+        rows=tuple(rows),
+        units=tuple(units),
+        resumed_matches=resumed_matches,
+    )
@@ -1,3 +1,35 @@
+from .llm_models import MODEL_USAGE_PREFIX, estimate_cost_usd, usage_by_model
+
+# Token counters the conversation engine adds to its ``stats`` dict.
+USAGE_KEYS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+def new_timing_totals():
+    return {
+        "chat_seconds": 0.0,
+        "summary_seconds": 0.0,
+        "db_seconds": 0.0,
+        "chats_measured": 0,
+    }
+
+
+def new_run_diagnostics():
+    return {
+        "attempts_total": 0,
+        "attempts_failed": 0,
+        "summary_calls": 0,
+        "total_turns": 0,
+        "successful_chats": 0,
+    }
+
+
+def merge_counters(target, source):
+    """Add every numeric counter in *source* into *target*."""
+    for key, value in source.items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
 def build_timing_summary(timing_totals):
     timing_summary = {
         "chat_seconds_total": round(timing_totals["chat_seconds"], 3),
@@ -29,9 +61,110 @@ def build_diagnostics_summary(run_diagnostics, processed_matches):
             if run_diagnostics["successful_chats"]
             else 0.0
         ),
+        "llm_calls": run_diagnostics.get("llm_calls", 0),
+        "llm_retries": run_diagnostics.get("llm_retries", 0),
+        "llm_rate_limited": run_diagnostics.get("llm_rate_limited", 0),
+        "llm_timeouts": run_diagnostics.get("llm_timeouts", 0),
+        "llm_fatal_errors": run_diagnostics.get("llm_fatal_errors", 0),
+        "llm_cache_hits": run_diagnostics.get("llm_cache_hits", 0),
+        "llm_throttle_waits": run_diagnostics.get("llm_throttle_waits", 0),
+        "llm_throttle_seconds": round(run_diagnostics.get("llm_throttle_seconds", 0.0), 3),
+        "llm_capped_calls": run_diagnostics.get("llm_capped_calls", 0),
+        "llm_length_stops": run_diagnostics.get("llm_length_stops", 0),
+        "llm_cap_retries": run_diagnostics.get("llm_cap_retries", 0),
+        "llm_truncated_replies": run_diagnostics.get("llm_truncated_replies", 0),
+        "llm_truncated_tokens": run_diagnostics.get("llm_truncated_tokens", 0),
+        "llm_context_summaries": run_diagnostics.get("llm_context_summaries", 0),
+        "prompt_tokens": run_diagnostics.get("prompt_tokens", 0),
+        "cached_tokens": run_diagnostics.get("cached_tokens", 0),
+        # Share of prompt tokens served from the provider's prompt cache.
+        "cached_prompt_ratio": (
+            round(run_diagnostics.get("cached_tokens", 0) / run_diagnostics["prompt_tokens"], 3)
+            if run_diagnostics.get("prompt_tokens")
+            else 0.0
+        ),
+        "resumed_chats": run_diagnostics.get("resumed_chats", 0),
+        "resumed_messages": run_diagnostics.get("resumed_messages", 0),
+        "summary_structured_fallbacks": run_diagnostics.get("summary_structured_fallbacks", 0),
+        "summary_local_decisions": run_diagnostics.get("summary_local", 0),
+        "summary_llm_decisions": run_diagnostics.get("summary_llm", 0),
+        # Share of deal decisions read from the transcript without a summary call.
+        "summary_local_rate": (
+            round(
+                run_diagnostics.get("summary_local", 0)
+                / (run_diagnostics.get("summary_local", 0) + run_diagnostics.get("summary_llm", 0)),
+                3,
+            )
+            if run_diagnostics.get("summary_local", 0) + run_diagnostics.get("summary_llm", 0)
+            else 0.0
+        ),
+    }
+
+
+def extract_usage(counters):
+    """Return the token usage counters found in *counters* (missing totals are 0), per-model ones included."""
+    usage = {key: counters.get(key, 0) for key in USAGE_KEYS}
+    usage.update({key: value for key, value in counters.items() if key.startswith(MODEL_USAGE_PREFIX)})
+    return usage
+
+
+def with_cost(usage, model):
+    """Return the token totals in *usage* with an estimated ``cost_usd``.
+
+    Tokens counted per model (fallback routes, per-agent models) are priced at
+    that model's rate and the rest at *model*'s.  ``cost_usd`` is ``None``
+    when any of those models has no price.
+    """
+    totals = {key: usage.get(key, 0) for key in USAGE_KEYS}
+    parts = list(usage_by_model(usage).items())
+    rest = {key: totals[key] - sum(counts.get(key, 0) for _, counts in parts) for key in USAGE_KEYS}
+    if not parts or any(rest.values()):
+        parts.append((model, rest))
+    cost = 0.0
+    for part_model, counts in parts:
+        part_cost = estimate_cost_usd(
+            part_model,
+            counts.get("prompt_tokens", 0),
+            counts.get("completion_tokens", 0),
+            counts.get("cached_tokens", 0),
+        )
+        if part_cost is None:
+            cost = None
+            break
+        cost += part_cost
+    return {**totals, "cost_usd": None if cost is None else round(cost, 6)}
+
+
+def build_usage_summary(run_usage, usage_by_team, usage_by_round, model):
+    """Summarize token usage and estimated cost for the run, each model, each team and each round."""
+    return {
+        "model": model,
+        "total": with_cost(run_usage, model),
+        "by_model": {name: with_cost(usage, name) for name, usage in sorted(usage_by_model(run_usage).items())},
+        "by_team": {team: with_cost(usage, model) for team, usage in sorted(usage_by_team.items())},
+        "by_round": {round_: with_cost(usage, model) for round_, usage in sorted(usage_by_round.items())},
     }
 
 
+RUN_ABORT_MESSAGES = {
+    "auth": "The API key was rejected or is not allowed to use this model. Update it in Profile and try again.",
+    "quota": "The API account has run out of quota. Add credit or use another key and try again.",
+    "model_not_found": "The model was not found at this provider. Pick another model and try again.",
+}
+
+
+def format_run_abort(abort):
+    """Explain why a run was aborted and how many chats are left to resume."""
+    message = RUN_ABORT_MESSAGES.get(abort["reason"], "The simulation was aborted.")
+    message += f"\n\nFirst error (round {abort['round']}, {abort['team1']} vs {abort['team2']}): {abort['error']}"
+    if abort.get("unplayed_matches"):
+        message += (
+            f"\n\n{abort['unplayed_matches']} chats were left unplayed and unscored;"
+            " re-run them from the Error Chats tab once the problem is fixed."
+        )
+    return message
+
+
 def format_unsuccessful_matchups(errors_matchups, name_roles):
     error_message = "The following negotiations were unsuccessful:\n\n"
     for match in errors_matchups:
@@ -1,7 +1,33 @@
+import json
 import re
+from dataclasses import replace
+
+import openai
 
 from .conversation_engine import GameAgent
-from .negotiations_common import clean_agent_message
+from .negotiations_common import clean_agent_message, has_agreement_indicator, is_valid_termination
+
+# Largest distance, as a share of the deal value, of any other figure in the closing messages of a deal read locally.
+LOCAL_DEAL_SPREAD = 0.05
+
+# response_format of the structured summary agent (build_summary_agent(structured=True)).
+DEAL_SUMMARY_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "deal_summary",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "agreed": {"type": "boolean"},
+                "value": {"type": ["number", "null"]},
+                "summary": {"type": "string"},
+            },
+            "required": ["agreed", "value", "summary"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 
 def _build_summary_context(chat_history, role1_name=None, role2_name=None, history_size=4):
@@ -60,6 +86,44 @@ def parse_deal_value(summary_text, summary_termination_message):
     return None
 
 
+def parse_structured_summary(summary_text):
+    """``(agreed, value, summary)`` from a structured summary reply, or ``None``.
+
+    Accepts the JSON document alone or embedded in other text (a provider
+    that ignored ``response_format``).  A reply with ``agreed`` false, or
+    without a numeric value, has value ``None``.
+    """
+    if not summary_text:
+        return None
+    start, end = summary_text.find("{"), summary_text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(summary_text[start : end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or "agreed" not in data:
+        return None
+    agreed = bool(data.get("agreed"))
+    value = data.get("value")
+    if not agreed or isinstance(value, bool) or not isinstance(value, (int, float)) or value == -1:
+        value = None
+    return agreed, None if value is None else float(value), str(data.get("summary") or "").strip()
+
+
+def format_structured_summary(summary, deal_value, summary_termination_message):
+    """Summary text stored for a structured reply, in the free-text layout.
+
+    Keeps the closing ``<termination> <value>`` line, so stored transcripts
+    are read back by :func:`extract_summary_from_transcript` as before.
+    """
+    if deal_value is None:
+        value = "None"
+    else:
+        value = int(deal_value) if float(deal_value).is_integer() else deal_value
+    return f"{summary}\n{summary_termination_message} {value}".strip()
+
+
 def evaluate_deal_summary(
     engine,
     chat_history,
@@ -69,13 +133,113 @@ def evaluate_deal_summary(
     role1_name=None,
     role2_name=None,
     history_size=4,
+    stats=None,
 ):
     if not summary_agent or not engine:
         return "", None
 
     summary_context = _build_summary_context(chat_history, role1_name, role2_name, history_size)
-    summary_text = engine.single_decision(summary_agent, summary_context + (summary_prompt or ""))
-    return summary_text, parse_deal_value(summary_text, summary_termination_message)
+    user_message = summary_context + (summary_prompt or "")
+    if not getattr(summary_agent, "response_format", None):
+        summary_text = engine.single_decision(summary_agent, user_message, stats=stats)
+        return summary_text, parse_deal_value(summary_text, summary_termination_message)
+
+    try:
+        reply = engine.single_decision(summary_agent, user_message, stats=stats)
+    except openai.BadRequestError:
+        # The provider rejects response_format: ask again for the same JSON in plain text.
+        if stats is not None:
+            stats["summary_structured_fallbacks"] = stats.get("summary_structured_fallbacks", 0) + 1
+        reply = engine.single_decision(replace(summary_agent, response_format=None), user_message, stats=stats)
+    structured = parse_structured_summary(reply)
+    if structured is None:
+        return reply, parse_deal_value(reply, summary_termination_message)
+    _, deal_value, summary = structured
+    return format_structured_summary(summary, deal_value, summary_termination_message), deal_value
+
+
+# Words that turn a sentence naming the price into a refusal ("I will not accept 100", "no deal at 100").
+_REJECTION_RE = re.compile(
+    r"\b(?:not|no|never|cannot|won't|can't|don't|reject\w*|declin\w*|refus\w*|too (?:much|high|low|expensive))\b"
+    r"|n't\b",
+    re.IGNORECASE,
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def _message_numbers(content):
+    return [float(number) for number in re.findall(r"\d+(?:\.\d+)?", content.replace("$", "").replace(",", ""))]
+
+
+def _rejects_value(content, value):
+    """Whether a sentence of *content* that names *value* also refuses or negates it."""
+    if re.search(r"\bno deal\b", content, re.IGNORECASE):
+        return True
+    return any(
+        value in _message_numbers(sentence) and _REJECTION_RE.search(sentence)
+        for sentence in _SENTENCE_END_RE.split(content)
+    )
+
+
+def extract_deal_locally(chat_history, negotiation_termination_message, role1_name=None, role2_name=None):
+    """Read the agreed value from the closing messages of a chat, without an LLM call.
+
+    Looks at the last message of each party and returns the value only when
+    every one of these holds:
+
+    * both parties name the same single figure, and it is the last figure
+      the closing speaker named (an offer and its acceptance);
+    * no other figure in the closing messages is more than
+      :data:`LOCAL_DEAL_SPREAD` away from it, so no counter-offer is still
+      open;
+    * both closing messages signal agreement and
+      :func:`~modules.negotiations_common.is_valid_termination` accepts the
+      ending;
+    * no sentence naming that figure negates or refuses it ("I will not
+      accept 100", "no deal at 100").
+
+    Otherwise returns ``None`` and the chat is left to the summary agent.
+    """
+    if not chat_history:
+        return None
+    closing = {}
+    for entry in reversed(chat_history):
+        name = entry.get("name")
+        if name not in closing:
+            content = entry.get("content") or ""
+            if role1_name and role2_name:
+                content = clean_agent_message(role1_name, role2_name, content)
+            closing[name] = content
+        if len(closing) == 2:
+            break
+    if len(closing) < 2:
+        return None
+
+    numbers = {name: _message_numbers(content) for name, content in closing.items()}
+    common = set.intersection(*(set(values) for values in numbers.values()))
+    last_numbers = numbers[chat_history[-1].get("name")]
+    if len(common) != 1 or last_numbers[-1] not in common:
+        return None
+    deal_value = common.pop()
+    figures = [value for values in numbers.values() for value in values]
+    if any(abs(value - deal_value) > deal_value * LOCAL_DEAL_SPREAD for value in figures):
+        return None
+    if not all(has_agreement_indicator(content) for content in closing.values()) or not is_valid_termination(
+        chat_history[-1], chat_history, negotiation_termination_message
+    ):
+        return None
+    if any(_rejects_value(content, deal_value) for content in closing.values()):
+        return None
+    return deal_value
+
+
+def format_local_summary(deal_value, summary_termination_message):
+    """Summary text stored for a deal read by :func:`extract_deal_locally`."""
+    value = int(deal_value) if float(deal_value).is_integer() else deal_value
+    return (
+        "Both parties confirmed the same value in their closing messages (read locally, without the summary "
+        f"agent).\n{summary_termination_message} {value}"
+    )
 
 
 def extract_summary_from_transcript(transcript, summary_termination_message):
@@ -93,10 +257,27 @@ def extract_summary_from_transcript(transcript, summary_termination_message):
     return summary_text, parse_deal_value(summary_text, summary_termination_message)
 
 
-def build_summary_agent(summary_termination_message, negotiation_termination_message, include_summary=False):
+def build_summary_agent(
+    summary_termination_message, negotiation_termination_message, include_summary=False, structured=False
+):
+    """The agent that decides whether a negotiation reached a deal.
+
+    With *structured*, the agent answers with a JSON object
+    ``{"agreed", "value", "summary"}`` enforced by :data:`DEAL_SUMMARY_FORMAT`
+    instead of a free-text ``<termination> <value>`` line.
+    """
     summary_prefix = ""
     if include_summary:
         summary_prefix = "Provide a concise 2-3 sentence summary before the final line.\n"
+    response_format = f"""- If there is a valid agreement: '{summary_termination_message} [agreed_value]'
+- If there is no valid agreement: '{summary_termination_message} None'"""
+    if structured:
+        summary_prefix = ""
+        summary_length = "a concise 2-3 sentence summary" if include_summary else "one short sentence"
+        response_format = f"""A JSON object with exactly these fields:
+- "agreed": true if there is a valid agreement, false otherwise
+- "value": the agreed value as a number, or null if there is no valid agreement
+- "summary": {summary_length} explaining your decision"""
 
     return GameAgent(
         name="Summary_Agent",
@@ -118,8 +299,8 @@ To determine if there is a valid agreement:
 - There must be no contradictions or retractions of the agreement
 
 Your response format:
-{summary_prefix}- If there is a valid agreement: '{summary_termination_message} [agreed_value]'
-- If there is no valid agreement: '{summary_termination_message} None'
+{summary_prefix}{response_format}
 
 Be thorough in your analysis and only report an agreement if ALL conditions are met.""",
+        response_format=DEAL_SUMMARY_FORMAT if structured else None,
     )
@@ -0,0 +1,237 @@
+"""Deal-summary evaluation as a separate pipeline stage.
+
+By default every chat asks the summary agent for the agreed value right
+after its last negotiation turn, so the summary call sits on the chat's
+critical path.  A :class:`SummaryStage` takes finished transcripts instead
+and evaluates them on its own worker threads, while the executor's slots
+move on to the next negotiations:
+
+* :meth:`SummaryStage.submit` queues a transcript with an opaque *tag*
+  identifying the chat;
+* each worker evaluates one transcript, or, with ``batch_size > 1``, packs
+  up to that many queued transcripts into one request whose reply has one
+  section per negotiation (transcripts missing from the reply are evaluated
+  on their own).  A structured summary agent (one with a
+  ``response_format``) answers for a single deal, so its transcripts are
+  never batched;
+* :meth:`SummaryStage.results` hands finished evaluations back, so the
+  caller can store summaries and scores on its own thread.
+
+With a *key_pool*, every summary request leases a key like a chat attempt
+does, so summaries share the run's keys, cooldowns and failover routes.
+"""
+
+import queue
+import re
+import threading
+import time
+
+from .negotiations_summary import _build_summary_context, evaluate_deal_summary, parse_deal_value
+
+BATCH_HEADING = "### Negotiation {}"
+_BATCH_SECTION = re.compile(r"^\s*#+\s*Negotiation\s+(\d+)\s*:?\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def build_batch_prompt(contexts, summary_prompt):
+    """One summary request covering several transcript excerpts."""
+    sections = "".join(f"{BATCH_HEADING.format(number)}\n{context}" for number, context in enumerate(contexts, 1))
+    return (
+        f"Evaluate each of the following {len(contexts)} negotiations on its own.\n\n"
+        f"{sections}"
+        f"{summary_prompt or ''}\n"
+        "Answer with one section per negotiation, in order. Start each section with its heading "
+        f"('{BATCH_HEADING.format('N')}') and follow the response format inside it."
+    )
+
+
+def split_batch_reply(reply):
+    """``{negotiation number: section text}`` from a batched summary reply."""
+    parts = _BATCH_SECTION.split(reply or "")
+    return {int(number): text.strip() for number, text in zip(parts[1::2], parts[2::2])}
+
+
+class SummaryStage:
+    """Evaluates deal summaries of finished chats on background threads.
+
+    Args:
+        engine: Engine that sends the summary requests (unused with *key_pool*).
+        summary_prompt: Question appended to each transcript excerpt.
+        summary_termination_message: Marker that precedes the agreed value.
+        summary_agent: Agent from :func:`~modules.negotiations_summary.build_summary_agent`.
+        workers: Summary requests in flight at once.
+        batch_size: Transcripts packed into one request (1 = one request per chat).
+        history_size: Trailing messages of each transcript that are evaluated.
+        key_pool: :class:`~modules.llm_key_pool.KeyPool` whose keys send the requests.
+    """
+
+    def __init__(
+        self,
+        engine,
+        summary_prompt,
+        summary_termination_message,
+        summary_agent,
+        workers=2,
+        batch_size=1,
+        history_size=4,
+        key_pool=None,
+    ):
+        self.engine = engine
+        self.key_pool = key_pool
+        self.summary_prompt = summary_prompt
+        self.summary_termination_message = summary_termination_message
+        self.summary_agent = summary_agent
+        self.batch_size = 1 if getattr(summary_agent, "response_format", None) else max(int(batch_size), 1)
+        self.history_size = history_size
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"summary-{index}", daemon=True)
+            for index in range(max(int(workers), 1))
+        ]
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.batch_fallbacks = 0
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, chat_history, role1_name, role2_name, tag=None):
+        """Queue a finished transcript; its result carries *tag*."""
+        self._jobs.put({"chat_history": chat_history, "role1_name": role1_name, "role2_name": role2_name, "tag": tag})
+
+    def results(self):
+        """Evaluations finished since the last call.
+
+        Each is a dict with ``tag``, ``summary``, ``deal_value``, ``stats``
+        (LLM counters), ``seconds`` and ``error`` (the exception, or ``None``).
+        """
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def join(self):
+        """Wait for every submitted transcript, then return the remaining results."""
+        self._jobs.join()
+        return self.results()
+
+    def close(self):
+        """Stop the worker threads once the queued transcripts are done."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def summary(self):
+        with self._lock:
+            return {"summary_batches": self.batches, "summary_batch_fallbacks": self.batch_fallbacks}
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            jobs = [job]
+            while len(jobs) < self.batch_size:
+                try:
+                    extra = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    # Hand the stop marker back to whichever worker takes it next.
+                    self._jobs.put(None)
+                    self._jobs.task_done()
+                    break
+                jobs.append(extra)
+            try:
+                if len(jobs) == 1:
+                    self._evaluate_one(job)
+                else:
+                    self._evaluate_batch(jobs)
+            finally:
+                for _ in jobs:
+                    self._jobs.task_done()
+
+    def _request(self, send, stats):
+        """``send(engine)`` on the stage engine, or on a key leased from the key pool."""
+        if self.key_pool is None:
+            return send(self.engine)
+        key = self.key_pool.acquire()
+        throttled_before = stats.get("llm_rate_limited", 0)
+        try:
+            reply = send(key.engine)
+        except Exception as error:
+            self.key_pool.release(key, stats.get("llm_rate_limited", 0) - throttled_before, error)
+            raise
+        self.key_pool.release(key, stats.get("llm_rate_limited", 0) - throttled_before)
+        return reply
+
+    def _evaluate_one(self, job, stats=None):
+        stats = {} if stats is None else stats
+        start = time.perf_counter()
+        try:
+            summary, deal_value = self._request(
+                lambda engine: evaluate_deal_summary(
+                    engine,
+                    job["chat_history"],
+                    self.summary_prompt,
+                    self.summary_termination_message,
+                    self.summary_agent,
+                    role1_name=job["role1_name"],
+                    role2_name=job["role2_name"],
+                    history_size=self.history_size,
+                    stats=stats,
+                ),
+                stats,
+            )
+            error = None
+        except Exception as exc:
+            summary, deal_value, error = "", None, exc
+        self._results.put(
+            {
+                "tag": job["tag"],
+                "summary": summary,
+                "deal_value": deal_value,
+                "stats": stats,
+                "seconds": time.perf_counter() - start,
+                "error": error,
+            }
+        )
+
+    def _evaluate_batch(self, jobs):
+        stats = {}
+        start = time.perf_counter()
+        contexts = [
+            _build_summary_context(job["chat_history"], job["role1_name"], job["role2_name"], self.history_size)
+            for job in jobs
+        ]
+        try:
+            prompt = build_batch_prompt(contexts, self.summary_prompt)
+            reply = self._request(lambda engine: engine.single_decision(self.summary_agent, prompt, stats=stats), stats)
+        except Exception:
+            reply = ""
+        sections = split_batch_reply(reply)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+        for number, job in enumerate(jobs, 1):
+            # The batch request's counters travel with the first result only.
+            job_stats, stats = stats, {}
+            section = sections.get(number)
+            if not section or self.summary_termination_message not in section:
+                with self._lock:
+                    self.batch_fallbacks += 1
+                self._evaluate_one(job, job_stats)
+                continue
+            self._results.put(
+                {
+                    "tag": job["tag"],
+                    "summary": section,
+                    "deal_value": parse_deal_value(section, self.summary_termination_message),
+                    "stats": job_stats,
+                    "seconds": seconds / len(jobs),
+                    "error": None,
+                }
+            )
@@ -0,0 +1,356 @@
+"""Work queue that spreads a tournament's chats over several worker processes.
+
+:func:`~modules.negotiations.create_chats` normally plays every chat from
+the process that scheduled them.  With a :class:`ChatWorkQueue` it writes
+the schedule to the ``chat_work_unit`` table instead, one row per chat,
+and plays the chats it claims from there.  Any number of other processes,
+on this machine or others, join the same game with
+``scripts/chat_worker.py`` and claim chats too:
+
+* a claim leases one pending unit to the worker (``FOR UPDATE SKIP LOCKED``
+  in the database store, so claims never block on or duplicate each other);
+* while a chat runs, its worker renews the lease every third of
+  ``lease_seconds``;
+* a unit whose lease expired (its worker crashed or lost the database) is
+  claimed again by the next worker that asks;
+* a finished unit is marked ``done`` (once its score is stored) or
+  ``failed``; units skipped by an aborted run go back to ``pending``;
+* the run settings that decide how a chat is played, judged and throttled
+  are stored with the queue, so every worker applies the same ones.
+
+Scores are still written with per-column updates of the ``round`` rows, so
+the two chats of a match may finish on different workers.
+"""
+
+import contextvars
+import os
+import socket
+import threading
+import time
+
+from .database_handler import (
+    claim_chat_work_unit,
+    count_chat_work_units,
+    delete_chat_work_units,
+    enqueue_chat_work_units,
+    finish_chat_work_unit,
+    get_chat_work_settings,
+    renew_chat_work_leases,
+    save_chat_work_settings,
+)
+from .negotiations_executor import UNIT_NOT_READY
+
+UNIT_PENDING = "pending"
+UNIT_LEASED = "leased"
+UNIT_DONE = "done"
+UNIT_FAILED = "failed"
+OPEN_UNIT_STATES = (UNIT_PENDING, UNIT_LEASED)
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_POLL_SECONDS = 2.0
+
+
+def default_worker_id():
+    """``host:pid`` of this process, as stored in ``leased_by``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class DatabaseWorkQueueStore:
+    """Keeps chat units in the ``chat_work_unit`` table.
+
+    *lock* serializes access to the shared DB connection with the chats
+    running on other threads.
+    """
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+
+    def enqueue(self, game_id, units):
+        with self._lock:
+            return enqueue_chat_work_units(game_id, units)
+
+    def claim(self, game_id, worker, lease_seconds):
+        with self._lock:
+            return claim_chat_work_unit(game_id, worker, lease_seconds)
+
+    def renew(self, unit_ids, worker, lease_seconds):
+        with self._lock:
+            return renew_chat_work_leases(unit_ids, worker, lease_seconds)
+
+    def finish(self, unit_id, worker, status, error=None):
+        with self._lock:
+            return finish_chat_work_unit(unit_id, worker, status, error)
+
+    def counts(self, game_id):
+        with self._lock:
+            return count_chat_work_units(game_id)
+
+    def clear(self, game_id):
+        with self._lock:
+            return delete_chat_work_units(game_id)
+
+    def save_settings(self, game_id, settings):
+        with self._lock:
+            return save_chat_work_settings(game_id, settings)
+
+    def settings(self, game_id):
+        with self._lock:
+            return get_chat_work_settings(game_id)
+
+
+class MemoryWorkQueueStore:
+    """Keeps chat units in process memory (tests and runs without a database).
+
+    Behaves like the table: leases expire on *clock* and units are claimed
+    in round order.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._units = {}
+        self._settings = {}
+        self._next_id = 1
+
+    @staticmethod
+    def _unit_key(game_id, unit):
+        return (
+            game_id,
+            unit["round_number"],
+            unit["group1_class"],
+            unit["group1_id"],
+            unit["group2_class"],
+            unit["group2_id"],
+            unit["group1_initiates"],
+        )
+
+    def enqueue(self, game_id, units):
+        with self._lock:
+            existing = {self._unit_key(game_id, unit) for unit in self._units.values()}
+            added = 0
+            for unit in units:
+                if self._unit_key(game_id, unit) in existing:
+                    continue
+                unit_id = self._next_id
+                self._next_id += 1
+                self._units[unit_id] = {
+                    "unit_id": unit_id,
+                    "game_id": game_id,
+                    **unit,
+                    "status": UNIT_PENDING,
+                    "attempts": 0,
+                    "leased_by": None,
+                    "lease_expires_at": None,
+                    "error": None,
+                }
+                existing.add(self._unit_key(game_id, unit))
+                added += 1
+            return added
+
+    def claim(self, game_id, worker, lease_seconds):
+        with self._lock:
+            now = self._clock()
+            open_units = [
+                unit
+                for unit in self._units.values()
+                if unit["game_id"] == game_id
+                and (
+                    unit["status"] == UNIT_PENDING or (unit["status"] == UNIT_LEASED and unit["lease_expires_at"] < now)
+                )
+            ]
+            if not open_units:
+                return None
+            unit = min(open_units, key=lambda item: (item["round_number"], item["unit_id"]))
+            unit.update(
+                status=UNIT_LEASED,
+                leased_by=worker,
+                attempts=unit["attempts"] + 1,
+                lease_expires_at=now + lease_seconds,
+            )
+            return {key: value for key, value in unit.items() if key not in {"lease_expires_at", "error"}}
+
+    def renew(self, unit_ids, worker, lease_seconds):
+        with self._lock:
+            renewed = 0
+            for unit_id in unit_ids:
+                unit = self._units.get(unit_id)
+                if unit and unit["status"] == UNIT_LEASED and unit["leased_by"] == worker:
+                    unit["lease_expires_at"] = self._clock() + lease_seconds
+                    renewed += 1
+            return renewed
+
+    def finish(self, unit_id, worker, status, error=None):
+        with self._lock:
+            unit = self._units.get(unit_id)
+            if not unit or unit["status"] != UNIT_LEASED or unit["leased_by"] != worker:
+                return False
+            unit.update(
+                status=status,
+                error=error,
+                lease_expires_at=None,
+                leased_by=None if status == UNIT_PENDING else worker,
+            )
+            return True
+
+    def counts(self, game_id):
+        with self._lock:
+            counts = {}
+            for unit in self._units.values():
+                if unit["game_id"] == game_id:
+                    counts[unit["status"]] = counts.get(unit["status"], 0) + 1
+            return counts
+
+    def clear(self, game_id):
+        with self._lock:
+            self._units = {key: unit for key, unit in self._units.items() if unit["game_id"] != game_id}
+            return True
+
+    def save_settings(self, game_id, settings):
+        with self._lock:
+            self._settings[game_id] = dict(settings)
+            return True
+
+    def settings(self, game_id):
+        with self._lock:
+            settings = self._settings.get(game_id)
+            return dict(settings) if settings is not None else None
+
+
+class ChatWorkQueue:
+    """One worker's view of a game's chat work queue.
+
+    Args:
+        game_id: Game whose units are queued and claimed.
+        store: Unit store (defaults to :class:`DatabaseWorkQueueStore`).
+        worker_id: Name recorded on leases (defaults to ``host:pid``).
+        lease_seconds: How long a claimed unit stays with this worker without a renewal.
+        poll_seconds: How often to look again while only other workers hold open units.
+        clock: Time source for the polling interval.
+    """
+
+    def __init__(
+        self,
+        game_id,
+        store=None,
+        worker_id=None,
+        lease_seconds=DEFAULT_LEASE_SECONDS,
+        poll_seconds=DEFAULT_POLL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.game_id = game_id
+        self.store = store or DatabaseWorkQueueStore()
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._held = set()
+        self._stop_renewal = threading.Event()
+        self._renewal_thread = None
+        self.claimed = 0
+        self.reclaimed = 0
+
+    def enqueue(self, units, settings=None):
+        """Queue units (see :func:`~modules.database_handler.enqueue_chat_work_units`); returns the number added.
+
+        *settings* (JSON-serializable, no API keys) replace the run settings
+        that joining workers read with :meth:`settings`.
+        """
+        if settings is not None:
+            self.store.save_settings(self.game_id, settings)
+        return self.store.enqueue(self.game_id, units)
+
+    def settings(self):
+        """Run settings stored by the process that queued the units, or ``None``."""
+        return self.store.settings(self.game_id)
+
+    def clear(self):
+        """Drop every unit of the game (before a fresh schedule is queued)."""
+        return self.store.clear(self.game_id)
+
+    def counts(self):
+        """``{status: units}`` for the whole game, across all workers."""
+        return self.store.counts(self.game_id)
+
+    def open_units(self):
+        """Units not finished yet, whoever holds them."""
+        counts = self.counts()
+        return sum(counts.get(status, 0) for status in OPEN_UNIT_STATES)
+
+    def claim(self):
+        """Lease the next open unit to this worker; ``None`` when none is claimable now."""
+        unit = self.store.claim(self.game_id, self.worker_id, self.lease_seconds)
+        if unit is None:
+            return None
+        with self._lock:
+            self._held.add(unit["unit_id"])
+            self.claimed += 1
+            if unit["attempts"] > 1:
+                self.reclaimed += 1
+        self._start_renewal()
+        return unit
+
+    def finish(self, unit_id, status, error=None):
+        """Record a held unit's outcome (``done``, ``failed``, or ``pending`` to hand it back)."""
+        with self._lock:
+            self._held.discard(unit_id)
+        return self.store.finish(unit_id, self.worker_id, status, error)
+
+    def claimed_units(self):
+        """Yield claimed units until the queue is drained.
+
+        When nothing is claimable but other workers still hold units, yields
+        :data:`~modules.negotiations_executor.UNIT_NOT_READY` instead of
+        waiting, so the executor keeps recording finished chats, and asks the
+        store again once *poll_seconds* have passed; the units of a worker
+        that dies are picked up once their leases expire.  Stops when every
+        open unit is one this worker holds.
+        """
+        next_poll = 0.0
+        while True:
+            if self._clock() < next_poll:
+                yield UNIT_NOT_READY
+                continue
+            unit = self.claim()
+            if unit is not None:
+                yield unit
+                continue
+            with self._lock:
+                held = len(self._held)
+            if self.open_units() <= held:
+                return
+            next_poll = self._clock() + self.poll_seconds
+            yield UNIT_NOT_READY
+
+    def _start_renewal(self):
+        with self._lock:
+            if self._renewal_thread is not None:
+                return
+            self._stop_renewal.clear()
+            # Renewals run in a copy of the caller's context, so they use a job's dedicated DB connection too.
+            self._renewal_thread = threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._renew_leases,),
+                name="chat-lease-renewal",
+                daemon=True,
+            )
+            self._renewal_thread.start()
+
+    def _renew_leases(self):
+        while not self._stop_renewal.wait(self.lease_seconds / 3):
+            with self._lock:
+                unit_ids = sorted(self._held)
+            if unit_ids:
+                self.store.renew(unit_ids, self.worker_id, self.lease_seconds)
+
+    def close(self):
+        """Stop renewing leases."""
+        self._stop_renewal.set()
+        with self._lock:
+            thread, self._renewal_thread = self._renewal_thread, None
+        if thread is not None:
+            thread.join()
+
+    def summary(self):
+        """Queue state for run diagnostics."""
+        return {"worker": self.worker_id, "claimed": self.claimed, "reclaimed": self.reclaimed, "units": self.counts()}
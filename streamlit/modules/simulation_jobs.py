@@ -0,0 +1,308 @@
+"""Background simulation jobs.
+
+A tournament used to run inside the Streamlit script that started it, so the
+browser tab had to stay open until the last chat finished and a rerun or a
+dropped connection killed it.  The Control Panel now submits a job instead:
+
+* the job row (``simulation_job`` table) records status, progress and the
+  final outcome, so any later page load can reattach to it;
+* a :class:`SimulationJobRunner` executes queued jobs on worker threads of
+  the app process, one at a time by default (``SIMULATION_JOB_WORKERS``),
+  so several runs can be queued without competing for the same rate limit;
+* while a job waits or runs, its heartbeat is refreshed; jobs whose
+  heartbeat stops (the process was restarted) are marked ``interrupted``.
+
+API keys are only held in memory by the queued callable; the job row keeps
+the non-secret run settings.
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+from contextlib import nullcontext
+
+from .control_panel_ui_helpers import format_progress_status_line
+from .database_handler import (
+    dedicated_connection,
+    get_simulation_job,
+    insert_simulation_job,
+    list_simulation_jobs,
+    mark_stale_simulation_jobs,
+    update_simulation_job,
+)
+from .negotiations import _db_write_lock
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCESS = "success"
+JOB_PARTIAL = "partial"
+JOB_ABORTED = "aborted"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+ACTIVE_JOB_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+PROGRESS_WRITE_SECONDS = 1.0
+HEARTBEAT_SECONDS = 60.0
+STALE_JOB_SECONDS = 600.0
+
+
+class DatabaseJobStore:
+    """Keeps simulation jobs in the ``simulation_job`` table.
+
+    *lock* serializes access to a DB connection with the chats the job runs
+    on other threads.
+    """
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+
+    def connection(self):
+        """Context in which a job's DB calls use a connection of their own, not the UI's."""
+        return dedicated_connection()
+
+    def create(self, game_id, created_by=None, params=None, total_matches=0):
+        with self._lock:
+            return insert_simulation_job(game_id, JOB_QUEUED, created_by, params, total_matches)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            update_simulation_job(job_id, **fields)
+
+    def get(self, job_id):
+        with self._lock:
+            return get_simulation_job(job_id)
+
+    def list(self, game_id, limit=5):
+        with self._lock:
+            return list_simulation_jobs(game_id, limit)
+
+    def mark_stale(self, stale_seconds):
+        with self._lock:
+            return mark_stale_simulation_jobs(stale_seconds)
+
+
+class MemoryJobStore:
+    """Keeps simulation jobs in process memory (tests and runs without a database)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 1
+
+    def create(self, game_id, created_by=None, params=None, total_matches=0):
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "game_id": game_id,
+                "status": JOB_QUEUED,
+                "created_by": created_by,
+                "worker": None,
+                "params": params,
+                "total_matches": total_matches,
+                "processed_matches": 0,
+                "completed_matches": 0,
+                "progress": None,
+                "result": None,
+                "error": None,
+            }
+            return job_id
+
+    def update(self, job_id, started=False, finished=False, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, game_id, limit=5):
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if job["game_id"] == game_id]
+        return sorted(jobs, key=lambda job: -job["job_id"])[:limit]
+
+    def mark_stale(self, stale_seconds):
+        return 0
+
+    def connection(self):
+        return nullcontext()
+
+
+class JobProgress:
+    """``progress_callback`` for :func:`~modules.negotiations.create_chats` that records progress on a job.
+
+    Writes are throttled to one per *interval* seconds, except when a chat
+    finishes, so a fast run does not turn into a stream of UPDATEs.
+    *caption_fn* may return extra text for the progress line (e.g. rate-limit
+    load).
+    """
+
+    def __init__(self, store, job_id, interval=PROGRESS_WRITE_SECONDS, caption_fn=None, clock=time.monotonic):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.caption_fn = caption_fn
+        self._clock = clock
+        self._last_write = None
+
+    def __call__(
+        self,
+        round_num,
+        team1,
+        team2,
+        role1_name,
+        role2_name,
+        completed_matches,
+        total_matches,
+        phase,
+        attempt=None,
+        elapsed_seconds=None,
+    ):
+        now = self._clock()
+        finished_chat = phase in {"completed", "failed"}
+        if not finished_chat and self._last_write is not None and now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        progress = format_progress_status_line(
+            round_num,
+            team1["Name"],
+            team2["Name"],
+            role1_name,
+            role2_name,
+            phase,
+            attempt=attempt,
+            elapsed_seconds=elapsed_seconds,
+        )
+        caption = self.caption_fn() if self.caption_fn else ""
+        self.store.update(
+            self.job_id,
+            processed_matches=completed_matches,
+            total_matches=total_matches,
+            progress=f"{progress} | {caption}" if caption else progress,
+        )
+
+
+def _job_outcome_fields(outcome):
+    """Final job columns for the value returned by a job's callable."""
+    if not isinstance(outcome, dict):
+        return {"status": JOB_SUCCESS, "progress": None, "result": str(outcome)}
+    return {
+        "status": outcome.get("status", JOB_SUCCESS),
+        "processed_matches": outcome.get("processed_matches", 0),
+        "completed_matches": outcome.get("completed_matches", 0),
+        "total_matches": outcome.get("total_matches", 0),
+        "progress": None,
+        "result": outcome,
+    }
+
+
+class SimulationJobRunner:
+    """Runs submitted simulation jobs on background threads.
+
+    Args:
+        store: Job store (defaults to :class:`DatabaseJobStore`).
+        workers: Jobs run at the same time.
+        heartbeat_seconds: How often waiting and running jobs refresh their heartbeat.
+    """
+
+    def __init__(self, store=None, workers=1, heartbeat_seconds=HEARTBEAT_SECONDS):
+        self.store = store or DatabaseJobStore()
+        self.workers = max(int(workers), 1)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._active = set()
+
+    def submit(self, game_id, run, total_matches=0, created_by=None, params=None, caption_fn=None):
+        """Queue ``run(progress_callback)`` as a job of *game_id*; returns the job id.
+
+        *run* returns the outcome of :func:`~modules.negotiations.create_chats`
+        (or a message string), which is stored as the job result.  *caption_fn*
+        is passed on to :class:`JobProgress`.
+        """
+        job_id = self.store.create(game_id, created_by, params, total_matches)
+        if job_id is None:
+            raise RuntimeError("Could not create the simulation job.")
+        with self._lock:
+            self._active.add(job_id)
+        self._queue.put((job_id, run, caption_fn))
+        self._start_threads()
+        return job_id
+
+    def _start_threads(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"simulation-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name="simulation-job-heartbeat", daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def _work(self):
+        while True:
+            job_id, run, caption_fn = self._queue.get()
+            try:
+                self.run_job(job_id, run, caption_fn)
+            finally:
+                with self._lock:
+                    self._active.discard(job_id)
+                self._queue.task_done()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                job_ids = sorted(self._active)
+            if not job_ids:
+                continue
+            with self.store.connection():
+                for job_id in job_ids:
+                    self.store.update(job_id)
+
+    def run_job(self, job_id, run, caption_fn=None):
+        """Execute one job on the calling thread and record its outcome.
+
+        The job's DB calls use a connection opened for the job and closed when
+        it ends (see :meth:`DatabaseJobStore.connection`).
+        """
+        with self.store.connection():
+            self.store.update(job_id, started=True, status=JOB_RUNNING, worker=self.worker_id)
+            try:
+                outcome = run(JobProgress(self.store, job_id, caption_fn=caption_fn))
+            except Exception as error:
+                self.store.update(job_id, finished=True, status=JOB_FAILED, error=f"{type(error).__name__}: {error}")
+                return
+            self.store.update(job_id, finished=True, **_job_outcome_fields(outcome))
+
+    def wait(self):
+        """Block until every submitted job has finished (scripts and tests)."""
+        self._queue.join()
+
+    def jobs(self, game_id, limit=5):
+        """The latest jobs of *game_id*, after releasing those of stopped processes."""
+        self.store.mark_stale(STALE_JOB_SECONDS)
+        return self.store.list(game_id, limit)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Return the process-wide :class:`SimulationJobRunner`."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = SimulationJobRunner(
+                DatabaseJobStore(lock=_db_write_lock), workers=int(os.getenv("SIMULATION_JOB_WORKERS", "1") or 1)
+            )
+        return _runner
@@ -69,6 +69,9 @@ def run_playground_negotiation(
     model="gpt-5-mini",
     conversation_starter=None,
     negotiation_termination_message=NEGOTIATION_TERMINATION_MESSAGE,
+    on_delta=None,
+    on_message=None,
+    stats=None,
 ):
     # Configure engine
     llm_config = build_llm_config(model, api_key)
@@ -93,7 +96,16 @@ def run_playground_negotiation(
     def termination_fn(msg, history):
         return negotiation_termination_message in msg["content"]
 
-    chat = engine.run_bilateral(initiator, responder, num_turns, termination_fn)
+    # With on_delta every turn is streamed, so the page can show it while it is generated.
+    chat = engine.run_bilateral(
+        initiator,
+        responder,
+        num_turns,
+        termination_fn,
+        stats=stats,
+        on_message=on_message,
+        on_delta=on_delta,
+    )
 
     # Process chat history for display
     negotiation_text = ""
@@ -220,6 +232,26 @@ with tab1:
         if not resolved_api_key:
             st.error("Please select an API key in Profile before running the negotiation.")
             st.stop()
+        st.subheader("Live Negotiation")
+        live_transcript = st.container()
+        live_turn = {"placeholder": None}
+        call_stats = {}
+
+        def show_delta(agent_name, text):
+            if live_turn["placeholder"] is None:
+                live_turn["placeholder"] = live_transcript.empty()
+            live_turn["placeholder"].markdown(
+                f"**{agent_name}:** {clean_agent_message(role1_name, role2_name, text)} ▌"
+            )
+
+        def finish_turn(history):
+            if live_turn["placeholder"] is not None:
+                entry = history[-1]
+                live_turn["placeholder"].markdown(
+                    f"**{entry['name']}:** {clean_agent_message(role1_name, role2_name, entry['content'])}"
+                )
+                live_turn["placeholder"] = None
+
         with st.spinner("Running negotiation test..."):
             try:
                 negotiation_text, chat_history = run_playground_negotiation(
@@ -232,7 +264,17 @@ with tab1:
                     model,
                     conversation_starter.split(" ➡ ")[0].strip(),
                     NEGOTIATION_TERMINATION_MESSAGE,
+                    on_delta=show_delta,
+                    on_message=finish_turn,
+                    stats=call_stats,
                 )
+                if call_stats.get("llm_streamed_calls"):
+                    st.caption(
+                        "Average time to first token: "
+                        f"{call_stats.get('llm_ttft_seconds', 0.0) / call_stats['llm_streamed_calls']:.2f}s | "
+                        "Average turn: "
+                        f"{call_stats.get('llm_stream_seconds', 0.0) / call_stats['llm_streamed_calls']:.2f}s"
+                    )
                 summary_text = ""
                 deal_value = None
                 try:
@@ -0,0 +1,107 @@
+"""End-to-end tournament run against the offline mock LLM backend.
+
+Exercises create_chats (scheduling, parallel chats, per-call retries,
+summaries and scoring) without network access or an API key.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.llm_provider import LLMConfig
+from modules.negotiations import create_chats
+from modules.negotiations_agents import build_team_agents
+
+TERMINATION = "Pleasure doing business with you"
+NAME_ROLES = ["Buyer", "Seller"]
+
+
+@pytest.mark.integration
+def test_mock_tournament_completes_with_injected_rate_limits(monkeypatch):
+    import modules.negotiations as neg
+
+    # Keep the injected 429s from slowing the test down.
+    monkeypatch.setattr(neg, "ConversationEngine", _fast_retry_engine(neg.ConversationEngine))
+    teams = [["T", group_id] for group_id in range(1, 7)]
+    team_info = [build_team_agents(team, ["buy", "sell"], 60, 30, NAME_ROLES, TERMINATION) for team in teams]
+    progress = []
+
+    result = create_chats(
+        None,
+        LLMConfig(model="mock", api_key="mock", base_url="mock://?rate_limit=0.1&seed=11&agree_after=4"),
+        NAME_ROLES,
+        "same",
+        teams,
+        [],
+        3,
+        8,
+        TERMINATION,
+        "Summarize.",
+        "Agreed value:",
+        progress_callback=lambda **kwargs: progress.append(kwargs["phase"]),
+        max_concurrency=4,
+        team_info=team_info,
+    )
+
+    assert result["status"] == "success"
+    assert result["completed_matches"] == result["total_matches"] == 18
+    assert result["diagnostics"]["llm_rate_limited"] > 0
+    assert result["diagnostics"]["avg_turns_per_successful_chat"] == 5.0
+    assert progress.count("completed") == 18
+    usage = result["usage"]
+    assert usage["total"]["prompt_tokens"] > 0
+    assert usage["total"]["cost_usd"] is None  # the mock model has no price
+    # Every chat is counted for both teams that played it.
+    assert sum(team["completion_tokens"] for team in usage["by_team"].values()) == (
+        2 * usage["total"]["completion_tokens"]
+    )
+    assert sum(round_["prompt_tokens"] for round_ in usage["by_round"].values()) == usage["total"]["prompt_tokens"]
+
+
+@pytest.mark.integration
+def test_adaptive_concurrency_backs_off_on_throttling(monkeypatch):
+    import modules.negotiations as neg
+
+    monkeypatch.setattr(neg, "ConversationEngine", _fast_retry_engine(neg.ConversationEngine))
+    monkeypatch.setattr(neg, "_learned_concurrency", {})
+    teams = [["T", group_id] for group_id in range(1, 9)]
+    team_info = [build_team_agents(team, ["buy", "sell"], 60, 30, NAME_ROLES, TERMINATION) for team in teams]
+    llm_config = LLMConfig(model="mock", api_key="mock", base_url="mock://?rate_limit=0.2&seed=5&agree_after=4")
+
+    result = create_chats(
+        None,
+        llm_config,
+        NAME_ROLES,
+        "same",
+        teams,
+        [],
+        3,
+        8,
+        TERMINATION,
+        "Summarize.",
+        "Agreed value:",
+        max_concurrency=8,
+        team_info=team_info,
+        adaptive_concurrency=True,
+    )
+
+    diagnostics = result["diagnostics"]
+    assert result["status"] == "success"
+    assert diagnostics["concurrency_initial"] == 2
+    assert diagnostics["throttle_events"] > 0
+    assert diagnostics["concurrency_decreases"] > 0
+    assert 1 <= diagnostics["concurrency_final"] <= 8
+    # The next run on the same key and model starts where this one ended.
+    assert list(neg._learned_concurrency.values()) == [diagnostics["concurrency_final"]]
+
+
+def _fast_retry_engine(engine_cls):
+    from modules.llm_retry import RetryPolicy
+
+    def build(llm_config, **kwargs):
+        return engine_cls(llm_config, retry_policy=RetryPolicy(base_delay=0.0, jitter=0.0, max_attempts=10), **kwargs)
+
+    return build
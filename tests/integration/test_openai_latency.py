@@ -7,11 +7,14 @@ Enable with:
 """
 
 import os
+import sys
 import time
 
 import pytest
 from openai import OpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
 
 def _env(name, default=""):
     return os.getenv(name, default).strip()
@@ -100,3 +103,36 @@ def test_openai_first_token_latency_streaming():
     assert first_token_seconds < 120, f"First token took too long: {first_token_seconds:.2f}s"
     assert total_seconds < 180, f"Total response took too long: {total_seconds:.2f}s"
     assert response_text, "API returned empty streamed content."
+
+
+@pytest.mark.integration
+@pytest.mark.requires_secrets
+@pytest.mark.slow
+def test_engine_streaming_records_time_to_first_token():
+    """The engine's streaming mode reports deltas and per-call TTFT / total time in its stats."""
+    if _env("RUN_OPENAI_LATENCY_TEST") != "1":
+        pytest.skip("Set RUN_OPENAI_LATENCY_TEST=1 to run real OpenAI latency checks.")
+
+    api_key = _get_api_key()
+    if not api_key:
+        pytest.skip("OPENAI_API_KEY (or E2E_OPENAI_API_KEY) is required for latency test.")
+
+    from modules.conversation_engine import ConversationEngine, GameAgent
+    from modules.negotiations_common import build_llm_config
+
+    engine = ConversationEngine(build_llm_config(_env("OPENAI_LATENCY_MODEL", "gpt-5-nano"), api_key))
+    deltas = []
+    stats = {}
+
+    reply = engine.single_decision(
+        GameAgent(name="Probe", system_message="You answer briefly."),
+        "Reply with exactly: OK",
+        stats=stats,
+        on_delta=lambda name, text: deltas.append(text),
+    )
+
+    assert reply.strip(), "API returned empty streamed content."
+    assert deltas and deltas[-1] == reply
+    assert stats["llm_streamed_calls"] == 1
+    assert stats["llm_stream_seconds"] >= stats["llm_ttft_seconds"]
+    assert stats["llm_ttft_seconds"] < 120, f"First token took too long: {stats['llm_ttft_seconds']:.2f}s"
@@ -13,6 +13,7 @@ from modules.control_panel_ui_helpers import (  # noqa: E402
     format_game_selector_label,
     format_progress_caption,
     format_progress_status_line,
+    format_rate_limit_caption,
     format_year_class_option,
 )
 
@@ -82,3 +83,18 @@ class TestSimulationProgressHelpers:
     def test_format_progress_caption_completed(self):
         text = format_progress_caption(completed_matches=4, total_matches=10, phase="completed")
         assert text == "Processed 4 of 10 chats"
+
+    @pytest.mark.unit
+    def test_format_rate_limit_caption(self):
+        text = format_rate_limit_caption(
+            {
+                "requests_per_minute": 500,
+                "tokens_per_minute": 200000,
+                "requests_last_minute": 120,
+                "tokens_last_minute": 45000,
+                "waits": 3,
+                "wait_seconds": 4.25,
+            }
+        )
+        assert text == "Rate limit: 120/500 requests/min, 45,000/200,000 tokens/min, throttled 3x (4.2s)"
+        assert format_rate_limit_caption(None) == ""
@@ -4,16 +4,29 @@ These tests verify conversation-loop logic (turn-taking, perspective
 building, termination, speaker rotation) without making real API calls.
 """
 
+import asyncio
 import os
 import sys
+import time
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+import openai
 import pytest
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
 
-from modules.conversation_engine import ChatResult, ConversationEngine, GameAgent
+from modules.conversation_context import ContextPolicy, context_policy_from_params
+from modules.conversation_engine import (
+    AsyncConversationEngine,
+    ChatResult,
+    ConversationEngine,
+    GameAgent,
+    GenerationLimits,
+    _PerspectiveViews,
+)
 from modules.llm_provider import LLMConfig
+from modules.llm_retry import RetryPolicy
 
 # ---------------------------------------------------------------------------
 # helpers
@@ -264,6 +277,37 @@ class TestPerspectiveBuilding:
             {"role": "user", "content": "msg3"},
         ]
 
+    @pytest.mark.unit
+    def test_incremental_views_match_full_rebuild(self):
+        config = LLMConfig(model="m", api_key="k")
+        with patch("modules.conversation_engine.OpenAI"):
+            engine = ConversationEngine(config)
+        agents = [GameAgent(name=n, system_message=f"sys_{n}") for n in ("Alice", "Bob", "Charlie")]
+        history = []
+        views = _PerspectiveViews(history)
+
+        for turn in range(7):
+            speaker = agents[turn % 3]
+            view = views.view(speaker)
+            expected = [{"role": "system", "content": speaker.system_message}]
+            expected += engine._build_perspective(history, speaker.name)
+            assert view == expected
+            history.append({"name": speaker.name, "content": f"msg{turn}"})
+
+    @pytest.mark.unit
+    def test_views_are_extended_in_place(self):
+        history = [{"name": "A", "content": "Open."}]
+        views = _PerspectiveViews(history)
+        agent = GameAgent(name="B", system_message="sys_b")
+
+        first = views.view(agent)
+        history.append({"name": "B", "content": "Reply."})
+        history.append({"name": "A", "content": "Counter."})
+        second = views.view(agent)
+
+        assert second is first
+        assert [m["role"] for m in second] == ["system", "user", "assistant", "user"]
+
 
 # ---------------------------------------------------------------------------
 # LLM call arguments
@@ -330,15 +374,15 @@ class TestLLMCallArguments:
         config = LLMConfig(model="m", api_key="k", base_url="https://openrouter.ai/api/v1")
         with patch("modules.conversation_engine.OpenAI") as MockOpenAI:
             ConversationEngine(config)
-            MockOpenAI.assert_called_once_with(api_key="k", base_url="https://openrouter.ai/api/v1")
+            MockOpenAI.assert_called_once_with(api_key="k", max_retries=0, base_url="https://openrouter.ai/api/v1")
 
     @pytest.mark.unit
     def test_base_url_omitted_when_none(self):
-        """When base_url is None, only api_key is passed to OpenAI."""
+        """When base_url is None, only api_key (and the disabled SDK retries) is passed to OpenAI."""
         config = LLMConfig(model="m", api_key="k", base_url=None)
         with patch("modules.conversation_engine.OpenAI") as MockOpenAI:
             ConversationEngine(config)
-            MockOpenAI.assert_called_once_with(api_key="k")
+            MockOpenAI.assert_called_once_with(api_key="k", max_retries=0)
 
     @pytest.mark.unit
     def test_model_passed_to_api(self):
@@ -385,6 +429,20 @@ class TestSingleDecision:
         engine.single_decision(a, "question")
 
         assert mock_create.call_count == 1
+        assert "response_format" not in mock_create.call_args.kwargs
+
+    @pytest.mark.unit
+    def test_sends_the_agent_response_format(self):
+        """An agent's response_format is sent with its single decisions, unless overridden."""
+        engine, mock_create = _make_engine(['{"answer": 1}', "plain"])
+        schema = {"type": "json_schema", "json_schema": {"name": "answer", "schema": {"type": "object"}}}
+
+        a = GameAgent(name="A", system_message="sys", response_format=schema)
+        engine.single_decision(a, "question")
+        engine.single_decision(a, "question", response_format={"type": "text"})
+
+        assert mock_create.call_args_list[0].kwargs["response_format"] == schema
+        assert mock_create.call_args_list[1].kwargs["response_format"] == {"type": "text"}
 
 
 # ---------------------------------------------------------------------------
@@ -579,3 +637,619 @@ class TestBilateralPerspectiveCorrectness:
         assert messages[1] == {"role": "assistant", "content": "Open."}
         # Agent1 sees agent2's reply as 'user'
         assert messages[2] == {"role": "user", "content": "Reply."}
+
+
+# ---------------------------------------------------------------------------
+# Resuming from a checkpointed history
+# ---------------------------------------------------------------------------
+
+
+class TestBilateralResume:
+    @pytest.mark.unit
+    def test_on_message_receives_every_prefix(self):
+        engine, _ = _make_engine(["Open.", "R1.", "R2."])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        checkpoints = []
+
+        engine.run_bilateral(a1, a2, max_turns=1, on_message=lambda history: checkpoints.append(list(history)))
+
+        assert [len(h) for h in checkpoints] == [1, 2, 3]
+        assert checkpoints[-1][-1] == {"name": "A", "content": "R2."}
+
+    @pytest.mark.unit
+    def test_resume_after_agent2_reply_continues_with_agent1(self):
+        engine, mock_create = _make_engine(["R2."])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        saved = [{"name": "A", "content": "Open."}, {"name": "B", "content": "R1."}]
+
+        result = engine.run_bilateral(a1, a2, max_turns=1, history=saved)
+
+        assert [m["content"] for m in result.chat_history] == ["Open.", "R1.", "R2."]
+        assert [m["name"] for m in result.chat_history] == ["A", "B", "A"]
+        assert mock_create.call_count == 1
+        first_messages = mock_create.call_args_list[0][1]["messages"]
+        assert first_messages == [
+            {"role": "system", "content": "sys_a"},
+            {"role": "assistant", "content": "Open."},
+            {"role": "user", "content": "R1."},
+        ]
+        # The caller's list is not mutated.
+        assert len(saved) == 2
+
+    @pytest.mark.unit
+    def test_resume_after_full_exchange_continues_with_agent2(self):
+        engine, mock_create = _make_engine(["R3.", "R4."])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        saved = [
+            {"name": "A", "content": "Open."},
+            {"name": "B", "content": "R1."},
+            {"name": "A", "content": "R2."},
+        ]
+
+        result = engine.run_bilateral(a1, a2, max_turns=2, history=saved)
+
+        assert [m["name"] for m in result.chat_history] == ["A", "B", "A", "B", "A"]
+        assert mock_create.call_count == 2
+        assert mock_create.call_args_list[0][1]["messages"][0] == {"role": "system", "content": "sys_b"}
+
+    @pytest.mark.unit
+    def test_resume_of_finished_conversation_makes_no_calls(self):
+        engine, mock_create = _make_engine([])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        saved = [{"name": "A", "content": "Open."}, {"name": "B", "content": "Deal. DONE"}]
+
+        result = engine.run_bilateral(
+            a1, a2, max_turns=5, termination_fn=lambda msg, history: "DONE" in msg["content"], history=saved
+        )
+
+        assert result.chat_history == saved
+        mock_create.assert_not_called()
+
+    @pytest.mark.unit
+    def test_resume_at_max_turns_makes_no_calls(self):
+        engine, mock_create = _make_engine([])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        saved = [
+            {"name": "A", "content": "Open."},
+            {"name": "B", "content": "R1."},
+            {"name": "A", "content": "R2."},
+        ]
+
+        result = engine.run_bilateral(a1, a2, max_turns=1, history=saved)
+
+        assert len(result.chat_history) == 3
+        mock_create.assert_not_called()
+
+    @pytest.mark.unit
+    def test_async_engine_resumes(self):
+        engine, calls = _make_async_engine(["R2."])
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        saved = [{"name": "A", "content": "Open."}, {"name": "B", "content": "R1."}]
+        checkpoints = []
+
+        result = asyncio.run(engine.run_bilateral(a1, a2, max_turns=1, history=saved, on_message=checkpoints.append))
+
+        assert [m["content"] for m in result.chat_history] == ["Open.", "R1.", "R2."]
+        assert len(calls) == 1
+        assert [len(h) for h in checkpoints] == [3]
+
+
+# ---------------------------------------------------------------------------
+# AsyncConversationEngine
+# ---------------------------------------------------------------------------
+
+
+def _make_async_engine(replies, delay=0.0):
+    """Create an AsyncConversationEngine whose LLM returns *replies* in order.
+
+    Each mocked call sleeps *delay* seconds before returning so tests can
+    observe that independent conversations overlap on one event loop.
+    """
+    config = LLMConfig(model="test-model", api_key="sk-test")
+    with patch("modules.conversation_engine.AsyncOpenAI") as MockAsyncOpenAI:
+        mock_client = MagicMock()
+        MockAsyncOpenAI.return_value = mock_client
+        engine = AsyncConversationEngine(config)
+
+    pending = list(replies)
+    calls = []
+
+    async def fake_create(**kwargs):
+        # Snapshot the messages, as the HTTP layer would serialize them.
+        calls.append({**kwargs, "messages": list(kwargs["messages"])})
+        if delay:
+            await asyncio.sleep(delay)
+        resp = MagicMock()
+        resp.choices = [MagicMock()]
+        resp.choices[0].message.content = pending.pop(0)
+        return resp
+
+    mock_client.chat.completions.create = fake_create
+    engine.client = mock_client
+    return engine, calls
+
+
+class TestAsyncConversationEngine:
+    @pytest.mark.unit
+    def test_run_bilateral_matches_sync_contract(self):
+        """The async bilateral loop alternates speakers and returns a ChatResult."""
+        engine, calls = _make_async_engine(["Open.", "R1.", "R2.", "R3.", "R4."])
+
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+
+        result = asyncio.run(engine.run_bilateral(a1, a2, max_turns=2))
+
+        assert isinstance(result, ChatResult)
+        assert [m["name"] for m in result.chat_history] == ["A", "B", "A", "B", "A"]
+        assert len(calls) == 5
+        # Agent1's second turn sees its opener as assistant and B's reply as user
+        assert calls[2]["messages"] == [
+            {"role": "system", "content": "sys_a"},
+            {"role": "assistant", "content": "Open."},
+            {"role": "user", "content": "R1."},
+        ]
+
+    @pytest.mark.unit
+    def test_run_bilateral_termination(self):
+        engine, calls = _make_async_engine(["Let's negotiate.", "Pleasure doing business with you"])
+
+        def term_fn(msg, history):
+            return "Pleasure doing business" in msg["content"]
+
+        result = asyncio.run(
+            engine.run_bilateral(
+                GameAgent(name="Buyer", system_message="b"),
+                GameAgent(name="Seller", system_message="s"),
+                max_turns=10,
+                termination_fn=term_fn,
+            )
+        )
+
+        assert len(result.chat_history) == 2
+        assert len(calls) == 2
+
+    @pytest.mark.unit
+    def test_run_multilateral_round_robin(self):
+        engine, _ = _make_async_engine(["Bob opens.", "Charlie speaks.", "Alice speaks."])
+
+        alice = GameAgent(name="Alice", system_message="a")
+        bob = GameAgent(name="Bob", system_message="b")
+        charlie = GameAgent(name="Charlie", system_message="c")
+
+        result = asyncio.run(engine.run_multilateral([alice, bob, charlie], opening_agent=bob, max_turns=2))
+
+        assert [m["name"] for m in result.chat_history] == ["Bob", "Charlie", "Alice"]
+
+    @pytest.mark.unit
+    def test_single_decision(self):
+        engine, calls = _make_async_engine(["cooperate"])
+
+        result = asyncio.run(engine.single_decision(GameAgent(name="P", system_message="sys"), "Cooperate?"))
+
+        assert result == "cooperate"
+        assert calls[0]["messages"][1] == {"role": "user", "content": "Cooperate?"}
+
+    @pytest.mark.unit
+    def test_concurrent_chats_overlap_on_one_loop(self):
+        """Awaiting several chats together costs about one chat of wall time."""
+        engine, calls = _make_async_engine(["msg"] * 30, delay=0.05)
+
+        async def run_all():
+            return await asyncio.gather(
+                *[
+                    engine.run_bilateral(
+                        GameAgent(name=f"A{i}", system_message="a"),
+                        GameAgent(name=f"B{i}", system_message="b"),
+                        max_turns=1,
+                    )
+                    for i in range(10)
+                ]
+            )
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 10
+        assert all(len(r.chat_history) == 3 for r in results)
+        assert len(calls) == 30
+        # Sequential execution would take 30 * 0.05 = 1.5s
+        assert elapsed < 0.75
+
+
+# ---------------------------------------------------------------------------
+# per-call retry
+# ---------------------------------------------------------------------------
+
+
+def _api_error(error_cls, status, headers=None):
+    response = MagicMock(status_code=status, headers=headers or {}, request=MagicMock())
+    return error_cls("error", response=response, body=None)
+
+
+def _text_response(text):
+    resp = MagicMock()
+    resp.choices = [MagicMock()]
+    resp.choices[0].message.content = text
+    return resp
+
+
+class TestPerCallRetry:
+    @pytest.mark.unit
+    def test_rate_limit_repeats_only_the_failed_call(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", sleeps.append)
+        engine, mock_create = _make_engine([])
+        mock_create.side_effect = [
+            _text_response("Open."),
+            _text_response("R1."),
+            _api_error(openai.RateLimitError, 429, headers={"retry-after": "3"}),
+            _text_response("R2."),
+        ]
+        stats = {}
+
+        result = engine.run_bilateral(
+            GameAgent(name="A", system_message="a"), GameAgent(name="B", system_message="b"), max_turns=1, stats=stats
+        )
+
+        assert [m["content"] for m in result.chat_history] == ["Open.", "R1.", "R2."]
+        assert mock_create.call_count == 4
+        # The retried request is identical to the failed one
+        assert mock_create.call_args_list[2] == mock_create.call_args_list[3]
+        assert sleeps == [3.0]
+        assert stats == {"llm_calls": 3, "llm_retries": 1, "llm_rate_limited": 1}
+
+    @pytest.mark.unit
+    def test_fatal_error_is_not_retried(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, mock_create = _make_engine([])
+        mock_create.side_effect = [_api_error(openai.BadRequestError, 400)]
+
+        with pytest.raises(openai.BadRequestError):
+            engine.single_decision(GameAgent(name="A", system_message="a"), "hi")
+        assert mock_create.call_count == 1
+
+    @pytest.mark.unit
+    def test_auth_error_is_not_retried(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, mock_create = _make_engine([])
+        mock_create.side_effect = [_api_error(openai.AuthenticationError, 401)]
+
+        with pytest.raises(openai.AuthenticationError):
+            engine.single_decision(GameAgent(name="A", system_message="a"), "hi")
+        assert mock_create.call_count == 1
+
+    @pytest.mark.unit
+    def test_gives_up_after_max_attempts(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, mock_create = _make_engine([])
+        engine.retry_policy = RetryPolicy(max_attempts=3, jitter=0)
+        mock_create.side_effect = [_api_error(openai.InternalServerError, 500)] * 5
+        stats = {}
+
+        with pytest.raises(openai.InternalServerError):
+            engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+        assert mock_create.call_count == 3
+        assert stats == {"llm_retries": 2}
+
+    @pytest.mark.unit
+    def test_async_engine_retries(self, monkeypatch):
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        monkeypatch.setattr("modules.conversation_engine.asyncio.sleep", fake_sleep)
+        engine, calls = _make_async_engine(["ok"])
+        original_create = engine.client.chat.completions.create
+        failures = [_api_error(openai.RateLimitError, 429, headers={"retry-after-ms": "500"})]
+
+        async def flaky_create(**kwargs):
+            if failures:
+                raise failures.pop()
+            return await original_create(**kwargs)
+
+        engine.client.chat.completions.create = flaky_create
+        stats = {}
+
+        result = asyncio.run(engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats))
+
+        assert result == "ok"
+        assert sleeps == [0.5]
+        assert stats["llm_retries"] == 1
+
+
+# ---------------------------------------------------------------------------
+# token usage
+# ---------------------------------------------------------------------------
+
+
+def _usage_response(text, prompt_tokens, completion_tokens, cached_tokens=None):
+    resp = _text_response(text)
+    resp.usage = SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens) if cached_tokens is not None else None,
+    )
+    return resp
+
+
+class TestUsageAccounting:
+    @pytest.mark.unit
+    def test_usage_is_summed_across_calls(self):
+        engine, mock_create = _make_engine([])
+        mock_create.side_effect = [
+            _usage_response("Open.", 100, 10, cached_tokens=64),
+            _usage_response("Reply.", 120, 12),
+        ]
+        stats = {}
+
+        engine.run_bilateral(
+            GameAgent(name="A", system_message="a"), GameAgent(name="B", system_message="b"), max_turns=1, stats=stats
+        )
+
+        assert stats == {
+            "llm_calls": 2,
+            "prompt_tokens": 220,
+            "completion_tokens": 22,
+            "cached_tokens": 64,
+            "model_usage:test-model:prompt_tokens": 220,
+            "model_usage:test-model:completion_tokens": 22,
+            "model_usage:test-model:cached_tokens": 64,
+        }
+
+    @pytest.mark.unit
+    def test_missing_usage_is_ignored(self):
+        engine, mock_create = _make_engine([])
+        response = _text_response("ok")
+        response.usage = None
+        mock_create.side_effect = [response]
+        stats = {}
+
+        engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+
+        assert stats == {"llm_calls": 1}
+
+
+# ---------------------------------------------------------------------------
+# streaming
+# ---------------------------------------------------------------------------
+
+
+def _mock_config(query="seed=3"):
+    return LLMConfig(model="mock", api_key="mock", base_url=f"mock://?{query}")
+
+
+class TestStreaming:
+    @pytest.mark.unit
+    def test_deltas_report_each_turn_as_it_grows(self):
+        engine = ConversationEngine(_mock_config())
+        deltas = []
+        stats = {}
+
+        result = engine.run_bilateral(
+            GameAgent(name="A", system_message="a"),
+            GameAgent(name="B", system_message="b"),
+            max_turns=1,
+            stats=stats,
+            on_delta=lambda name, text: deltas.append((name, text)),
+        )
+
+        # Consecutive deltas from the same speaker belong to one turn.
+        turns = []
+        for name, text in deltas:
+            if turns and turns[-1][0] == name:
+                assert text.startswith(turns[-1][1][-1])
+                turns[-1][1].append(text)
+            else:
+                turns.append((name, [text]))
+        assert [(name, texts[-1]) for name, texts in turns] == [
+            (entry["name"], entry["content"]) for entry in result.chat_history
+        ]
+        assert all(len(texts) > 1 for _, texts in turns)
+        assert stats["llm_streamed_calls"] == len(result.chat_history)
+        assert stats["llm_stream_seconds"] >= stats["llm_ttft_seconds"] >= 0
+        assert stats["completion_tokens"] > 0
+
+    @pytest.mark.unit
+    def test_streamed_reply_matches_blocking_reply(self):
+        agent = GameAgent(name="A", system_message="a")
+        blocking = ConversationEngine(_mock_config()).single_decision(agent, "hi")
+
+        streamed = ConversationEngine(_mock_config()).single_decision(agent, "hi", on_delta=lambda name, text: None)
+
+        assert streamed == blocking
+
+    @pytest.mark.unit
+    def test_failed_stream_is_retried_from_scratch(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, mock_create = _make_engine([])
+
+        def chunk(text):
+            return SimpleNamespace(
+                usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=None)]
+            )
+
+        def broken_stream():
+            yield chunk("Hel")
+            raise openai.APIConnectionError(request=MagicMock())
+
+        mock_create.side_effect = [broken_stream(), iter([chunk("Hello"), chunk(" there")])]
+        deltas = []
+
+        reply = engine.single_decision(
+            GameAgent(name="A", system_message="a"), "hi", on_delta=lambda name, text: deltas.append(text)
+        )
+
+        assert reply == "Hello there"
+        assert deltas == ["Hel", "Hello", "Hello there"]
+        assert mock_create.call_args.kwargs["stream"] is True
+
+    @pytest.mark.unit
+    def test_async_engine_streams(self):
+        deltas = []
+
+        async def run():
+            async with AsyncConversationEngine(_mock_config()) as engine:
+                return await engine.single_decision(
+                    GameAgent(name="A", system_message="a"), "hi", on_delta=lambda name, text: deltas.append(text)
+                )
+
+        reply = asyncio.run(run())
+
+        assert deltas[-1] == reply
+        assert len(deltas) > 1
+
+
+def _finished_response(text, finish_reason):
+    resp = _text_response(text)
+    resp.choices[0].finish_reason = finish_reason
+    return resp
+
+
+class TestGenerationLimits:
+    @pytest.mark.unit
+    def test_chat_models_get_max_tokens_and_stop(self):
+        engine, mock_create = _make_engine(["Deal."])
+        limits = GenerationLimits(max_output_tokens=120, stop=("\nBuyer:", "\nSeller:"))
+
+        engine.single_decision(GameAgent(name="A", system_message="a", limits=limits), "hi")
+
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs["max_tokens"] == 120
+        assert kwargs["stop"] == ["\nBuyer:", "\nSeller:"]
+        assert "max_completion_tokens" not in kwargs
+
+    @pytest.mark.unit
+    def test_reasoning_models_get_headroom_and_client_side_stops(self):
+        engine, mock_create = _make_engine(["Fine.\nSeller: and more"])
+        engine.model = "gpt-5-mini"
+        limits = GenerationLimits(max_output_tokens=100, stop=("\nSeller:",))
+        stats = {}
+
+        reply = engine.single_decision(GameAgent(name="A", system_message="a", limits=limits), "hi", stats=stats)
+
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs["max_completion_tokens"] == 100 + 2048
+        assert "stop" not in kwargs and "max_tokens" not in kwargs
+        assert reply == "Fine."
+        assert stats["llm_truncated_replies"] == 1
+
+    @pytest.mark.unit
+    def test_reply_ends_with_the_termination_sentence(self):
+        engine, _ = _make_engine(["OK. Pleasure doing business with you at $50. Also, one more thing."])
+        limits = GenerationLimits(stop_after="Pleasure doing business with you")
+        stats = {}
+
+        reply = engine.single_decision(GameAgent(name="A", system_message="a", limits=limits), "hi", stats=stats)
+
+        assert reply == "OK. Pleasure doing business with you at $50."
+        assert stats["llm_truncated_tokens"] > 0
+
+    @pytest.mark.unit
+    def test_empty_capped_reply_is_retried_without_the_cap(self):
+        engine, mock_create = _make_engine([])
+        mock_create.side_effect = [_finished_response("", "length"), _finished_response("Done.", "stop")]
+        stats = {}
+
+        reply = engine.single_decision(
+            GameAgent(name="A", system_message="a", limits=GenerationLimits(max_output_tokens=5)), "hi", stats=stats
+        )
+
+        assert reply == "Done."
+        assert "max_tokens" not in mock_create.call_args.kwargs
+        assert stats["llm_cap_retries"] == 1
+        assert stats["llm_calls"] == 1
+
+    @pytest.mark.unit
+    def test_mock_backend_reports_length_stops(self):
+        engine = ConversationEngine(_mock_config())
+        stats = {}
+
+        reply = engine.single_decision(
+            GameAgent(name="A", system_message="a", limits=GenerationLimits(max_output_tokens=2)), "hi", stats=stats
+        )
+
+        assert len(reply) <= 8
+        assert stats["llm_length_stops"] == 1
+        assert stats["llm_capped_calls"] == 1
+
+
+class TestContextPolicy:
+    @staticmethod
+    def _agents():
+        return GameAgent(name="Buyer", system_message="buy"), GameAgent(name="Seller", system_message="sell")
+
+    @pytest.mark.unit
+    def test_last_k_sends_only_recent_messages(self):
+        engine, mock_create = _make_engine([f"m{i}" for i in range(9)])
+        engine.context_policy = ContextPolicy(mode="last_k", window=3)
+        buyer, seller = self._agents()
+
+        engine.run_bilateral(buyer, seller, max_turns=4)
+
+        last_messages = mock_create.call_args.kwargs["messages"]
+        assert last_messages[0] == {"role": "system", "content": "buy"}
+        assert [m["content"] for m in last_messages[1:]] == ["m5", "m6", "m7"]
+        assert max(len(call.kwargs["messages"]) for call in mock_create.call_args_list) == 4
+
+    @pytest.mark.unit
+    def test_summary_folds_older_messages_with_the_summary_model(self):
+        # Nine messages with a window of two: summaries are due before messages 5, 7 and 9.
+        replies = ["m0", "m1", "m2", "m3", "S1", "m4", "m5", "S2", "m6", "m7", "S3", "m8"]
+        engine, mock_create = _make_engine(replies)
+        engine.context_policy = ContextPolicy(mode="summary", window=2, summary_model="gpt-5-nano")
+        buyer, seller = self._agents()
+        stats = {}
+
+        result = engine.run_bilateral(buyer, seller, max_turns=4, stats=stats)
+
+        assert [entry["content"] for entry in result.chat_history] == [f"m{i}" for i in range(9)]
+        assert stats["llm_context_summaries"] == 3
+        summary_call = mock_create.call_args_list[4].kwargs
+        assert summary_call["model"] == "gpt-5-nano"
+        assert "Buyer: m0" in summary_call["messages"][1]["content"]
+        last_messages = mock_create.call_args.kwargs["messages"]
+        assert last_messages[1]["content"].endswith("S3")
+        assert [m["content"] for m in last_messages[2:]] == ["m6", "m7"]
+        assert mock_create.call_args.kwargs["model"] == "test-model"
+
+    @pytest.mark.unit
+    def test_context_policy_from_params(self):
+        assert context_policy_from_params(None) is None
+        assert context_policy_from_params({"context_mode": "full", "context_window": 4}) is None
+        policy = context_policy_from_params({"context_mode": "last_k", "context_window": 4})
+        assert policy == ContextPolicy(mode="last_k", window=4)
+        with pytest.raises(ValueError):
+            ContextPolicy(mode="everything")
+
+
+class TestPromptCaching:
+    @pytest.mark.unit
+    def test_agent_requests_share_a_prefix_and_cache_key(self):
+        engine, mock_create = _make_engine(["o", "r1", "a1", "r2"])
+        buyer = GameAgent(name="Buyer", system_message="buy")
+        seller = GameAgent(name="Seller", system_message="sell")
+
+        engine.run_bilateral(buyer, seller, max_turns=2)
+
+        buyer_calls = [call.kwargs for call in mock_create.call_args_list[0::2]]
+        assert buyer_calls[1]["messages"][: len(buyer_calls[0]["messages"])] == buyer_calls[0]["messages"]
+        assert len({call["prompt_cache_key"] for call in buyer_calls}) == 1
+        assert mock_create.call_args_list[1].kwargs["prompt_cache_key"] != buyer_calls[0]["prompt_cache_key"]
+
+    @pytest.mark.unit
+    def test_cache_key_only_sent_to_openai(self):
+        openrouter = ConversationEngine(LLMConfig(model="m", api_key="k", base_url="https://openrouter.ai/api/v1"))
+        openai_proxy = ConversationEngine(LLMConfig(model="m", api_key="k", base_url="https://api.openai.com/v1"))
+        messages = [{"role": "system", "content": "s"}]
+
+        assert "prompt_cache_key" not in openrouter._request_kwargs(messages)
+        assert "prompt_cache_key" in openai_proxy._request_kwargs(messages)
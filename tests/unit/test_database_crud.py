@@ -62,6 +62,23 @@ class TestGetDbConnectionString:
                 assert dh.get_db_connection_string() is None
 
 
+class TestDedicatedConnection:
+    @pytest.mark.unit
+    def test_block_uses_its_own_connection_and_closes_it(self, db):
+        dh, _, _ = db
+        job_conn = MagicMock(closed=False)
+        with (
+            patch.object(dh, "get_db_connection_string", return_value="postgresql://job"),
+            patch.object(dh.psycopg2, "connect", return_value=job_conn) as connect,
+        ):
+            with dh.dedicated_connection() as conn:
+                assert conn is job_conn
+                assert dh.get_connection() is job_conn
+            connect.assert_called_once_with("postgresql://job")
+        job_conn.close.assert_called_once()
+        assert dh._dedicated_connection.get() is None
+
+
 # ---------------------------------------------------------------------------
 # _get_api_key_cipher
 # ---------------------------------------------------------------------------
@@ -561,11 +578,34 @@ class TestGameSimulationParams:
     @pytest.mark.unit
     def test_get_params_found(self, db):
         dh, conn, cursor = db
-        cursor.fetchone.return_value = ("gpt-4o", "same", "Hello", 10, "Deal!", "Sum", "DEAL:")
+        cursor.fetchone.return_value = ("gpt-4o", "same", "Hello", 10, "Deal!", "Sum", "DEAL:", None, None, None)
         with patch.object(dh, "get_connection", return_value=conn):
             result = dh.get_game_simulation_params(1)
         assert result["model"] == "gpt-4o"
         assert result["num_turns"] == 10
+        assert result["context_mode"] == "full"
+
+    @pytest.mark.unit
+    def test_context_policy_round_trip(self, db):
+        dh, conn, cursor = db
+        with patch.object(dh, "get_connection", return_value=conn):
+            dh.upsert_game_simulation_params(
+                1, "gpt-5-mini", "same", "", 40, "Deal!", "Sum", "DEAL:", "summary", 6, "gpt-5-nano"
+            )
+        params = cursor.execute.call_args_list[-1][0][1]
+        assert params["context_mode"] == "summary"
+        assert params["context_window"] == 6
+        queries = [call[0][0] for call in cursor.execute.call_args_list]
+        assert not any("ALTER TABLE" in q for q in queries)
+
+        cursor.fetchone.return_value = ("m", "same", "", 40, "Deal!", "Sum", "DEAL:", "summary", 6, "gpt-5-nano")
+        with patch.object(dh, "get_connection", return_value=conn):
+            result = dh.get_game_simulation_params(1)
+        assert (result["context_mode"], result["context_window"], result["context_summary_model"]) == (
+            "summary",
+            6,
+            "gpt-5-nano",
+        )
 
     @pytest.mark.unit
     def test_get_params_not_found(self, db):
@@ -575,6 +615,182 @@ class TestGameSimulationParams:
             assert dh.get_game_simulation_params(999) is None
 
 
+# ---------------------------------------------------------------------------
+# simulation jobs
+# ---------------------------------------------------------------------------
+class TestSimulationJobs:
+    @pytest.mark.unit
+    def test_insert_returns_job_id(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = (7,)
+        with patch.object(dh, "get_connection", return_value=conn):
+            job_id = dh.insert_simulation_job(1, "queued", "prof", {"model": "gpt-5-mini"}, 12)
+        assert job_id == 7
+        params = cursor.execute.call_args_list[-1][0][1]
+        assert params["params"] == '{"model": "gpt-5-mini"}'
+        assert params["total_matches"] == 12
+        conn.commit.assert_called()
+
+    @pytest.mark.unit
+    def test_update_sets_only_given_fields(self, db):
+        dh, conn, cursor = db
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.update_simulation_job(7, finished=True, status="success", result={"status": "success"})
+        query, params = cursor.execute.call_args_list[-1][0]
+        assert "status = %(status)s" in query
+        assert "finished_at = CURRENT_TIMESTAMP" in query
+        assert "started_at" not in query
+        assert params == {"status": "success", "result": '{"status": "success"}', "job_id": 7}
+
+    @pytest.mark.unit
+    def test_update_rejects_unknown_fields(self, db):
+        dh, conn, _ = db
+        with patch.object(dh, "get_connection", return_value=conn):
+            with pytest.raises(ValueError):
+                dh.update_simulation_job(7, game_id=2)
+
+    @pytest.mark.unit
+    def test_get_decodes_json_columns(self, db):
+        dh, conn, cursor = db
+        row = [None] * 16
+        row[0], row[1], row[2], row[5], row[10] = 7, 1, "running", '{"model": "m"}', None
+        cursor.fetchone.return_value = tuple(row)
+        with patch.object(dh, "get_connection", return_value=conn):
+            job = dh.get_simulation_job(7)
+        assert job["job_id"] == 7
+        assert job["status"] == "running"
+        assert job["params"] == {"model": "m"}
+        assert job["result"] is None
+
+
+class TestNormalizeCohortSchema:
+    @pytest.mark.unit
+    def test_adds_the_chat_usage_and_route_columns(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = (False, False, False, True, False)
+        dh._COHORT_SCHEMA_NORMALIZED = False
+
+        dh._normalize_cohort_schema(conn)
+
+        added = [call[0][0] for call in cursor.execute.call_args_list if "ADD COLUMN" in call[0][0]]
+        assert added == [
+            f"ALTER TABLE negotiation_chat ADD COLUMN IF NOT EXISTS {column} {column_type};"
+            for column, column_type in {**dh.NEGOTIATION_CHAT_USAGE_COLUMNS, "llm_route": "TEXT"}.items()
+        ]
+        conn.commit.assert_called_once()
+
+    @pytest.mark.unit
+    def test_creates_run_tables_and_context_columns(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = (False, True, False, False, True)
+        dh._COHORT_SCHEMA_NORMALIZED = False
+
+        dh._normalize_cohort_schema(conn)
+
+        queries = [call[0][0] for call in cursor.execute.call_args_list]
+        for table in ("negotiation_checkpoint", "simulation_job", "chat_work_unit"):
+            assert any(f"CREATE TABLE IF NOT EXISTS {table}" in q for q in queries)
+        assert any("ADD COLUMN IF NOT EXISTS context_mode" in q for q in queries)
+
+    @pytest.mark.unit
+    def test_hot_path_calls_run_no_ddl(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = None
+        cursor.fetchall.return_value = []
+        with patch.object(dh, "get_connection", return_value=conn):
+            dh.upsert_negotiation_checkpoint(1, 1, "T", 1, "T", 2, [])
+            dh.update_simulation_job(1, progress="p")
+            dh.claim_chat_work_unit(1, "w", 60)
+            dh.count_chat_work_units(1)
+
+        queries = [call[0][0] for call in cursor.execute.call_args_list]
+        assert not any("CREATE TABLE" in q or "ALTER TABLE" in q for q in queries)
+
+
+class TestUpdateNegotiationChatSummary:
+    @pytest.mark.unit
+    def test_back_fills_summary_and_adds_usage(self, db):
+        dh, conn, cursor = db
+        cursor.rowcount = 1
+        with patch.object(dh, "get_connection", return_value=conn):
+            updated = dh.update_negotiation_chat_summary(
+                1, 2, "T", 1, "T", 2, "Agreed value: 10", 10.0, usage={"prompt_tokens": 40}
+            )
+        assert updated is True
+        query, params = cursor.execute.call_args_list[-1][0]
+        assert "prompt_tokens = COALESCE(prompt_tokens, 0) + %(prompt_tokens)s" in query
+        assert params["deal_value"] == 10.0
+        assert params["prompt_tokens"] == 40
+        assert params["completion_tokens"] == 0
+        assert not any("ALTER TABLE" in call[0][0] for call in cursor.execute.call_args_list)
+        conn.commit.assert_called()
+
+
+class TestChatWorkUnits:
+    @pytest.mark.unit
+    def test_claim_skips_locked_rows_and_reclaims_expired_leases(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = (3, 1, 2, "T", 1, "T", 2, True, "leased", 2, "host:1")
+        with patch.object(dh, "get_connection", return_value=conn):
+            unit = dh.claim_chat_work_unit(1, "host:1", 300)
+        query, params = cursor.execute.call_args_list[-1][0]
+        assert "FOR UPDATE SKIP LOCKED" in query
+        assert "lease_expires_at < CURRENT_TIMESTAMP" in query
+        assert params == {"game_id": 1, "worker": "host:1", "lease_seconds": 300}
+        assert unit["unit_id"] == 3
+        assert unit["group1_initiates"] is True
+        assert unit["attempts"] == 2
+        conn.commit.assert_called()
+
+    @pytest.mark.unit
+    def test_claim_returns_none_when_queue_is_drained(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = None
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.claim_chat_work_unit(1, "host:1", 300) is None
+
+    @pytest.mark.unit
+    def test_finish_only_touches_the_workers_own_lease(self, db):
+        dh, conn, cursor = db
+        cursor.rowcount = 0
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.finish_chat_work_unit(3, "host:1", "done") is False
+        query, params = cursor.execute.call_args_list[-1][0]
+        assert "leased_by = %(worker)s" in query
+        assert params["status"] == "done"
+
+    @pytest.mark.unit
+    def test_enqueue_inserts_all_units_in_one_statement(self, db):
+        dh, conn, cursor = db
+        units = [
+            {
+                "round_number": 1,
+                "group1_class": "T",
+                "group1_id": 1,
+                "group2_class": "T",
+                "group2_id": group,
+                "group1_initiates": True,
+            }
+            for group in (2, 3)
+        ]
+        with (
+            patch.object(dh, "get_connection", return_value=conn),
+            patch.object(dh, "execute_values", return_value=[(7,)]) as execute_values,
+        ):
+            assert dh.enqueue_chat_work_units(1, units) == 1
+        execute_values.assert_called_once()
+        assert execute_values.call_args[0][2] == [(1, 1, "T", 1, "T", 2, True), (1, 1, "T", 1, "T", 3, True)]
+        conn.commit.assert_called_once()
+
+    @pytest.mark.unit
+    def test_count_ends_its_read_transaction(self, db):
+        dh, conn, cursor = db
+        cursor.fetchall.return_value = [("pending", 2), ("done", 1)]
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.count_chat_work_units(1) == {"pending": 2, "done": 1}
+        conn.commit.assert_called_once()
+
+
 # ---------------------------------------------------------------------------
 # get_negotiation_chat_details
 # ---------------------------------------------------------------------------
@@ -820,6 +1036,28 @@ class TestGroupValuesAndGameParams:
         assert len(result) == 2
         assert result[0]["class"] == "A"
 
+    @pytest.mark.unit
+    def test_get_game_team_inputs(self, db):
+        dh, conn, cursor = db
+        cursor.fetchall.return_value = [("A", 1, "buy #_;:) sell", "ts", 10, 20), ("B", 2, None, None, 15, 25)]
+        with patch.object(dh, "get_connection", return_value=conn):
+            result = dh.get_game_team_inputs(1)
+        assert cursor.execute.call_count == 1
+        assert result[("A", 1)] == {
+            "prompt": "buy #_;:) sell",
+            "updated_at": "ts",
+            "minimizer_value": 10,
+            "maximizer_value": 20,
+        }
+        assert result[("B", 2)]["prompt"] is None
+
+    @pytest.mark.unit
+    def test_get_game_team_inputs_error(self, db):
+        dh, conn, cursor = db
+        cursor.execute.side_effect = Exception("down")
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.get_game_team_inputs(1) is None
+
     @pytest.mark.unit
     def test_get_game_parameters_found(self, db):
         dh, conn, cursor = db
@@ -841,3 +1079,46 @@ class TestGroupValuesAndGameParams:
             result = dh.store_game_parameters(1, 5, 50, 10, 100)
         assert result is True
         conn.commit.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# negotiation_checkpoint
+# ---------------------------------------------------------------------------
+class TestNegotiationCheckpoints:
+    @pytest.mark.unit
+    def test_upsert_serializes_history(self, db):
+        dh, conn, cursor = db
+        history = [{"name": "Buyer", "content": "Open."}]
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.upsert_negotiation_checkpoint(1, 2, "A", 1, "B", 2, history) is True
+        params = cursor.execute.call_args[0][1]
+        assert params["history"] == '[{"name": "Buyer", "content": "Open."}]'
+        assert params["message_count"] == 1
+        conn.commit.assert_called()
+
+    @pytest.mark.unit
+    def test_get_returns_decoded_history(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = ('[{"name": "Buyer", "content": "Open."}]',)
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.get_negotiation_checkpoint(1, 2, "A", 1, "B", 2) == [{"name": "Buyer", "content": "Open."}]
+
+    @pytest.mark.unit
+    def test_get_returns_none_when_missing(self, db):
+        dh, conn, cursor = db
+        cursor.fetchone.return_value = None
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.get_negotiation_checkpoint(1, 2, "A", 1, "B", 2) is None
+
+    @pytest.mark.unit
+    def test_delete_for_game(self, db):
+        dh, conn, cursor = db
+        with patch.object(dh, "get_connection", return_value=conn):
+            assert dh.delete_negotiation_checkpoints(7) is True
+        assert cursor.execute.call_args[0][1] == {"game_id": 7}
+
+    @pytest.mark.unit
+    def test_upsert_returns_false_without_connection(self, db):
+        dh, _, _ = db
+        with patch.object(dh, "get_connection", return_value=None):
+            assert dh.upsert_negotiation_checkpoint(1, 2, "A", 1, "B", 2, []) is False
@@ -0,0 +1,168 @@
+"""Unit tests for the content-addressed LLM response cache."""
+
+import os
+import sqlite3
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.conversation_engine import ConversationEngine, GameAgent  # noqa: E402
+from modules.llm_cache import (  # noqa: E402
+    CACHE_READ_WRITE,
+    CACHE_RECORD,
+    CACHE_REPLAY,
+    LLMCacheMiss,
+    LLMResponseCache,
+    build_llm_cache,
+    cache_key,
+    open_llm_cache,
+)
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.llm_retry import ERROR_FATAL, classify_llm_error  # noqa: E402
+
+
+def _request(content="hi", model="m"):
+    return {"model": model, "messages": [{"role": "system", "content": "sys"}, {"role": "user", "content": content}]}
+
+
+def _engine(replies, cache):
+    with patch("modules.conversation_engine.OpenAI") as MockOpenAI:
+        client = MagicMock()
+        MockOpenAI.return_value = client
+        engine = ConversationEngine(LLMConfig(model="m", api_key="k"), cache=cache)
+    responses = []
+    for text in replies:
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = text
+        responses.append(response)
+    client.chat.completions.create.side_effect = responses
+    return engine, client.chat.completions.create
+
+
+class TestCacheKey:
+    @pytest.mark.unit
+    def test_key_is_stable_and_order_independent(self):
+        a = {"model": "m", "temperature": 0.2, "messages": [{"role": "user", "content": "x"}]}
+        b = {"messages": [{"content": "x", "role": "user"}], "temperature": 0.2, "model": "m"}
+        assert cache_key(a) == cache_key(b)
+
+    @pytest.mark.unit
+    def test_key_changes_with_any_request_field(self):
+        base = _request()
+        assert cache_key(base) != cache_key(_request(model="other"))
+        assert cache_key(base) != cache_key(_request(content="hello"))
+        assert cache_key(base) != cache_key({**base, "temperature": 0.5})
+
+
+class TestLLMResponseCache:
+    @pytest.mark.unit
+    def test_read_write_round_trip(self):
+        cache = LLMResponseCache(":memory:")
+        assert cache.lookup(_request()) is None
+        cache.store(_request(), "hello")
+        assert cache.lookup(_request()) == "hello"
+
+    @pytest.mark.unit
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "cache" / "responses.sqlite3")
+        LLMResponseCache(path).store(_request(), "stored")
+        assert LLMResponseCache(path, mode=CACHE_REPLAY).lookup(_request()) == "stored"
+
+    @pytest.mark.unit
+    def test_record_mode_never_serves_hits(self):
+        cache = LLMResponseCache(":memory:", mode=CACHE_RECORD)
+        cache.store(_request(), "first")
+        assert cache.lookup(_request()) is None
+        cache.store(_request(), "second")
+        cache.mode = CACHE_READ_WRITE
+        assert cache.lookup(_request()) == "second"
+
+    @pytest.mark.unit
+    def test_replay_mode_raises_on_miss_and_does_not_store(self):
+        cache = LLMResponseCache(":memory:", mode=CACHE_REPLAY)
+        cache.store(_request(), "ignored")
+        with pytest.raises(LLMCacheMiss):
+            cache.lookup(_request())
+        assert cache.stats()["entries"] == 0
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used_entries(self):
+        cache = LLMResponseCache(":memory:", max_entries=2)
+        cache.store(_request("a"), "A")
+        cache.store(_request("b"), "B")
+        with patch("modules.llm_cache.time.time", return_value=10**12):
+            cache.lookup(_request("a"))  # "a" becomes the most recently used
+        cache.store(_request("c"), "C")
+        assert cache.lookup(_request("b")) is None
+        assert cache.lookup(_request("a")) == "A"
+        assert cache.stats()["entries"] == 2
+
+    @pytest.mark.unit
+    def test_evicts_by_size(self):
+        cache = LLMResponseCache(":memory:", max_bytes=100)
+        for index in range(5):
+            cache.store(_request(str(index)), "x" * 30)
+        assert cache.stats()["bytes"] <= 100
+        assert cache.lookup(_request("4")) == "x" * 30
+
+    @pytest.mark.unit
+    def test_build_llm_cache_reads_environment(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+        assert build_llm_cache() is None
+        monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+        monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "c.sqlite3"))
+        cache = build_llm_cache()
+        assert cache.mode == CACHE_REPLAY
+        assert build_llm_cache("off") is None
+
+    @pytest.mark.unit
+    def test_open_llm_cache_closes_the_connection(self, tmp_path):
+        with open_llm_cache("read_write", str(tmp_path / "c.sqlite3")) as cache:
+            cache.store(_request(), "stored")
+        with pytest.raises(sqlite3.ProgrammingError):
+            cache.lookup(_request())
+        with open_llm_cache("off") as cache:
+            assert cache is None
+
+
+class TestEngineCaching:
+    @pytest.mark.unit
+    def test_identical_request_is_served_from_cache(self):
+        cache = LLMResponseCache(":memory:")
+        agent = GameAgent(name="A", system_message="sys")
+        engine, create = _engine(["fresh"], cache)
+        stats = {}
+
+        assert engine.single_decision(agent, "question", stats=stats) == "fresh"
+        assert engine.single_decision(agent, "question", stats=stats) == "fresh"
+
+        assert create.call_count == 1
+        assert stats == {"llm_calls": 1, "llm_cache_hits": 1}
+
+    @pytest.mark.unit
+    def test_replay_of_recorded_conversation_makes_no_calls(self):
+        cache = LLMResponseCache(":memory:", mode=CACHE_RECORD)
+        a1 = GameAgent(name="A", system_message="sys_a")
+        a2 = GameAgent(name="B", system_message="sys_b")
+        engine, _ = _engine(["Open.", "R1.", "R2."], cache)
+        recorded = engine.run_bilateral(a1, a2, max_turns=1).chat_history
+
+        cache.mode = CACHE_REPLAY
+        replay_engine, create = _engine([], cache)
+        replayed = replay_engine.run_bilateral(a1, a2, max_turns=1).chat_history
+
+        assert replayed == recorded
+        create.assert_not_called()
+
+    @pytest.mark.unit
+    def test_replay_miss_is_a_fatal_error(self):
+        cache = LLMResponseCache(":memory:", mode=CACHE_REPLAY)
+        engine, create = _engine(["unused"], cache)
+        with pytest.raises(LLMCacheMiss) as excinfo:
+            engine.single_decision(GameAgent(name="A", system_message="sys"), "question")
+        assert classify_llm_error(excinfo.value) == ERROR_FATAL
+        create.assert_not_called()
@@ -0,0 +1,106 @@
+"""Unit tests for spreading chats across several API keys."""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.llm_key_pool import KeyPool, NoHealthyKeyError, mask_api_key  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _error(error_cls, status, code=None):
+    response = MagicMock(status_code=status, headers={}, request=MagicMock())
+    return error_cls("error", response=response, body={"error": {"code": code}} if code else None)
+
+
+def _pool(count=2, **kwargs):
+    configs = [LLMConfig(model="m", api_key=f"sk-key-number-{i}") for i in range(count)]
+    return KeyPool(configs, lambda config: config.api_key, **kwargs)
+
+
+class TestKeyPool:
+    @pytest.mark.unit
+    def test_leases_the_least_busy_key(self):
+        pool = _pool(3)
+
+        leased = [pool.acquire() for _ in range(4)]
+
+        assert [key.engine for key in leased] == [
+            "sk-key-number-0",
+            "sk-key-number-1",
+            "sk-key-number-2",
+            "sk-key-number-0",
+        ]
+
+    @pytest.mark.unit
+    def test_throttled_key_rests_with_growing_cooldown(self):
+        clock = FakeClock()
+        pool = _pool(2, cooldown_seconds=10, clock=clock)
+        first = pool.acquire()
+        pool.release(first, rate_limited=2)
+
+        assert pool.acquire() is not first
+        assert pool.summary()[0]["cooldown_seconds"] == 10
+
+        clock.now += 11
+        again = pool.acquire()
+        assert again is first
+        pool.release(again, rate_limited=1)
+        assert pool.summary()[0]["cooldown_seconds"] == 20
+        assert pool.summary()[0]["throttled_chats"] == 2
+
+    @pytest.mark.unit
+    def test_cooling_keys_are_still_used_when_nothing_else_is_left(self):
+        clock = FakeClock()
+        pool = _pool(2, cooldown_seconds=10, clock=clock)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first, rate_limited=1)
+        clock.now += 1
+        pool.release(second, rate_limited=1)
+
+        assert pool.acquire() is first
+
+    @pytest.mark.unit
+    def test_rejected_and_exhausted_keys_leave_the_rotation(self):
+        pool = _pool(2)
+        first, second = pool.acquire(), pool.acquire()
+        auth_error = _error(openai.AuthenticationError, 401)
+        quota_error = _error(openai.RateLimitError, 429, code="insufficient_quota")
+
+        assert pool.can_fail_over(auth_error)
+        pool.release(first, error=auth_error)
+        assert pool.acquire() is second
+        pool.release(second, error=quota_error)
+
+        assert not pool.can_fail_over(auth_error)
+        with pytest.raises(NoHealthyKeyError):
+            pool.acquire()
+        assert all(key["disabled"] for key in pool.summary())
+
+    @pytest.mark.unit
+    def test_repeated_failures_cool_a_key_down(self):
+        pool = _pool(1, max_consecutive_failures=2)
+        for _ in range(2):
+            pool.release(pool.acquire(), error=TimeoutError())
+
+        assert pool.summary()[0]["failures"] == 2
+        assert pool.summary()[0]["cooldown_seconds"] > 0
+        assert not pool.can_fail_over(TimeoutError())
+
+    @pytest.mark.unit
+    def test_mask_api_key(self):
+        assert mask_api_key("sk-abcdefghijkl") == "sk-...ijkl"
+        assert mask_api_key("") == "(none)"
@@ -0,0 +1,192 @@
+"""Unit tests for the offline mock LLM backend."""
+
+import asyncio
+import os
+import sys
+
+import openai
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.conversation_engine import AsyncConversationEngine, ConversationEngine  # noqa: E402
+from modules.llm_mock import (  # noqa: E402
+    AsyncMockOpenAI,
+    MockLLMBackend,
+    MockLLMSettings,
+    MockOpenAI,
+    is_mock_base_url,
+    parse_mock_base_url,
+)
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.llm_retry import ERROR_RETRYABLE, classify_llm_error, retry_after_seconds  # noqa: E402
+from modules.negotiations import _make_termination_fn  # noqa: E402
+from modules.negotiations_agents import build_team_agents  # noqa: E402
+from modules.negotiations_summary import build_summary_agent, evaluate_deal_summary  # noqa: E402
+
+TERMINATION = "Pleasure doing business with you"
+
+
+def _team(group_id):
+    return build_team_agents(("T", group_id), ["buy low", "sell high"], 50, 40, ["Buyer", "Seller"], TERMINATION)
+
+
+class TestMockUrl:
+    @pytest.mark.unit
+    def test_detects_mock_scheme(self):
+        assert is_mock_base_url("mock://?latency=0.1")
+        assert not is_mock_base_url("https://api.openai.com/v1")
+        assert not is_mock_base_url(None)
+
+    @pytest.mark.unit
+    def test_parses_query_parameters(self):
+        settings = parse_mock_base_url("mock://?latency=0.25&latency_dist=lognormal&rate_limit=0.1&agree_after=4")
+        assert settings.latency == 0.25
+        assert settings.latency_dist == "lognormal"
+        assert settings.rate_limit == 0.1
+        assert settings.agree_after == 4
+
+    @pytest.mark.unit
+    def test_rejects_unknown_parameters(self):
+        with pytest.raises(ValueError):
+            parse_mock_base_url("mock://?latencyy=1")
+
+
+class TestScriptedNegotiation:
+    @pytest.mark.unit
+    def test_negotiation_terminates_and_summary_reports_deal(self):
+        engine = ConversationEngine(LLMConfig(model="mock", api_key="mock", base_url="mock://?agree_after=4"))
+        team1, team2 = _team(1), _team(2)
+
+        chat = engine.run_bilateral(team1["Agent 1"], team2["Agent 2"], 10, _make_termination_fn(TERMINATION))
+
+        assert len(chat.chat_history) == 5
+        assert TERMINATION in chat.chat_history[-1]["content"]
+
+        summary_text, deal = evaluate_deal_summary(
+            engine,
+            chat.chat_history,
+            "Summarize.",
+            "Agreed value:",
+            build_summary_agent("Agreed value:", TERMINATION),
+        )
+        assert "Agreed value:" in summary_text
+        assert deal == float(chat.chat_history[-1]["content"].rsplit("$", 1)[1])
+
+    @pytest.mark.unit
+    def test_no_deal_conversations_run_to_max_turns(self):
+        engine = ConversationEngine(LLMConfig(model="mock", api_key="mock", base_url="mock://?no_deal=1"))
+        team1, team2 = _team(1), _team(2)
+
+        chat = engine.run_bilateral(team1["Agent 1"], team2["Agent 2"], 3, _make_termination_fn(TERMINATION))
+
+        assert len(chat.chat_history) == 7
+        summary_text, deal = evaluate_deal_summary(
+            engine, chat.chat_history, "", "Agreed value:", build_summary_agent("Agreed value:", TERMINATION)
+        )
+        assert deal is None
+        assert summary_text.endswith("Agreed value: None")
+
+    @pytest.mark.unit
+    def test_structured_summary_reports_deal(self):
+        engine = ConversationEngine(LLMConfig(model="mock", api_key="mock", base_url="mock://?agree_after=4"))
+        team1, team2 = _team(1), _team(2)
+        chat = engine.run_bilateral(team1["Agent 1"], team2["Agent 2"], 10, _make_termination_fn(TERMINATION))
+
+        summary_text, deal = evaluate_deal_summary(
+            engine,
+            chat.chat_history,
+            "Summarize.",
+            "Agreed value:",
+            build_summary_agent("Agreed value:", TERMINATION, structured=True),
+        )
+
+        assert deal == float(chat.chat_history[-1]["content"].rsplit("$", 1)[1])
+        assert summary_text == f"Both parties confirmed the deal at ${deal:g}.\nAgreed value: {deal:g}"
+
+    @pytest.mark.unit
+    def test_replies_are_deterministic(self):
+        messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "I can offer $10."}]
+        assert MockLLMBackend().reply(messages) == MockLLMBackend().reply(messages)
+
+    @pytest.mark.unit
+    def test_completion_reports_usage(self):
+        client = MockOpenAI()
+        response = client.chat.completions.create(model="mock", messages=[{"role": "system", "content": "sys"}])
+        assert response.choices[0].message.content
+        assert response.usage.prompt_tokens > 0
+        assert response.usage.completion_tokens > 0
+
+    @pytest.mark.unit
+    def test_repeated_prefixes_report_cached_tokens(self):
+        client = MockOpenAI(MockLLMBackend(MockLLMSettings(prefix_cache_min_tokens=128)))
+        system = {"role": "system", "content": "x" * 2000}
+
+        first = client.chat.completions.create(model="mock", messages=[system, {"role": "user", "content": "a"}])
+        second = client.chat.completions.create(model="mock", messages=[system, {"role": "user", "content": "b"}])
+
+        assert first.usage.prompt_tokens_details.cached_tokens == 0
+        # The 504-token system message is cached in whole 128-token blocks.
+        assert second.usage.prompt_tokens_details.cached_tokens == 384
+
+    @pytest.mark.unit
+    def test_streamed_chunks_rebuild_the_completion(self):
+        client = MockOpenAI()
+        request = {"model": "mock", "messages": [{"role": "user", "content": "hi"}]}
+        expected = client.chat.completions.create(**request)
+
+        chunks = list(client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True}))
+
+        text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+        assert text == expected.choices[0].message.content
+        assert len(chunks) > 3
+        assert chunks[-1].choices == []
+        assert chunks[-1].usage.completion_tokens == expected.usage.completion_tokens
+
+
+class TestFaultInjection:
+    @pytest.mark.unit
+    def test_rate_limit_errors_are_retryable_with_hint(self):
+        client = MockOpenAI(MockLLMBackend(MockLLMSettings(rate_limit=1.0, retry_after=2.0)))
+        with pytest.raises(openai.RateLimitError) as excinfo:
+            client.chat.completions.create(model="mock", messages=[])
+        assert classify_llm_error(excinfo.value) == ERROR_RETRYABLE
+        assert retry_after_seconds(excinfo.value) == 2.0
+
+    @pytest.mark.unit
+    def test_server_errors(self):
+        client = MockOpenAI(MockLLMBackend(MockLLMSettings(error=1.0)))
+        with pytest.raises(openai.InternalServerError):
+            client.chat.completions.create(model="mock", messages=[])
+
+    @pytest.mark.unit
+    def test_fault_sequence_is_seeded(self):
+        def outcomes(seed):
+            backend = MockLLMBackend(MockLLMSettings(rate_limit=0.5, seed=seed))
+            return [backend.plan({"messages": []})[1] is None for _ in range(20)]
+
+        assert outcomes(3) == outcomes(3)
+        assert not all(outcomes(3))
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("dist", ["uniform", "exponential", "lognormal"])
+    def test_latency_distributions_are_non_negative(self, dist):
+        backend = MockLLMBackend(MockLLMSettings(latency=0.1, latency_dist=dist))
+        delays = [backend.plan({"messages": []})[0] for _ in range(50)]
+        assert all(delay >= 0 for delay in delays)
+        assert len(set(delays)) > 1
+
+
+class TestAsyncMock:
+    @pytest.mark.unit
+    def test_async_engine_uses_mock_client(self):
+        engine = AsyncConversationEngine(LLMConfig(model="mock", api_key="mock", base_url="mock://?agree_after=2"))
+        assert isinstance(engine.client, AsyncMockOpenAI)
+        team1, team2 = _team(1), _team(2)
+
+        chat = asyncio.run(
+            engine.run_bilateral(team1["Agent 1"], team2["Agent 2"], 5, _make_termination_fn(TERMINATION))
+        )
+
+        assert len(chat.chat_history) == 3
+        assert TERMINATION in chat.chat_history[-1]["content"]
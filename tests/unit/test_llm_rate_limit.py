@@ -0,0 +1,129 @@
+"""Unit tests for the process-wide LLM rate limiter."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.conversation_engine import ConversationEngine, GameAgent  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.llm_rate_limit import (  # noqa: E402
+    RateLimiter,
+    estimate_prompt_tokens,
+    get_rate_limiter,
+    rate_limit_utilization,
+    reset_rate_limiters,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry(monkeypatch):
+    monkeypatch.delenv("LLM_REQUESTS_PER_MINUTE", raising=False)
+    monkeypatch.delenv("LLM_TOKENS_PER_MINUTE", raising=False)
+    reset_rate_limiters()
+    yield
+    reset_rate_limiters()
+
+
+class TestRateLimiter:
+    @pytest.mark.unit
+    def test_requests_beyond_the_burst_wait_in_order(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst_seconds=2, clock=clock)
+
+        delays = [limiter.reserve(0) for _ in range(4)]
+
+        # Two requests fit in the burst, then one per second.
+        assert delays == [0.0, 0.0, 1.0, 2.0]
+        clock.now += 10
+        assert limiter.reserve(0) == 0.0
+
+    @pytest.mark.unit
+    def test_token_budget_is_corrected_by_reported_usage(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=600, burst_seconds=10, clock=clock)  # 10 tokens/s, burst 100
+
+        assert limiter.reserve(100) == 0.0
+        limiter.settle(100, 40)  # the request was smaller than estimated
+
+        assert limiter.reserve(60) == 0.0
+        assert limiter.reserve(10) == pytest.approx(1.0)
+
+    @pytest.mark.unit
+    def test_utilization_reports_last_minute_traffic(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000, clock=clock)
+        limiter.reserve(200)
+        limiter.reserve(300)
+        limiter.settle(300, 400)
+
+        usage = limiter.utilization()
+
+        assert usage["requests_last_minute"] == 2
+        assert usage["tokens_last_minute"] == 600
+        assert usage["request_utilization"] == 0.2
+        assert usage["token_utilization"] == 0.6
+        clock.now += 61
+        assert limiter.utilization()["requests_last_minute"] == 0
+
+    @pytest.mark.unit
+    def test_old_traffic_is_dropped_without_reading_utilization(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        for _ in range(100):
+            limiter.reserve(10)
+            limiter.settle(10, 12)
+            clock.now += 1
+
+        assert len(limiter._recent) <= 2 * 61
+
+    @pytest.mark.unit
+    def test_estimate_prompt_tokens(self):
+        assert estimate_prompt_tokens([{"role": "user", "content": "x" * 400}, {"role": "system"}]) == 108
+
+
+class TestRateLimiterRegistry:
+    @pytest.mark.unit
+    def test_engines_share_a_limiter_per_account_and_model(self):
+        limited = LLMConfig(model="m", api_key="k", requests_per_minute=100)
+
+        first = get_rate_limiter(limited)
+
+        assert get_rate_limiter(LLMConfig(model="m", api_key="k")) is first
+        assert get_rate_limiter(LLMConfig(model="m", api_key="other")) is None
+        assert get_rate_limiter(LLMConfig(model="other", api_key="k", tokens_per_minute=5)) is not first
+        assert rate_limit_utilization(LLMConfig(model="m", api_key="k"))["requests_per_minute"] == 100
+
+    @pytest.mark.unit
+    def test_environment_limits_apply(self, monkeypatch):
+        monkeypatch.setenv("LLM_TOKENS_PER_MINUTE", "20000")
+
+        limiter = get_rate_limiter(LLMConfig(model="m", api_key="k"))
+
+        assert limiter.utilization()["tokens_per_minute"] == 20000
+
+    @pytest.mark.unit
+    def test_engine_waits_for_budget_before_dispatch(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", sleeps.append)
+        config = LLMConfig(model="mock", api_key="k", base_url="mock://?seed=1", requests_per_minute=6)
+        engine = ConversationEngine(config)
+        stats = {}
+
+        for _ in range(3):
+            engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+
+        # The burst holds one request; the sleeps are faked, so the debt grows by 10s per call.
+        assert sleeps == [pytest.approx(10.0, abs=0.1), pytest.approx(20.0, abs=0.1)]
+        assert stats["llm_throttle_waits"] == 2
+        assert stats["llm_calls"] == 3
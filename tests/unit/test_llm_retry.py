@@ -0,0 +1,145 @@
+"""Unit tests for LLM error classification and the retry policy."""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+STREAMLIT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../streamlit"))
+if STREAMLIT_PATH not in sys.path:
+    sys.path.insert(0, STREAMLIT_PATH)
+
+from modules.llm_retry import (  # noqa: E402
+    ERROR_AUTH,
+    ERROR_FATAL,
+    ERROR_RETRYABLE,
+    RetryPolicy,
+    classify_llm_error,
+    retry_after_seconds,
+    run_abort_reason,
+)
+
+
+def _status_error(error_cls, status, headers=None, body=None):
+    response = MagicMock(status_code=status, headers=headers or {}, request=MagicMock())
+    return error_cls("error", response=response, body=body)
+
+
+class TestClassifyLlmError:
+    @pytest.mark.unit
+    def test_rate_limit_is_retryable(self):
+        assert classify_llm_error(_status_error(openai.RateLimitError, 429)) == ERROR_RETRYABLE
+
+    @pytest.mark.unit
+    def test_insufficient_quota_is_fatal(self):
+        error = _status_error(openai.RateLimitError, 429, body={"code": "insufficient_quota"})
+        assert classify_llm_error(error) == ERROR_FATAL
+
+    @pytest.mark.unit
+    def test_server_error_is_retryable(self):
+        assert classify_llm_error(_status_error(openai.InternalServerError, 503)) == ERROR_RETRYABLE
+
+    @pytest.mark.unit
+    def test_timeout_is_retryable(self):
+        assert classify_llm_error(openai.APITimeoutError(request=MagicMock())) == ERROR_RETRYABLE
+
+    @pytest.mark.unit
+    def test_connection_error_is_retryable(self):
+        assert classify_llm_error(openai.APIConnectionError(request=MagicMock())) == ERROR_RETRYABLE
+
+    @pytest.mark.unit
+    def test_authentication_is_auth(self):
+        assert classify_llm_error(_status_error(openai.AuthenticationError, 401)) == ERROR_AUTH
+
+    @pytest.mark.unit
+    def test_permission_denied_is_auth(self):
+        assert classify_llm_error(_status_error(openai.PermissionDeniedError, 403)) == ERROR_AUTH
+
+    @pytest.mark.unit
+    def test_bad_request_is_fatal(self):
+        assert classify_llm_error(_status_error(openai.BadRequestError, 400)) == ERROR_FATAL
+
+    @pytest.mark.unit
+    def test_not_found_is_fatal(self):
+        assert classify_llm_error(_status_error(openai.NotFoundError, 404)) == ERROR_FATAL
+
+    @pytest.mark.unit
+    def test_builtin_timeout_is_retryable(self):
+        assert classify_llm_error(TimeoutError()) == ERROR_RETRYABLE
+
+    @pytest.mark.unit
+    def test_unknown_exception_is_fatal(self):
+        assert classify_llm_error(ValueError("bug")) == ERROR_FATAL
+
+
+class TestRunAbortReason:
+    @pytest.mark.unit
+    def test_run_wide_failures(self):
+        assert run_abort_reason(_status_error(openai.AuthenticationError, 401)) == "auth"
+        quota = _status_error(openai.RateLimitError, 429, body={"error": {"code": "insufficient_quota"}})
+        assert run_abort_reason(quota) == "quota"
+        assert run_abort_reason(_status_error(openai.NotFoundError, 404)) == "model_not_found"
+        unknown_model = _status_error(openai.BadRequestError, 400, body={"code": "model_not_found"})
+        assert run_abort_reason(unknown_model) == "model_not_found"
+
+    @pytest.mark.unit
+    def test_chat_local_failures_do_not_abort(self):
+        assert run_abort_reason(_status_error(openai.RateLimitError, 429)) is None
+        assert run_abort_reason(_status_error(openai.BadRequestError, 400)) is None
+        assert run_abort_reason(ValueError("bug")) is None
+
+
+class TestRetryAfterSeconds:
+    @pytest.mark.unit
+    def test_seconds_header(self):
+        error = _status_error(openai.RateLimitError, 429, headers={"retry-after": "7"})
+        assert retry_after_seconds(error) == 7.0
+
+    @pytest.mark.unit
+    def test_milliseconds_header_preferred(self):
+        error = _status_error(openai.RateLimitError, 429, headers={"retry-after-ms": "250", "retry-after": "7"})
+        assert retry_after_seconds(error) == 0.25
+
+    @pytest.mark.unit
+    def test_http_date_header(self):
+        error = _status_error(openai.RateLimitError, 429, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        # A date in the past means "retry now"
+        assert retry_after_seconds(error) == 0.0
+
+    @pytest.mark.unit
+    def test_missing_header(self):
+        assert retry_after_seconds(_status_error(openai.RateLimitError, 429)) is None
+
+    @pytest.mark.unit
+    def test_error_without_response(self):
+        assert retry_after_seconds(ValueError("x")) is None
+
+
+class TestRetryPolicy:
+    @pytest.mark.unit
+    def test_exponential_backoff_without_jitter(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=30.0, jitter=0)
+        assert [policy.delay_seconds(n) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 8.0]
+
+    @pytest.mark.unit
+    def test_backoff_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0)
+        assert policy.delay_seconds(10) == 5.0
+
+    @pytest.mark.unit
+    def test_jitter_stays_within_bounds(self):
+        policy = RetryPolicy(base_delay=2.0, jitter=0.5)
+        delays = [policy.delay_seconds(1) for _ in range(50)]
+        assert all(1.0 <= d <= 2.0 for d in delays)
+
+    @pytest.mark.unit
+    def test_retry_after_overrides_backoff(self):
+        policy = RetryPolicy(base_delay=1.0, max_retry_after=60.0)
+        assert policy.delay_seconds(1, retry_after=12.0) == 12.0
+
+    @pytest.mark.unit
+    def test_retry_after_capped(self):
+        policy = RetryPolicy(max_retry_after=10.0)
+        assert policy.delay_seconds(1, retry_after=300.0) == 10.0
@@ -0,0 +1,280 @@
+"""Unit tests for provider failover and circuit breakers."""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import openai
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.conversation_engine import AsyncConversationEngine, ConversationEngine, GameAgent  # noqa: E402
+from modules.llm_cache import LLMResponseCache  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.llm_routing import (  # noqa: E402
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    fallbacks_from_env,
+    format_route,
+    get_circuit_breaker,
+    reset_circuit_breakers,
+    route_calls,
+    route_label,
+)
+from modules.negotiations_common import build_llm_config  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fresh_breakers():
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _api_error(error_cls, status):
+    response = MagicMock(status_code=status, headers={}, request=MagicMock())
+    return error_cls("error", response=response, body=None)
+
+
+def _text_response(text):
+    resp = MagicMock()
+    resp.choices = [MagicMock()]
+    resp.choices[0].message.content = text
+    resp.choices[0].finish_reason = "stop"
+    return resp
+
+
+class TestCircuitBreaker:
+    @pytest.mark.unit
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == CIRCUIT_OPEN
+        assert not breaker.allow()
+        assert breaker.times_opened == 1
+
+    @pytest.mark.unit
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CIRCUIT_CLOSED
+
+    @pytest.mark.unit
+    def test_half_open_lets_one_trial_through(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now += 10
+        assert breaker.allow()
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == CIRCUIT_CLOSED
+        assert breaker.allow()
+
+    @pytest.mark.unit
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == CIRCUIT_OPEN
+        assert not breaker.allow()
+        assert breaker.times_opened == 2
+
+    @pytest.mark.unit
+    def test_breakers_are_shared_per_endpoint_key_and_model(self):
+        config = LLMConfig(model="m", api_key="k", base_url="https://openrouter.ai/api/v1")
+
+        assert get_circuit_breaker(config) is get_circuit_breaker(LLMConfig(**vars(config)))
+        assert get_circuit_breaker(config) is not get_circuit_breaker(LLMConfig(model="m", api_key="k"))
+
+
+class TestRouteLabels:
+    @pytest.mark.unit
+    def test_route_label_has_host_and_model_only(self):
+        assert route_label(LLMConfig(model="gpt-5-mini", api_key="sk-secret")) == "api.openai.com:gpt-5-mini"
+        label = route_label(
+            LLMConfig(model="openai/gpt-4o", api_key="sk-secret", base_url="https://openrouter.ai/api/v1")
+        )
+        assert label == "openrouter.ai:openai/gpt-4o"
+
+    @pytest.mark.unit
+    def test_format_route(self):
+        assert format_route({"llm_calls": 3}) is None
+        assert format_route({"llm_route:a:m": 3}) == "a:m"
+        stats = {"llm_calls": 12, "llm_route:a:m": 2, "llm_route:b:n": 10}
+        assert route_calls(stats) == {"a:m": 2, "b:n": 10}
+        assert format_route(stats) == "b:n (10), a:m (2)"
+
+
+def _engine_with_fallback():
+    fallback = LLMConfig(model="fallback-model", api_key="k2", base_url="https://openrouter.ai/api/v1")
+    engine = ConversationEngine(LLMConfig(model="primary-model", api_key="k1", fallbacks=[fallback]))
+    engine.client = MagicMock()
+    engine._fallback_routes[0].client = MagicMock()
+    return engine, engine.client.chat.completions.create, engine._fallback_routes[0].client.chat.completions.create
+
+
+class TestFailover:
+    @pytest.mark.unit
+    def test_fails_over_when_the_primary_breaker_opens(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        primary.side_effect = [_api_error(openai.InternalServerError, 500)] * 3
+        fallback.return_value = _text_response("From the fallback.")
+        stats = {}
+
+        reply = engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+
+        assert reply == "From the fallback."
+        assert primary.call_count == 3
+        request = fallback.call_args.kwargs
+        assert request["model"] == "fallback-model"
+        assert "prompt_cache_key" not in request
+        assert stats["llm_failovers"] == 1
+        assert route_calls(stats) == {"openrouter.ai:fallback-model": 1}
+
+    @pytest.mark.unit
+    def test_open_breaker_skips_the_primary_until_it_recovers(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        clock = FakeClock()
+        engine.breaker._clock = clock
+        primary.side_effect = [
+            openai.APITimeoutError(request=MagicMock()),
+            openai.APITimeoutError(request=MagicMock()),
+            openai.APITimeoutError(request=MagicMock()),
+            _text_response("Primary is back."),
+        ]
+        fallback.return_value = _text_response("Fallback.")
+        agent = GameAgent(name="A", system_message="a")
+
+        assert engine.single_decision(agent, "1") == "Fallback."
+        assert engine.single_decision(agent, "2") == "Fallback."
+        assert primary.call_count == 3
+
+        clock.now += engine.breaker.reset_seconds
+        stats = {}
+        assert engine.single_decision(agent, "3", stats=stats) == "Primary is back."
+        assert route_calls(stats) == {"api.openai.com:primary-model": 1}
+        assert engine.breaker.state == CIRCUIT_CLOSED
+
+    @pytest.mark.unit
+    def test_rejected_requests_do_not_fail_over(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        primary.side_effect = [_api_error(openai.BadRequestError, 400)]
+
+        with pytest.raises(openai.BadRequestError):
+            engine.single_decision(GameAgent(name="A", system_message="a"), "hi")
+        assert fallback.call_count == 0
+        assert engine.breaker.state == CIRCUIT_CLOSED
+
+    @pytest.mark.unit
+    def test_fallback_replies_are_not_cached_under_the_primary_request(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        engine.cache = LLMResponseCache(":memory:")
+        primary.side_effect = [_api_error(openai.InternalServerError, 500)] * 3 + [_text_response("From the primary.")]
+        fallback.return_value = _text_response("From the fallback.")
+        agent = GameAgent(name="A", system_message="a")
+
+        assert engine.single_decision(agent, "hi") == "From the fallback."
+        engine.breaker.record_success()
+        stats = {}
+        assert engine.single_decision(agent, "hi", stats=stats) == "From the primary."
+        assert "llm_cache_hits" not in stats
+        assert engine.single_decision(agent, "hi", stats=stats) == "From the primary."
+        assert stats["llm_cache_hits"] == 1
+
+    @pytest.mark.unit
+    def test_usage_is_counted_under_the_model_that_served_it(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        primary.side_effect = [_api_error(openai.InternalServerError, 500)] * 3
+        reply = _text_response("From the fallback.")
+        reply.usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+        fallback.return_value = reply
+        stats = {}
+
+        engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+
+        assert stats["model_usage:fallback-model:prompt_tokens"] == 100
+        assert stats["model_usage:fallback-model:completion_tokens"] == 10
+        assert not any(key.startswith("model_usage:primary-model") for key in stats)
+
+    @pytest.mark.unit
+    def test_rate_limits_do_not_open_the_breaker(self, monkeypatch):
+        monkeypatch.setattr("modules.conversation_engine.time.sleep", lambda _s: None)
+        engine, primary, fallback = _engine_with_fallback()
+        primary.side_effect = [_api_error(openai.RateLimitError, 429)] * 4 + [_text_response("Primary.")]
+
+        reply = engine.single_decision(GameAgent(name="A", system_message="a"), "hi")
+
+        assert reply == "Primary."
+        assert fallback.call_count == 0
+        assert engine.breaker.state == CIRCUIT_CLOSED
+        assert engine.breaker.failures == 0
+
+    @pytest.mark.unit
+    def test_fallbacks_are_opt_in(self, monkeypatch):
+        monkeypatch.setenv("LLM_FALLBACK_BASE_URL", "https://openrouter.ai/api/v1")
+        monkeypatch.setenv("LLM_FALLBACK_MODEL", "fallback-model")
+
+        assert build_llm_config("primary-model", "k").fallbacks is None
+        assert fallbacks_from_env()[0].model == "fallback-model"
+
+    @pytest.mark.unit
+    def test_no_route_stats_without_fallbacks(self):
+        engine = ConversationEngine(LLMConfig(model="m", api_key="k"))
+        engine.client = MagicMock()
+        engine.client.chat.completions.create.return_value = _text_response("ok")
+        stats = {}
+
+        engine.single_decision(GameAgent(name="A", system_message="a"), "hi", stats=stats)
+
+        assert engine.breaker is None
+        assert stats == {"llm_calls": 1}
+        assert engine.route_label == "api.openai.com:m"
+
+    @pytest.mark.unit
+    def test_async_engine_closes_every_route_client(self):
+        fallback = LLMConfig(model="fallback-model", api_key="k2", base_url="https://backup.example/v1")
+        engine = AsyncConversationEngine(LLMConfig(model="primary-model", api_key="k1", fallbacks=[fallback]))
+        clients = [engine.client, engine._fallback_routes[0].client]
+        for client in clients:
+            client.close = AsyncMock()
+
+        asyncio.run(engine.aclose())
+
+        for client in clients:
+            client.close.assert_awaited_once()
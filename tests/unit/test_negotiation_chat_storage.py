@@ -64,6 +64,39 @@ class TestNegotiationChatStorage:
         assert params["group2_id"] == 4
         assert params["transcript"] == "chat transcript"
 
+    @pytest.mark.unit
+    def test_insert_negotiation_chat_writes_usage_columns(self, real_database_handler):
+        """Test that usage is written with the chat without altering the table."""
+        database_handler, cursor = real_database_handler
+        cursor.fetchall.return_value = [
+            ("transcript",),
+            ("prompt_tokens",),
+            ("completion_tokens",),
+            ("cached_tokens",),
+            ("cost_usd",),
+        ]
+        usage = {"prompt_tokens": 1200, "completion_tokens": 300, "cached_tokens": 0, "cost_usd": 0.0009}
+
+        with patch.object(database_handler, "get_db_connection_string", return_value="db"):
+            result = database_handler.insert_negotiation_chat(
+                game_id=1,
+                round_number=2,
+                group1_class="A",
+                group1_id=3,
+                group2_class="B",
+                group2_id=4,
+                transcript="chat transcript",
+                usage=usage,
+            )
+
+        assert result is True
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert not any("ALTER TABLE negotiation_chat" in statement for statement in statements)
+        query, params = cursor.execute.call_args[0]
+        assert "cost_usd = EXCLUDED.cost_usd" in query
+        assert params["prompt_tokens"] == 1200
+        assert params["cost_usd"] == 0.0009
+
     @pytest.mark.unit
     def test_get_negotiation_chat_returns_transcript(self, real_database_handler):
         """Test that get_negotiation_chat returns the transcript when found."""
@@ -0,0 +1,233 @@
+"""Unit tests for the negotiation chat execution backends."""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+STREAMLIT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../streamlit"))
+if STREAMLIT_PATH not in sys.path:
+    sys.path.insert(0, STREAMLIT_PATH)
+
+from modules.negotiations_executor import (  # noqa: E402
+    UNIT_NOT_READY,
+    AIMDConcurrencyController,
+    SerialMatchExecutor,
+    ThreadPoolMatchExecutor,
+    build_match_executor,
+)
+
+
+def _collect(executor, units, work_fn):
+    events, results = [], []
+    callback_threads = set()
+
+    def on_event(event):
+        callback_threads.add(threading.get_ident())
+        events.append(event)
+
+    def on_result(unit, result):
+        callback_threads.add(threading.get_ident())
+        results.append((unit, result))
+
+    executor.run(units, work_fn, on_event, on_result)
+    return events, results, callback_threads
+
+
+class TestBuildMatchExecutor:
+    @pytest.mark.unit
+    def test_single_concurrency_is_serial(self):
+        assert isinstance(build_match_executor(1), SerialMatchExecutor)
+        assert isinstance(build_match_executor(None), SerialMatchExecutor)
+
+    @pytest.mark.unit
+    def test_higher_concurrency_uses_thread_pool(self):
+        executor = build_match_executor(4)
+        assert isinstance(executor, ThreadPoolMatchExecutor)
+        assert executor.max_concurrency == 4
+
+    @pytest.mark.unit
+    def test_invalid_thread_pool_size(self):
+        with pytest.raises(ValueError):
+            ThreadPoolMatchExecutor(0)
+
+
+class TestSerialMatchExecutor:
+    @pytest.mark.unit
+    def test_runs_in_order_with_events(self):
+        def work(unit, emit):
+            emit({"unit": unit})
+            return unit * 10
+
+        events, results, _ = _collect(SerialMatchExecutor(), [1, 2, 3], work)
+
+        assert [e["unit"] for e in events] == [1, 2, 3]
+        assert results == [(1, 10), (2, 20), (3, 30)]
+
+    @pytest.mark.unit
+    def test_waits_while_units_are_not_ready(self):
+        executor = SerialMatchExecutor()
+        executor.poll_interval = 0
+
+        _, results, _ = _collect(executor, [1, UNIT_NOT_READY, UNIT_NOT_READY, 2], lambda unit, emit: unit)
+
+        assert results == [(1, 1), (2, 2)]
+
+
+class TestThreadPoolMatchExecutor:
+    @pytest.mark.unit
+    def test_callbacks_run_on_calling_thread(self):
+        def work(unit, emit):
+            emit({"unit": unit, "thread": threading.get_ident()})
+            return unit
+
+        events, results, callback_threads = _collect(ThreadPoolMatchExecutor(3), range(6), work)
+
+        assert callback_threads == {threading.get_ident()}
+        assert sorted(r for _, r in results) == list(range(6))
+        assert len(events) == 6
+        assert all(e["thread"] != threading.get_ident() for e in events)
+
+    @pytest.mark.unit
+    def test_respects_concurrency_limit(self):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def work(unit, emit):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return unit
+
+        _collect(ThreadPoolMatchExecutor(2, poll_interval=0.01), range(8), work)
+
+        assert state["peak"] == 2
+
+    @pytest.mark.unit
+    def test_wall_time_scales_with_concurrency(self):
+        def work(unit, emit):
+            time.sleep(0.05)
+            return unit
+
+        start = time.perf_counter()
+        _collect(ThreadPoolMatchExecutor(8, poll_interval=0.01), range(16), work)
+        elapsed = time.perf_counter() - start
+
+        # Serial execution would take 16 * 0.05 = 0.8s
+        assert elapsed < 0.4
+
+    @pytest.mark.unit
+    def test_worker_exception_stops_submission_and_propagates(self):
+        started = []
+
+        def work(unit, emit):
+            started.append(unit)
+            if unit == 0:
+                raise RuntimeError("boom")
+            time.sleep(0.01)
+            return unit
+
+        with pytest.raises(RuntimeError, match="boom"):
+            _collect(ThreadPoolMatchExecutor(1, poll_interval=0.01), range(5), work)
+
+        assert started == [0]
+
+    @pytest.mark.unit
+    def test_units_in_flight_are_recorded_before_the_error_propagates(self):
+        recorded = []
+
+        def work(unit, emit):
+            if unit == 0:
+                raise RuntimeError("boom")
+            time.sleep(0.05)
+            return unit * 10
+
+        executor = ThreadPoolMatchExecutor(3, poll_interval=0.01)
+        with pytest.raises(RuntimeError, match="boom"):
+            executor.run(range(3), work, lambda event: None, lambda unit, result: recorded.append((unit, result)))
+
+        assert sorted(recorded) == [(1, 10), (2, 20)]
+
+    @pytest.mark.unit
+    def test_records_finished_units_while_the_next_ones_are_not_ready(self):
+        results = []
+
+        def units():
+            yield 1
+            # Nothing else is handed out until the first result has been recorded.
+            while not results:
+                yield UNIT_NOT_READY
+            yield 2
+
+        executor = ThreadPoolMatchExecutor(2, poll_interval=0.01)
+        executor.run(units(), lambda unit, emit: unit, lambda event: None, lambda unit, result: results.append(unit))
+
+        assert results == [1, 2]
+
+    @pytest.mark.unit
+    def test_units_see_the_callers_context(self):
+        job = contextvars.ContextVar("job", default=None)
+        job.set("job-1")
+
+        _, results, _ = _collect(ThreadPoolMatchExecutor(2, poll_interval=0.01), range(3), lambda unit, emit: job.get())
+
+        assert {result for _, result in results} == {"job-1"}
+
+
+class TestAIMDConcurrencyController:
+    @pytest.mark.unit
+    def test_grows_additively_up_to_maximum(self):
+        controller = AIMDConcurrencyController(initial=2, maximum=4)
+
+        limits = [controller.record(throttled=False) for _ in range(4)]
+
+        assert limits == [3, 4, 4, 4]
+        assert controller.peak == 4
+
+    @pytest.mark.unit
+    def test_throttle_halves_once_per_in_flight_window(self):
+        controller = AIMDConcurrencyController(initial=8, maximum=16)
+
+        assert controller.record(throttled=True) == 4
+        # The other 7 chats started under the old limit; their 429s do not count again.
+        assert [controller.record(throttled=True) for _ in range(7)] == [4] * 7
+        assert controller.record(throttled=True) == 2
+        assert controller.summary()["throttle_events"] == 9
+        assert controller.summary()["concurrency_decreases"] == 2
+
+    @pytest.mark.unit
+    def test_never_drops_below_minimum(self):
+        controller = AIMDConcurrencyController(initial=1, maximum=4)
+
+        assert controller.record(throttled=True) == 1
+
+    @pytest.mark.unit
+    def test_executor_follows_controller_limit(self):
+        controller = AIMDConcurrencyController(initial=1, maximum=3)
+        lock = threading.Lock()
+        state = {"active": 0, "peaks": []}
+
+        def work(unit, emit):
+            with lock:
+                state["active"] += 1
+                state["peaks"].append(state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return unit
+
+        def on_result(unit, result):
+            controller.record(throttled=False)
+
+        ThreadPoolMatchExecutor(8, poll_interval=0.01, controller=controller).run(
+            range(12), work, lambda event: None, on_result
+        )
+
+        assert state["peaks"][0] == 1
+        assert max(state["peaks"]) == 3
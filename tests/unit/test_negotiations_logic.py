@@ -10,8 +10,11 @@ is_invalid_api_key_error.
 
 import os
 import sys
+import threading
+import time
 from unittest.mock import MagicMock
 
+import openai
 import pytest
 
 STREAMLIT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../streamlit"))
@@ -19,6 +22,7 @@ if STREAMLIT_PATH not in sys.path:
     sys.path.insert(0, STREAMLIT_PATH)
 
 import modules.negotiations as neg  # noqa: E402
+import modules.negotiations_agents as negotiations_agents  # noqa: E402
 from modules.conversation_engine import ChatResult, GameAgent  # noqa: E402
 from modules.llm_provider import LLMConfig  # noqa: E402
 from modules.negotiations import (  # noqa: E402
@@ -28,6 +32,7 @@ from modules.negotiations import (  # noqa: E402
     clean_agent_message,
     create_chat,
     create_chats,
+    extract_deal_locally,
     extract_summary_from_transcript,
     get_maximizer_reservation,
     get_minimizer_maximizer,
@@ -38,6 +43,14 @@ from modules.negotiations import (  # noqa: E402
     parse_deal_value,
     resolve_initiator_role_index,
 )
+from modules.negotiations_agents import build_team_agents, create_agents, output_token_cap  # noqa: E402
+from modules.negotiations_checkpoints import MemoryCheckpointStore  # noqa: E402
+from modules.negotiations_summary import (  # noqa: E402
+    DEAL_SUMMARY_FORMAT,
+    build_summary_agent,
+    evaluate_deal_summary,
+    parse_structured_summary,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -511,6 +524,187 @@ class TestIsValidTermination:
         assert is_valid_termination(msg, history, self.TERM_MSG) is True
 
 
+# ---------------------------------------------------------------------------
+# extract_deal_locally
+# ---------------------------------------------------------------------------
+class TestExtractDealLocally:
+    TERM_MSG = "Pleasure doing business with you"
+
+    @pytest.mark.unit
+    def test_confirmed_offer_is_read(self):
+        history = [
+            {"name": "Buyer", "content": "Buyer: I can do $1,200, final offer."},
+            {"name": "Seller", "content": f"Seller: Agreed, $1,200 it is. Deal! {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG, "Buyer", "Seller") == 1200.0
+
+    @pytest.mark.unit
+    def test_agreement_from_one_side_only_is_left_to_the_summary_agent(self):
+        history = [
+            {"name": "Buyer", "content": "I can offer $59."},
+            {"name": "Seller", "content": f"That works for me. {self.TERM_MSG} at $59"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_open_counter_offer_is_left_to_the_summary_agent(self):
+        history = [
+            {"name": "Buyer", "content": "Final offer: $50, or $59 if you deliver."},
+            {"name": "Seller", "content": f"Deal, $59 then. {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "closing",
+        [
+            "I will not accept 100, that is too much for me.",
+            "Then no deal at 100.",
+            "Final answer: I can't do 100, we are done here.",
+            "I must decline 100. This is my final word.",
+        ],
+    )
+    def test_rejections_are_not_read_as_deals(self, closing):
+        history = [
+            {"name": "Buyer", "content": "Final offer: 100, take it and we have a deal."},
+            {"name": "Seller", "content": f"{closing} {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_other_figures_in_the_closing_messages_are_left_to_the_summary_agent(self):
+        history = [
+            {"name": "Buyer", "content": "Agreed, deal at $100 instead of the $80 I wanted."},
+            {"name": "Seller", "content": f"Deal at $100, agreed. {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_no_shared_figure_is_left_to_the_summary_agent(self):
+        history = [
+            {"name": "Buyer", "content": "My limit is $50."},
+            {"name": "Seller", "content": f"I need $70. {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_ambiguous_figures_are_left_to_the_summary_agent(self):
+        history = [
+            {"name": "Buyer", "content": "$40 for 2 units?"},
+            {"name": "Seller", "content": f"Deal: $40 for 2 units. {self.TERM_MSG}"},
+        ]
+
+        assert extract_deal_locally(history, self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_one_sided_history_is_not_read(self):
+        assert extract_deal_locally([{"name": "Buyer", "content": "$10"}], self.TERM_MSG) is None
+
+    @pytest.mark.unit
+    def test_create_chat_skips_the_summary_agent_for_a_clear_deal(self, monkeypatch):
+        engine = MagicMock()
+        engine.run_bilateral.return_value = ChatResult(
+            [
+                {"name": "BuyerAgent", "content": "I can offer $12, final."},
+                {"name": "SellerAgent", "content": f"Agreed at $12, deal. {self.TERM_MSG}"},
+            ]
+        )
+        buyer = GameAgent(name="BuyerAgent", system_message="buyer prompt")
+        seller = GameAgent(name="SellerAgent", system_message="seller prompt")
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+        insert_mock = MagicMock(return_value=True)
+        monkeypatch.setattr(neg, "insert_negotiation_chat", insert_mock)
+        diagnostics = neg.new_run_diagnostics()
+
+        deal = create_chat(
+            1,
+            {"Name": "ClassT_Group1", "Agent 1": buyer, "Agent 2": seller},
+            {"Name": "ClassT_Group2", "Agent 1": buyer, "Agent 2": seller},
+            1,
+            5,
+            "summarize",
+            1,
+            engine,
+            MagicMock(),
+            "The value agreed was",
+            self.TERM_MSG,
+            run_diagnostics=diagnostics,
+            read_deals_locally=True,
+        )
+
+        assert deal == 12.0
+        engine.single_decision.assert_not_called()
+        assert insert_mock.call_args.kwargs["summary"].endswith("The value agreed was 12")
+        assert (diagnostics["summary_local"], diagnostics["summary_calls"]) == (1, 0)
+
+
+# ---------------------------------------------------------------------------
+# structured summaries
+# ---------------------------------------------------------------------------
+class TestStructuredSummary:
+    HISTORY = [{"name": "Buyer", "content": "$12?"}, {"name": "Seller", "content": "Deal at $12."}]
+
+    @pytest.mark.unit
+    def test_parses_json_reply(self):
+        reply = '{"agreed": true, "value": 12, "summary": "Both confirmed 12."}'
+
+        assert parse_structured_summary(reply) == (True, 12.0, "Both confirmed 12.")
+
+    @pytest.mark.unit
+    def test_parses_json_inside_text(self):
+        reply = 'Here you go:\n```json\n{"agreed": false, "value": 12, "summary": "Retracted."}\n```'
+
+        assert parse_structured_summary(reply) == (False, None, "Retracted.")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("reply", ["", "Agreed value: 12", "{not json}", '{"value": 12}'])
+    def test_rejects_other_replies(self, reply):
+        assert parse_structured_summary(reply) is None
+
+    @pytest.mark.unit
+    def test_structured_agent_carries_the_schema(self):
+        agent = build_summary_agent("The value agreed was", "Pleasure", structured=True)
+
+        assert agent.response_format == DEAL_SUMMARY_FORMAT
+        assert '"agreed"' in agent.system_message
+        assert build_summary_agent("The value agreed was", "Pleasure").response_format is None
+
+    @pytest.mark.unit
+    def test_evaluation_stores_the_termination_line(self):
+        engine = MagicMock()
+        engine.single_decision.return_value = '{"agreed": true, "value": 12.5, "summary": "Deal."}'
+        agent = build_summary_agent("The value agreed was", "Pleasure", structured=True)
+
+        summary, deal = evaluate_deal_summary(engine, self.HISTORY, "summarize", "The value agreed was", agent)
+
+        assert (summary, deal) == ("Deal.\nThe value agreed was 12.5", 12.5)
+        assert extract_summary_from_transcript(f"Buyer: x\n\n\n{summary}", "The value agreed was")[1] == 12.5
+
+    @pytest.mark.unit
+    def test_unsupported_format_is_asked_again_without_it(self):
+        engine = MagicMock()
+        rejected = openai.BadRequestError(
+            "response_format unsupported", response=MagicMock(status_code=400, request=MagicMock()), body=None
+        )
+        engine.single_decision.side_effect = [rejected, '{"agreed": false, "value": null, "summary": "No deal."}']
+        agent = build_summary_agent("The value agreed was", "Pleasure", structured=True)
+        stats = {}
+
+        summary, deal = evaluate_deal_summary(
+            engine, self.HISTORY, "summarize", "The value agreed was", agent, stats=stats
+        )
+
+        assert (summary, deal) == ("No deal.\nThe value agreed was None", None)
+        assert engine.single_decision.call_args.args[0].response_format is None
+        assert stats == {"summary_structured_fallbacks": 1}
+
+
 # ---------------------------------------------------------------------------
 # build_llm_config
 # ---------------------------------------------------------------------------
@@ -597,6 +791,60 @@ class TestIsInvalidApiKeyError:
         assert is_invalid_api_key_error(Exception("INVALID API KEY")) is True
 
 
+# ---------------------------------------------------------------------------
+# create_chats with scripted chats
+# ---------------------------------------------------------------------------
+def _scripted_teams(count):
+    return [
+        {
+            "Name": f"ClassT_Group{i}",
+            "Value 1": 20,
+            "Value 2": 10,
+            "Agent 1": GameAgent(name=f"a{i}1", system_message="p"),
+            "Agent 2": GameAgent(name=f"a{i}2", system_message="p"),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def tournament(monkeypatch):
+    """Run create_chats for *team_count* teams with a scripted create_chat and schedule.
+
+    Round rows and score updates are recorded instead of stored; keyword
+    overrides replace the default create_chats arguments.
+    """
+    round_rows = []
+    score_updates = []
+    monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+    monkeypatch.setattr(neg, "insert_round_data", lambda *args, **kwargs: round_rows.append(args))
+    monkeypatch.setattr(neg, "update_round_data", lambda *args, **kwargs: score_updates.append(args))
+    monkeypatch.setattr(neg, "build_summary_agent", lambda *args, **kwargs: MagicMock())
+
+    def run(create_chat_fn, schedule=None, team_count=2, **overrides):
+        if schedule is not None:
+            monkeypatch.setattr(neg, "berger_schedule", lambda _teams, _rounds: schedule)
+        monkeypatch.setattr(neg, "create_chat", create_chat_fn)
+        arguments = {
+            "game_id": 1,
+            "llm_config": LLMConfig(model="test-model", api_key="sk-test"),
+            "name_roles": ["Buyer", "Seller"],
+            "conversation_order": "Buyer",
+            "teams": [["T", i] for i in range(1, team_count + 1)],
+            "values": [],
+            "num_rounds": 1,
+            "num_turns": 5,
+            "negotiation_termination_message": "Pleasure doing business with you",
+            "summary_prompt": "summarize",
+            "summary_termination_message": "The value agreed was",
+            "team_info": _scripted_teams(team_count),
+        }
+        arguments.update(overrides)
+        return create_chats(**arguments)
+
+    return run, round_rows, score_updates
+
+
 # ---------------------------------------------------------------------------
 # timing instrumentation
 # ---------------------------------------------------------------------------
@@ -659,28 +907,8 @@ class TestNegotiationTimingInstrumentation:
         assert insert_mock.call_count == 1
 
     @pytest.mark.unit
-    def test_create_chats_reports_timing_and_progress(self, monkeypatch):
-        # Arrange minimal deterministic 2-team schedule => 2 chats total
-        monkeypatch.setattr(neg, "berger_schedule", lambda _teams, _rounds: [[("ClassT_Group1", "ClassT_Group2")]])
-        monkeypatch.setattr(neg, "insert_round_data", lambda *args, **kwargs: True)
-        monkeypatch.setattr(neg, "update_round_data", lambda *args, **kwargs: True)
-        monkeypatch.setattr(neg, "build_summary_agent", lambda *args, **kwargs: MagicMock())
-
-        team1 = {
-            "Name": "ClassT_Group1",
-            "Value 1": 20,
-            "Value 2": 10,
-            "Agent 1": GameAgent(name="a11", system_message="p1"),
-            "Agent 2": GameAgent(name="a12", system_message="p2"),
-        }
-        team2 = {
-            "Name": "ClassT_Group2",
-            "Value 1": 19,
-            "Value 2": 9,
-            "Agent 1": GameAgent(name="a21", system_message="p3"),
-            "Agent 2": GameAgent(name="a22", system_message="p4"),
-        }
-        monkeypatch.setattr(neg, "create_agents", lambda *args, **kwargs: [team1, team2])
+    def test_create_chats_reports_timing_and_progress(self, tournament):
+        run, _, _ = tournament
 
         def fake_create_chat(*args, **kwargs):
             timing = kwargs["timing_totals"]
@@ -690,28 +918,13 @@ class TestNegotiationTimingInstrumentation:
             timing["chats_measured"] += 1
             return 12.0
 
-        monkeypatch.setattr(neg, "create_chat", fake_create_chat)
-
         progress_events = []
 
         def progress_cb(**kwargs):
             progress_events.append(kwargs)
 
-        # Act
-        result = create_chats(
-            game_id=1,
-            llm_config=LLMConfig(model="test-model", api_key="sk-test"),
-            name_roles=["Buyer", "Seller"],
-            conversation_order="Buyer",
-            teams=[["T", 1], ["T", 2]],
-            values=[{"class": "T", "group_id": 1}, {"class": "T", "group_id": 2}],
-            num_rounds=1,
-            num_turns=5,
-            negotiation_termination_message="Pleasure doing business with you",
-            summary_prompt="summarize",
-            summary_termination_message="The value agreed was",
-            progress_callback=progress_cb,
-        )
+        # Act: minimal deterministic 2-team schedule => 2 chats total
+        result = run(fake_create_chat, [[("ClassT_Group1", "ClassT_Group2")]], progress_callback=progress_cb)
 
         # Assert
         assert result["status"] == "success"
@@ -727,3 +940,552 @@ class TestNegotiationTimingInstrumentation:
         assert "running" in phases
         assert phases.count("completed") == 2
         assert all(event["total_matches"] == 2 for event in progress_events)
+
+    @pytest.mark.unit
+    def test_create_chats_parallel_updates_scores_per_role(self, tournament):
+        run, round_rows, score_updates = tournament
+        worker_threads = set()
+
+        def fake_create_chat(game_id, minimizer_team, maximizer_team, *args, **kwargs):
+            worker_threads.add(threading.get_ident())
+            kwargs["timing_totals"]["chats_measured"] += 1
+            kwargs["run_diagnostics"]["successful_chats"] += 1
+            time.sleep(0.02)
+            return 15.0
+
+        # Two matches in one round => four chats played on a thread pool
+        result = run(
+            fake_create_chat,
+            [[("ClassT_Group1", "ClassT_Group2"), ("ClassT_Group3", "ClassT_Group4")]],
+            team_count=4,
+            max_concurrency=4,
+        )
+
+        assert result["status"] == "success"
+        assert result["completed_matches"] == 4
+        assert result["timing"]["chats_measured"] == 4
+        assert result["diagnostics"]["max_concurrency"] == 4
+        assert len(round_rows) == 2
+        assert threading.get_ident() not in worker_threads
+        # Each round row receives one update per role assignment
+        role_pairs = sorted((args[1:6], args[8:10]) for args in score_updates)
+        assert role_pairs == [
+            ((1, "T", "1", "T", "2"), (1, 2)),
+            ((1, "T", "1", "T", "2"), (2, 1)),
+            ((1, "T", "3", "T", "4"), (1, 2)),
+            ((1, "T", "3", "T", "4"), (2, 1)),
+        ]
+
+    @pytest.mark.unit
+    def test_create_chat_does_not_mutate_shared_agents(self, monkeypatch):
+        engine = MagicMock()
+        engine.run_bilateral.return_value = ChatResult([{"name": "a", "content": "hi"}])
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {"explanation": "rules"})
+
+        buyer = GameAgent(name="Buyer", system_message="buyer prompt")
+        seller = GameAgent(name="Seller", system_message="seller prompt")
+        minimizer_team = {"Name": "ClassT_Group1", "Agent 1": buyer, "Agent 2": seller}
+        maximizer_team = {"Name": "ClassT_Group2", "Agent 1": buyer, "Agent 2": seller}
+
+        for _ in range(2):
+            create_chat(1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, None, "Agreed", "Done")
+
+        assert buyer.system_message == "buyer prompt"
+        sent_agent1 = engine.run_bilateral.call_args[0][0]
+        assert sent_agent1.system_message == "Game Type: zero-sum\nGame Explanation: rules\n\nbuyer prompt"
+
+    @pytest.mark.unit
+    def test_create_chats_does_not_restart_chat_on_fatal_error(self, tournament):
+        run, _, _ = tournament
+        attempts = []
+
+        def failing_create_chat(*args, **kwargs):
+            attempts.append(1)
+            raise ValueError("model does not exist")
+
+        result = run(failing_create_chat, [[("ClassT_Group1", "ClassT_Group2")]])
+
+        assert result["status"] == "partial"
+        assert len(attempts) == 2  # one attempt per chat, no restarts
+        assert result["diagnostics"]["llm_fatal_errors"] == 2
+        assert len(result["errors"]) == 2
+
+    @pytest.mark.unit
+    def test_create_chats_aborts_the_run_on_a_rejected_key(self, tournament):
+        run, _, score_updates = tournament
+        attempts = []
+
+        def rejected_create_chat(*args, **kwargs):
+            attempts.append(1)
+            raise openai.AuthenticationError(
+                "bad key", response=MagicMock(status_code=401, headers={}, request=MagicMock()), body=None
+            )
+
+        result = run(
+            rejected_create_chat,
+            [[("ClassT_Group1", "ClassT_Group2")], [("ClassT_Group2", "ClassT_Group1")]],
+            num_rounds=2,
+        )
+
+        assert result["status"] == "aborted"
+        assert len(attempts) == 1
+        assert score_updates == []
+        assert result["abort"]["reason"] == "auth"
+        assert result["abort"]["round"] == 1
+        assert result["abort"]["unplayed_matches"] == 3
+        assert result["processed_matches"] == 1
+        assert "Error Chats" in result["message"]
+
+
+class TestResumeTournament:
+    @pytest.mark.unit
+    def test_schedule_from_round_rows(self):
+        rows = [
+            (2, "A", 1, "A", 3, None, None, None, None),
+            (1, "A", 1, "A", 2, 0.4, 0.6, None, None),
+            (1, "A", 3, "A", 4, 0.5, 0.5, 0.3, 0.7),
+        ]
+
+        schedule = neg.schedule_from_round_rows(rows)
+
+        assert schedule == [
+            [("ClassA_Group1", "ClassA_Group2", True, False), ("ClassA_Group3", "ClassA_Group4", True, True)],
+            [("ClassA_Group1", "ClassA_Group3", False, False)],
+        ]
+
+    @pytest.mark.unit
+    def test_resume_plays_only_chats_without_a_result(self, tournament, monkeypatch):
+        run, inserted, score_updates = tournament
+        monkeypatch.setattr(
+            neg,
+            "get_round_data",
+            lambda _gid: [
+                (1, "T", 1, "T", 2, 0.4, 0.6, None, None),
+                (1, "T", 3, "T", 4, 0.5, 0.5, 0.3, 0.7),
+            ],
+        )
+        played = []
+
+        def fake_create_chat(game_id, minimizer_team, maximizer_team, *args, **kwargs):
+            played.append((minimizer_team["Name"], maximizer_team["Name"]))
+            return 15.0
+
+        result = run(fake_create_chat, team_count=4, resume=True)
+
+        assert result["status"] == "success"
+        assert played == [("ClassT_Group2", "ClassT_Group1")]
+        assert (result["total_matches"], result["resumed_matches"]) == (1, 3)
+        assert inserted == []
+        assert [args[1:6] + args[8:10] for args in score_updates] == [(1, "T", "1", "T", "2", 2, 1)]
+
+    @pytest.mark.unit
+    def test_resume_aborts_when_the_stored_schedule_cannot_be_read(self, tournament, monkeypatch):
+        run, inserted, _ = tournament
+        monkeypatch.setattr(neg, "get_round_data", lambda _gid: False)
+        create_chat_mock = MagicMock()
+
+        with pytest.raises(RuntimeError, match="not resumed"):
+            run(create_chat_mock, team_count=4, resume=True)
+
+        assert inserted == []
+        create_chat_mock.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Checkpointed chats
+# ---------------------------------------------------------------------------
+class TestChatCheckpoints:
+    @pytest.fixture
+    def teams(self, monkeypatch):
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {"explanation": "rules"})
+        monkeypatch.setattr(neg, "insert_negotiation_chat", MagicMock(return_value=True))
+        buyer = GameAgent(name="Buyer", system_message="buyer prompt")
+        seller = GameAgent(name="Seller", system_message="seller prompt")
+        minimizer_team = {"Name": "ClassT_Group1", "Agent 1": buyer, "Agent 2": seller}
+        maximizer_team = {"Name": "ClassT_Group2", "Agent 1": buyer, "Agent 2": seller}
+        return minimizer_team, maximizer_team
+
+    @pytest.mark.unit
+    def test_retry_resumes_from_last_checkpoint(self, teams):
+        minimizer_team, maximizer_team = teams
+        store = MemoryCheckpointStore()
+        key = (1, 1, "T", 1, "T", 2)
+        opener = {"name": "Buyer", "content": "Open."}
+        received_histories = []
+
+        def run_bilateral(agent1, agent2, max_turns, termination_fn, stats=None, history=None, on_message=None):
+            received_histories.append(history)
+            if history is None:
+                if on_message is not None:
+                    on_message([opener])
+                raise TimeoutError("provider hung up")
+            return ChatResult(history + [{"name": "Seller", "content": "Done"}])
+
+        engine = MagicMock()
+        engine.run_bilateral.side_effect = run_bilateral
+        diagnostics = neg.new_run_diagnostics()
+
+        with pytest.raises(TimeoutError):
+            create_chat(1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, None, "Agreed", "Done")
+        assert received_histories == [None]  # checkpointing is opt-in
+
+        with pytest.raises(TimeoutError):
+            create_chat(
+                1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, None, "Agreed", "Done", checkpoint_store=store
+            )
+        assert store.load(key) == [opener]
+
+        create_chat(
+            1,
+            minimizer_team,
+            maximizer_team,
+            1,
+            3,
+            "s",
+            1,
+            engine,
+            None,
+            "Agreed",
+            "Done",
+            run_diagnostics=diagnostics,
+            checkpoint_store=store,
+        )
+
+        assert received_histories[-1] == [opener]
+        assert diagnostics["resumed_chats"] == 1
+        assert diagnostics["resumed_messages"] == 1
+        assert store.load(key) is None
+
+    @pytest.mark.unit
+    def test_checkpoint_from_other_agents_is_ignored(self, teams):
+        minimizer_team, maximizer_team = teams
+        store = MemoryCheckpointStore()
+        store.save((1, 1, "T", 1, "T", 2), [{"name": "Someone", "content": "Open."}])
+        engine = MagicMock()
+        engine.run_bilateral.return_value = ChatResult([{"name": "Buyer", "content": "hi"}])
+
+        create_chat(
+            1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, None, "Agreed", "Done", checkpoint_store=store
+        )
+
+        assert engine.run_bilateral.call_args.kwargs["history"] is None
+
+    @pytest.mark.unit
+    def test_checkpoint_kept_when_result_not_stored(self, teams, monkeypatch):
+        minimizer_team, maximizer_team = teams
+        monkeypatch.setattr(neg, "insert_negotiation_chat", MagicMock(return_value=False))
+        store = MemoryCheckpointStore()
+        history = [{"name": "Buyer", "content": "Open."}, {"name": "Seller", "content": "Done"}]
+
+        def run_bilateral(*args, on_message=None, **kwargs):
+            on_message(history)
+            return ChatResult(history)
+
+        engine = MagicMock()
+        engine.run_bilateral.side_effect = run_bilateral
+
+        create_chat(
+            1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, None, "Agreed", "Done", checkpoint_store=store
+        )
+
+        assert store.load((1, 1, "T", 1, "T", 2)) == history
+
+
+# ---------------------------------------------------------------------------
+# token usage accounting
+# ---------------------------------------------------------------------------
+class TestChatUsage:
+    @pytest.mark.unit
+    def test_create_chat_stores_usage_and_merges_diagnostics(self, monkeypatch):
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {"explanation": "rules"})
+        insert_mock = MagicMock(return_value=True)
+        monkeypatch.setattr(neg, "insert_negotiation_chat", insert_mock)
+        buyer = GameAgent(name="Buyer", system_message="buyer prompt")
+        seller = GameAgent(name="Seller", system_message="seller prompt")
+        minimizer_team = {"Name": "ClassT_Group1", "Agent 1": buyer, "Agent 2": seller}
+        maximizer_team = {"Name": "ClassT_Group2", "Agent 1": buyer, "Agent 2": seller}
+
+        def run_bilateral(*args, stats=None, **kwargs):
+            stats.update({"llm_calls": 2, "prompt_tokens": 1_000_000, "completion_tokens": 100_000})
+            return ChatResult([{"name": "Buyer", "content": "Open."}, {"name": "Seller", "content": "Done"}])
+
+        def evaluate_deal_summary(*args, stats=None, **kwargs):
+            stats.update({"llm_calls": stats["llm_calls"] + 1, "cached_tokens": 500_000})
+            return "Agreed 10", 10
+
+        monkeypatch.setattr(neg, "evaluate_deal_summary", evaluate_deal_summary)
+        engine = MagicMock(model="gpt-5-mini")
+        engine.run_bilateral.side_effect = run_bilateral
+        diagnostics = neg.new_run_diagnostics()
+
+        create_chat(
+            1,
+            minimizer_team,
+            maximizer_team,
+            1,
+            3,
+            "s",
+            1,
+            engine,
+            object(),
+            "Agreed",
+            "Done",
+            run_diagnostics=diagnostics,
+        )
+
+        assert insert_mock.call_args.kwargs["usage"] == {
+            "prompt_tokens": 1_000_000,
+            "completion_tokens": 100_000,
+            "cached_tokens": 500_000,
+            # 500k uncached input at $0.25/M + 500k cached at $0.025/M + 100k output at $2/M
+            "cost_usd": 0.3375,
+        }
+        assert diagnostics["llm_calls"] == 3
+        assert diagnostics["prompt_tokens"] == 1_000_000
+
+    @pytest.mark.unit
+    def test_usage_is_priced_per_model(self, monkeypatch):
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+        insert_mock = MagicMock(return_value=True)
+        monkeypatch.setattr(neg, "insert_negotiation_chat", insert_mock)
+        monkeypatch.setattr(neg, "evaluate_deal_summary", lambda *args, **kwargs: ("Agreed 10", 10))
+        agent = GameAgent(name="Buyer", system_message="prompt")
+        minimizer_team = {"Name": "ClassT_Group1", "Agent 1": agent, "Agent 2": agent}
+        maximizer_team = {"Name": "ClassT_Group2", "Agent 1": agent, "Agent 2": agent}
+
+        def run_bilateral(*args, stats=None, **kwargs):
+            # Half the chat went to a fallback route serving gpt-5-nano.
+            for model in ("gpt-5-mini", "gpt-5-nano"):
+                for field, tokens in (("prompt_tokens", 1_000_000), ("completion_tokens", 100_000)):
+                    stats[field] = stats.get(field, 0) + tokens
+                    stats[f"model_usage:{model}:{field}"] = tokens
+            return ChatResult([{"name": "Buyer", "content": "Open."}, {"name": "Buyer", "content": "Done"}])
+
+        engine = MagicMock(model="gpt-5-mini")
+        engine.run_bilateral.side_effect = run_bilateral
+
+        create_chat(1, minimizer_team, maximizer_team, 1, 3, "s", 1, engine, object(), "Agreed", "Done")
+
+        assert insert_mock.call_args.kwargs["usage"] == {
+            "prompt_tokens": 2_000_000,
+            "completion_tokens": 200_000,
+            "cached_tokens": 0,
+            # gpt-5-mini: $0.25 + $0.20; gpt-5-nano: $0.05 + $0.04
+            "cost_usd": 0.54,
+        }
+
+    @pytest.mark.unit
+    def test_failed_chat_still_counts_usage(self, monkeypatch):
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+        agent = GameAgent(name="Buyer", system_message="prompt")
+        team = {"Name": "ClassT_Group1", "Agent 1": agent, "Agent 2": agent}
+
+        def run_bilateral(*args, stats=None, **kwargs):
+            stats["prompt_tokens"] = 42
+            raise TimeoutError("provider hung up")
+
+        engine = MagicMock()
+        engine.run_bilateral.side_effect = run_bilateral
+        diagnostics = neg.new_run_diagnostics()
+
+        with pytest.raises(TimeoutError):
+            create_chat(1, team, team, 1, 3, "s", 1, engine, None, "Agreed", "Done", run_diagnostics=diagnostics)
+
+        assert diagnostics["prompt_tokens"] == 42
+
+
+class TestGameContext:
+    @pytest.mark.unit
+    def test_create_chats_builds_the_game_context_once(self, tournament, monkeypatch):
+        run, _, _ = tournament
+        lookups = []
+        monkeypatch.setattr(neg, "get_game_by_id", lambda gid: lookups.append(gid) or {"explanation": "rules"})
+        contexts = []
+
+        def fake_create_chat(*args, **kwargs):
+            contexts.append(kwargs["game_context"])
+            return 12.0
+
+        run(
+            fake_create_chat,
+            [[("ClassT_Group1", "ClassT_Group2")], [("ClassT_Group2", "ClassT_Group1")]],
+            num_rounds=2,
+        )
+
+        assert lookups == [1]
+        assert contexts == ["Game Type: zero-sum\nGame Explanation: rules\n\n"] * 4
+
+
+class TestKeyPoolFailover:
+    @pytest.mark.unit
+    def test_chat_moves_to_another_key_when_one_is_rejected(self, tournament):
+        run, _, _ = tournament
+        engines = []
+
+        def fake_create_chat(*args, **kwargs):
+            engine = args[7]
+            engines.append(engine.model)
+            if engine.model == "revoked":
+                raise openai.AuthenticationError(
+                    "bad key", response=MagicMock(status_code=401, headers={}, request=MagicMock()), body=None
+                )
+            return 12.0
+
+        result = run(
+            fake_create_chat,
+            [[("ClassT_Group1", "ClassT_Group2")]],
+            llm_config=[LLMConfig(model="revoked", api_key="sk-1"), LLMConfig(model="healthy", api_key="sk-2")],
+            key_labels=["old", "new"],
+        )
+
+        assert result["status"] == "success"
+        assert engines == ["revoked", "healthy", "healthy"]
+        assert result["diagnostics"]["key_failovers"] == 1
+        assert [key["label"] for key in result["diagnostics"]["keys"]] == ["old", "new"]
+        assert result["diagnostics"]["keys"][0]["disabled"]
+
+
+# ---------------------------------------------------------------------------
+# negotiation generation limits
+# ---------------------------------------------------------------------------
+
+
+class TestNegotiationLimits:
+    @pytest.mark.unit
+    def test_agents_get_limits_from_the_word_budget(self):
+        team = build_team_agents(("T", 1), ["buy", "sell"], 10, 20, ["Buyer", "Seller"], "Deal done", words=50)
+
+        limits = team["Agent 1"].limits
+
+        assert limits is team["Agent 2"].limits
+        assert limits.max_output_tokens == output_token_cap(50, "Deal done") == 135 + 3
+        assert limits.stop == ("\nBuyer:", "\nSeller:")
+        assert limits.stop_after == "Deal done"
+
+
+# ---------------------------------------------------------------------------
+# create_agents
+# ---------------------------------------------------------------------------
+
+
+class TestCreateAgents:
+    @pytest.mark.unit
+    def test_fetches_every_submission_in_one_query(self, monkeypatch):
+        lookups = []
+        inputs = {
+            ("T", group): {"prompt": f"buy {group} #_;:) sell {group}", "minimizer_value": 10, "maximizer_value": 20}
+            for group in (1, 2, 3)
+        }
+        monkeypatch.setattr(negotiations_agents, "get_game_team_inputs", lambda gid: lookups.append(gid) or inputs)
+        values = [{"class": "T", "group_id": 2, "minimizer_value": 30, "maximizer_value": 40}]
+
+        teams = create_agents(1, [("T", 1), ("T", 2), ("T", 3)], values, ["Buyer", "Seller"], "Deal")
+
+        assert lookups == [1]
+        assert [team["Name"] for team in teams] == ["ClassT_Group1", "ClassT_Group2", "ClassT_Group3"]
+        # Values passed in take precedence over the stored ones.
+        assert [(team["Value 1"], team["Value 2"]) for team in teams] == [(10, 20), (30, 40), (10, 20)]
+        assert teams[1]["Agent 2"].system_message.startswith("sell 2")
+
+    @pytest.mark.unit
+    def test_missing_submission_raises(self, monkeypatch):
+        monkeypatch.setattr(negotiations_agents, "get_game_team_inputs", lambda gid: {})
+
+        with pytest.raises(Exception, match="No submission found"):
+            create_agents(1, [("T", 1)], [], ["Buyer", "Seller"], "Deal")
+
+
+# ---------------------------------------------------------------------------
+# create_all_error_chats
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def error_chats(monkeypatch):
+    """Re-run the two chats of one failed match with a scripted create_chat."""
+    teams = [
+        {
+            "Name": f"ClassT_Group{i}",
+            "Value 1": 20,
+            "Value 2": 10,
+            "Agent 1": GameAgent(name=f"a{i}1", system_message="p"),
+            "Agent 2": GameAgent(name=f"a{i}2", system_message="p"),
+        }
+        for i in (1, 2)
+    ]
+    monkeypatch.setattr(neg, "get_error_matchups", lambda _gid: [(1, ("T", 1), ("T", 2), 1, 1)])
+    monkeypatch.setattr(neg, "create_agents", lambda *args, **kwargs: teams)
+    monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+    score_updates = []
+    monkeypatch.setattr(neg, "update_round_data", lambda *args, **kwargs: score_updates.append(args))
+
+    def run(create_chat_fn):
+        monkeypatch.setattr(neg, "create_chat", create_chat_fn)
+        return neg.create_all_error_chats(
+            1,
+            LLMConfig(model="test-model", api_key="sk-test"),
+            ["Buyer", "Seller"],
+            "Buyer",
+            [],
+            5,
+            "Deal",
+            "summarize",
+            "Agreed",
+        )
+
+    return run, score_updates
+
+
+class TestCreateAllErrorChats:
+    @pytest.mark.unit
+    def test_fatal_error_is_not_restarted(self, error_chats):
+        run, score_updates = error_chats
+        attempts = []
+
+        def create_chat_fn(game_id, minimizer_team, *args, **kwargs):
+            attempts.append(minimizer_team["Name"])
+            if minimizer_team["Name"] == "ClassT_Group1":
+                raise ValueError("bad request")
+            return 15.0
+
+        message = run(create_chat_fn)
+
+        assert attempts == ["ClassT_Group1", "ClassT_Group2"]
+        assert "Round 1 - ClassT_Group1 (Buyer) vs ClassT_Group2 (Seller)" in message
+        assert len(score_updates) == 1
+
+    @pytest.mark.unit
+    def test_retryable_error_restarts_the_chat_three_times(self, error_chats):
+        run, score_updates = error_chats
+        attempts = []
+
+        def create_chat_fn(game_id, minimizer_team, *args, **kwargs):
+            attempts.append(minimizer_team["Name"])
+            if minimizer_team["Name"] == "ClassT_Group1":
+                raise TimeoutError("timed out")
+            return 15.0
+
+        message = run(create_chat_fn)
+
+        assert attempts.count("ClassT_Group1") == 3
+        assert "unsuccessful" in message
+        assert len(score_updates) == 1
+
+    @pytest.mark.unit
+    def test_run_wide_failure_stops_the_rerun(self, error_chats):
+        run, score_updates = error_chats
+        attempts = []
+        rejected = openai.AuthenticationError(
+            "invalid api key", response=MagicMock(status_code=401, headers={}, request=MagicMock()), body=None
+        )
+
+        def create_chat_fn(game_id, minimizer_team, *args, **kwargs):
+            attempts.append(minimizer_team["Name"])
+            raise rejected
+
+        message = run(create_chat_fn)
+
+        assert attempts == ["ClassT_Group1"]
+        assert "1 chats were left unplayed" in message
+        assert "AuthenticationError: invalid api key" in message
+        assert score_updates == []
@@ -0,0 +1,88 @@
+"""Unit tests for the compiled tournament plan."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.conversation_engine import GameAgent  # noqa: E402
+from modules.negotiations_plan import compile_simulation_plan  # noqa: E402
+
+CONTEXT = "Game Type: zero-sum\nGame Explanation: rules\n\n"
+
+
+def _teams(*groups):
+    return [
+        {
+            "Name": f"ClassT_Group{group}",
+            "Value 1": 20,
+            "Value 2": 10,
+            "Agent 1": GameAgent(name=f"Buyer{group}", system_message="buy low"),
+            "Agent 2": GameAgent(name=f"Seller{group}", system_message="sell high"),
+        }
+        for group in groups
+    ]
+
+
+class TestCompileSimulationPlan:
+    @pytest.mark.unit
+    def test_resolves_rows_and_units(self):
+        teams = _teams(1, 2, 3)
+        schedule = [[("ClassT_Group1", "ClassT_Group2")], [("ClassT_Group3", "ClassT_Group1")]]
+
+        plan = compile_simulation_plan(schedule, teams, 1, CONTEXT)
+
+        assert plan.rows == ((1, "T", "1", "T", "2"), (2, "T", "3", "T", "1"))
+        assert plan.total_matches == 4
+        assert [(unit["round"], unit["team1"]["Name"], unit["team2"]["Name"]) for unit in plan.units] == [
+            (1, "ClassT_Group1", "ClassT_Group2"),
+            (1, "ClassT_Group2", "ClassT_Group1"),
+            (2, "ClassT_Group3", "ClassT_Group1"),
+            (2, "ClassT_Group1", "ClassT_Group3"),
+        ]
+        assert plan.units[1]["row"] is plan.units[0]["row"]
+        assert plan.team("T", 3) is teams[2]
+
+    @pytest.mark.unit
+    def test_agents_carry_the_game_context_on_copies(self):
+        teams = _teams(1, 2)
+        plan = compile_simulation_plan([[("ClassT_Group1", "ClassT_Group2")]], teams, 2, CONTEXT)
+
+        initiator, responder = plan.chat_agents(teams[0], teams[1])
+
+        # With role 2 opening, the maximizer's seller starts and the minimizer's buyer answers.
+        assert (initiator.name, responder.name) == ("Seller2", "Buyer1")
+        assert initiator.system_message == CONTEXT + "sell high"
+        assert teams[1]["Agent 2"].system_message == "sell high"
+
+    @pytest.mark.unit
+    def test_resume_leaves_out_finished_chats(self):
+        teams = _teams(1, 2)
+        schedule = [[("ClassT_Group1", "ClassT_Group2", True, False)]]
+
+        plan = compile_simulation_plan(schedule, teams, 1, CONTEXT, resume=True)
+
+        assert plan.resumed_matches == 1
+        assert [(unit["team1"]["Name"], unit["team2"]["Name"]) for unit in plan.units] == [
+            ("ClassT_Group2", "ClassT_Group1")
+        ]
+
+    @pytest.mark.unit
+    def test_skips_matches_with_unknown_teams(self):
+        plan = compile_simulation_plan([[("ClassT_Group1", "ClassT_Group9")]], _teams(1, 2), 1)
+
+        assert plan.rows == ()
+        assert plan.units == ()
+
+    @pytest.mark.unit
+    def test_plan_is_read_only(self):
+        plan = compile_simulation_plan([[("ClassT_Group1", "ClassT_Group2")]], _teams(1, 2), 1)
+
+        with pytest.raises(TypeError):
+            plan.units[0]["round"] = 2
+        with pytest.raises(TypeError):
+            plan.teams["ClassT_Group3"] = {}
+        with pytest.raises(AttributeError):
+            plan.game_context = "changed"
@@ -0,0 +1,180 @@
+"""Unit tests for the background deal-summary stage."""
+
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+import modules.negotiations as neg  # noqa: E402
+from modules.conversation_engine import GameAgent  # noqa: E402
+from modules.llm_key_pool import KeyPool  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.negotiations_summary_stage import SummaryStage, build_batch_prompt, split_batch_reply  # noqa: E402
+
+HISTORY = [{"name": "Buyer", "content": "10?"}, {"name": "Seller", "content": "Deal at 10."}]
+
+
+def _stage(replies, batch_size=1, workers=1):
+    engine = MagicMock()
+    engine.single_decision.side_effect = replies
+    agent = GameAgent(name="Summary_Agent", system_message="s")
+    return SummaryStage(engine, "What was agreed?", "Agreed value:", agent, workers=workers, batch_size=batch_size)
+
+
+class TestBatchFormat:
+    @pytest.mark.unit
+    def test_prompt_numbers_each_transcript(self):
+        prompt = build_batch_prompt(["A: 1\n\n\n", "B: 2\n\n\n"], "What was agreed?")
+
+        assert "### Negotiation 1\nA: 1" in prompt
+        assert "### Negotiation 2\nB: 2" in prompt
+        assert "What was agreed?" in prompt
+
+    @pytest.mark.unit
+    def test_split_reply_by_heading(self):
+        reply = "### Negotiation 1\nThey agreed.\nAgreed value: 10\n\n## Negotiation 2:\nNo deal.\nAgreed value: None"
+
+        sections = split_batch_reply(reply)
+
+        assert sections == {1: "They agreed.\nAgreed value: 10", 2: "No deal.\nAgreed value: None"}
+
+
+class TestSummaryStage:
+    @pytest.mark.unit
+    def test_evaluates_each_transcript(self):
+        stage = _stage(["Agreed value: 12", "Agreed value: None"])
+        stage.submit(HISTORY, "Buyer", "Seller", tag="a")
+        stage.submit(HISTORY, "Buyer", "Seller", tag="b")
+
+        results = sorted(stage.join(), key=lambda result: result["tag"])
+        stage.close()
+
+        assert [(result["tag"], result["deal_value"]) for result in results] == [("a", 12.0), ("b", None)]
+        assert all(result["error"] is None for result in results)
+
+    @pytest.mark.unit
+    def test_reports_errors_with_the_tag(self):
+        stage = _stage([RuntimeError("down")])
+        stage.submit(HISTORY, "Buyer", "Seller", tag="a")
+
+        (result,) = stage.join()
+        stage.close()
+
+        assert result["tag"] == "a"
+        assert isinstance(result["error"], RuntimeError)
+
+    @pytest.mark.unit
+    def test_requests_go_through_the_key_pool(self):
+        engines = {}
+
+        def engine_for(config):
+            engines[config.api_key] = MagicMock()
+            engines[config.api_key].single_decision.return_value = "Agreed value: 12"
+            return engines[config.api_key]
+
+        pool = KeyPool([LLMConfig(model="m", api_key="sk-a"), LLMConfig(model="m", api_key="sk-b")], engine_for)
+        engines["sk-a"].single_decision.side_effect = RuntimeError("down")
+        agent = GameAgent(name="Summary_Agent", system_message="s")
+        stage = SummaryStage(None, "What was agreed?", "Agreed value:", agent, workers=1, key_pool=pool)
+
+        for tag in ("a", "b"):
+            stage.submit(HISTORY, "Buyer", "Seller", tag=tag)
+            stage.join()
+        stage.close()
+
+        assert [(key["chats"], key["failures"], key["in_flight"]) for key in pool.summary()] == [(1, 1, 0), (1, 0, 0)]
+        engines["sk-b"].single_decision.assert_called_once()
+
+    @pytest.mark.unit
+    def test_batches_queued_transcripts_and_falls_back_for_missing_sections(self):
+        started, release = threading.Event(), threading.Event()
+        replies = iter(
+            [
+                "### Negotiation 1\nAgreed value: 10\n### Negotiation 2\nI am not sure.",
+                "Agreed value: 20",
+            ]
+        )
+
+        def single_decision(agent, prompt, stats=None):
+            if prompt.startswith("Buyer"):
+                # The first transcript holds the worker until the next two are queued.
+                started.set()
+                release.wait(5)
+                return "Agreed value: 1"
+            return next(replies)
+
+        stage = _stage(None, batch_size=3)
+        stage.engine.single_decision.side_effect = single_decision
+        stage.submit(HISTORY, "Buyer", "Seller", tag="gate")
+        started.wait(5)
+        stage.submit(HISTORY[1:], "Buyer", "Seller", tag="a")
+        stage.submit(HISTORY[1:], "Buyer", "Seller", tag="b")
+        release.set()
+
+        results = {result["tag"]: result["deal_value"] for result in stage.join()}
+        stage.close()
+
+        assert results == {"gate": 1.0, "a": 10.0, "b": 20.0}
+        assert stage.summary() == {"summary_batches": 1, "summary_batch_fallbacks": 1}
+
+
+class TestCreateChatsWithSummaryStage:
+    @pytest.mark.unit
+    def test_summaries_and_scores_are_back_filled(self, monkeypatch):
+        monkeypatch.setattr(neg, "insert_round_data", lambda *args, **kwargs: None)
+        score_updates = []
+        monkeypatch.setattr(neg, "update_round_data", lambda *args, **kwargs: score_updates.append(args))
+        back_filled = []
+        monkeypatch.setattr(
+            neg, "update_negotiation_chat_summary", lambda *args, **kwargs: back_filled.append(args) or True
+        )
+        monkeypatch.setattr(neg, "insert_negotiation_chat", MagicMock(return_value=True))
+        monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+
+        def fake_run_bilateral(self, agent1, agent2, *args, **kwargs):
+            return MagicMock(chat_history=[{"name": agent1.name, "content": "Deal at 15."}])
+
+        def fake_single_decision(self, agent, prompt, stats=None):
+            return "They agreed.\nThe value agreed was 15"
+
+        monkeypatch.setattr(neg.ConversationEngine, "run_bilateral", fake_run_bilateral)
+        monkeypatch.setattr(neg.ConversationEngine, "single_decision", fake_single_decision)
+        teams = [
+            {
+                "Name": f"ClassT_Group{i}",
+                "Value 1": 20,
+                "Value 2": 10,
+                "Agent 1": GameAgent(name=f"Buyer{i}", system_message="p"),
+                "Agent 2": GameAgent(name=f"Seller{i}", system_message="p"),
+            }
+            for i in (1, 2)
+        ]
+
+        result = neg.create_chats(
+            game_id=1,
+            llm_config=LLMConfig(model="test-model", api_key="sk-test"),
+            name_roles=["Buyer", "Seller"],
+            conversation_order="Buyer",
+            teams=[["T", 1], ["T", 2]],
+            values=[],
+            num_rounds=1,
+            num_turns=5,
+            negotiation_termination_message="Pleasure doing business with you",
+            summary_prompt="summarize",
+            summary_termination_message="The value agreed was",
+            team_info=teams,
+            summary_workers=2,
+        )
+
+        assert result["status"] == "success"
+        assert result["completed_matches"] == 2
+        assert result["diagnostics"]["summary_calls"] == 2
+        assert sorted(args[6:8] for args in back_filled) == [
+            ("They agreed.\nThe value agreed was 15", 15.0),
+            ("They agreed.\nThe value agreed was 15", 15.0),
+        ]
+        assert len(score_updates) == 2
@@ -0,0 +1,312 @@
+"""Unit tests for the distributed chat work queue."""
+
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+import modules.database_handler as database_handler  # noqa: E402
+import modules.negotiations as neg  # noqa: E402
+import modules.negotiations_work_queue as work_queue_module  # noqa: E402
+from modules.conversation_engine import GameAgent  # noqa: E402
+from modules.llm_provider import LLMConfig  # noqa: E402
+from modules.negotiations_executor import UNIT_NOT_READY  # noqa: E402
+from modules.negotiations_work_queue import (  # noqa: E402
+    UNIT_DONE,
+    UNIT_LEASED,
+    UNIT_PENDING,
+    ChatWorkQueue,
+    DatabaseWorkQueueStore,
+    MemoryWorkQueueStore,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _unit(round_number, group1, group2, group1_initiates=True):
+    return {
+        "round_number": round_number,
+        "group1_class": "T",
+        "group1_id": group1,
+        "group2_class": "T",
+        "group2_id": group2,
+        "group1_initiates": group1_initiates,
+    }
+
+
+class TestMemoryWorkQueueStore:
+    @pytest.mark.unit
+    def test_claims_in_round_order_and_ignores_duplicates(self):
+        store = MemoryWorkQueueStore()
+        assert store.enqueue(1, [_unit(2, 1, 3), _unit(1, 1, 2)]) == 2
+        assert store.enqueue(1, [_unit(1, 1, 2)]) == 0
+
+        first = store.claim(1, "w1", 60)
+        second = store.claim(1, "w2", 60)
+
+        assert (first["round_number"], first["leased_by"]) == (1, "w1")
+        assert (second["round_number"], second["leased_by"]) == (2, "w2")
+        assert store.claim(1, "w3", 60) is None
+
+    @pytest.mark.unit
+    def test_expired_lease_is_claimed_again(self):
+        clock = FakeClock()
+        store = MemoryWorkQueueStore(clock=clock)
+        store.enqueue(1, [_unit(1, 1, 2)])
+        claimed = store.claim(1, "crashed", 60)
+
+        clock.now += 61
+        reclaimed = store.claim(1, "w2", 60)
+
+        assert reclaimed["unit_id"] == claimed["unit_id"]
+        assert reclaimed["attempts"] == 2
+        assert not store.finish(claimed["unit_id"], "crashed", UNIT_DONE)
+        assert store.finish(claimed["unit_id"], "w2", UNIT_DONE)
+        assert store.counts(1) == {UNIT_DONE: 1}
+
+    @pytest.mark.unit
+    def test_renewed_lease_does_not_expire(self):
+        clock = FakeClock()
+        store = MemoryWorkQueueStore(clock=clock)
+        store.enqueue(1, [_unit(1, 1, 2)])
+        claimed = store.claim(1, "w1", 60)
+
+        clock.now += 50
+        assert store.renew([claimed["unit_id"]], "w1", 60) == 1
+        clock.now += 50
+
+        assert store.claim(1, "w2", 60) is None
+
+
+class TestChatWorkQueue:
+    @pytest.mark.unit
+    def test_waits_for_other_workers_and_reclaims_their_expired_units(self):
+        clock = FakeClock()
+        store = MemoryWorkQueueStore(clock=clock)
+        store.enqueue(1, [_unit(1, 1, 2), _unit(1, 1, 2, group1_initiates=False)])
+        store.claim(1, "crashed", 60)
+        queue = ChatWorkQueue(1, store, worker_id="w1", lease_seconds=60, poll_seconds=5, clock=clock)
+
+        claimed = []
+        waits = 0
+        for unit in queue.claimed_units():
+            if unit is UNIT_NOT_READY:
+                waits += 1
+                clock.now += 30
+                continue
+            claimed.append(unit["unit_id"])
+            queue.finish(unit["unit_id"], UNIT_DONE)
+        queue.close()
+
+        assert claimed == [2, 1]
+        assert waits == 3
+        assert queue.summary() == {"worker": "w1", "claimed": 2, "reclaimed": 1, "units": {UNIT_DONE: 2}}
+
+    @pytest.mark.unit
+    def test_does_not_poll_the_store_before_the_interval(self):
+        clock = FakeClock()
+        store = MemoryWorkQueueStore(clock=clock)
+        store.enqueue(1, [_unit(1, 1, 2)])
+        store.claim(1, "other", 60)
+        queue = ChatWorkQueue(1, store, worker_id="w1", lease_seconds=60, poll_seconds=5, clock=clock)
+        store.claim = MagicMock(wraps=store.claim)
+
+        units = queue.claimed_units()
+
+        assert [next(units) for _ in range(3)] == [UNIT_NOT_READY] * 3
+        assert store.claim.call_count == 1
+        clock.now += 5
+        assert next(units) is UNIT_NOT_READY
+        assert store.claim.call_count == 2
+
+    @pytest.mark.unit
+    def test_stops_when_only_its_own_units_are_open(self):
+        store = MemoryWorkQueueStore()
+        store.enqueue(1, [_unit(1, 1, 2)])
+        queue = ChatWorkQueue(1, store, worker_id="w1", lease_seconds=60)
+
+        units = queue.claimed_units()
+        held = next(units)
+
+        assert list(units) == []
+        assert store.counts(1) == {UNIT_LEASED: 1}
+        queue.finish(held["unit_id"], UNIT_PENDING)
+        queue.close()
+        assert store.counts(1) == {UNIT_PENDING: 1}
+
+    @pytest.mark.unit
+    def test_lease_renewals_use_the_callers_dedicated_connection(self, monkeypatch):
+        job_conn = MagicMock(closed=False)
+        renewed_on = []
+        renewed = threading.Event()
+
+        def renew(unit_ids, worker, lease_seconds):
+            renewed_on.append(database_handler.get_connection())
+            renewed.set()
+            return len(unit_ids)
+
+        monkeypatch.setattr(work_queue_module, "renew_chat_work_leases", renew)
+        store = DatabaseWorkQueueStore()
+        store.claim = MagicMock(return_value={"unit_id": 1, "attempts": 1})
+        queue = ChatWorkQueue(1, store, worker_id="w1", lease_seconds=0.03)
+
+        token = database_handler._dedicated_connection.set(job_conn)
+        try:
+            queue.claim()
+        finally:
+            database_handler._dedicated_connection.reset(token)
+        assert renewed.wait(5)
+        queue.close()
+
+        assert renewed_on[0] is job_conn
+
+
+@pytest.fixture
+def tournament(monkeypatch):
+    monkeypatch.setattr(neg, "insert_round_data", lambda *args, **kwargs: None)
+    score_updates = []
+    monkeypatch.setattr(neg, "update_round_data", lambda *args, **kwargs: score_updates.append(args))
+    monkeypatch.setattr(neg, "build_summary_agent", lambda *args, **kwargs: MagicMock())
+    monkeypatch.setattr(neg, "get_game_by_id", lambda _gid: {})
+    played = []
+
+    def fake_create_chat(game_id, minimizer_team, maximizer_team, *args, **kwargs):
+        played.append((minimizer_team["Name"], maximizer_team["Name"]))
+        return 15.0
+
+    monkeypatch.setattr(neg, "create_chat", fake_create_chat)
+    teams = [
+        {
+            "Name": f"ClassT_Group{i}",
+            "Value 1": 20,
+            "Value 2": 10,
+            "Agent 1": GameAgent(name=f"a{i}1", system_message="p"),
+            "Agent 2": GameAgent(name=f"a{i}2", system_message="p"),
+        }
+        for i in range(1, 5)
+    ]
+
+    def run(work_queue, join_queue=False, **kwargs):
+        return neg.create_chats(
+            game_id=1,
+            llm_config=LLMConfig(model="test-model", api_key="sk-test"),
+            name_roles=["Buyer", "Seller"],
+            conversation_order="Buyer",
+            teams=[["T", i] for i in range(1, 5)],
+            values=[],
+            num_rounds=1,
+            num_turns=5,
+            negotiation_termination_message="Pleasure doing business with you",
+            summary_prompt="summarize",
+            summary_termination_message="The value agreed was",
+            team_info=teams,
+            work_queue=work_queue,
+            join_queue=join_queue,
+            **kwargs,
+        )
+
+    return run, played, score_updates
+
+
+class TestCreateChatsWithWorkQueue:
+    @pytest.mark.unit
+    def test_lead_queues_and_plays_the_whole_schedule(self, tournament):
+        run, played, score_updates = tournament
+        store = MemoryWorkQueueStore()
+
+        result = run(ChatWorkQueue(1, store, worker_id="lead"))
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == result["completed_matches"] == 4
+        assert len(set(played)) == 4
+        assert len(score_updates) == 4
+        assert store.counts(1) == {UNIT_DONE: 4}
+        assert result["diagnostics"]["work_queue"]["claimed"] == 4
+
+    @pytest.mark.unit
+    def test_joining_worker_plays_only_queued_chats(self, tournament):
+        run, played, score_updates = tournament
+        store = MemoryWorkQueueStore()
+        store.enqueue(1, [_unit(1, 1, 2, group1_initiates=False)])
+
+        result = run(ChatWorkQueue(1, store, worker_id="helper"), join_queue=True)
+
+        assert result["status"] == "success"
+        assert played == [("ClassT_Group2", "ClassT_Group1")]
+        # Group 2 initiated as the buyer (minimizer), which is role 1 of the row's team 2.
+        assert [args[1:6] + args[8:10] for args in score_updates] == [(1, "T", "1", "T", "2", 2, 1)]
+        assert store.counts(1) == {UNIT_DONE: 1}
+
+    @pytest.mark.unit
+    def test_lead_stores_the_run_settings_with_the_queue(self, tournament):
+        run, _, _ = tournament
+        store = MemoryWorkQueueStore()
+
+        run(ChatWorkQueue(1, store, worker_id="lead"), read_deals_locally=True, structured_summaries=True)
+
+        assert store.settings(1) == {
+            "summary_workers": 0,
+            "summary_batch_size": 1,
+            "read_deals_locally": True,
+            "structured_summaries": True,
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "fail_over": False,
+        }
+
+    @pytest.mark.unit
+    def test_units_with_a_pending_summary_stay_leased(self, tournament, monkeypatch):
+        run, _, score_updates = tournament
+        store = MemoryWorkQueueStore()
+
+        def deferred_chat(*args, run_diagnostics=None, **kwargs):
+            # The summary was handed to the stage but never comes back, as if the process died.
+            run_diagnostics["summary_deferred"] = run_diagnostics.get("summary_deferred", 0) + 1
+            return None
+
+        monkeypatch.setattr(neg, "create_chat", deferred_chat)
+
+        run(ChatWorkQueue(1, store, worker_id="lead"), summary_workers=1)
+
+        assert score_updates == []
+        assert store.counts(1) == {UNIT_LEASED: 4}
+
+    @pytest.mark.unit
+    def test_units_are_done_once_their_deferred_summary_is_stored(self, tournament, monkeypatch):
+        run, _, score_updates = tournament
+        store = MemoryWorkQueueStore()
+        scores_when_done = []
+        finish = store.finish
+
+        def recording_finish(unit_id, worker, status, error=None):
+            if status == UNIT_DONE:
+                scores_when_done.append(len(score_updates))
+            return finish(unit_id, worker, status, error)
+
+        def deferred_chat(*args, run_diagnostics=None, summary_stage=None, summary_tag=None, **kwargs):
+            run_diagnostics["summary_deferred"] = run_diagnostics.get("summary_deferred", 0) + 1
+            summary_stage.submit([{"name": "a", "content": "15"}], "a", "b", tag={"chat_key": None, **summary_tag})
+            return None
+
+        monkeypatch.setattr(store, "finish", recording_finish)
+        monkeypatch.setattr(neg, "create_chat", deferred_chat)
+        monkeypatch.setattr(neg, "build_summary_agent", lambda *args, **kwargs: GameAgent(name="S", system_message="s"))
+        monkeypatch.setattr(
+            neg.ConversationEngine, "single_decision", lambda self, agent, prompt, stats=None: "The value agreed was 15"
+        )
+
+        result = run(ChatWorkQueue(1, store, worker_id="lead"), summary_workers=1)
+
+        assert result["completed_matches"] == 4
+        assert store.counts(1) == {UNIT_DONE: 4}
+        assert all(scores >= position for position, scores in enumerate(scores_when_done, 1))
@@ -0,0 +1,127 @@
+"""Unit tests for background simulation jobs."""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "streamlit"))
+
+from modules.simulation_jobs import (  # noqa: E402
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JobProgress,
+    MemoryJobStore,
+    SimulationJobRunner,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _report(progress, processed, phase):
+    team1, team2 = {"Name": "ClassA_Group1"}, {"Name": "ClassA_Group2"}
+    progress(1, team1, team2, "Buyer", "Seller", processed, 4, phase, attempt=1)
+
+
+class TestJobProgress:
+    @pytest.mark.unit
+    def test_throttles_writes_but_records_finished_chats(self):
+        store = MemoryJobStore()
+        job_id = store.create(1)
+        clock = FakeClock()
+        progress = JobProgress(store, job_id, interval=1.0, clock=clock)
+
+        _report(progress, 0, "running")
+        _report(progress, 0, "running")
+        assert store.get(job_id)["progress"].endswith("Running (attempt 1)")
+
+        _report(progress, 1, "completed")
+        assert store.get(job_id)["processed_matches"] == 1
+
+        clock.now += 0.5
+        _report(progress, 1, "running")
+        assert "Completed" in store.get(job_id)["progress"]
+        clock.now += 1.0
+        _report(progress, 1, "running")
+        assert "Running" in store.get(job_id)["progress"]
+
+
+class TestSimulationJobRunner:
+    @pytest.mark.unit
+    def test_run_job_records_the_outcome(self):
+        store = MemoryJobStore()
+        runner = SimulationJobRunner(store)
+        job_id = store.create(1, params={"model": "m"}, total_matches=4)
+        outcome = {"status": "partial", "processed_matches": 4, "completed_matches": 3, "total_matches": 4}
+
+        runner.run_job(job_id, lambda progress: outcome)
+
+        job = store.get(job_id)
+        assert job["status"] == "partial"
+        assert job["completed_matches"] == 3
+        assert job["result"] == outcome
+        assert job["worker"] == runner.worker_id
+
+    @pytest.mark.unit
+    def test_job_runs_inside_the_store_connection(self):
+        store = MemoryJobStore()
+        events = []
+
+        class Connection:
+            def __enter__(self):
+                events.append("open")
+
+            def __exit__(self, *exc):
+                events.append("close")
+
+        store.connection = Connection
+        job_id = store.create(1)
+
+        SimulationJobRunner(store).run_job(job_id, lambda progress: events.append("run") or "done")
+
+        assert events == ["open", "run", "close"]
+
+    @pytest.mark.unit
+    def test_failed_job_keeps_the_error(self):
+        store = MemoryJobStore()
+        runner = SimulationJobRunner(store)
+        job_id = store.create(1)
+
+        def run(progress):
+            raise RuntimeError("database went away")
+
+        runner.run_job(job_id, run)
+
+        assert store.get(job_id)["status"] == JOB_FAILED
+        assert store.get(job_id)["error"] == "RuntimeError: database went away"
+
+    @pytest.mark.unit
+    def test_jobs_run_in_the_background_one_at_a_time(self):
+        store = MemoryJobStore()
+        runner = SimulationJobRunner(store, workers=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def first(progress):
+            started.set()
+            release.wait(5)
+            return {"status": "success"}
+
+        first_id = runner.submit(1, first, total_matches=2)
+        second_id = runner.submit(1, lambda progress: {"status": "success"})
+        assert started.wait(5)
+
+        assert store.get(first_id)["status"] == JOB_RUNNING
+        assert store.get(second_id)["status"] == JOB_QUEUED
+
+        release.set()
+        runner.wait()
+        assert [job["status"] for job in runner.jobs(1)] == ["success", "success"]